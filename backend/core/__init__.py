@@ -5,7 +5,21 @@ backend.core - 核心配置与基础设施模块
 """
 
 from .config import settings
-from .database import db, connect_to_mongo, close_mongo_connection
+from .database import db, connect_storage, close_storage
+from .throttle import Throttle
+from .tokenizer import Tokenizer, get_tokenizer, trim_to_budget
+from .executor import run_in_thread, run_in_process, offload, shutdown_executors
+from .loop_monitor import LoopLagMonitor, loop_monitor
+from .responses import ORJSONResponse, make_etag, etag_matches, not_modified
+from .compression import CompressionMiddleware
+from .request_scope import request_scope, RequestScopeMiddleware
+from .llm_client import get_openai_client, use_openai_client, close_openai_client
+from .stages import StageRecorder, stage, staged, record_stages
+from .metrics import METRICS_ENABLED, MetricsMiddleware, chat_turn, db_timed, render_metrics
+from .tracing import Trace, Span, start_trace, span, open_span, traced_db, current_trace, current_trace_id, TracingMiddleware
+from .log_pipeline import configure_logging, shutdown_logging, log_context, LogContextMiddleware, JSONFormatter, log_stats
+from .profiling import StackSampler, MemoryTracker, memory_tracker, profile_worker, admin_authorized, ProfilingMiddleware
+from .pubsub import PubSub, Subscription, FanOut, LocalFanOut, RedisFanOut, pubsub, user_channel
 from .exceptions import (
     BaseError,
     RepositoryError,
@@ -22,8 +36,65 @@ from .exceptions import (
 __all__ = [
     "settings",
     "db",
-    "connect_to_mongo",
-    "close_mongo_connection",
+    "connect_storage",
+    "close_storage",
+    "Throttle",
+    "Tokenizer",
+    "get_tokenizer",
+    "trim_to_budget",
+    "run_in_thread",
+    "run_in_process",
+    "offload",
+    "shutdown_executors",
+    "LoopLagMonitor",
+    "loop_monitor",
+    "ORJSONResponse",
+    "make_etag",
+    "etag_matches",
+    "not_modified",
+    "CompressionMiddleware",
+    "request_scope",
+    "RequestScopeMiddleware",
+    "get_openai_client",
+    "use_openai_client",
+    "close_openai_client",
+    "StageRecorder",
+    "stage",
+    "staged",
+    "record_stages",
+    "METRICS_ENABLED",
+    "MetricsMiddleware",
+    "chat_turn",
+    "db_timed",
+    "render_metrics",
+    "Trace",
+    "Span",
+    "start_trace",
+    "span",
+    "open_span",
+    "traced_db",
+    "current_trace",
+    "current_trace_id",
+    "TracingMiddleware",
+    "configure_logging",
+    "shutdown_logging",
+    "log_context",
+    "LogContextMiddleware",
+    "JSONFormatter",
+    "log_stats",
+    "StackSampler",
+    "MemoryTracker",
+    "memory_tracker",
+    "profile_worker",
+    "admin_authorized",
+    "ProfilingMiddleware",
+    "PubSub",
+    "Subscription",
+    "FanOut",
+    "LocalFanOut",
+    "RedisFanOut",
+    "pubsub",
+    "user_channel",
     "BaseError",
     "RepositoryError",
     "DocumentNotFoundError",
@@ -0,0 +1,116 @@
+"""
+[INPUT]: 依赖 gzip 标准库，可选依赖 brotli，依赖 backend.core.executor 的 offload，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 CompressionMiddleware 类（按 Accept-Encoding 协商 br/gzip 压缩整段 JSON 响应）
+[POS]: backend/core 的响应压缩层，被 main.py 注册为最外层中间件
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, List, Optional, Tuple
+import gzip
+from .config import settings
+from .executor import offload
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：uv sync --extra brotli
+    brotli = None
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def _compress_br(body: bytes) -> bytes:
+    # quality 4：压缩率接近 gzip -6 以上，速度与之相当（默认 11 面向静态资源，太慢）
+    return brotli.compress(body, quality=4)
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding 选择编码：br（已安装 brotli 时）优先于 gzip，q=0 表示拒绝"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if weights.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """响应压缩（纯 ASGI 中间件）
+
+    只压缩一次性发送的完整响应体（历史、列表等 JSON）：
+    - 流式响应（more_body=True，如 NDJSON 导出）原样透传，不缓冲
+    - 已带 Content-Encoding（如 zstd 导出）、304/204、非文本类型、小于阈值的响应不压缩
+    - 压缩放到 offload：大响应体在线程池中执行（zlib/brotli 计算期间释放 GIL）
+    可压缩的响应统一带 Vary: Accept-Encoding，避免共享缓存把压缩体发给不支持的客户端。
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.RESPONSE_COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept) if accept else None
+        start: Optional[dict] = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            pending, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(pending, body):
+                await send(pending)
+                await send(message)
+                return
+
+            headers = [(k, v) for k, v in pending["headers"] if k != b"content-length"]
+            headers.append((b"vary", b"Accept-Encoding"))
+            if encoding:
+                compress = _compress_br if encoding == "br" else _compress_gzip
+                body = await offload(compress, body, size=len(body))
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**pending, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start: dict, body: bytes) -> bool:
+        if start["status"] < 200 or start["status"] in (204, 304) or len(body) < self.minimum_size:
+            return False
+        headers: List[Tuple[bytes, bytes]] = start.get("headers", [])
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(_COMPRESSIBLE_TYPES)
@@ -6,15 +6,42 @@
 """
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 
 class Settings(BaseSettings):
     """应用全局配置"""
 
+    # === 存储后端配置 ===
+    STORAGE_BACKEND: Literal["mongo", "memory", "sqlite"] = "mongo"  # memory 数据随进程退出丢失
+    SQLITE_PATH: str = "chuxing.db"  # SQLite 后端的数据库文件
+    INDEX_SKIP_IF_CURRENT: bool = True  # 存储中记录的索引结构版本与声明一致时，启动跳过逐集合索引检查
+
+    # === 启动预热配置 ===
+    WARMUP_TIMEOUT: float = 30.0  # 预热超时（秒），超时后仍标记为就绪
+    WARMUP_AGENT_LIMIT: int = 1000  # 预加载编码器时读取的 Agent 数上限
+    WARMUP_STORAGE_CONNECTIONS: int = 4  # 预先建立的存储连接数（并发轻量查询）
+    WARMUP_LLM_CONNECTION: bool = False  # 是否预先请求一次 models 接口，建立到 LLM 服务的连接
+
     # === MongoDB 配置 ===
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "llm_chat"
+    MONGODB_MAX_POOL_SIZE: int = 100  # 每个服务器的连接池上限
+    MONGODB_MIN_POOL_SIZE: int = 0  # 每个服务器保持的最少连接数
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None  # 空闲连接回收时间，None 为不回收
+    MONGODB_CONNECT_TIMEOUT_MS: int = 20000  # 建立连接超时
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None  # 单次读写超时，None 为不超时
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000  # 选择可用节点的超时（主节点切换期间的最长等待）
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # 连接池耗尽时等待空闲连接的超时，None 为一直等待
+    # 读意图 → 读偏好（primary / primaryPreferred / secondary / secondaryPreferred / nearest），未列出的意图走主节点（JSON 格式）
+    MONGODB_READ_PREFERENCES: Dict[str, str] = {
+        "history": "secondaryPreferred",
+        "search": "secondaryPreferred",
+        "export": "secondaryPreferred",
+        "stats": "secondaryPreferred",
+    }
+    MONGODB_MAX_STALENESS_SECONDS: int = -1  # 从节点最大复制延迟（不小于 90），超过的从节点不参与读；-1 为不限制
+    MONGODB_CAUSAL_CONSISTENCY: bool = True  # 请求 / 对话轮次内使用因果一致会话，并通过 X-Causal-Token 跨请求延续
 
     # === OpenAI 配置 ===
     OPENAI_API_KEY: str
@@ -23,11 +50,94 @@ class Settings(BaseSettings):
     # === LLM 上下文配置 ===
     MAX_CONTEXT_TOKENS: int = 4096
 
+    # === 分词配置 ===
+    DEFAULT_TOKEN_ENCODING: str = "o200k_base"  # 未知模型使用的 tiktoken 编码
+    TOKENIZER_MODEL_OVERRIDES: Dict[str, str] = {}  # 模型名 → 编码名，覆盖内置规则（JSON 格式）
+    RETOKENIZE_BATCH_SIZE: int = 1000  # 重新计数任务每批处理的消息数
+
+    # === CPU 执行器配置 ===
+    CPU_THREAD_WORKERS: int = 4  # 线程池大小（tiktoken/zstd 等释放 GIL 的计算）
+    CPU_PROCESS_WORKERS: int = 2  # 进程池大小（纯 Python 计算，<=0 时退化为线程池）
+    OFFLOAD_THREAD_THRESHOLD: int = 16384  # 输入规模（字符/字节）达到该值才交给线程池
+    OFFLOAD_PROCESS_THRESHOLD: int = 262144  # 纯 Python 计算输入达到该值才交给进程池
+
+    # === 事件循环监控配置 ===
+    ENABLE_LOOP_MONITOR: bool = True  # 是否采样事件循环延迟
+    LOOP_LAG_SAMPLE_INTERVAL: float = 0.1  # 采样间隔（秒）
+    LOOP_STALL_THRESHOLD: float = 0.25  # 事件循环阻塞超过该时长（秒）时记录调用栈
+
+    # === 监控指标配置 ===
+    ENABLE_METRICS: bool = True  # 是否暴露 /metrics（需安装 prometheus-client，未安装时自动关闭）
+
+    # === 链路追踪配置 ===
+    ENABLE_TRACING: bool = False  # 是否为每个请求 / WebSocket 对话轮次收集 span
+    TRACE_FILE: str = "traces.jsonl"  # 导出文件（每行一个 OTLP/JSON 请求，按大小轮转）
+    TRACE_FILE_MAX_BYTES: int = 50 * 1024 * 1024  # 单个导出文件的大小上限
+    TRACE_FILE_BACKUPS: int = 5  # 保留的轮转文件数
+    TRACE_SAMPLE_RATE: float = 0.01  # 头部采样：普通请求的导出比例
+    TRACE_SLOW_THRESHOLD: float = 2.0  # 尾部采样：耗时达到该值（秒）或出错的请求一律导出
+    TRACE_MAX_SPANS: int = 1000  # 单个 trace 最多保留的 span 数
+    TRACE_SERVICE_NAME: str = "chuxing"  # 导出的 service.name
+
+    # === 日志配置 ===
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"  # json 每行一个对象（带 trace_id / conversation_id / route）
+    LOG_QUEUE_SIZE: int = 10000  # 待写日志队列上限，满时丢弃（不阻塞请求）
+    LOG_SAMPLE_RATE: float = 1.0  # 请求内 INFO 及以下日志的默认采样比例（按请求整体保留或丢弃）
+    LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {}  # "METHOD 路由模板" → 采样比例，覆盖默认值（JSON 格式）
+
+    # === 性能剖析配置 ===
+    ADMIN_TOKEN: str = ""  # 管理令牌（请求头 X-Admin-Token），为空时关闭性能剖析
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # 采样间隔（秒）
+    PROFILE_MAX_SECONDS: float = 60.0  # 整个 worker 剖析的最长时长（秒）
+
+    # === 响应压缩配置 ===
+    ENABLE_RESPONSE_COMPRESSION: bool = True  # 是否按 Accept-Encoding 压缩响应（br 需安装 brotli，否则 gzip）
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024  # 响应体达到该字节数才压缩
+
+    # === 实时通道配置 ===
+    WS_SEND_QUEUE_SIZE: int = 256  # 每条 WebSocket 连接的待发送帧上限（推送溢出时断开，对话增量则等待）
+    WS_MAX_TURNS_PER_CONNECTION: int = 4  # 单条连接并发进行的对话轮次上限
+    PUBSUB_BACKEND: Literal["local", "redis"] = "local"  # 跨 worker 事件扇出：local 单进程，redis 多 worker/多节点
+    REDIS_URL: str = "redis://localhost:6379/0"
+
     # === 上下文压缩配置 ===
     ENABLE_CONTEXT_COMPRESSION: bool = False  # 是否启用上下文压缩
     COMPRESSION_THRESHOLD: int = 30  # 触发压缩的消息数阈值
     COMPRESSION_TARGET: int = 10  # 压缩后保留的消息数
 
+    # === 级联删除配置 ===
+    CASCADE_DELETE_BATCH_SIZE: int = 1000  # 单批 delete_many 的最大文档数
+    CASCADE_DELETE_RATE: float = 5.0  # 每秒最多执行的删除批次数（<=0 不限速）
+
+    # === 消息保留策略配置 ===
+    MESSAGE_RETENTION_DAYS: Optional[int] = None  # 全局默认保留天数（用户/Agent 均未配置时生效）
+    RETENTION_TTL_GRACE_DAYS: int = 7  # TTL 兜底宽限期：压缩任务未能处理的消息最终由 TTL 索引删除
+    ENABLE_RETENTION_COMPACTION: bool = False  # 是否定期运行过期消息压缩任务
+    RETENTION_COMPACTION_INTERVAL: int = 3600  # 压缩任务调度间隔（秒）
+    RETENTION_COMPACTION_BATCH_SIZE: int = 200  # 单次折叠进摘要的最大消息数
+    RETENTION_COMPACTION_RATE: float = 1.0  # 每秒最多处理的折叠批次数（<=0 不限速）
+    JOB_TTL_DAYS: int = 7  # 已结束后台任务的保留天数
+    JOB_LEASE_SECONDS: int = 60  # 后台任务租约时长：执行中每 1/3 租约续约一次，进程退出后超时由其他进程接管
+
+    # === 导入导出配置 ===
+    EXPORT_BATCH_SIZE: int = 1000  # 导出游标每批拉取的文档数
+    IMPORT_CHUNK_SIZE: int = 1000  # 导入时每次 insert_many 的文档数
+
+    # === 全文检索配置 ===
+    ENABLE_SEARCH_INDEX: bool = True  # 写入消息时是否同步更新倒排索引
+    SEARCH_MAX_TERMS_PER_MESSAGE: int = 2000  # 单条消息最多索引的词项数
+    SEARCH_MAX_CANDIDATES: int = 5000  # 单次查询最多评估的候选消息数（按最新优先）
+
+    # === 统计汇总配置 ===
+    ENABLE_STATS_ROLLUPS: bool = True  # 写入消息时是否累加小时 / 天汇总桶
+    STATS_MAX_POINTS: int = 2000  # 单次统计查询最多覆盖的时间桶数
+    STATS_REBUILD_CHUNK_SIZE: int = 200  # 重建任务每块扫描的会话数
+    STATS_REBUILD_CONCURRENCY: int = 4  # 重建任务并发扫描的块数
+
+    # === 会话分支配置 ===
+    LINEAGE_CACHE_SIZE: int = 10000  # 进程内缓存的会话祖先链数量
+
     # === 服务器配置 ===
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
@@ -1,81 +1,237 @@
 """
-[INPUT]: 依赖 motor.motor_asyncio 的 AsyncIOMotorClient，依赖 backend.core.config 的 settings
-[OUTPUT]: 对外提供 db 全局对象、connect_to_mongo/close_mongo_connection 生命周期函数
-[POS]: backend/core 的数据库连接管理器，被 main.py 的 lifespan 和所有 Repository 消费
+[INPUT]: 依赖 backend.storage 的 StorageBackend/create_backend，依赖 backend.storage.routing 的 causal_scope，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 db 全局对象（按名称获取集合）、connect_storage/close_storage 生命周期函数、INDEXES 索引声明、index_schema_version 与 ensure_indexes、CausalConsistencyMiddleware
+[POS]: backend/core 的存储后端管理器，被 main.py 的 lifespan（及注册中间件）和所有 Repository 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from .config import settings
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import hashlib
 import logging
+from .config import settings
+from .exceptions import DuplicateKeyError, RepositoryError
+from ..storage.base import IndexKeys, StorageBackend, StorageCollection, normalize_keys
+from ..storage.routing import causal_scope
 
 logger = logging.getLogger(__name__)
 
 
-# ==================== 数据库连接管理 ====================
-class Database:
-    """MongoDB 连接池封装"""
-
-    client: AsyncIOMotorClient = None
-    db: AsyncIOMotorDatabase = None
-
-
-# 全局数据库实例
-db = Database()
-
-
-async def connect_to_mongo() -> None:
-    """应用启动时调用：建立连接池 + 创建索引"""
-    logger.info(f"正在连接 MongoDB: {settings.MONGODB_URL}")
-
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
-    db.db = db.client[settings.MONGODB_DB_NAME]
-
-    # 测试连接
-    try:
-        await db.client.admin.command("ping")
-        logger.info("MongoDB 连接成功")
-    except Exception as e:
-        logger.error(f"MongoDB 连接失败: {e}")
-        raise
+# ==================== 存储后端管理 ====================
+def _create_backend() -> StorageBackend:
+    # 存储实现依赖 backend.core.exceptions，延迟导入避免循环
+    from ..storage import create_backend
 
-    # 创建索引
-    await create_indexes()
+    return create_backend(settings.STORAGE_BACKEND)
 
 
-async def close_mongo_connection() -> None:
-    """应用关闭时调用：关闭连接池"""
-    logger.info("正在关闭 MongoDB 连接")
-    if db.client:
-        db.client.close()
-        logger.info("MongoDB 连接已关闭")
-
+class Database:
+    """存储后端持有者（后端由 Settings.STORAGE_BACKEND 选择，首次使用时创建）"""
 
-async def create_indexes() -> None:
-    """创建所有集合的索引（幂等操作）"""
-    logger.info("开始创建数据库索引")
+    backend: Optional[StorageBackend] = None
 
-    # === users 集合索引 ===
-    await db.db.users.create_index("username", unique=True)
-    await db.db.users.create_index("created_at")
-    await db.db.users.create_index("user_id", unique=True)
-    logger.info("users 集合索引创建完成")
+    def collection(self, name: str) -> StorageCollection:
+        if self.backend is None:
+            self.backend = _create_backend()
+        return self.backend.collection(name)
 
-    # === agents 集合索引 ===
-    await db.db.agents.create_index("agent_id", unique=True)
-    await db.db.agents.create_index("name")
-    await db.db.agents.create_index("created_at")
-    logger.info("agents 集合索引创建完成")
 
-    # === conversations 集合索引 ===
-    await db.db.conversations.create_index("conversation_id", unique=True)
-    await db.db.conversations.create_index([("user_id", 1), ("created_at", -1)])
-    await db.db.conversations.create_index("agent_id")
-    logger.info("conversations 集合索引创建完成")
+# 全局数据库实例
+db = Database()
 
-    # === messages 集合索引 ===
-    await db.db.messages.create_index("message_id", unique=True)
-    await db.db.messages.create_index([("conversation_id", 1), ("created_at", 1)])
-    logger.info("messages 集合索引创建完成")
 
-    logger.info("所有索引创建完成")
+async def connect_storage() -> None:
+    """应用启动时调用：连接存储后端 + 补齐索引"""
+    if db.backend is None:
+        db.backend = _create_backend()
+    logger.info("存储后端: %s", db.backend.name)
+    await db.backend.connect()
+    await ensure_indexes()
+
+
+async def close_storage() -> None:
+    """应用关闭时调用：释放存储后端连接"""
+    if db.backend is not None:
+        await db.backend.close()
+
+
+# ==================== 因果一致 ====================
+class CausalConsistencyMiddleware:
+    """每个 HTTP 请求一个因果一致范围（纯 ASGI 中间件）
+
+    请求内的读（包括路由到从节点的历史 / 检索 / 导出）一定能读到本请求此前的写；
+    响应头 X-Causal-Token 带回本请求观察到的最新逻辑时间，客户端在下一个请求带上同名请求头，
+    即可跨请求读到自己的写（例如发完消息立刻拉历史）。流式响应的令牌只覆盖响应开始前的写。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope["headers"]).get(b"x-causal-token")
+        with causal_scope(token.decode("latin-1") if token else None) as clock:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    value = clock.token()
+                    if value is not None:
+                        message["headers"] = [*message.get("headers", ()), (b"x-causal-token", value.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+# ==================== 索引管理 ====================
+# 集合 → [(键, create_index 选项)]；改动此表即改变索引结构版本，下次启动时逐集合比对补齐
+# TTL 索引（仅 Mongo 后端生效，其余后端依赖保留策略任务清理）：
+# - messages.expire_at：保留策略的兜底删除（未设置 expire_at 的消息永久保留）
+# - jobs.finished_at：已结束的任务记录自动过期
+# jobs.singleton：周期任务的同类型去重键（未结束时为任务类型，结束时改为 job_id）
+INDEXES: Dict[str, List[Tuple[IndexKeys, Dict[str, Any]]]] = {
+    "users": [
+        ("username", {"unique": True}),
+        ("created_at", {}),
+        ("user_id", {"unique": True}),
+    ],
+    "agents": [
+        ("agent_id", {"unique": True}),
+        ("name", {}),
+        ("created_at", {}),
+    ],
+    "conversations": [
+        ("conversation_id", {"unique": True}),
+        ([("user_id", 1), ("created_at", -1)], {}),
+        ("agent_id", {}),
+        ("retention_days", {"sparse": True}),
+        ("parent_conversation_id", {"sparse": True}),
+    ],
+    "messages": [
+        ("message_id", {"unique": True}),
+        ([("conversation_id", 1), ("created_at", 1)], {}),
+        ("expire_at", {"ttl_seconds": 0}),
+    ],
+    "search_postings": [
+        ([("term", 1), ("user_id", 1), ("created_at", -1)], {}),
+        ([("message_id", 1), ("term", 1)], {}),
+        ("conversation_id", {}),
+    ],
+    "jobs": [
+        ("job_id", {"unique": True}),
+        ([("status", 1), ("created_at", 1)], {}),
+        ("singleton", {"unique": True, "sparse": True}),
+        ("finished_at", {"ttl_seconds": settings.JOB_TTL_DAYS * 86400}),
+    ],
+    "stats_rollups": [
+        ([("granularity", 1), ("bucket", 1), ("user_id", 1), ("agent_id", 1), ("model", 1)], {"unique": True}),
+        ([("user_id", 1), ("granularity", 1), ("bucket", 1)], {}),
+        ([("granularity", 1), ("agent_id", 1), ("bucket", 1)], {}),
+    ],
+    "schema_meta": [
+        ("key", {"unique": True}),
+    ],
+}
+
+_META_COLLECTION = "schema_meta"
+_META_KEY = "indexes"
+
+
+def index_schema_version() -> str:
+    """索引声明的摘要（集合、键、选项），声明不变则版本不变"""
+    canonical = sorted(
+        (name, tuple(normalize_keys(keys)), tuple(sorted(options.items())))
+        for name, specs in INDEXES.items()
+        for keys, options in specs
+    )
+    return hashlib.sha1(repr(canonical).encode()).hexdigest()[:12]
+
+
+async def ensure_indexes(force: bool = False) -> Dict[str, Any]:
+    """补齐缺失的索引、重建选项变化的索引（幂等）
+
+    - 存储中记录的索引结构版本与当前声明一致时直接跳过（多 worker 滚动重启只需一次读取）
+    - 否则各集合并发地用 index_info 比对声明：缺失的索引直接创建；
+      键相同但 unique/sparse/ttl_seconds 不同的索引先删除再按声明重建，完成后写入新版本
+    - 重建失败（如改为唯一索引而已有重复数据）时抛出 RepositoryError，不写入新版本
+    force=True 或 INDEX_SKIP_IF_CURRENT=false 时总是逐集合比对（索引被手工删除后用于修复）。
+    """
+    version = index_schema_version()
+    meta = db.collection(_META_COLLECTION)
+    if not force and settings.INDEX_SKIP_IF_CURRENT:
+        current = await meta.find_one({"key": _META_KEY})
+        if current is not None and current.get("version") == version:
+            logger.info("索引结构版本未变化（%s），跳过索引检查", version)
+            return {"version": version, "skipped": True, "created": {}, "rebuilt": {}}
+
+    start = asyncio.get_running_loop().time()
+    results = await asyncio.gather(
+        *(_ensure_collection(db.collection(name), specs) for name, specs in INDEXES.items())
+    )
+    created = {name: keys for name, (keys, _) in zip(INDEXES, results) if keys}
+    rebuilt = {name: keys for name, (_, keys) in zip(INDEXES, results) if keys}
+    await _record_version(meta, version)
+    elapsed = asyncio.get_running_loop().time() - start
+    logger.info(
+        "索引检查完成（%s）: 新建 %s 个, 重建 %s 个, 耗时 %.0fms",
+        version,
+        sum(len(keys) for keys in created.values()),
+        sum(len(keys) for keys in rebuilt.values()),
+        elapsed * 1000,
+    )
+    return {"version": version, "skipped": False, "created": created, "rebuilt": rebuilt}
+
+
+def _declared_options(coll: StorageCollection, options: Dict[str, Any]) -> Dict[str, Any]:
+    """声明选项 → 与 index_info 可比较的形式（不支持 TTL 的后端忽略 ttl_seconds）"""
+    return {
+        "unique": bool(options.get("unique")),
+        "sparse": bool(options.get("sparse")),
+        "ttl_seconds": options.get("ttl_seconds") if coll.supports_ttl else None,
+    }
+
+
+def _key_label(keys: IndexKeys) -> str:
+    return ",".join(f"{field}:{direction}" for field, direction in normalize_keys(keys))
+
+
+async def _ensure_collection(
+    coll: StorageCollection, specs: List[Tuple[IndexKeys, Dict[str, Any]]]
+) -> Tuple[List[str], List[str]]:
+    existing = {tuple(keys): options for keys, options in await coll.index_info()}
+    missing, changed = [], []
+    for keys, options in specs:
+        current = existing.get(tuple(normalize_keys(keys)))
+        if current is None:
+            missing.append((keys, options))
+        elif current != _declared_options(coll, options):
+            changed.append((keys, options, current))
+
+    await asyncio.gather(*(coll.create_index(keys, **options) for keys, options in missing))
+    for keys, options, current in changed:
+        logger.warning(
+            "索引选项变化，删除后重建: %s.%s %s -> %s",
+            coll.name,
+            _key_label(keys),
+            current,
+            _declared_options(coll, options),
+        )
+        await coll.drop_index(keys)
+        try:
+            await coll.create_index(keys, **options)
+        except Exception as e:
+            raise RepositoryError(f"重建索引失败 {coll.name}.{_key_label(keys)}（索引已删除，需处理后重试）: {e}") from e
+    return [_key_label(keys) for keys, _ in missing], [_key_label(keys) for keys, _, _ in changed]
+
+
+async def _record_version(meta: StorageCollection, version: str) -> None:
+    fields = {"version": version, "updated_at": datetime.now(timezone.utc)}
+    if await meta.find_one_and_set({"key": _META_KEY}, fields) is None:
+        try:
+            await meta.insert_one({"key": _META_KEY, **fields})
+        except DuplicateKeyError:
+            # 另一个 worker 同时完成了检查
+            await meta.find_one_and_set({"key": _META_KEY}, fields)
@@ -0,0 +1,111 @@
+"""
+[INPUT]: 依赖 concurrent.futures 的线程池/进程池，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 run_in_thread/run_in_process/offload 协程函数、shutdown_executors 与 threads_running_for（按提交任务查线程池线程，供单请求剖析）
+[POS]: backend/core 的 CPU 任务执行层，被分词计数、上下文裁剪、检索分词、导出压缩等热点路径消费，被 main.py 的 lifespan 关闭，被 profiling 的单请求剖析查询
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, TypeVar
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import multiprocessing
+import threading
+from .config import settings
+
+T = TypeVar("T")
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+# 线程池中正在执行的调用：线程 ID → 提交它的 asyncio 任务（单请求剖析据此采样线程池）
+_owners: Dict[int, "asyncio.Task[Any]"] = {}
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        with _lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(
+                    max_workers=settings.CPU_THREAD_WORKERS, thread_name_prefix="cpu"
+                )
+    return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        with _lock:
+            if _process_pool is None:
+                # spawn：子进程不继承事件循环与数据库连接
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=settings.CPU_PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _process_pool
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在 CPU 线程池执行（适合释放 GIL 的 C 扩展：tiktoken、zstd、orjson）"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(_get_thread_pool(), _owned, asyncio.current_task(), call)
+
+
+def _owned(task: Optional["asyncio.Task[Any]"], call: Callable[[], T]) -> T:
+    """在工作线程中执行 call，执行期间登记提交它的任务"""
+    ident = threading.get_ident()
+    if task is not None:
+        _owners[ident] = task
+    try:
+        return call()
+    finally:
+        _owners.pop(ident, None)
+
+
+def threads_running_for(task: "asyncio.Task[Any]") -> List[Tuple[int, str]]:
+    """正在为 task 执行调用的线程池线程 (线程 ID, 线程名)；进程池中的调用不可见"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    return [(ident, names.get(ident, str(ident))) for ident, owner in list(_owners.items()) if owner is task]
+
+
+async def run_in_process(func: Callable[..., T], *args: Any) -> T:
+    """在进程池执行（适合持有 GIL 的纯 Python 计算）
+
+    func 与参数必须可 pickle（模块级函数）；CPU_PROCESS_WORKERS <= 0 时退化为线程池。
+    """
+    if settings.CPU_PROCESS_WORKERS <= 0:
+        return await run_in_thread(func, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), func, *args)
+
+
+async def offload(
+    func: Callable[..., T],
+    *args: Any,
+    size: int,
+    kind: Literal["thread", "process"] = "thread",
+) -> T:
+    """按输入规模决定执行位置
+
+    小输入直接在事件循环上执行（切换线程的开销比计算本身大），
+    超过阈值才交给线程池或进程池，避免单个大消息阻塞同一 worker 上的其他请求。
+    """
+    if kind == "process" and size >= settings.OFFLOAD_PROCESS_THRESHOLD:
+        return await run_in_process(func, *args)
+    if size >= settings.OFFLOAD_THREAD_THRESHOLD:
+        return await run_in_thread(func, *args)
+    return func(*args)
+
+
+def shutdown_executors() -> None:
+    """关闭线程池与进程池（应用退出时调用）"""
+    global _thread_pool, _process_pool
+    with _lock:
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+            _thread_pool = None
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
@@ -0,0 +1,41 @@
+"""
+[INPUT]: 依赖 openai 的 AsyncOpenAI，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 get_openai_client/use_openai_client/close_openai_client 函数（进程内共享的 OpenAI 客户端）
+[POS]: backend/core 的 LLM 客户端，被 LLMService 与 ContextCompressionService 消费，被 main.py 的 lifespan 关闭
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Optional
+from openai import AsyncOpenAI
+from .config import settings
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """进程内共享的客户端
+
+    服务按请求 / 连接实例化，客户端不随之创建：到 OpenAI 的 HTTP 连接池跨请求复用（keep-alive），
+    长连接场景下空闲连接也不持有各自的连接池。
+    """
+    global _client
+    if _client is None:
+        params = {"api_key": settings.OPENAI_API_KEY}
+        if settings.OPENAI_BASE_URL:
+            params["base_url"] = settings.OPENAI_BASE_URL
+        _client = AsyncOpenAI(**params)
+    return _client
+
+
+def use_openai_client(client: Optional[AsyncOpenAI]) -> None:
+    """替换进程内客户端（基准与离线测试接入进程内的假服务），传入 None 恢复按配置创建"""
+    global _client
+    _client = client
+
+
+async def close_openai_client() -> None:
+    """关闭连接池（应用退出时调用）"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
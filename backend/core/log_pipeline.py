@@ -0,0 +1,184 @@
+"""
+[INPUT]: 依赖 logging.handlers 的 QueueHandler/QueueListener，依赖 contextvars 的 ContextVar，依赖 orjson 的 dumps，依赖 backend.core.config 的 settings，依赖 backend.core.metrics 的 route_template，依赖 backend.core.tracing 的 current_trace（日志关联 trace）
+[OUTPUT]: 对外提供 configure_logging/shutdown_logging、log_context 上下文管理器、LogContextMiddleware、JSONFormatter 与 log_stats
+[POS]: backend/core 的日志管线，被 main.py 在导入时配置、在 lifespan 关闭时刷新，被 realtime 路由按对话轮次绑定上下文，被 diagnostics 路由读取统计
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Optional
+import logging
+import queue
+import random
+import sys
+import orjson
+from .config import settings
+from .metrics import route_template
+from .tracing import current_trace
+
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# 当前请求 / 对话轮次的日志上下文；"_scope" 为 HTTP 请求的 ASGI scope，"_sampled" 为本请求的采样结果
+_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_context", default=None)
+
+_stats = {"enqueued": 0, "sampled_out": 0, "dropped": 0}
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """为范围内的日志附加字段（conversation_id 等），嵌套时继承外层字段"""
+    outer = _context.get()
+    token = _context.set({**outer, **fields} if outer else fields)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class LogContextMiddleware:
+    """为每个 HTTP 请求开启日志上下文（纯 ASGI 中间件）：路由模板与路径中的 conv_id 在记录日志时从 scope 读取"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with log_context(_scope=scope):
+            await self.app(scope, receive, send)
+
+
+# ==================== 生产方（调用线程） ====================
+class _ContextFilter(logging.Filter):
+    """在调用方线程补齐上下文字段并做采样（ContextVar 只在调用方可见）
+
+    WARNING 及以上一律保留；INFO/DEBUG 按请求采样：一个请求的日志要么全留要么全丢，
+    比例取 LOG_ROUTE_SAMPLE_RATES 中该路由（"METHOD 路由模板"）的配置，否则 LOG_SAMPLE_RATE；
+    所属 trace 已被采样导出时保留，日志与 trace 可以对上。请求之外（后台任务、启动关闭）不采样。
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace is not None else None
+        record.conversation_id = record.route = None
+        if context is None:
+            return True
+        scope = context.get("_scope")
+        if scope is not None:
+            record.route = f"{scope['method']} {route_template(scope)}"
+            params = scope.get("path_params")
+            record.conversation_id = params.get("conv_id") if params else None
+        record.conversation_id = context.get("conversation_id", record.conversation_id)
+        record.route = context.get("route", record.route)
+        if record.levelno >= logging.WARNING or (trace is not None and trace.sampled):
+            return True
+        sampled = context.get("_sampled")
+        if sampled is None:
+            route = record.route
+            rate = settings.LOG_ROUTE_SAMPLE_RATES.get(route, settings.LOG_SAMPLE_RATE) if route else 1.0
+            sampled = rate >= 1.0 or random.random() < rate
+            if scope is None or scope.get("route") is not None:
+                # 路由匹配之前（中间件里）的日志不缓存结果，匹配之后按路由决定
+                context["_sampled"] = sampled
+        if not sampled:
+            _stats["sampled_out"] += 1
+        return sampled
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """入队不阻塞、不格式化：消息与参数原样交给监听线程（%-style 参数在那里才拼接）
+
+    标准 QueueHandler.prepare 会在调用方线程格式化整条消息；这里只把异常栈转成文本
+    （traceback 对象持有栈帧，不宜跨线程保留）。队列满时丢弃并计数，绝不阻塞事件循环。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            _stats["enqueued"] += 1
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+# ==================== 消费方（监听线程） ====================
+class JSONFormatter(logging.Formatter):
+    """一行一个 JSON 对象：时间、级别、logger、消息，以及 trace_id / conversation_id / route（有值时）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("trace_id", "conversation_id", "route"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry).decode()
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        return super().formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}"
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging() -> None:
+    """根 logger 只挂一个非阻塞队列 handler，格式化与写 stderr 由监听线程完成（重复调用无副作用）"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT))
+    handler = _NonBlockingQueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    # uvicorn 在导入应用之前已为自己的 logger 挂上同步 handler，改为经根 logger 的队列输出
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        for existing in uvicorn_logger.handlers[:]:
+            uvicorn_logger.removeHandler(existing)
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """写完队列中剩余的日志并停止监听线程，之后的日志（进程退出前）直接同步输出"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        if isinstance(existing, _NonBlockingQueueHandler):
+            root.removeHandler(existing)
+    listener.stop()
+    for output in listener.handlers:
+        root.addHandler(output)
+
+
+def log_stats() -> Dict[str, Any]:
+    """入队 / 采样丢弃 / 队列满丢弃的条数与当前积压"""
+    backlog = _listener.queue.qsize() if _listener is not None else 0
+    return {**_stats, "backlog": backlog}
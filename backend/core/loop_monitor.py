@@ -0,0 +1,124 @@
+"""
+[INPUT]: 依赖 asyncio 的事件循环，依赖 sys._current_frames 的线程栈快照，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 LoopLagMonitor 类与全局 loop_monitor 实例（事件循环延迟直方图与卡顿栈日志）
+[POS]: backend/core 的事件循环健康监控，被 main.py 的 lifespan 启停，被 diagnostics 路由读取
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样
+
+    - 采样协程：每 interval 秒 sleep 一次，实际唤醒时间与预期之差即为延迟，计入直方图
+    - 看门狗线程：采样协程同时写心跳；心跳超过 stall_threshold 未更新，
+      说明事件循环正被同步代码占住，此时抓取事件循环线程的调用栈与当前任务并记录日志
+      （同一次卡顿只记录一次）
+    """
+
+    def __init__(self):
+        self.interval = settings.LOOP_LAG_SAMPLE_INTERVAL
+        self.stall_threshold = settings.LOOP_STALL_THRESHOLD
+        self.bucket_counts: List[int] = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.sample_count = 0
+        self.lag_sum_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.stall_count = 0
+        self._heartbeat = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """在事件循环内启动采样协程与看门狗线程"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前直方图（累计计数，Prometheus 风格的 le 桶）"""
+        cumulative, buckets = 0, {}
+        for bound, count in zip(LAG_BUCKETS_MS + ("+Inf",), self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "interval_seconds": self.interval,
+            "samples": self.sample_count,
+            "lag_ms_sum": round(self.lag_sum_ms, 3),
+            "lag_ms_max": round(self.max_lag_ms, 3),
+            "lag_ms_buckets": buckets,
+            "stalls": self.stall_count,
+        }
+
+    def _observe(self, lag_ms: float) -> None:
+        self.bucket_counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.sample_count += 1
+        self.lag_sum_ms += lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._observe(max(0.0, loop.time() - expected) * 1000)
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        """看门狗线程：检测心跳停滞并记录卡顿现场"""
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat
+            if stalled < self.stall_threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            self.stall_count += 1
+            logger.warning("事件循环卡顿: 已阻塞 %.0fms\n%s", stalled * 1000, self._describe_stall())
+
+    def _describe_stall(self) -> str:
+        """事件循环线程当前的调用栈 + 正在执行的任务"""
+        lines = []
+        task = asyncio.current_task(self._loop) if self._loop else None
+        if task is not None:
+            lines.append(f"当前任务: {task.get_name()} {task.get_coro()!r}")
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is not None:
+            lines.append("".join(traceback.format_stack(frame)))
+        return "\n".join(lines)
+
+
+# 全局事件循环监控
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,234 @@
+"""
+[INPUT]: 依赖 backend.core.config 的 settings，依赖 backend.core.stages 的 record_stages（对话轮次的分阶段耗时），依赖 backend.core.loop_monitor 的 loop_monitor，依赖 backend.core.pubsub 的 pubsub，可选依赖 prometheus_client
+[OUTPUT]: 对外提供 METRICS_ENABLED 标志、MetricsMiddleware、route_template（请求的路由模板）、chat_turn 上下文管理器、db_timed 装饰器、llm_ttft/llm_duration/token_counters/cache_counters 预绑定取值函数、COMPRESSION_SECONDS 与 render_metrics
+[POS]: backend/core 的 Prometheus 指标，被 main.py（/metrics 与中间件）、BaseRepository、ChatService、LLMService、LineageResolver 与 realtime 路由埋点
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Tuple
+import re
+import time
+from .config import settings
+from .stages import record_stages
+from .loop_monitor import loop_monitor
+from .pubsub import pubsub
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+except ImportError:  # 可选依赖：uv sync --extra metrics
+    prometheus_client = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_ENABLED = settings.ENABLE_METRICS and prometheus_client is not None
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 120)
+
+
+class _Noop:
+    """未启用时的占位子指标：所有埋点调用为空操作"""
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _Noop()
+
+
+def _bound(metric: Any) -> Callable[..., Any]:
+    """按标签值缓存子指标（labels() 每次都要加锁查表），返回取值函数；未启用时恒返回空操作"""
+    if not METRICS_ENABLED:
+        return lambda *values: _NOOP
+    children: Dict[Tuple[str, ...], Any] = {}
+
+    def child(*values: str) -> Any:
+        bound = children.get(values)
+        if bound is None:
+            bound = children[values] = metric.labels(*values)
+        return bound
+
+    return child
+
+
+if METRICS_ENABLED:
+    _http_seconds = Histogram(
+        "chuxing_http_request_duration_seconds", "HTTP 请求耗时（按路由模板）",
+        ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+    )
+    _turn_seconds = Histogram(
+        "chuxing_chat_turn_duration_seconds", "一轮对话的总耗时", ["transport"], buckets=_LATENCY_BUCKETS,
+    )
+    _stage_seconds = Histogram(
+        "chuxing_chat_stage_duration_seconds", "一轮对话中各阶段的自身耗时（扣除嵌套子阶段）",
+        ["stage"], buckets=_LATENCY_BUCKETS,
+    )
+    _llm_ttft = Histogram(
+        "chuxing_llm_time_to_first_token_seconds", "LLM 首个增量到达时间（流式）", ["model"], buckets=_LLM_BUCKETS,
+    )
+    _llm_seconds = Histogram(
+        "chuxing_llm_request_duration_seconds", "LLM 调用总耗时", ["model"], buckets=_LLM_BUCKETS,
+    )
+    _prompt_tokens = Counter("chuxing_llm_prompt_tokens", "LLM 输入 token 数（供应商 usage）", ["agent_id"])
+    _completion_tokens = Counter(
+        "chuxing_llm_completion_tokens", "LLM 输出 token 数（供应商 usage）", ["agent_id"]
+    )
+    _compression_seconds = Histogram(
+        "chuxing_context_compression_duration_seconds", "上下文压缩耗时（_count 即触发次数）",
+        buckets=_LLM_BUCKETS,
+    )
+    _db_seconds = Histogram(
+        "chuxing_db_operation_duration_seconds", "存储操作耗时", ["collection", "operation"], buckets=_DB_BUCKETS,
+    )
+    _cache_requests = Counter("chuxing_cache_requests", "缓存查找次数", ["cache", "result"])
+
+    class _RuntimeCollector:
+        """抓取时读取已有的运行时统计：事件循环延迟直方图、实时通道订阅数"""
+
+        def collect(self) -> Iterator[Any]:
+            snapshot = loop_monitor.snapshot()
+            yield HistogramMetricFamily(
+                "chuxing_event_loop_lag_seconds", "事件循环调度延迟",
+                buckets=[
+                    (bound if bound == "+Inf" else str(float(bound) / 1000), count)
+                    for bound, count in snapshot["lag_ms_buckets"].items()
+                ],
+                sum_value=snapshot["lag_ms_sum"] / 1000,
+            )
+            stalls = CounterMetricFamily("chuxing_event_loop_stalls", "事件循环阻塞超过阈值的次数")
+            stalls.add_metric([], snapshot["stalls"])
+            yield stalls
+            subscriptions = GaugeMetricFamily(
+                "chuxing_realtime_subscriptions", "本进程的实时通道订阅（WebSocket 连接）数"
+            )
+            subscriptions.add_metric([], pubsub.stats()["subscriptions"])
+            yield subscriptions
+
+    prometheus_client.REGISTRY.register(_RuntimeCollector())
+else:
+    _http_seconds = _turn_seconds = _stage_seconds = _llm_ttft = _llm_seconds = None
+    _prompt_tokens = _completion_tokens = _db_seconds = _cache_requests = None
+    _compression_seconds = _NOOP
+
+
+# ==================== 预绑定取值 ====================
+_http_child = _bound(_http_seconds)
+_turn_child = _bound(_turn_seconds)
+_stage_child = _bound(_stage_seconds)
+llm_ttft = _bound(_llm_ttft)
+llm_duration = _bound(_llm_seconds)
+_prompt_child = _bound(_prompt_tokens)
+_completion_child = _bound(_completion_tokens)
+_db_child = _bound(_db_seconds)
+_cache_child = _bound(_cache_requests)
+COMPRESSION_SECONDS = _compression_seconds
+
+
+def token_counters(agent_id: str) -> Tuple[Any, Any]:
+    """(输入 token 计数器, 输出 token 计数器)"""
+    return _prompt_child(agent_id), _completion_child(agent_id)
+
+
+def cache_counters(cache: str) -> Tuple[Any, Any]:
+    """(命中计数器, 未命中计数器)，模块加载时绑定一次，埋点处只做 inc"""
+    return _cache_child(cache, "hit"), _cache_child(cache, "miss")
+
+
+@contextmanager
+def chat_turn(transport: str) -> Iterator[None]:
+    """计时一轮对话，结束时把各阶段自身耗时计入直方图"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    with record_stages() as recorder:
+        yield
+    _turn_child(transport).observe(time.perf_counter() - start)
+    for name, entry in recorder.stages.items():
+        _stage_child(name).observe(entry["self"])
+
+
+def db_timed(operation: str) -> Callable:
+    """仓储方法装饰器：按 (集合, 操作) 记录耗时；未启用时原样返回被装饰函数"""
+
+    def decorator(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+        children: Dict[str, Any] = {}
+
+        @wraps(func)
+        async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                child = children.get(self.namespace)
+                if child is None:
+                    child = children[self.namespace] = _db_child(self.namespace, operation)
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+_PARAM = re.compile(r"{(\w+)(?::\w+)?}")
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """匹配到的路由模板（/api/conversations/{conv_id}/messages），未匹配时为 unmatched
+
+    scope["route"].path 可能只是子路由内的路径（不含 include_router 的前缀），
+    按路径参数渲染后从实际路径末尾对齐，补回前缀。
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    params = scope.get("path_params") or {}
+    rendered = _PARAM.sub(lambda m: str(params.get(m.group(1), m.group(0))), template) if params else template
+    path = scope["path"]
+    if not path.endswith(rendered):
+        return template
+    return path[: len(path) - len(rendered)] + template
+
+
+class MetricsMiddleware:
+    """HTTP 请求耗时（纯 ASGI 中间件）
+
+    路由标签取路由模板，未匹配的请求统一记为 unmatched，路径参数不会撑爆标签基数。WebSocket 连接不计入。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _http_child(scope["method"], route_template(scope), status).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> bytes:
+    """Prometheus 文本格式的当前指标"""
+    return generate_latest()
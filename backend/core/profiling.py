@@ -0,0 +1,271 @@
+"""
+[INPUT]: 依赖 sys._current_frames 的线程栈快照，依赖 tracemalloc 标准库，依赖 starlette 的 Response，依赖 backend.core.config 的 settings，依赖 backend.core.executor 的 run_in_thread/threads_running_for，依赖 backend.core.exceptions 的 InvalidOperationError
+[OUTPUT]: 对外提供 StackSampler（采样分析器，输出 collapsed stack）、profile_worker 协程、MemoryTracker 类与全局 memory_tracker、admin_authorized 与 ProfilingMiddleware
+[POS]: backend/core 的按需性能剖析，被 main.py 注册为中间件（单请求剖析），被 diagnostics 路由消费（整个 worker 的剖析与内存快照对比）
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from starlette.responses import PlainTextResponse, Response
+from .config import settings
+from .executor import run_in_thread, threads_running_for
+from .exceptions import InvalidOperationError
+
+_SYS_PATHS = sorted({os.path.abspath(p) + os.sep for p in sys.path if p}, key=len, reverse=True)
+_labels: Dict[Any, str] = {}
+_busy = False
+
+
+def admin_authorized(token: Optional[str]) -> bool:
+    """管理令牌校验；未配置 ADMIN_TOKEN 时一律拒绝"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+@contextmanager
+def _exclusive() -> Iterator[None]:
+    """同一时刻只允许一个剖析（采样线程持有 GIL，叠加会放大开销）"""
+    global _busy
+    if _busy:
+        raise InvalidOperationError("已有进行中的性能剖析")
+    _busy = True
+    try:
+        yield
+    finally:
+        _busy = False
+
+
+# ==================== CPU 采样 ====================
+def _label(code: Any) -> str:
+    """栈帧标签：模块相对路径:限定函数名（不带行号，同一函数的样本在火焰图中合并）"""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for prefix in _SYS_PATHS:
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        label = _labels[code] = f"{path}:{getattr(code, 'co_qualname', code.co_name)}"
+    return label
+
+
+class StackSampler:
+    """采样分析器：后台线程每 interval 秒抓取一次线程栈，按 collapsed stack 计数
+
+    - 指定 task 时（单请求剖析）：事件循环线程仅在该任务正在执行时计数，不含其他并发请求与空闲等待；
+      该任务经 run_in_thread / offload 交给线程池的调用同时采样，以工作线程名为根帧（如 `cpu_0;...`）；
+      交给进程池的调用（offload(kind="process") 超过 OFFLOAD_PROCESS_THRESHOLD）在子进程执行，不在剖析内
+    - 未指定 task 时采所有线程，以线程名为根帧（整个 worker 的剖析）
+    输出为 Brendan Gregg 的 collapsed 格式（`根;...;叶 次数`），可直接交给 flamegraph.pl / speedscope。
+    """
+
+    def __init__(self, interval: float, task: Optional[asyncio.Task] = None):
+        self.interval = interval
+        self.task = task
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._loop = task.get_loop() if task is not None else None
+        self._loop_thread_id = threading.get_ident() if task is not None else None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            if self.task is not None:
+                workers = threads_running_for(self.task)
+                on_loop = asyncio.current_task(self._loop) is self.task
+                if not on_loop and not workers:
+                    continue
+                frames = sys._current_frames()
+                frame = frames.get(self._loop_thread_id) if on_loop else None
+                if frame is not None:
+                    self.stacks[self._collapse(frame, None)] += 1
+                for ident, name in workers:
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.stacks[self._collapse(frame, name)] += 1
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self._collapse(frame, names.get(ident, str(ident)))] += 1
+
+    @staticmethod
+    def _collapse(frame: Any, root: Optional[str]) -> str:
+        labels: List[str] = []
+        while frame is not None:
+            labels.append(_label(frame.f_code))
+            frame = frame.f_back
+        if root is not None:
+            labels.append(root)
+        labels.reverse()
+        return ";".join(labels)
+
+
+async def profile_worker(seconds: float, interval: float) -> Tuple[str, int]:
+    """采样整个 worker（所有线程）seconds 秒，返回 (collapsed stack, 采样轮数)"""
+    with _exclusive():
+        sampler = StackSampler(interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    return sampler.collapsed(), sampler.samples
+
+
+class ProfilingMiddleware:
+    """单请求剖析（纯 ASGI 中间件）
+
+    带管理令牌（X-Admin-Token）且带 X-Profile 请求头或 ?profile=1 的 HTTP 请求照常执行，
+    原响应被丢弃，改为返回该请求的 collapsed stack（X-Profile-Status 为原响应状态码）。
+    令牌不匹配时请求按普通请求处理，不暴露剖析能力。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            with _exclusive():
+                sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL, asyncio.current_task())
+                sampler.start()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    sampler.stop()
+        except InvalidOperationError as e:
+            await PlainTextResponse(str(e), status_code=409)(scope, receive, send)
+            return
+
+        response = Response(
+            sampler.collapsed(),
+            media_type="text/plain",
+            headers={
+                "X-Profile-Status": str(status),
+                "X-Profile-Samples": str(sampler.samples),
+                "Content-Disposition": f'attachment; filename="profile-{int(time.time())}.collapsed"',
+            },
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _requested(scope: Dict[str, Any]) -> bool:
+        headers = dict(scope["headers"])
+        flagged = b"x-profile" in headers or parse_qs(scope["query_string"].decode("latin-1")).get("profile") == ["1"]
+        if not flagged:
+            return False
+        token = headers.get(b"x-admin-token")
+        return admin_authorized(token.decode("latin-1") if token else None)
+
+
+# ==================== 内存快照 ====================
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryTracker:
+    """tracemalloc 快照对比：start 记录基线，diff 给出相对基线增长最多的分配位置
+
+    追踪期间每次分配都有额外开销（约 1.5～3 倍内存、明显的 CPU），排查完应及时 stop。
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_by_us = False
+
+    async def start(self, frames: int) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_by_us = True
+        self._baseline = await run_in_thread(self._snapshot)
+        return self.status()
+
+    async def diff(self, top: int, group_by: str, reset: bool) -> Dict[str, Any]:
+        if self._baseline is None or not tracemalloc.is_tracing():
+            raise InvalidOperationError("未开启内存追踪，先调用 start")
+        snapshot = await run_in_thread(self._snapshot)
+        stats = await run_in_thread(snapshot.compare_to, self._baseline, group_by)
+        if reset:
+            self._baseline = snapshot
+        return {
+            **self.status(),
+            "group_by": group_by,
+            "size_kb_diff": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            "top": [
+                {
+                    "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                    "size_kb_diff": round(stat.size_diff / 1024, 1),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    def stop(self) -> Dict[str, Any]:
+        self._baseline = None
+        if self._started_by_us:
+            tracemalloc.stop()
+            self._started_by_us = False
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+
+# 全局内存追踪
+memory_tracker = MemoryTracker()
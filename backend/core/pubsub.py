@@ -0,0 +1,244 @@
+"""
+[INPUT]: 依赖 asyncio 的 Future，依赖 collections 的 deque，依赖 orjson 的 dumps/loads，依赖 backend.core.config 的 settings，可选依赖 redis
+[OUTPUT]: 对外提供 PubSub/Subscription/FanOut/LocalFanOut/RedisFanOut 类、user_channel 函数与全局 pubsub 实例
+[POS]: backend/core 的进程内发布订阅，被 ChatService（发布消息事件）与 realtime 路由（WebSocket 订阅）消费，被 main.py 的 lifespan 启停
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Callable, Deque, Dict, Optional, Set
+from collections import deque
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+import uuid
+import orjson
+from .config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # 可选依赖：uv sync --extra redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# 远端事件的本地投递回调：(channel, frame, origin)
+Deliver = Callable[[str, str, Optional[str]], None]
+
+
+def user_channel(user_id: str) -> str:
+    """用户频道：该用户所有连接（多端）共享"""
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """一个订阅者（通常是一条 WebSocket 连接）的有界发送队列
+
+    - 推送事件（deliver）不等待：队列满说明消费者过慢，丢弃积压并标记溢出，
+      由消费方断开连接，客户端重连后通过历史接口补齐，发布方永不被单个慢连接拖住
+    - 本连接自身的对话增量（send）等待队列空位：背压直接作用在生成方上
+    队列元素是已序列化的文本帧，同一事件推送给 N 个订阅者只序列化一次。
+    用 deque + 单个等待 future 实现（asyncio.Queue 每个实例带 4 个 deque，
+    空闲连接数量大时差异可观）：同一时刻只有发送协程一个消费者。
+    """
+
+    __slots__ = ("id", "channels", "overflowed", "maxsize", "_frames", "_waiter", "_space", "_closed")
+
+    def __init__(self, maxsize: int):
+        self.id = uuid.uuid4().hex
+        self.channels: Set[str] = set()
+        self.overflowed = False
+        self.maxsize = maxsize
+        self._frames: Deque[str] = deque()
+        self._waiter: Optional[asyncio.Future] = None  # 发送协程等待新帧
+        self._space: Optional[asyncio.Future] = None  # 生成方等待队列空位
+        self._closed = False
+
+    def deliver(self, frame: str, origin: Optional[str] = None) -> None:
+        if self._closed or origin == self.id:
+            return
+        if len(self._frames) >= self.maxsize:
+            self.overflowed = True
+            self.close()
+            return
+        self._frames.append(frame)
+        self._wake("_waiter")
+
+    async def send(self, frame: str) -> None:
+        """入队本连接自身产生的帧，队列满时等待"""
+        while not self._closed and len(self._frames) >= self.maxsize:
+            if self._space is None or self._space.done():
+                self._space = asyncio.get_running_loop().create_future()
+            await self._space
+        if not self._closed:
+            self._frames.append(frame)
+            self._wake("_waiter")
+
+    async def next(self) -> Optional[str]:
+        """下一帧；返回 None 表示已关闭或溢出"""
+        while not self._frames and not self._closed:
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+        if self._closed:
+            return None
+        frame = self._frames.popleft()
+        self._wake("_space")
+        return frame
+
+    def close(self) -> None:
+        self._closed = True
+        self._frames.clear()
+        self._wake("_waiter")
+        self._wake("_space")
+
+    def _wake(self, attr: str) -> None:
+        future = getattr(self, attr)
+        if future is not None:
+            setattr(self, attr, None)
+            if not future.done():
+                future.set_result(None)
+
+
+# ==================== 跨进程扇出 ====================
+class FanOut(ABC):
+    """跨 worker / 节点的事件扇出：本进程发布的事件经它送达其他进程的订阅者"""
+
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        """开始接收其他进程发布的事件"""
+
+    @abstractmethod
+    async def publish(self, channel: str, frame: str, origin: Optional[str]) -> None:
+        """把本进程发布的事件送往其他进程"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """停止接收并释放连接"""
+
+
+class LocalFanOut(FanOut):
+    """单进程部署：无需扇出"""
+
+    async def start(self, deliver: Deliver) -> None:
+        return None
+
+    async def publish(self, channel: str, frame: str, origin: Optional[str]) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class RedisFanOut(FanOut):
+    """经 Redis 的单个共享频道扇出
+
+    每个进程只持有一个 Redis 订阅，事件携带来源进程 ID，收到自己发出的事件时跳过；
+    Redis 频道数与用户数、连接数无关，代价是每个进程收到全部事件后在本地按频道过滤。
+    """
+
+    def __init__(self, url: str, channel: str = "chuxing:pubsub"):
+        if aioredis is None:
+            raise RuntimeError("未安装 redis，无法使用 PUBSUB_BACKEND=redis（uv sync --extra redis）")
+        self.url = url
+        self.channel = channel
+        self.node_id = uuid.uuid4().hex
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._redis = aioredis.from_url(self.url)
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver: Deliver) -> None:
+        try:
+            async for message in pubsub.listen():
+                payload = orjson.loads(message["data"])
+                if payload["node"] != self.node_id:
+                    deliver(payload["channel"], payload["frame"], payload.get("origin"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Redis 扇出订阅中断: %s", e)
+        finally:
+            await pubsub.aclose()
+
+    async def publish(self, channel: str, frame: str, origin: Optional[str]) -> None:
+        payload = {"node": self.node_id, "channel": channel, "frame": frame, "origin": origin}
+        await self._redis.publish(self.channel, orjson.dumps(payload))
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+# ==================== 发布订阅 ====================
+class PubSub:
+    """进程内发布订阅：频道 → 订阅者集合
+
+    发布只做一次序列化与 O(订阅者) 次非阻塞入队，跨进程部分交给 FanOut。
+    空闲连接只占用一个 Subscription（一个 deque 与一个等待 future），不占用定时器或后台任务。
+    """
+
+    def __init__(self, fanout_factory: Optional[Callable[[], FanOut]] = None):
+        self._channels: Dict[str, Set[Subscription]] = {}
+        self._fanout_factory = fanout_factory or _create_fanout
+        self._fanout: FanOut = LocalFanOut()
+
+    async def start(self) -> None:
+        self._fanout = self._fanout_factory()
+        await self._fanout.start(self._deliver_local)
+
+    async def close(self) -> None:
+        await self._fanout.close()
+        self._fanout = LocalFanOut()
+
+    def subscribe(self, *channels: str, maxsize: Optional[int] = None) -> Subscription:
+        sub = Subscription(maxsize or settings.WS_SEND_QUEUE_SIZE)
+        for channel in channels:
+            sub.channels.add(channel)
+            self._channels.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for channel in sub.channels:
+            subs = self._channels.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._channels[channel]
+        sub.channels.clear()
+
+    async def publish(self, channel: str, event: Dict[str, Any], origin: Optional[str] = None) -> int:
+        """发布事件，返回本进程内的投递数量；origin 为发起方订阅 ID（该订阅不会收到回声）"""
+        frame = orjson.dumps(event).decode()
+        delivered = self._deliver_local(channel, frame, origin)
+        await self._fanout.publish(channel, frame, origin)
+        return delivered
+
+    def _deliver_local(self, channel: str, frame: str, origin: Optional[str]) -> int:
+        subs = self._channels.get(channel)
+        if not subs:
+            return 0
+        for sub in tuple(subs):
+            sub.deliver(frame, origin)
+        return len(subs)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "subscriptions": sum(len(subs) for subs in self._channels.values()),
+        }
+
+
+def _create_fanout() -> FanOut:
+    if settings.PUBSUB_BACKEND == "redis":
+        return RedisFanOut(settings.REDIS_URL)
+    return LocalFanOut()
+
+
+# 全局实例（每个 worker 进程一个）
+pubsub = PubSub()
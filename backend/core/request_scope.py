@@ -0,0 +1,65 @@
+"""
+[INPUT]: 依赖 contextvars 的 ContextVar，依赖 ASGI 协议
+[OUTPUT]: 对外提供 request_scope 上下文管理器、RequestScopeMiddleware、request_memo/invalidate_memo/leave_request_scope 工具函数
+[POS]: backend/core 的请求级状态容器，被 main.py 注册为中间件，被 BaseRepository.load 的请求内去重与 JobRunner 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# 命名空间（集合名）→ 该请求内已发起的查询；None 表示不在请求作用域内
+_memo: ContextVar[Optional[Dict[str, Dict[Any, Any]]]] = ContextVar("request_memo", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[None]:
+    """开启一个请求作用域：作用域内的查询结果按键去重，退出时丢弃"""
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+def request_memo(namespace: str) -> Optional[Dict[Any, Any]]:
+    """当前请求在 namespace 下的备忘表，不在请求作用域内时返回 None"""
+    memo = _memo.get()
+    if memo is None:
+        return None
+    return memo.setdefault(namespace, {})
+
+
+def invalidate_memo(namespace: str) -> None:
+    """丢弃 namespace 下的备忘（写操作之后调用，保证请求内读到自己的写入）"""
+    memo = _memo.get()
+    if memo:
+        memo.pop(namespace, None)
+
+
+def leave_request_scope() -> None:
+    """在当前任务内脱离请求作用域
+
+    asyncio 任务创建时复制上下文，请求中提交的后台任务会与请求共享同一份备忘表；
+    长期运行的任务开始时调用，避免读到请求期间的旧结果。
+    """
+    _memo.set(None)
+
+
+class RequestScopeMiddleware:
+    """为每个 HTTP 请求开启独立的请求作用域（纯 ASGI 中间件，下游与本层同一上下文）
+
+    WebSocket 连接长期存在，整条连接共用一份备忘会读到其他请求写入前的旧结果，
+    由 realtime 路由按对话轮次开启作用域。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope():
+            await self.app(scope, receive, send)
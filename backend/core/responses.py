@@ -0,0 +1,48 @@
+"""
+[INPUT]: 依赖 fastapi 的 JSONResponse/Response，依赖 orjson 的 dumps，依赖 hashlib 标准库
+[OUTPUT]: 对外提供 ORJSONResponse 响应类、make_etag/etag_matches/not_modified 条件请求工具
+[POS]: backend/core 的响应序列化层，被返回大列表的路由（对话历史、会话列表）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Optional
+import hashlib
+from fastapi.responses import JSONResponse, Response
+import orjson
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson 序列化的 JSON 响应
+
+    直接序列化 dict/list/datetime，不经过 jsonable_encoder 与 Pydantic 模型，
+    适合服务层已按响应结构投影好的原始字典。
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# ==================== 条件请求 ====================
+def make_etag(*parts: Any) -> str:
+    """由版本信息派生弱 ETag（W/"..."）：语义相同即可复用，不承诺字节级一致（压缩前后共用）"""
+    digest = hashlib.sha1(orjson.dumps(parts, option=orjson.OPT_NON_STR_KEYS)).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持 * 与逗号分隔的多个 ETag）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == target for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """304 响应：无响应体，回传 ETag 供客户端继续使用"""
+    return Response(status_code=304, headers={"ETag": etag})
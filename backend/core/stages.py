@@ -0,0 +1,116 @@
+"""
+[INPUT]: 依赖 contextvars 的 ContextVar，依赖 time 的 perf_counter
+[OUTPUT]: 对外提供 stage 上下文管理器、staged 装饰器、record_stages 记录器与 StageRecorder 类
+[POS]: backend/core 的请求内分阶段计时，被仓储层（db_read/persist）、MessageService（token_count）、LLMService（history_load/compression/trim/llm_wait）埋点，被 benchmarks.chat_path 与 backend.core.metrics（对话阶段直方图）读取
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+import time
+
+
+class StageRecorder:
+    """一次请求的分阶段耗时
+
+    每个阶段记录调用次数、含子阶段的总耗时（total）与扣除子阶段后的自身耗时（self）。
+    各阶段 self 之和加上未埋点部分等于请求耗时，可直接比较“时间花在哪里”；
+    并发执行的子阶段（asyncio.gather）各自计入，父阶段的 self 不低于 0。
+    """
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, total: float, self_time: float) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"calls": 0, "total": 0.0, "self": 0.0}
+        entry["calls"] += 1
+        entry["total"] += total
+        entry["self"] += self_time
+
+    def merge(self, other: "StageRecorder") -> None:
+        for name, entry in other.stages.items():
+            mine = self.stages.get(name)
+            if mine is None:
+                self.stages[name] = dict(entry)
+            else:
+                mine["calls"] += entry["calls"]
+                mine["total"] += entry["total"]
+                mine["self"] += entry["self"]
+
+    def self_times(self) -> Dict[str, float]:
+        return {name: entry["self"] for name, entry in self.stages.items()}
+
+
+class _Frame:
+    __slots__ = ("name", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.children = 0.0
+
+
+# 当前记录器与所在阶段；未开启记录时为 None，埋点只做一次 ContextVar 读取
+_recorder: ContextVar[Optional[StageRecorder]] = ContextVar("stage_recorder", default=None)
+_frame: ContextVar[Optional[_Frame]] = ContextVar("stage_frame", default=None)
+
+
+@contextmanager
+def record_stages() -> Iterator[StageRecorder]:
+    """在当前上下文（及其创建的子任务）内记录分阶段耗时
+
+    嵌套使用时（基准记录整个请求，指标记录其中的对话轮次），内层结束后并入外层。
+    """
+    outer = _recorder.get()
+    recorder = StageRecorder()
+    token = _recorder.set(recorder)
+    frame_token = _frame.set(None)
+    try:
+        yield recorder
+    finally:
+        _frame.reset(frame_token)
+        _recorder.reset(token)
+        if outer is not None:
+            outer.merge(recorder)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """计时一个阶段；同名阶段多次进入时累加"""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    parent = _frame.get()
+    frame = _Frame(name)
+    token = _frame.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _frame.reset(token)
+        recorder.add(name, elapsed, max(0.0, elapsed - frame.children))
+        if parent is not None:
+            parent.children += elapsed
+
+
+def staged(name: str) -> Callable:
+    """协程函数装饰器：整个调用计为一个阶段"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _recorder.get() is None:
+                return await func(*args, **kwargs)
+            with stage(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,31 @@
+"""
+[INPUT]: 依赖 asyncio 的事件循环时钟
+[OUTPUT]: 对外提供 Throttle 类，按固定速率节流后台批处理
+[POS]: backend/core 的速率控制工具，被级联删除等后台任务消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+import asyncio
+
+
+class Throttle:
+    """固定速率节流器
+
+    每次 wait() 至少间隔 1/rate 秒，rate <= 0 表示不限速。
+    后台任务在每个批次前调用，避免长时间占用数据库与复制带宽。
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+
+    async def wait(self) -> None:
+        """等待下一个可执行时刻"""
+        if not self.interval:
+            return
+
+        now = asyncio.get_running_loop().time()
+        if self._next_at > now:
+            await asyncio.sleep(self._next_at - now)
+            now = self._next_at
+        self._next_at = now + self.interval
@@ -0,0 +1,253 @@
+"""
+[INPUT]: 依赖 tiktoken 的编码器，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 Tokenizer 类（精确计数与字符类别区间估算）、get_tokenizer 函数（按模型名取分词规则）、trim_to_budget 函数（估算优先的上下文裁剪）、count_texts 函数（可在进程池中执行的批量计数）
+[POS]: backend/core 的分词注册表，被 MessageService（写入计数）、LLMService（上下文裁剪）和重新计数任务消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+import math
+import operator
+import threading
+import tiktoken
+from .config import settings
+
+# (模型名前缀, 编码名, 每条消息固定开销, 回复引导开销)，按前缀从长到短匹配
+# 开销参考 OpenAI cookbook；DeepSeek 没有 tiktoken 实现，o200k 在中英文上最接近其 BPE
+_MODEL_RULES: List[Tuple[str, str, int, int]] = sorted(
+    [
+        ("gpt-3.5-turbo-0301", "cl100k_base", 4, 3),
+        ("gpt-3.5", "cl100k_base", 3, 3),
+        ("gpt-4o", "o200k_base", 3, 3),
+        ("gpt-4.1", "o200k_base", 3, 3),
+        ("gpt-4.5", "o200k_base", 3, 3),
+        ("gpt-4", "cl100k_base", 3, 3),
+        ("gpt-5", "o200k_base", 3, 3),
+        ("o1", "o200k_base", 3, 3),
+        ("o3", "o200k_base", 3, 3),
+        ("o4", "o200k_base", 3, 3),
+        ("deepseek", "o200k_base", 4, 3),
+    ],
+    key=lambda rule: len(rule[0]),
+    reverse=True,
+)
+
+# 估算用的字符类别：UTF-8 编码后一次 translate 把每个字节映射为类别码，再逐类计数
+# L 字母 / D 数字 / P ASCII 标点符号 / S 空格 / N 其他空白 / 2、3、4 多字节字符（按首字节计，续字节映射为 "."）
+
+
+def _class_table() -> bytes:
+    table = bytearray(b"." * 256)
+    for byte in range(128):
+        char = chr(byte)
+        table[byte] = ord(
+            "L" if char.isalpha() else "D" if char.isdigit() else "S" if char == " "
+            else "N" if char.isspace() or byte < 32 or byte == 127 else "P"
+        )
+    for start, end, code in ((0xC0, 0xE0, "2"), (0xE0, 0xF0, "3"), (0xF0, 0xF8, "4")):
+        table[start:end] = code.encode() * (end - start)
+    return bytes(table)
+
+
+_CLASS_TABLE = _class_table()
+
+# 每类每字符的 token 数 (下界系数, 上界系数)，系数顺序为 L D P S N 2 3 4；按文本形态分三档：
+# - prose：常规文本（平均每个空白分隔片段 3～20 个非空白字符）
+# - fragmented：数字 / 标点不少于字母与多字节字符，或片段很短（表格、列表、数字串、逐字母）——每个字符都可能单独成 token
+# - dense：片段超过 20 个字符（base64、URL、压缩 JSON、无空格长串）
+# cl100k 系数由 benchmarks.tokens 在约 2700 段文本（合成对话、长文本粘贴、本仓库代码与 README、标准库文档）
+# 与 benchmarks.tokens.ADVERSARIAL_TEXTS 上实测后留出余量：全部落在区间内，对抗文本上界最小余量 4%；
+# 上界 / 实际的中位数：英文 1.3、中文 1.65、代码 1.7、日志 2.2，下界 / 实际的中位数约 0.36。
+# o200k 词表更大、同一文本的 token 数通常更少：上界沿用 cl100k 系数，下界放宽；部署前用 --check 校验。
+# 两端另受严格成立的界约束：上界不超过 UTF-8 字节数（字节级 BPE 每个 token 至少覆盖 1 字节）。
+Rates = Tuple[Tuple[float, ...], Tuple[float, ...]]
+_CL100K_RATES: Dict[str, Rates] = {
+    "prose": ((0.1, 0.33, 0.02, 0, 0, 0.3, 0.5, 1.0), (0.25, 1, 0.8, 0.2, 1, 1.5, 2.2, 4)),
+    "fragmented": ((0.1, 0.33, 0.02, 0, 0, 0.3, 0.5, 1.0), (0.5, 1, 1, 1, 1, 1.5, 2.2, 4)),
+    "dense": ((0.1, 0.33, 0.01, 0, 0, 0.3, 0.5, 1.0), (0.7, 1, 1, 1, 1, 2, 3, 4)),
+}
+_ESTIMATE_RATES: Dict[str, Dict[str, Rates]] = {
+    "cl100k_base": _CL100K_RATES,
+    "o200k_base": {
+        shape: ((0.05, 0.33, 0.01, 0, 0, 0.15, 0.25, 0.5), high) for shape, (_, high) in _CL100K_RATES.items()
+    },
+}
+
+# 平均每个空白分隔片段超过该长度按 dense 处理，低于 _SHORT_RUN 按 fragmented 处理
+_DENSE_RUN = 20
+_SHORT_RUN = 3
+
+_encoders: Dict[str, Any] = {}
+_encoders_lock = threading.Lock()
+
+
+def _get_encoding(name: str) -> Any:
+    """进程级缓存编码器（首次加载需读取 BPE 表，之后复用）"""
+    encoder = _encoders.get(name)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.get(name)
+            if encoder is None:
+                encoder = tiktoken.get_encoding(name)
+                _encoders[name] = encoder
+    return encoder
+
+
+class Tokenizer:
+    """单个模型的计数规则
+
+    - encoding：tiktoken 编码名，写入消息的 token_encoding
+    - tokens_per_message：每条消息的角色/分隔符开销
+    - reply_priming：每次请求末尾为助手回复预置的开销
+    - rule：决定 token_count 的规则标识（编码 + 每条消息开销），写入消息的 token_rule，用于判断计数是否过期；
+      同编码的模型开销可能不同（deepseek 4、gpt-4o 3），只比较编码不够
+    编码器在第一次计数时才加载。
+    """
+
+    def __init__(self, encoding: str, tokens_per_message: int, reply_priming: int):
+        self.encoding = encoding
+        self.tokens_per_message = tokens_per_message
+        self.reply_priming = reply_priming
+        self.rule = f"{encoding}:{tokens_per_message}"
+        self.rates = _ESTIMATE_RATES.get(encoding)
+
+    def count(self, text: str) -> int:
+        """正文 token 数（不含消息开销）"""
+        return len(_get_encoding(self.encoding).encode_ordinary(text))
+
+    def count_message(self, content: str) -> int:
+        """单条消息 token 数（含消息开销），即消息的 token_count"""
+        return self.tokens_per_message + self.count(content)
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """整次请求的 token 数"""
+        return sum(self.count_message(m["content"]) for m in messages) + self.reply_priming
+
+    def estimate(self, text: str) -> Tuple[int, int]:
+        """正文 token 数的 (下界, 上界)，只统计字符类别，不做 BPE
+
+        几次 C 层面的线性扫描（UTF-8 编码、类别映射与计数、空白切分），不加载编码器，
+        比完整 BPE 快一个数量级以上，长文本粘贴时差距最明显。
+        没有校准系数的编码只给出严格成立的 (0, UTF-8 字节数)。
+        """
+        if not text:
+            return (0, 0)
+        data = text.encode("utf-8", "surrogatepass")
+        if self.rates is None:
+            return (0, len(data))
+        classes = data.translate(_CLASS_TABLE)
+        digits, punct = classes.count(b"D"), classes.count(b"P")
+        spaces, other_spaces = classes.count(b"S"), classes.count(b"N")
+        # 纯 ASCII 文本不必统计多字节类别；字母数由字符总数减去其余类别得到
+        if len(data) == len(text):
+            two = three = four = 0
+        else:
+            two, three, four = classes.count(b"2"), classes.count(b"3"), classes.count(b"4")
+        multibyte = two + three + four
+        letters = len(text) - digits - punct - spaces - other_spaces - multibyte
+        counts = (letters, digits, punct, spaces, other_spaces, two, three, four)
+        runs = max(len(data.split()), 1)
+        solid = letters + digits + punct + multibyte
+        if letters + digits + punct > _DENSE_RUN * runs:
+            shape = "dense"
+        elif digits + punct >= letters + multibyte or solid < _SHORT_RUN * runs:
+            shape = "fragmented"
+        else:
+            shape = "prose"
+        low_rates, high_rates = self.rates[shape]
+        high = min(len(data), math.ceil(sum(map(operator.mul, high_rates, counts))))
+        low = int(sum(map(operator.mul, low_rates, counts)))
+        return (min(low, high), high)
+
+    def estimate_message(self, content: str) -> Tuple[int, int]:
+        """单条消息 token 数的 (下界, 上界)（含消息开销）"""
+        low, high = self.estimate(content)
+        return (low + self.tokens_per_message, high + self.tokens_per_message)
+
+
+@lru_cache(maxsize=256)
+def get_tokenizer(model: Optional[str] = None) -> Tokenizer:
+    """按模型名取计数规则（进程级缓存）
+
+    优先级：TOKENIZER_MODEL_OVERRIDES > 内置前缀规则 > DEFAULT_TOKEN_ENCODING
+    """
+    name = (model or "").lower()
+    override = settings.TOKENIZER_MODEL_OVERRIDES.get(name)
+    for prefix, encoding, per_message, priming in _MODEL_RULES:
+        if name.startswith(prefix):
+            return Tokenizer(override or encoding, per_message, priming)
+    return Tokenizer(override or settings.DEFAULT_TOKEN_ENCODING, 4, 3)
+
+
+def trim_to_budget(
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    tokenizer: Tokenizer,
+    known: Optional[List[Optional[int]]] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """保留 messages[0]（system）与 messages[-1]（最新 user），从最早的历史开始丢弃直到不超过预算
+
+    等价于：保留能放进预算的最长历史后缀。每条消息先用估算区间表示：
+    - 区间上界之和仍在预算内 → 确定保留；下界之和已超预算 → 确定丢弃，停止
+    - 介于两者之间（靠近裁剪点）→ 对当前组合中区间最宽的消息做精确计数，再判断
+    远离裁剪点的消息永远不做 BPE。
+    known 与 messages 一一对应，给出已知的精确计数（如历史消息入库时的 token_count），
+    为 None 的位置才估算。返回 (裁剪结果, 本次精确计数的消息数)。
+    """
+    known = known or [None] * len(messages)
+    bounds = [
+        (count, count) if count is not None else tokenizer.estimate_message(m["content"])
+        for m, count in zip(messages, known)
+    ]
+    exact = [count is not None for count in known]
+    exact_counts = 0
+
+    def fits(group: List[int]) -> Optional[bool]:
+        low = sum(bounds[i][0] for i in group) + tokenizer.reply_priming
+        high = sum(bounds[i][1] for i in group) + tokenizer.reply_priming
+        if high <= max_tokens:
+            return True
+        if low > max_tokens:
+            return False
+        return None
+
+    def resolve(group: List[int]) -> bool:
+        nonlocal exact_counts
+        while True:
+            verdict = fits(group)
+            if verdict is not None:
+                return verdict
+            # 区间未收敛时组合中必有估算值：精确计数最宽的那条
+            widest = max(
+                (i for i in group if not exact[i]), key=lambda i: bounds[i][1] - bounds[i][0]
+            )
+            count = tokenizer.count_message(messages[widest]["content"])
+            bounds[widest] = (count, count)
+            exact[widest] = True
+            exact_counts += 1
+
+    if len(messages) <= 2 or resolve(list(range(len(messages)))):
+        return messages, exact_counts
+
+    last = len(messages) - 1
+    kept: List[int] = []
+    for i in range(last - 1, 0, -1):
+        if not resolve([0, last, i] + kept):
+            break
+        kept.append(i)
+
+    return [messages[0]] + [messages[i] for i in reversed(kept)] + [messages[last]], exact_counts
+
+
+def count_texts(encoding: str, tokens_per_message: int, texts: List[str]) -> List[int]:
+    """批量计算消息 token_count
+
+    模块级函数、参数可 pickle，可直接提交给 ProcessPoolExecutor；
+    每个子进程各自缓存编码器。
+    """
+    encoder = _get_encoding(encoding)
+    return [
+        tokens_per_message + len(tokens)
+        for tokens in encoder.encode_ordinary_batch(texts, num_threads=1)
+    ]
@@ -0,0 +1,329 @@
+"""
+[INPUT]: 依赖 contextvars 的 ContextVar，依赖 logging.handlers 的 RotatingFileHandler/QueueListener（监听线程写按大小轮转的导出文件），依赖 orjson 的 dumps，依赖 backend.core.config 的 settings，依赖 backend.core.metrics 的 route_template
+[OUTPUT]: 对外提供 Trace/Span 类、start_trace/span 上下文管理器、open_span（不进入上下文的跨 yield 区间）、traced_db 装饰器、current_trace/current_trace_id 与 TracingMiddleware
+[POS]: backend/core 的轻量链路追踪，被 main.py 注册为中间件，被 realtime 路由按对话轮次开启，被 BaseRepository、MessageService、LLMService、ContextCompressionService 埋点，被日志管线读取当前 trace
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+import queue
+import random
+import re
+import time
+import orjson
+from .config import settings
+from .metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# OTLP SpanKind / StatusCode
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+_STATUS_OK, _STATUS_ERROR = 1, 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class Span:
+    """一个计时区间（OTLP span 的子集）"""
+
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int, attributes: Optional[Dict[str, Any]]):
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes if attributes is not None else {}
+        self.error: Optional[str] = None
+        self.end_ns = 0
+        self.start_ns = time.time_ns()
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+
+
+class Trace:
+    """一个请求（或一轮 WebSocket 对话）的全部 span
+
+    请求期间总是收集 span（尾部采样需要完整的慢请求），结束时决定是否导出：
+    - 头部采样：开始时按 TRACE_SAMPLE_RATE 抽中，或上游 traceparent 标记为已采样
+    - 尾部采样：耗时达到 TRACE_SLOW_THRESHOLD 或出错的请求一律保留
+    单个 trace 至多保留 TRACE_MAX_SPANS 个 span，超出部分只计数。
+    """
+
+    __slots__ = ("trace_id", "sampled", "spans", "dropped", "root")
+
+    def __init__(self, trace_id: Optional[str] = None, sampled: Optional[bool] = None):
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.sampled = random.random() < settings.TRACE_SAMPLE_RATE if sampled is None else sampled
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+
+    def start_span(
+        self, name: str, parent: Optional[Span], kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        span = Span(name, parent.span_id if parent is not None else None, kind, attributes)
+        if len(self.spans) < settings.TRACE_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+        return span
+
+    def should_export(self) -> bool:
+        root = self.root
+        if self.sampled or root is None or root.error is not None:
+            return True
+        return (root.end_ns - root.start_ns) / 1e9 >= settings.TRACE_SLOW_THRESHOLD
+
+    def traceparent(self) -> str:
+        span_id = self.root.span_id if self.root is not None else "0" * 16
+        return f"00-{self.trace_id}-{span_id}-{'01' if self.sampled else '00'}"
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+# ==================== 导出 ====================
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """OTLP/JSON 的 ExportTraceServiceRequest（一个 trace 一个 resourceSpans）"""
+    spans = []
+    for span in trace.spans:
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [_attribute(k, v) for k, v in span.attributes.items() if v is not None],
+            "status": {"code": _STATUS_ERROR, "message": span.error} if span.error else {"code": _STATUS_OK},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        spans.append(item)
+    if trace.dropped and spans:
+        spans[0]["droppedSpansCount"] = trace.dropped
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", settings.TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "chuxing.tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class _OTLPFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return orjson.dumps(to_otlp(record.msg)).decode()
+
+
+class _FileExporter:
+    """每个 trace 一行 OTLP/JSON，写入按大小轮转的本地文件（与 OpenTelemetry Collector 的 file 导出格式一致）
+
+    请求结束时只把 Trace 入队，序列化与写文件由监听线程完成；队列满时丢弃。
+    """
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._listener: Optional[QueueListener] = None
+
+    def export(self, trace: Trace) -> None:
+        if self._listener is None:
+            handler = RotatingFileHandler(
+                settings.TRACE_FILE,
+                maxBytes=settings.TRACE_FILE_MAX_BYTES,
+                backupCount=settings.TRACE_FILE_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(_OTLPFormatter())
+            self._queue = queue.Queue(maxsize=1000)
+            self._listener = QueueListener(self._queue, handler)
+            self._listener.start()
+        try:
+            self._queue.put_nowait(logging.makeLogRecord({"msg": trace, "levelno": logging.INFO}))
+        except queue.Full:
+            logger.warning("trace 导出队列已满，丢弃 trace %s", trace.trace_id)
+
+    def close(self) -> None:
+        """写完队列中的 trace 并关闭文件"""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            self._queue = None
+
+
+exporter = _FileExporter()
+
+
+# ==================== 埋点 ====================
+@contextmanager
+def start_trace(
+    name: str,
+    traceparent: Optional[str] = None,
+    trace_id: Optional[str] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Optional[Trace]]:
+    """开启一个 trace（根 span 为 SERVER），结束时按采样规则导出；未开启追踪时产出 None
+
+    traceparent（W3C）优先，其次 trace_id（32 位十六进制）；都无效时生成新的 trace ID。
+    """
+    if not settings.ENABLE_TRACING:
+        yield None
+        return
+    trace, parent_id = _continue(traceparent, trace_id)
+    root = trace.root = trace.start_span(name, None, KIND_SERVER, attributes)
+    root.parent_id = parent_id
+    trace_token = _trace.set(trace)
+    span_token = _span.set(root)
+    try:
+        yield trace
+    except BaseException as e:
+        root.error = repr(e)
+        raise
+    finally:
+        _span.reset(span_token)
+        _trace.reset(trace_token)
+        root.end()
+        if trace.should_export():
+            try:
+                exporter.export(trace)
+            except OSError as e:
+                logger.error("trace 导出文件无法打开: %s", e)
+
+
+def _continue(traceparent: Optional[str], trace_id: Optional[str]) -> Tuple[Trace, Optional[str]]:
+    match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+    if match:
+        sampled = bool(int(match.group(3), 16) & 1) or None
+        return Trace(match.group(1), sampled), match.group(2)
+    if trace_id and _TRACE_ID.match(trace_id.strip().lower()):
+        return Trace(trace_id.strip().lower()), None
+    return Trace(), None
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """当前 trace 内的子 span；不在 trace 内时只做一次 ContextVar 读取"""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, _span.get(), kind, attributes)
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        _span.reset(token)
+        current.end()
+
+
+def open_span(name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """开始一个不设为当前 span 的区间，由调用方 end()
+
+    用于跨 yield 的区间（流式响应）：异步生成器内设置的 ContextVar 会泄漏到消费方，
+    生成器在其他上下文中关闭时也无法 reset。
+    """
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return trace.start_span(name, _span.get(), kind, attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def traced_db(operation: str) -> Callable:
+    """仓储方法装饰器：在 trace 内为每次存储操作创建 CLIENT span（带集合名）"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            if _trace.get() is None:
+                return await func(self, *args, **kwargs)
+            attributes = {"db.operation.name": operation, "db.collection.name": self.namespace}
+            with span(f"db.{operation}", KIND_CLIENT, attributes):
+                return await func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    """HTTP 请求的 trace（纯 ASGI 中间件）
+
+    读取请求头 traceparent / X-Trace-Id 延续上游 trace，响应头返回 traceparent 与 X-Trace-Id。
+    WebSocket 连接长期存在，由 realtime 路由按对话轮次开启 trace。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        traceparent = headers.get(b"traceparent")
+        trace_id = headers.get(b"x-trace-id")
+        attributes = {"http.request.method": scope["method"], "url.path": scope["path"]}
+        with start_trace(
+            f"HTTP {scope['method']}",
+            traceparent.decode("latin-1") if traceparent else None,
+            trace_id.decode("latin-1") if trace_id else None,
+            attributes,
+        ) as trace:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    attributes["http.response.status_code"] = status
+                    if status >= 500:
+                        trace.root.error = f"HTTP {status}"
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"traceparent", trace.traceparent().encode()),
+                        (b"x-trace-id", trace.trace_id.encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                attributes["http.route"] = route
+                trace.root.name = f"{scope['method']} {route}"
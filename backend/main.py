@@ -1,21 +1,33 @@
 """
-[INPUT]: 依赖 fastapi 的 FastAPI，依赖 backend.core.database 的 connect_to_mongo/close_mongo_connection，依赖 backend.routers 的所有路由模块
+[INPUT]: 依赖 fastapi 的 FastAPI，依赖 backend.core.database 的 connect_storage/close_storage/CausalConsistencyMiddleware，依赖 backend.services.job 的 job_runner，依赖 backend.services.warmup 的 warmup（就绪探针），依赖 backend.core.responses 的 ORJSONResponse，依赖 backend.core.executor 的 shutdown_executors，依赖 backend.core.loop_monitor 的 loop_monitor，依赖 backend.core.request_scope 的 RequestScopeMiddleware，依赖 backend.core.compression 的 CompressionMiddleware，依赖 backend.core.metrics 的 MetricsMiddleware/render_metrics，依赖 backend.core.tracing 的 TracingMiddleware/exporter，依赖 backend.core.profiling 的 ProfilingMiddleware，依赖 backend.core.log_pipeline 的 configure_logging/shutdown_logging/LogContextMiddleware，依赖 backend.core.pubsub 的 pubsub，依赖 backend.core.llm_client 的 close_openai_client，依赖 backend.routers 的所有路由模块
 [OUTPUT]: 对外提供 FastAPI 应用实例 app，供 uvicorn 启动
 [POS]: backend 的应用入口，被 uvicorn 直接调用
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 import logging
-from .core.database import connect_to_mongo, close_mongo_connection
-from .routers import users, agents, conversations, messages
+from .core.database import CausalConsistencyMiddleware, connect_storage, close_storage
+from .core.config import settings
+from .core.executor import shutdown_executors
+from .core.loop_monitor import loop_monitor
+from .core.request_scope import RequestScopeMiddleware
+from .core.compression import CompressionMiddleware
+from .core.metrics import METRICS_ENABLED, CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from .core.tracing import TracingMiddleware, exporter as trace_exporter
+from .core.profiling import ProfilingMiddleware
+from .core.log_pipeline import LogContextMiddleware, configure_logging, shutdown_logging
+from .core.pubsub import pubsub
+from .core.llm_client import close_openai_client
+from .core.responses import ORJSONResponse
+from .services.job import job_runner
+from .services.warmup import warmup
+from .services.retention import JOB_TYPE as RETENTION_JOB_TYPE
+from .routers import users, agents, conversations, messages, jobs, transfer, search, stats, diagnostics, realtime
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+# 配置日志（队列 + 监听线程，请求路径上只做入队）
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -23,18 +35,38 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """应用生命周期管理
 
-    启动时：连接 MongoDB + 创建索引
-    关闭时：关闭连接池
+    启动时：事件循环监控 + 连接存储后端 + 补齐索引 + 启动事件扇出 + 恢复未完成的后台任务 + 调度保留策略压缩 + 后台预热
+    关闭时：退出就绪 + 中断后台任务 + 停止事件扇出 + 关闭 OpenAI 与存储连接池 + 关闭 CPU 执行器 + 关闭 trace 导出文件 + 写完剩余日志
     """
+    configure_logging()
     logger.info("应用启动中...")
-    await connect_to_mongo()
+    if settings.ENABLE_METRICS and not METRICS_ENABLED:
+        logger.warning("未安装 prometheus-client，/metrics 已关闭（uv sync --extra metrics）")
+    if settings.ENABLE_LOOP_MONITOR:
+        loop_monitor.start()
+    await connect_storage()
+    await pubsub.start()
+    await job_runner.resume()
+    if settings.ENABLE_RETENTION_COMPACTION:
+        job_runner.schedule_periodic(
+            RETENTION_JOB_TYPE, "all", settings.RETENTION_COMPACTION_INTERVAL
+        )
+    warmup.start()
     logger.info("应用启动完成")
 
     yield
 
     logger.info("应用关闭中...")
-    await close_mongo_connection()
+    await warmup.stop()
+    await job_runner.shutdown()
+    await pubsub.close()
+    await close_openai_client()
+    await close_storage()
+    shutdown_executors()
+    await loop_monitor.stop()
+    trace_exporter.close()
     logger.info("应用关闭完成")
+    shutdown_logging()
 
 
 # 创建 FastAPI 应用
@@ -45,20 +77,71 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# 请求作用域：仓储 load 的请求内去重
+app.add_middleware(RequestScopeMiddleware)
+
+# 日志上下文：请求内日志带路由与 conv_id，并按路由采样
+app.add_middleware(LogContextMiddleware)
+
+# 因果一致会话（仅 Mongo 后端且有读路由到从节点时注册）：请求内与跨请求（X-Causal-Token）读到自己的写
+if (
+    settings.STORAGE_BACKEND == "mongo"
+    and settings.MONGODB_CAUSAL_CONSISTENCY
+    and any(mode != "primary" for mode in settings.MONGODB_READ_PREFERENCES.values())
+):
+    app.add_middleware(CausalConsistencyMiddleware)
+
+# 单请求性能剖析（仅配置了管理令牌时注册）
+if settings.ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
+# 响应压缩（最外层：压缩的是最终响应体）
+if settings.ENABLE_RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# 请求耗时指标（包住压缩，计入完整的响应时间）
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 链路追踪（最外层：根 span 覆盖整个请求，响应头带回 trace ID）
+if settings.ENABLE_TRACING:
+    app.add_middleware(TracingMiddleware)
+
 
 # 注册路由
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
 app.include_router(conversations.router, prefix="/api/conversations", tags=["conversations"])
 app.include_router(messages.router, prefix="/api", tags=["messages"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(transfer.router, prefix="/api", tags=["transfer"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
+app.include_router(realtime.router, prefix="/api", tags=["realtime"])
 
 
 @app.get("/health")
 async def health_check():
-    """健康检查接口"""
+    """健康检查接口（存活探针：进程能响应即为 ok）"""
     return {"status": "ok", "service": "llm-chat-system"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """就绪探针：预热完成前与关闭开始后返回 503，滚动发布时不把流量导给冷 worker"""
+    snapshot = warmup.snapshot()
+    return ORJSONResponse(snapshot, status_code=200 if warmup.ready else 503)
+
+
+if METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus 指标"""
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -6,8 +6,16 @@ backend.models - Pydantic 数据模型模块
 
 from .user import UserCreate, UserResponse, UserInDB
 from .agent import AgentCreate, AgentResponse, AgentInDB
-from .conversation import ConversationCreate, ConversationResponse, ConversationInDB
+from .conversation import (
+    ConversationCreate,
+    ConversationFork,
+    ConversationResponse,
+    ConversationInDB,
+)
 from .message import MessageCreate, MessageResponse, MessageInDB
+from .job import JobResponse, JobInDB
+from .search import SearchHit, SearchResponse, PostingInDB
+from .stats import RollupInDB, StatsMetrics, StatsPoint, StatsResponse
 
 __all__ = [
     "UserCreate",
@@ -17,9 +25,19 @@ __all__ = [
     "AgentResponse",
     "AgentInDB",
     "ConversationCreate",
+    "ConversationFork",
     "ConversationResponse",
     "ConversationInDB",
     "MessageCreate",
     "MessageResponse",
     "MessageInDB",
+    "JobResponse",
+    "JobInDB",
+    "SearchHit",
+    "SearchResponse",
+    "PostingInDB",
+    "RollupInDB",
+    "StatsMetrics",
+    "StatsPoint",
+    "StatsResponse",
 ]
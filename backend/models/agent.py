@@ -18,6 +18,9 @@ class AgentCreate(BaseModel):
     model: str = Field(
         default="deepseek-chat", description="OpenAI 模型名（如 gpt-4o-mini、gpt-4o）"
     )
+    retention_days: Optional[int] = Field(
+        None, ge=1, description="原始消息保留天数（为空表示不限制）"
+    )
 
 
 class AgentResponse(BaseModel):
@@ -27,6 +30,7 @@ class AgentResponse(BaseModel):
     name: str = Field(..., description="Agent 名称")
     system_prompt: str = Field(..., description="系统提示词")
     model: str = Field(..., description="OpenAI 模型名")
+    retention_days: Optional[int] = Field(None, description="原始消息保留天数")
     created_at: datetime = Field(..., description="创建时间")
 
     model_config = {"from_attributes": True}
@@ -39,6 +43,7 @@ class AgentInDB(BaseModel):
     name: str
     system_prompt: str
     model: str
+    retention_days: Optional[int] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
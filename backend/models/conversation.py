@@ -1,6 +1,6 @@
 """
 [INPUT]: 依赖 pydantic 的 BaseModel，依赖 datetime/uuid 标准库
-[OUTPUT]: 对外提供 ConversationCreate/ConversationResponse/ConversationInDB 三个模型
+[OUTPUT]: 对外提供 ConversationCreate/ConversationFork/ConversationResponse/ConversationInDB 四个模型
 [POS]: backend/models 的会话数据模型，被 ConversationRepository 和 ConversationService 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
@@ -18,6 +18,15 @@ class ConversationCreate(BaseModel):
     title: Optional[str] = Field(None, max_length=200, description="会话标题（可选）")
 
 
+class ConversationFork(BaseModel):
+    """分支会话请求体"""
+
+    message_id: Optional[str] = Field(
+        None, description="分支点消息 ID（含该消息），为空表示从当前最新处分支"
+    )
+    title: Optional[str] = Field(None, max_length=200, description="分支标题（可选）")
+
+
 class ConversationResponse(BaseModel):
     """会话响应体（对外暴露）"""
 
@@ -25,6 +34,9 @@ class ConversationResponse(BaseModel):
     user_id: str = Field(..., description="用户 ID")
     agent_id: str = Field(..., description="Agent ID")
     title: Optional[str] = Field(None, description="会话标题")
+    retention_days: Optional[int] = Field(None, description="原始消息保留天数（创建时由用户/Agent 策略决定）")
+    parent_conversation_id: Optional[str] = Field(None, description="父会话 ID（分支会话）")
+    fork_point: Optional[datetime] = Field(None, description="继承父会话消息的截止时间（含）")
     created_at: datetime = Field(..., description="创建时间")
     updated_at: datetime = Field(..., description="最后更新时间")
 
@@ -38,6 +50,13 @@ class ConversationInDB(BaseModel):
     user_id: str
     agent_id: str
     title: Optional[str] = None
+    retention_days: Optional[int] = None
+    summary: Optional[str] = None  # 过期消息折叠后的历史摘要
+    summary_until: Optional[datetime] = None  # 摘要已覆盖到的最后一条消息时间
+    parent_conversation_id: Optional[str] = None  # 分支来源，历史按祖先链惰性拼接
+    fork_point: Optional[datetime] = None  # 父会话中 created_at <= fork_point 的消息属于本分支历史
+    message_count: int = 0  # 自身消息数（写入 +1、折叠删除 -n），参与历史 ETag
+    revision: int = 0  # 已有消息被改写（如重新计算 token）时 +1，参与历史 ETag
     created_at: datetime
     updated_at: datetime
 
@@ -0,0 +1,47 @@
+"""
+[INPUT]: 依赖 pydantic 的 BaseModel，依赖 datetime 标准库
+[OUTPUT]: 对外提供 JobResponse/JobInDB 两个模型
+[POS]: backend/models 的后台任务数据模型，被 JobRepository 和 JobService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+
+JobStatus = Literal["pending", "running", "completed", "failed"]
+
+
+class JobResponse(BaseModel):
+    """后台任务响应体（对外暴露）"""
+
+    job_id: str = Field(..., description="任务 ID")
+    job_type: str = Field(..., description="任务类型（如 delete_user、delete_conversation）")
+    target_id: str = Field(..., description="任务目标 ID")
+    status: JobStatus = Field(..., description="任务状态")
+    progress: Dict[str, int] = Field(default_factory=dict, description="已处理数量（按集合统计）")
+    error: Optional[str] = Field(None, description="失败原因")
+    created_at: datetime = Field(..., description="创建时间")
+    updated_at: datetime = Field(..., description="最后更新时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+
+    model_config = {"from_attributes": True}
+
+
+class JobInDB(BaseModel):
+    """后台任务数据库模型（内部使用）"""
+
+    job_id: str
+    job_type: str
+    target_id: str
+    status: JobStatus
+    params: Dict[str, Any] = Field(default_factory=dict)
+    progress: Dict[str, int] = Field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    owner: Optional[str] = None  # 持有租约的进程
+    lease_until: Optional[datetime] = None  # 租约到期时间，过期后其他进程可接管
+
+    model_config = {"from_attributes": True}
@@ -24,6 +24,7 @@ class MessageResponse(BaseModel):
     role: Literal["user", "assistant", "system"] = Field(..., description="角色")
     content: str = Field(..., description="消息内容")
     token_count: Optional[int] = Field(None, description="Token 数量")
+    token_encoding: Optional[str] = Field(None, description="计算 token_count 使用的编码")
     created_at: datetime = Field(..., description="创建时间")
 
     model_config = {"from_attributes": True}
@@ -37,6 +38,9 @@ class MessageInDB(BaseModel):
     role: Literal["user", "assistant", "system"]
     content: str
     token_count: Optional[int] = None
+    token_encoding: Optional[str] = None  # 计算 token_count 使用的编码
+    token_rule: Optional[str] = None  # 计算 token_count 使用的规则（编码:每条消息开销），与模型规则不一致时需重新计数
     created_at: datetime
+    expire_at: Optional[datetime] = None  # TTL 兜底删除时间
 
     model_config = {"from_attributes": True}
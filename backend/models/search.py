@@ -0,0 +1,44 @@
+"""
+[INPUT]: 依赖 pydantic 的 BaseModel，依赖 datetime 标准库
+[OUTPUT]: 对外提供 PostingInDB/SearchHit/SearchResponse 三个模型
+[POS]: backend/models 的全文检索数据模型，被 SearchPostingRepository 和 SearchService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+
+
+class SearchHit(BaseModel):
+    """单条检索结果"""
+
+    message_id: str = Field(..., description="消息 ID")
+    conversation_id: str = Field(..., description="会话 ID")
+    role: Literal["user", "assistant", "system"] = Field(..., description="角色")
+    snippet: str = Field(..., description="命中片段")
+    score: float = Field(..., description="相关性得分")
+    created_at: datetime = Field(..., description="消息创建时间")
+
+
+class SearchResponse(BaseModel):
+    """检索响应体（对外暴露）"""
+
+    hits: List[SearchHit] = Field(default_factory=list, description="命中结果")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多")
+    truncated: bool = Field(
+        False, description="候选集达到 SEARCH_MAX_CANDIDATES 上限：只检索了最新的候选，更早的命中不会返回"
+    )
+
+
+class PostingInDB(BaseModel):
+    """倒排索引记录（内部使用）：一个词项在一条消息中的出现"""
+
+    term: str
+    user_id: str
+    conversation_id: str
+    message_id: str
+    tf: int
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
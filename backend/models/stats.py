@@ -0,0 +1,60 @@
+"""
+[INPUT]: 依赖 pydantic 的 BaseModel，依赖 datetime 标准库
+[OUTPUT]: 对外提供 RollupInDB/StatsMetrics/StatsPoint/StatsResponse 四个模型与 Granularity/GroupBy 类型
+[POS]: backend/models 的统计汇总数据模型，被 StatsRollupRepository 和 StatsService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+
+Granularity = Literal["day", "hour"]
+GroupBy = Literal["none", "user", "agent", "model"]
+
+
+class StatsMetrics(BaseModel):
+    """一组汇总桶合计出的指标"""
+
+    turns: int = Field(0, description="对话轮次（用户消息数）")
+    replies: int = Field(0, description="助手回复数")
+    avg_reply_chars: float = Field(0.0, description="平均回复长度（字符）")
+    user_tokens: int = Field(0, description="用户消息 token 数")
+    assistant_tokens: int = Field(0, description="助手回复 token 数")
+    total_tokens: int = Field(0, description="token 合计")
+    active_users: int = Field(0, description="活跃用户数（去重）")
+
+
+class StatsPoint(StatsMetrics):
+    """一个时间桶（按 group_by 再分组时为一个分组）的指标"""
+
+    bucket: datetime = Field(..., description="时间桶起点（UTC）")
+    key: Optional[str] = Field(None, description="分组值（user_id / agent_id / model），不分组时为空")
+
+
+class StatsResponse(BaseModel):
+    """统计查询响应体（对外暴露）"""
+
+    granularity: Granularity = Field(..., description="时间粒度")
+    group_by: GroupBy = Field(..., description="分组维度")
+    start: datetime = Field(..., description="起始时间桶（含）")
+    end: datetime = Field(..., description="结束时间（不含）")
+    points: List[StatsPoint] = Field(default_factory=list, description="按时间桶、分组值排序")
+    totals: StatsMetrics = Field(default_factory=StatsMetrics, description="整个区间的合计")
+
+
+class RollupInDB(BaseModel):
+    """汇总桶（内部使用）：某用户在某 Agent / 模型上一个小时或一天的计数，写消息时 $inc 累加"""
+
+    granularity: Granularity
+    bucket: datetime
+    user_id: str
+    agent_id: str
+    model: str
+    user_messages: int = 0
+    assistant_messages: int = 0
+    user_tokens: int = 0
+    assistant_tokens: int = 0
+    assistant_chars: int = 0
+
+    model_config = {"from_attributes": True}
@@ -14,6 +14,9 @@ class UserCreate(BaseModel):
     """创建用户请求体"""
 
     username: str = Field(..., min_length=1, max_length=50, description="用户名")
+    retention_days: Optional[int] = Field(
+        None, ge=1, description="原始消息保留天数（为空表示不限制）"
+    )
 
 
 class UserResponse(BaseModel):
@@ -21,6 +24,7 @@ class UserResponse(BaseModel):
 
     user_id: str = Field(..., description="用户 ID")
     username: str = Field(..., description="用户名")
+    retention_days: Optional[int] = Field(None, description="原始消息保留天数")
     created_at: datetime = Field(..., description="创建时间")
 
     model_config = {"from_attributes": True}
@@ -31,6 +35,7 @@ class UserInDB(BaseModel):
 
     user_id: str
     username: str
+    retention_days: Optional[int] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
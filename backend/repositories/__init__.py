@@ -5,15 +5,23 @@ backend.repositories - 数据访问层模块
 """
 
 from .base import BaseRepository
+from .loader import BatchLoader
 from .user import UserRepository
 from .agent import AgentRepository
 from .conversation import ConversationRepository
 from .message import MessageRepository
+from .job import JobRepository
+from .search import SearchPostingRepository
+from .stats import StatsRollupRepository
 
 __all__ = [
     "BaseRepository",
+    "BatchLoader",
     "UserRepository",
     "AgentRepository",
     "ConversationRepository",
     "MessageRepository",
+    "JobRepository",
+    "SearchPostingRepository",
+    "StatsRollupRepository",
 ]
@@ -18,7 +18,7 @@ class AgentRepository(BaseRepository[AgentInDB]):
     """
 
     def __init__(self):
-        super().__init__(db.db.agents)
+        super().__init__(db.collection("agents"))
 
     def _to_model(self, doc: Dict[str, Any]) -> AgentInDB:
         """MongoDB 文档 → AgentInDB 模型"""
@@ -27,5 +27,6 @@ class AgentRepository(BaseRepository[AgentInDB]):
             name=doc["name"],
             system_prompt=doc["system_prompt"],
             model=doc["model"],
+            retention_days=doc.get("retention_days"),
             created_at=doc["created_at"],
         )
@@ -1,41 +1,88 @@
 """
-[INPUT]: 依赖 motor.motor_asyncio 的 AsyncIOMotorCollection，依赖 typing 的泛型
-[OUTPUT]: 对外提供 BaseRepository 抽象类，定义通用 CRUD 方法
+[INPUT]: 依赖 backend.storage 的 StorageCollection，依赖 pydantic 的 BaseModel（find_raw 的 model_construct 模式），依赖 typing 的泛型，依赖 backend.core.request_scope 的请求内备忘，依赖 backend.repositories.loader 的 get_loader，依赖 backend.core.stages 的 staged（读写计入 db_read / persist 阶段），依赖 backend.core.metrics 的 db_timed/cache_counters（存储操作耗时与请求内备忘命中率），依赖 backend.core.tracing 的 traced_db（存储操作 span）
+[OUTPUT]: 对外提供 BaseRepository 抽象类，定义通用 CRUD 方法、合并查询 load 与原始投影查询 find_raw
 [POS]: backend/repositories 的基类，被所有具体 Repository 继承
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from typing import Generic, TypeVar, Optional, List, Dict, Any
+from typing import Generic, TypeVar, Optional, List, Dict, Any, AsyncIterator, Tuple, Type
 from abc import ABC, abstractmethod
-from motor.motor_asyncio import AsyncIOMotorCollection
+import asyncio
+from pydantic import BaseModel
+from ..core.request_scope import request_memo, invalidate_memo
+from ..core.stages import staged
+from ..core.metrics import cache_counters, db_timed
+from ..core.tracing import traced_db
+from ..storage import StorageCollection
+from .loader import get_loader
 
 T = TypeVar("T")
 
+_MEMO_HIT, _MEMO_MISS = cache_counters("request_memo")
+
 
 class BaseRepository(ABC, Generic[T]):
     """通用 CRUD 仓储基类
 
     设计哲学：
-    - 封装 MongoDB 操作细节
+    - 封装存储操作细节（Mongo / 内存 / SQLite 后端共享同一组方法）
     - 提供类型安全的查询接口
     - 通过 _to_model 抽象方法实现文档到模型的转换
     - 返回 Optional[T] 让上层处理 None 情况，代码自证正确
     """
 
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(self, collection: StorageCollection):
         self.collection = collection
+        self.namespace = collection.name
 
+    @staged("persist")
+    @db_timed("create")
+    @traced_db("create")
     async def create(self, document: Dict[str, Any]) -> T:
         """插入文档"""
-        result = await self.collection.insert_one(document)
-        document["_id"] = result.inserted_id
+        document["_id"] = await self.collection.insert_one(document)
+        invalidate_memo(self.namespace)
         return self._to_model(document)
 
+    @staged("db_read")
+    @db_timed("find_one")
+    @traced_db("find_one")
     async def find_one(self, query: Dict[str, Any]) -> Optional[T]:
         """查询单个文档，返回 None 表示不存在"""
         doc = await self.collection.find_one(query)
         return self._to_model(doc) if doc else None
 
+    @staged("db_read")
+    async def load(self, field: str, value: Any) -> Optional[T]:
+        """按唯一字段查询单个文档（DataLoader 语义）
+
+        - 同一事件循环轮次内的 load 合并为一条 $in 查询（跨请求共享）
+        - 请求作用域内同一 (field, value) 只查询一次，本集合发生写操作后失效
+        返回的模型可能被多个调用方共享，只读使用。
+        """
+        memo = request_memo(self.namespace)
+        key = (field, value)
+        future = memo.get(key) if memo is not None else None
+        if future is None:
+            future = get_loader(self, field).load(value)
+            if memo is not None:
+                _MEMO_MISS.inc()
+                memo[key] = future
+
+                def drop_failed(f: asyncio.Future) -> None:
+                    # 查询失败不缓存，同一请求内重试会重新查询
+                    if f.exception() is not None:
+                        memo.pop(key, None)
+
+                future.add_done_callback(drop_failed)
+        else:
+            _MEMO_HIT.inc()
+        # shield：单个请求取消时不取消其他请求共享的 Future
+        return await asyncio.shield(future)
+
+    @staged("db_read")
+    @db_timed("find_many")
+    @traced_db("find_many")
     async def find_many(
         self,
         query: Dict[str, Any],
@@ -44,27 +91,151 @@ class BaseRepository(ABC, Generic[T]):
         sort: Optional[List[tuple]] = None,
     ) -> List[T]:
         """查询多个文档"""
-        cursor = self.collection.find(query).skip(skip).limit(limit)
-        if sort:
-            cursor = cursor.sort(sort)
-        docs = await cursor.to_list(length=limit)
+        docs = await self.collection.find(query, sort=sort, skip=skip, limit=limit)
         return [self._to_model(doc) for doc in docs]
 
+    @staged("db_read")
+    @db_timed("find_raw")
+    @traced_db("find_raw")
+    async def find_raw(
+        self,
+        query: Dict[str, Any],
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        skip: int = 0,
+        sort: Optional[List[tuple]] = None,
+        construct: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """查询原始文档（按 fields 投影，不含 _id，不经过 _to_model）
+
+        热路径专用：省去逐条 Pydantic 校验，也只从数据库取需要的字段。
+        - construct 为空：返回原始字典
+        - construct 为模型类：以 model_construct 包装（不校验，调用方需保证 fields 覆盖必填字段）
+        """
+        projection: Dict[str, int] = {"_id": 0}
+        if fields:
+            projection.update({field: 1 for field in fields})
+        docs = await self.collection.find(query, projection, sort=sort, skip=skip, limit=limit)
+        if construct is not None:
+            return [construct.model_construct(**doc) for doc in docs]
+        return docs
+
+    async def iter_raw(
+        self,
+        query: Dict[str, Any],
+        sort: Optional[List[tuple]] = None,
+        batch_size: int = 1000,
+        limit: int = 0,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """流式遍历原始文档（不含 _id，不构造模型；fields 不为空时只取这些字段）
+
+        游标按 batch_size 分批拉取，内存占用与结果总量无关，
+        用于导出等需要顺序扫描大量文档的场景。
+        """
+        projection: Dict[str, int] = {"_id": 0}
+        if fields:
+            projection.update({field: 1 for field in fields})
+        async for doc in self.collection.iterate(
+            query, projection, sort=sort, batch_size=batch_size, limit=limit
+        ):
+            yield doc
+
+    @staged("persist")
+    @db_timed("create_many")
+    @traced_db("create_many")
+    async def create_many(self, documents: List[Dict[str, Any]]) -> int:
+        """批量插入（ordered=False），返回成功插入数量
+
+        唯一索引冲突的文档被跳过，其余文档照常写入，
+        重复导入同一份数据是安全的。
+        """
+        if not documents:
+            return 0
+        invalidate_memo(self.namespace)
+        return await self.collection.insert_many(documents)
+
+    @staged("persist")
+    @db_timed("update")
+    @traced_db("update")
     async def update(self, query: Dict[str, Any], update: Dict[str, Any]) -> Optional[T]:
         """更新文档，返回更新后的文档"""
-        doc = await self.collection.find_one_and_update(
-            query, {"$set": update}, return_document=True
-        )
+        doc = await self.collection.find_one_and_set(query, update)
+        invalidate_memo(self.namespace)
+        return self._to_model(doc) if doc else None
+
+    @staged("persist")
+    @db_timed("increment")
+    @traced_db("increment")
+    async def increment(
+        self,
+        query: Dict[str, Any],
+        amounts: Dict[str, float],
+        update: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+    ) -> Optional[T]:
+        """原子累加字段（可同时 $set update），返回更新后的文档
+
+        upsert 为 True 时不存在则按 query 的相等条件插入（计数类汇总文档，配合唯一索引）。
+        """
+        doc = await self.collection.increment(query, amounts, update, upsert=upsert)
+        invalidate_memo(self.namespace)
         return self._to_model(doc) if doc else None
 
+    @staged("persist")
+    @db_timed("update_each")
+    @traced_db("update_each")
+    async def update_each(
+        self, updates: List[Tuple[Dict[str, Any], Dict[str, Any]]], upsert: bool = False
+    ) -> int:
+        """批量逐条更新（一次 bulk_write，ordered=False），返回修改数量
+
+        每项为 (query, $set 字段)，用于回填任务按文档写入不同的值；
+        upsert 为 True 时未命中的项按 query 的相等条件插入（重建汇总等按键整体覆盖的场景）。
+        """
+        if not updates:
+            return 0
+        modified = await self.collection.update_each(updates, upsert=upsert)
+        invalidate_memo(self.namespace)
+        return modified
+
+    @staged("persist")
+    @db_timed("delete")
+    @traced_db("delete")
     async def delete(self, query: Dict[str, Any]) -> bool:
         """删除文档，返回是否成功"""
-        result = await self.collection.delete_one(query)
-        return result.deleted_count > 0
+        deleted = await self.collection.delete_one(query)
+        invalidate_memo(self.namespace)
+        return deleted > 0
+
+    @staged("persist")
+    @db_timed("delete_many")
+    @traced_db("delete_many")
+    async def delete_many(self, query: Dict[str, Any]) -> int:
+        """删除所有匹配文档，返回删除数量"""
+        deleted = await self.collection.delete_many(query)
+        invalidate_memo(self.namespace)
+        return deleted
+
+    @staged("persist")
+    @db_timed("delete_batch")
+    @traced_db("delete_batch")
+    async def delete_batch(self, query: Dict[str, Any], batch_size: int) -> int:
+        """有界批量删除，返回本批删除数量（0 表示已删完）
+
+        单次至多删除 batch_size 条（由存储后端先取 _id 再删除），
+        删除量可控，避免大删除阻塞写入或拉高复制延迟。
+        """
+        deleted = await self.collection.delete_many(query, limit=batch_size)
+        invalidate_memo(self.namespace)
+        return deleted
 
-    async def count(self, query: Dict[str, Any]) -> int:
-        """统计文档数量"""
-        return await self.collection.count_documents(query)
+    @staged("db_read")
+    @db_timed("count")
+    @traced_db("count")
+    async def count(self, query: Dict[str, Any], limit: int = 0) -> int:
+        """统计文档数量，limit > 0 时数到 limit 即停止"""
+        return await self.collection.count(query, limit=limit)
 
     @abstractmethod
     def _to_model(self, doc: Dict[str, Any]) -> T:
@@ -18,7 +18,7 @@ class ConversationRepository(BaseRepository[ConversationInDB]):
     """
 
     def __init__(self):
-        super().__init__(db.db.conversations)
+        super().__init__(db.collection("conversations"))
 
     def _to_model(self, doc: Dict[str, Any]) -> ConversationInDB:
         """MongoDB 文档 → ConversationInDB 模型"""
@@ -27,6 +27,13 @@ class ConversationRepository(BaseRepository[ConversationInDB]):
             user_id=doc["user_id"],
             agent_id=doc["agent_id"],
             title=doc.get("title"),
+            retention_days=doc.get("retention_days"),
+            summary=doc.get("summary"),
+            summary_until=doc.get("summary_until"),
+            parent_conversation_id=doc.get("parent_conversation_id"),
+            fork_point=doc.get("fork_point"),
+            message_count=doc.get("message_count", 0),
+            revision=doc.get("revision", 0),
             created_at=doc["created_at"],
             updated_at=doc["updated_at"],
         )
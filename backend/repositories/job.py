@@ -0,0 +1,38 @@
+"""
+[INPUT]: 依赖 backend.repositories.base 的 BaseRepository，依赖 backend.models.job 的 JobInDB，依赖 backend.core.database 的 db
+[OUTPUT]: 对外提供 JobRepository 类，封装后台任务数据的 CRUD 操作
+[POS]: backend/repositories 的后台任务数据访问层，被 JobService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, Any
+from .base import BaseRepository
+from ..models.job import JobInDB
+from ..core.database import db
+
+
+class JobRepository(BaseRepository[JobInDB]):
+    """后台任务数据仓储
+
+    提供后台任务相关的数据库操作
+    """
+
+    def __init__(self):
+        super().__init__(db.collection("jobs"))
+
+    def _to_model(self, doc: Dict[str, Any]) -> JobInDB:
+        """MongoDB 文档 → JobInDB 模型"""
+        return JobInDB(
+            job_id=doc["job_id"],
+            job_type=doc["job_type"],
+            target_id=doc["target_id"],
+            status=doc["status"],
+            params=doc.get("params", {}),
+            progress=doc.get("progress", {}),
+            error=doc.get("error"),
+            created_at=doc["created_at"],
+            updated_at=doc["updated_at"],
+            finished_at=doc.get("finished_at"),
+            owner=doc.get("owner"),
+            lease_until=doc.get("lease_until"),
+        )
@@ -0,0 +1,92 @@
+"""
+[INPUT]: 依赖 asyncio 的事件循环，依赖 contextvars 的空 Context（派发不继承请求上下文），依赖 backend.repositories.base 的 BaseRepository.find_many
+[OUTPUT]: 对外提供 BatchLoader 类与 get_loader 函数（按集合与字段共享的批量加载器）
+[POS]: backend/repositories 的查询合并层，被 BaseRepository.load 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, Set, Tuple, TYPE_CHECKING
+import asyncio
+import contextvars
+import functools
+import logging
+
+if TYPE_CHECKING:
+    from .base import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """合并同一事件循环轮次内对同一唯一字段的单文档查询
+
+    - 第一次 load 时用 call_soon 安排派发，同一轮次内到达的 load 只登记取值
+    - 派发在空上下文中执行：合并查询可能服务多个请求，不计入第一个调用方的阶段计时、追踪区间，
+      也不沿用其读意图与因果会话（走主节点读，对所有调用方都满足读己之写）；
+      各调用方的等待时间由 BaseRepository.load 的 db_read 阶段各自计入
+    - 派发时以一条 {field: {"$in": [...]}} 查询取回全部文档，同值的调用共享同一个 Future
+    - 字段必须唯一（按字段值回填结果），不存在的值得到 None
+    - 派发任务由加载器持有直到结束（事件循环只弱引用任务，未持有时可能被回收，等待方永远挂起）；
+      查询失败时异常设置到本批每个 Future，任务被取消时本批 Future 一并取消
+    """
+
+    def __init__(self, repo: "BaseRepository", field: str):
+        self.repo = repo
+        self.field = field
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, value: Any) -> asyncio.Future:
+        future = self._pending.get(value)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch, context=contextvars.Context())
+            future = self._pending[value] = loop.create_future()
+        return future
+
+    def _dispatch(self) -> None:
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(functools.partial(_cancel_unsettled, batch))
+
+    async def _fetch(self, batch: Dict[Any, asyncio.Future]) -> None:
+        try:
+            models = await self.repo.find_many(
+                {self.field: {"$in": list(batch)}}, limit=len(batch)
+            )
+            found = {getattr(model, self.field): model for model in models}
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for value, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(value))
+        if len(batch) > 1:
+            logger.debug("合并查询: %s.%s × %d", self.repo.namespace, self.field, len(batch))
+
+
+def _cancel_unsettled(batch: Dict[Any, asyncio.Future], task: asyncio.Task) -> None:
+    """派发任务结束后仍未完成的 Future 一并取消（任务在开始执行前就被取消时 _fetch 不会运行）"""
+    for future in batch.values():
+        future.cancel()
+
+
+# (集合名, 字段) → 加载器；所有 Repository 实例共享，跨请求的并发查询才能合并
+_loaders: Dict[Tuple[str, str], BatchLoader] = {}
+
+
+def get_loader(repo: "BaseRepository", field: str) -> BatchLoader:
+    key = (repo.namespace, field)
+    loader = _loaders.get(key)
+    if loader is None:
+        loader = _loaders[key] = BatchLoader(repo, field)
+    else:
+        # 使用最新的 Repository（重连后集合对象会变化）
+        loader.repo = repo
+    return loader
@@ -18,7 +18,7 @@ class MessageRepository(BaseRepository[MessageInDB]):
     """
 
     def __init__(self):
-        super().__init__(db.db.messages)
+        super().__init__(db.collection("messages"))
 
     def _to_model(self, doc: Dict[str, Any]) -> MessageInDB:
         """MongoDB 文档 → MessageInDB 模型"""
@@ -28,5 +28,8 @@ class MessageRepository(BaseRepository[MessageInDB]):
             role=doc["role"],
             content=doc["content"],
             token_count=doc.get("token_count"),
+            token_encoding=doc.get("token_encoding"),
+            token_rule=doc.get("token_rule"),
             created_at=doc["created_at"],
+            expire_at=doc.get("expire_at"),
         )
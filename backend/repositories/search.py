@@ -0,0 +1,32 @@
+"""
+[INPUT]: 依赖 backend.repositories.base 的 BaseRepository，依赖 backend.models.search 的 PostingInDB，依赖 backend.core.database 的 db
+[OUTPUT]: 对外提供 SearchPostingRepository 类，封装倒排索引记录的读写
+[POS]: backend/repositories 的全文检索数据访问层，被 SearchService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, Any
+from .base import BaseRepository
+from ..models.search import PostingInDB
+from ..core.database import db
+
+
+class SearchPostingRepository(BaseRepository[PostingInDB]):
+    """倒排索引数据仓储
+
+    提供 search_postings 集合的数据库操作
+    """
+
+    def __init__(self):
+        super().__init__(db.collection("search_postings"))
+
+    def _to_model(self, doc: Dict[str, Any]) -> PostingInDB:
+        """MongoDB 文档 → PostingInDB 模型"""
+        return PostingInDB(
+            term=doc["term"],
+            user_id=doc["user_id"],
+            conversation_id=doc["conversation_id"],
+            message_id=doc["message_id"],
+            tf=doc["tf"],
+            created_at=doc["created_at"],
+        )
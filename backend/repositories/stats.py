@@ -0,0 +1,36 @@
+"""
+[INPUT]: 依赖 backend.repositories.base 的 BaseRepository，依赖 backend.models.stats 的 RollupInDB，依赖 backend.core.database 的 db
+[OUTPUT]: 对外提供 StatsRollupRepository 类，封装统计汇总桶的读写
+[POS]: backend/repositories 的统计汇总数据访问层，被 StatsService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, Any
+from .base import BaseRepository
+from ..models.stats import RollupInDB
+from ..core.database import db
+
+
+class StatsRollupRepository(BaseRepository[RollupInDB]):
+    """统计汇总数据仓储
+
+    提供 stats_rollups 集合的数据库操作
+    """
+
+    def __init__(self):
+        super().__init__(db.collection("stats_rollups"))
+
+    def _to_model(self, doc: Dict[str, Any]) -> RollupInDB:
+        """MongoDB 文档 → RollupInDB 模型"""
+        return RollupInDB(
+            granularity=doc["granularity"],
+            bucket=doc["bucket"],
+            user_id=doc["user_id"],
+            agent_id=doc["agent_id"],
+            model=doc["model"],
+            user_messages=doc.get("user_messages", 0),
+            assistant_messages=doc.get("assistant_messages", 0),
+            user_tokens=doc.get("user_tokens", 0),
+            assistant_tokens=doc.get("assistant_tokens", 0),
+            assistant_chars=doc.get("assistant_chars", 0),
+        )
@@ -18,12 +18,13 @@ class UserRepository(BaseRepository[UserInDB]):
     """
 
     def __init__(self):
-        super().__init__(db.db.users)
+        super().__init__(db.collection("users"))
 
     def _to_model(self, doc: Dict[str, Any]) -> UserInDB:
         """MongoDB 文档 → UserInDB 模型"""
         return UserInDB(
             user_id=doc["user_id"],
             username=doc["username"],
+            retention_days=doc.get("retention_days"),
             created_at=doc["created_at"],
         )
@@ -4,6 +4,17 @@ backend.routers - API 路由层模块
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from . import users, agents, conversations, messages
+from . import users, agents, conversations, messages, jobs, transfer, search, stats, diagnostics, realtime
 
-__all__ = ["users", "agents", "conversations", "messages"]
+__all__ = [
+    "users",
+    "agents",
+    "conversations",
+    "messages",
+    "jobs",
+    "transfer",
+    "search",
+    "stats",
+    "diagnostics",
+    "realtime",
+]
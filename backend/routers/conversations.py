@@ -1,15 +1,17 @@
 """
-[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.conversation 的 ConversationService，依赖 backend.models.conversation 的 ConversationCreate/ConversationResponse
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.conversation 的 ConversationService，依赖 backend.models.conversation 的 ConversationCreate/ConversationFork/ConversationResponse，依赖 backend.core.responses 的 ORJSONResponse/make_etag/etag_matches/not_modified
 [OUTPUT]: 对外提供会话管理 REST API 路由
 [POS]: backend/routers 的会话管理路由，被 main.py 注册
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi.encoders import jsonable_encoder
 from typing import List, Optional
 from ..services.conversation import ConversationService
-from ..models.conversation import ConversationCreate, ConversationResponse
-from ..core.exceptions import ResourceNotFoundError
+from ..models.conversation import ConversationCreate, ConversationFork, ConversationResponse
+from ..core.exceptions import ResourceNotFoundError, InvalidOperationError
+from ..core.responses import ORJSONResponse, make_etag, etag_matches, not_modified
 
 router = APIRouter()
 
@@ -35,13 +37,23 @@ async def list_conversations(
     user_id: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=500),
     skip: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(None),
     service: ConversationService = Depends(get_conversation_service),
 ):
-    """列出会话（可按 user_id 过滤）"""
-    if user_id:
-        return await service.list_user_conversations(user_id, limit=limit, skip=skip)
-    # 未来可扩展为列出所有会话
-    return []
+    """列出会话（可按 user_id 过滤）
+
+    列表本身就是各会话的 updated_at 快照，ETag 由渲染后的内容派生：
+    命中时省去响应体传输（查询仍需执行）。
+    """
+    if not user_id:
+        # 未来可扩展为列出所有会话
+        return []
+    convs = await service.list_user_conversations(user_id, limit=limit, skip=skip)
+    content = jsonable_encoder(convs)
+    etag = make_etag(content)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return ORJSONResponse(content, headers={"ETag": etag})
 
 
 @router.get("/{conv_id}", response_model=ConversationResponse)
@@ -55,13 +67,28 @@ async def get_conversation(
     return conv
 
 
+@router.post("/{conv_id}/fork", response_model=ConversationResponse, status_code=201)
+async def fork_conversation(
+    conv_id: str,
+    data: ConversationFork,
+    service: ConversationService = Depends(get_conversation_service),
+):
+    """从指定消息（或当前末尾）分支出新会话，不复制历史消息"""
+    try:
+        return await service.fork_conversation(conv_id, data)
+    except ResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.delete("/{conv_id}", response_model=dict)
 async def delete_conversation(
     conv_id: str, service: ConversationService = Depends(get_conversation_service)
 ):
-    """删除会话"""
+    """删除会话（消息由后台任务级联删除）"""
     try:
-        await service.delete_conversation(conv_id)
-        return {"success": True}
+        job = await service.delete_conversation(conv_id)
+        return {"success": True, "job_id": job.job_id}
     except ResourceNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,90 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException/Header，依赖 backend.core.loop_monitor 的 loop_monitor，依赖 backend.core.pubsub 的 pubsub，依赖 backend.core.log_pipeline 的 log_stats，依赖 backend.core.profiling 的 profile_worker/memory_tracker/admin_authorized
+[OUTPUT]: 对外提供运行时诊断 REST API 路由（事件循环延迟直方图、实时通道订阅数、日志管线统计；需管理令牌的 CPU 采样剖析与内存快照对比）
+[POS]: backend/routers 的诊断路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ..core.config import settings
+from ..core.loop_monitor import loop_monitor
+from ..core.pubsub import pubsub
+from ..core.log_pipeline import log_stats
+from ..core.profiling import admin_authorized, memory_tracker, profile_worker
+from ..core.exceptions import InvalidOperationError
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """依赖注入：校验管理令牌（未配置 ADMIN_TOKEN 时剖析接口不可用）"""
+    if not admin_authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="需要有效的 X-Admin-Token")
+
+
+@router.get("/loop-lag", response_model=dict)
+async def get_loop_lag():
+    """事件循环延迟直方图（累计桶，单位毫秒）与卡顿次数"""
+    return loop_monitor.snapshot()
+
+
+@router.get("/realtime", response_model=dict)
+async def get_realtime():
+    """本进程的实时通道频道数与订阅（WebSocket 连接）数"""
+    return pubsub.stats()
+
+
+@router.get("/logging", response_model=dict)
+async def get_logging():
+    """日志管线的入队、采样丢弃、队列满丢弃条数与当前积压"""
+    return log_stats()
+
+
+# ==================== 性能剖析（需管理令牌） ====================
+@router.post("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(None, ge=1, description="采样间隔（毫秒），默认 PROFILE_SAMPLE_INTERVAL"),
+):
+    """采样整个 worker 的所有线程 seconds 秒，返回 collapsed stack（flamegraph.pl / speedscope 可直接读取）"""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds 不能超过 {settings.PROFILE_MAX_SECONDS}")
+    interval = interval_ms / 1000 if interval_ms else settings.PROFILE_SAMPLE_INTERVAL
+    try:
+        collapsed, samples = await profile_worker(seconds, interval)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            "X-Profile-Samples": str(samples),
+            "Content-Disposition": 'attachment; filename="worker.collapsed"',
+        },
+    )
+
+
+@router.post("/memory/start", response_model=dict, dependencies=[Depends(require_admin)])
+async def start_memory_tracking(frames: int = Query(1, ge=1, le=64)):
+    """开启 tracemalloc（每个分配记录 frames 层调用栈）并记录基线快照"""
+    return await memory_tracker.start(frames)
+
+
+@router.get("/memory/diff", response_model=dict, dependencies=[Depends(require_admin)])
+async def diff_memory(
+    top: int = Query(20, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    reset: bool = Query(False, description="以本次快照作为新的基线"),
+):
+    """当前快照相对基线的分配增长，按增长量排序"""
+    try:
+        return await memory_tracker.diff(top, group_by, reset)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/memory/stop", response_model=dict, dependencies=[Depends(require_admin)])
+async def stop_memory_tracking():
+    """停止 tracemalloc 并丢弃基线"""
+    return memory_tracker.stop()
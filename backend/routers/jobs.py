@@ -0,0 +1,58 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.job 的 JobService，依赖 backend.services.retention 的 RetentionService，依赖 backend.services.retokenize 的 RetokenizeService，依赖 backend.models.job 的 JobResponse
+[OUTPUT]: 对外提供后台任务状态查询与手动触发 REST API 路由
+[POS]: backend/routers 的后台任务路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from ..services.job import JobService
+from ..services.retention import RetentionService
+from ..services.retokenize import RetokenizeService
+from ..models.job import JobResponse
+
+router = APIRouter()
+
+
+def get_job_service() -> JobService:
+    """依赖注入：获取 JobService 实例"""
+    return JobService()
+
+
+def get_retention_service() -> RetentionService:
+    """依赖注入：获取 RetentionService 实例"""
+    return RetentionService()
+
+
+def get_retokenize_service() -> RetokenizeService:
+    """依赖注入：获取 RetokenizeService 实例"""
+    return RetokenizeService()
+
+
+@router.post("/retention-compaction", response_model=dict, status_code=202)
+async def run_retention_compaction(
+    service: RetentionService = Depends(get_retention_service),
+):
+    """手动触发一次过期消息压缩"""
+    job = await service.schedule_compaction()
+    return {"success": True, "job_id": job.job_id}
+
+
+@router.post("/retokenize", response_model=dict, status_code=202)
+async def run_retokenize(
+    agent_id: Optional[str] = Query(None, description="为空时处理所有 Agent"),
+    service: RetokenizeService = Depends(get_retokenize_service),
+):
+    """按 Agent 模型重新计算已存消息的 token_count"""
+    job = await service.schedule(agent_id)
+    return {"success": True, "job_id": job.job_id}
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, service: JobService = Depends(get_job_service)):
+    """查询后台任务状态与进度"""
+    job = await service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
@@ -1,78 +1,58 @@
 """
-[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.message 的 MessageService，依赖 backend.services.llm 的 LLMService，依赖 backend.services.conversation 的 ConversationService，依赖 backend.models.message 的 MessageCreate/MessageResponse
-[OUTPUT]: 对外提供核心对话接口 POST /conversations/{conv_id}/chat
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.message 的 MessageService，依赖 backend.services.chat 的 ChatService，依赖 backend.services.conversation 的 ConversationService，依赖 backend.models.message 的 MessageCreate/MessageResponse，依赖 backend.core.responses 的 ORJSONResponse/etag_matches/not_modified
+[OUTPUT]: 对外提供核心对话接口 POST /conversations/{conv_id}/chat、主动推送接口 POST /conversations/{conv_id}/push 与历史接口 GET /conversations/{conv_id}/messages（支持 ETag 条件请求与 since 增量同步）
 [POS]: backend/routers 的核心对话路由，被 main.py 注册，是整个数据流的汇聚点
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from typing import List, Optional
+from datetime import datetime, timezone
 import logging
 from ..services.message import MessageService
-from ..services.llm import LLMService
 from ..services.conversation import ConversationService
+from ..services.chat import ChatService
 from ..models.message import MessageCreate, MessageResponse
 from ..core.exceptions import ResourceNotFoundError, LLMError
+from ..core.responses import ORJSONResponse, etag_matches, not_modified
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_GENERATION_HEADER = "X-History-Generation"
 
 def get_message_service() -> MessageService:
     """依赖注入：获取 MessageService 实例"""
     return MessageService()
 
 
-def get_llm_service() -> LLMService:
-    """依赖注入：获取 LLMService 实例"""
-    return LLMService()
-
-
 def get_conversation_service() -> ConversationService:
     """依赖注入：获取 ConversationService 实例"""
     return ConversationService()
 
 
+def get_chat_service() -> ChatService:
+    """依赖注入：获取 ChatService 实例"""
+    return ChatService()
+
+
 @router.post(
     "/conversations/{conv_id}/chat", response_model=MessageResponse, status_code=200
 )
 async def chat(
     conv_id: str,
     body: MessageCreate,
-    message_service: MessageService = Depends(get_message_service),
-    llm_service: LLMService = Depends(get_llm_service),
-    conv_service: ConversationService = Depends(get_conversation_service),
+    chat_service: ChatService = Depends(get_chat_service),
 ):
-    """核心对话接口
-
-    数据流：
-    1. 保存 user message
-    2. 调用 LLMService 生成回复
-    3. 保存 assistant message
-    4. 更新会话时间戳
-    5. 返回 assistant 回复
+    """核心对话接口（一轮一个请求；需要流式增量与服务端推送时使用 WebSocket /api/ws）
+
+    数据流见 ChatService：保存 user message → LLM 生成 → 保存 assistant message → 发布到用户频道
     """
     try:
-        # 1. 保存用户消息
-        logger.info(f"收到用户消息: conv_id={conv_id}, length={len(body.content)}")
-        user_msg = await message_service.create_message(conv_id, "user", body.content)
-
-        # 2. 调用 LLM 生成回复
-        assistant_content = await llm_service.generate_response(conv_id, body.content)
-
-        # 3. 保存助手消息
-        assistant_msg = await message_service.create_message(
-            conv_id, "assistant", assistant_content
-        )
-
-        # 4. 更新会话时间戳
-        await conv_service.update_conversation_timestamp(conv_id)
-
-        logger.info(
-            f"对话完成: user_msg_id={user_msg.message_id}, assistant_msg_id={assistant_msg.message_id}"
-        )
-
+        logger.info("收到用户消息: conv_id=%s, length=%d", conv_id, len(body.content))
+        assistant_msg = await chat_service.chat(conv_id, body.content)
+        logger.info("对话完成: conv_id=%s, assistant_msg_id=%s", conv_id, assistant_msg.message_id)
         return assistant_msg
 
     except ResourceNotFoundError as e:
@@ -89,14 +69,53 @@ async def chat(
         raise HTTPException(status_code=500, detail="服务器内部错误")
 
 
+@router.post(
+    "/conversations/{conv_id}/push", response_model=MessageResponse, status_code=201
+)
+async def push_message(
+    conv_id: str,
+    body: MessageCreate,
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    """服务端主动触达：以 assistant 身份写入会话，并推送给该用户在线的 WebSocket 连接"""
+    try:
+        return await chat_service.push_message(conv_id, body.content)
+    except ResourceNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/conversations/{conv_id}/messages", response_model=List[MessageResponse])
 async def get_messages(
     conv_id: str,
     limit: int = Query(50, ge=1, le=200),
     skip: int = Query(0, ge=0),
+    since: Optional[datetime] = Query(None, description="增量同步游标：只返回 created_at >= since 的消息"),
+    if_none_match: Optional[str] = Header(None),
     message_service: MessageService = Depends(get_message_service),
+    conv_service: ConversationService = Depends(get_conversation_service),
 ):
-    """获取对话历史"""
-    return await message_service.get_conversation_messages(
-        conv_id, limit=limit, skip=skip
+    """获取对话历史
+
+    先由会话文档计算 ETag：与 If-None-Match 一致时直接返回 304，不查询消息。
+    服务层返回按 MessageResponse 字段投影的原始字典，直接由 orjson 序列化；
+    response_model 仅用于生成接口文档，不参与运行时校验。
+
+    增量同步：客户端以上次同步到的最后一条 created_at 作为 since 拉取新消息，
+    响应头 X-History-Generation 为历史代次，与本地记录不一致时需丢弃本地副本全量重拉。
+    """
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)  # 存储使用 naive UTC
+
+    etag = await conv_service.history_etag(conv_id, limit, skip, since)
+    if etag is None:
+        raise HTTPException(status_code=404, detail=f"会话不存在: {conv_id}")
+    headers = {"ETag": etag, _GENERATION_HEADER: await conv_service.history_generation(conv_id)}
+    if etag_matches(if_none_match, etag):
+        response = not_modified(etag)
+        response.headers[_GENERATION_HEADER] = headers[_GENERATION_HEADER]
+        return response
+
+    messages = await message_service.get_conversation_messages(
+        conv_id, limit=limit, skip=skip, since=since
     )
+    return ORJSONResponse(messages, headers=headers)
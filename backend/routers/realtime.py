@@ -0,0 +1,207 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/WebSocket，依赖 backend.services.chat 的 ChatService，依赖 backend.services.user 的 UserService，依赖 backend.core.pubsub 的 pubsub/Subscription/user_channel，依赖 backend.core.request_scope 的 request_scope，依赖 backend.core.metrics 的 chat_turn，依赖 backend.core.tracing 的 start_trace（每轮对话一个 trace），依赖 backend.core.log_pipeline 的 log_context，依赖 backend.storage.routing 的 causal_scope（每轮对话一个因果一致范围），依赖 backend.models.message 的 MessageCreate
+[OUTPUT]: 对外提供 WebSocket 接口 /ws（对话轮次流式增量 + 服务端推送事件的多路复用）
+[POS]: backend/routers 的实时通道路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+协议（JSON 文本帧）：
+    客户端 → 服务端
+        {"type": "chat", "conversation_id": "...", "content": "...", "request_id": "可选", "traceparent": "可选", "causal_token": "可选"}
+        {"type": "cancel", "request_id": "..."}
+        {"type": "ping"}
+    服务端 → 客户端
+        {"type": "ready", "connection_id": "..."}
+        {"type": "turn.started", "request_id": "...", "message": {...用户消息}, "trace_id": "开启追踪时"}
+        {"type": "turn.delta", "request_id": "...", "content": "增量文本"}
+        {"type": "turn.completed", "request_id": "...", "message": {...助手消息}, "causal_token": "Mongo 因果一致时"}
+        {"type": "turn.failed", "request_id": "...", "status": 404|429|502|500, "detail": "..."}
+        {"type": "message.created", "message": {...}}   # 其他连接的对话 / 服务端主动推送
+        {"type": "pong"} / {"type": "error", "detail": "..."}
+"""
+
+from typing import Any, Dict
+import asyncio
+import logging
+import uuid
+import orjson
+from fastapi import APIRouter, Depends, Query, WebSocket
+from pydantic import ValidationError
+from ..services.chat import ChatService
+from ..services.user import UserService
+from ..models.message import MessageCreate
+from ..core.config import settings
+from ..core.pubsub import Subscription, pubsub, user_channel
+from ..core.request_scope import request_scope
+from ..core.metrics import chat_turn
+from ..core.tracing import start_trace
+from ..core.log_pipeline import log_context
+from ..storage.routing import causal_scope
+from ..core.exceptions import ResourceNotFoundError, LLMError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# 关闭码：4404 用户不存在；1013 发送队列溢出（消费过慢，客户端稍后重连并从历史补齐）
+_CLOSE_USER_NOT_FOUND = 4404
+_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+def get_chat_service() -> ChatService:
+    """获取 ChatService 实例（每个对话轮次一个，空闲连接不持有服务对象）"""
+    return ChatService()
+
+
+# 依赖提供函数为 async：同步函数会被 FastAPI 派发到线程池，每条新连接多一次线程往返，
+# 大量客户端同时重连时线程池成为建连瓶颈
+async def get_user_service() -> UserService:
+    """依赖注入：获取 UserService 实例"""
+    return UserService()
+
+
+def _frame(event: Dict[str, Any]) -> str:
+    return orjson.dumps(event).decode()
+
+
+class _Connection:
+    """一条 WebSocket 连接
+
+    - 出站帧全部经过同一个有界 Subscription 队列，由唯一的发送协程写出（帧顺序确定，无并发写）
+    - 对话轮次按 request_id 多路复用，每轮一个任务，单连接并发轮次有上限
+    - 每个轮次是一次独立的请求：单独的 ChatService 与请求作用域（仓储 load 的备忘不跨轮次）
+    - 空闲连接只有接收循环与发送协程两个挂起的协程，没有定时器（心跳由 ASGI 服务器的 ping 负责）
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, sub: Subscription):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.sub = sub
+        self.turns: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self.sub.send(_frame({"type": "ready", "connection_id": self.sub.id}))
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await self._handle(message.get("text") or message.get("bytes") or b"")
+        finally:
+            pubsub.unsubscribe(self.sub)
+            for task in list(self.turns.values()):
+                task.cancel()
+            await asyncio.gather(*self.turns.values(), return_exceptions=True)
+            self.sub.close()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    async def _send_loop(self) -> None:
+        while True:
+            frame = await self.sub.next()
+            if frame is None:
+                if self.sub.overflowed:
+                    logger.warning("WebSocket 发送队列溢出，断开连接: user_id=%s", self.user_id)
+                    await self.websocket.close(code=_CLOSE_TRY_AGAIN_LATER, reason="send queue overflow")
+                return
+            try:
+                await self.websocket.send_text(frame)
+            except Exception:
+                return  # 连接已断开，由接收循环收尾
+
+    async def _handle(self, raw: Any) -> None:
+        try:
+            request = orjson.loads(raw)
+            kind = request["type"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            await self.sub.send(_frame({"type": "error", "detail": "无效的消息格式"}))
+            return
+
+        if kind == "ping":
+            await self.sub.send(_frame({"type": "pong"}))
+        elif kind == "chat":
+            await self._start_turn(request)
+        elif kind == "cancel":
+            task = self.turns.get(str(request.get("request_id")))
+            if task is not None:
+                task.cancel()
+        else:
+            await self.sub.send(_frame({"type": "error", "detail": f"未知的消息类型: {kind}"}))
+
+    async def _start_turn(self, request: Dict[str, Any]) -> None:
+        request_id = str(request.get("request_id") or uuid.uuid4())
+        try:
+            body = MessageCreate(content=request.get("content"))
+            conv_id = str(request["conversation_id"])
+        except (ValidationError, KeyError):
+            await self._fail(request_id, 422, "需要 conversation_id 与非空 content")
+            return
+        if request_id in self.turns:
+            await self._fail(request_id, 409, f"request_id 重复: {request_id}")
+            return
+        if len(self.turns) >= settings.WS_MAX_TURNS_PER_CONNECTION:
+            await self._fail(request_id, 429, "进行中的对话轮次过多")
+            return
+        self.turns[request_id] = asyncio.create_task(
+            self._turn(request_id, conv_id, body.content, request.get("traceparent"), request.get("causal_token"))
+        )
+
+    async def _turn(
+        self, request_id: str, conv_id: str, content: str, traceparent: Any = None, causal_token: Any = None
+    ) -> None:
+        attributes = {"request_id": request_id, "conversation_id": conv_id}
+        try:
+            with request_scope(), chat_turn("ws"), start_trace(
+                "WS chat", traceparent if isinstance(traceparent, str) else None, attributes=attributes
+            ) as trace, log_context(route="WS chat", conversation_id=conv_id), causal_scope(
+                causal_token if isinstance(causal_token, str) else None
+            ) as clock:
+                turn = get_chat_service().stream_chat(
+                    conv_id, content, origin=self.sub.id, user_id=self.user_id
+                )
+                async for kind, value in turn:
+                    if kind == "delta":
+                        event = {"type": "turn.delta", "request_id": request_id, "content": value}
+                    else:
+                        event = {
+                            "type": "turn.started" if kind == "message" else "turn.completed",
+                            "request_id": request_id,
+                            "message": value.model_dump(mode="json"),
+                        }
+                        if trace is not None and kind == "message":
+                            event["trace_id"] = trace.trace_id
+                        if kind != "message" and clock.token() is not None:
+                            event["causal_token"] = clock.token()
+                    # 队列满时在此等待：客户端读得慢，生成方随之放慢
+                    await self.sub.send(_frame(event))
+        except ResourceNotFoundError as e:
+            await self._fail(request_id, 404, str(e))
+        except LLMError as e:
+            await self._fail(request_id, 502, f"LLM 调用失败: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("对话轮次未知错误", exc_info=e)
+            await self._fail(request_id, 500, "服务器内部错误")
+        finally:
+            self.turns.pop(request_id, None)
+
+    async def _fail(self, request_id: str, status: int, detail: str) -> None:
+        await self.sub.send(
+            _frame({"type": "turn.failed", "request_id": request_id, "status": status, "detail": detail})
+        )
+
+
+@router.websocket("/ws")
+async def realtime(
+    websocket: WebSocket,
+    user_id: str = Query(...),
+    user_service: UserService = Depends(get_user_service),
+):
+    """实时通道：一条连接承载该用户的多路对话轮次与服务端推送"""
+    if not await user_service.get_user(user_id):
+        await websocket.close(code=_CLOSE_USER_NOT_FOUND, reason="user not found")
+        return
+
+    await websocket.accept()
+    sub = pubsub.subscribe(user_channel(user_id))
+    await _Connection(websocket, user_id, sub).run()
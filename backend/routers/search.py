@@ -0,0 +1,44 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.search 的 SearchService，依赖 backend.models.search 的 SearchResponse
+[OUTPUT]: 对外提供消息全文检索与索引重建 REST API 路由
+[POS]: backend/routers 的检索路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import Optional
+from ..services.search import SearchService
+from ..models.search import SearchResponse
+from ..core.exceptions import InvalidOperationError
+
+router = APIRouter()
+
+
+def get_search_service() -> SearchService:
+    """依赖注入：获取 SearchService 实例"""
+    return SearchService()
+
+
+@router.get("", response_model=SearchResponse)
+async def search_messages(
+    user_id: str = Query(..., description="仅检索该用户的消息"),
+    q: str = Query(..., min_length=1, max_length=200, description="检索词"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    service: SearchService = Depends(get_search_service),
+):
+    """检索用户的历史消息（按相关性排序，游标分页）"""
+    try:
+        return await service.search(user_id, q, limit=limit, cursor=cursor)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/reindex", response_model=dict, status_code=202)
+async def reindex_user(
+    user_id: str = Query(..., description="重建该用户的索引"),
+    service: SearchService = Depends(get_search_service),
+):
+    """后台重建用户的全部倒排索引（历史数据补录）"""
+    job = await service.schedule_reindex(user_id)
+    return {"success": True, "job_id": job.job_id}
@@ -0,0 +1,60 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException，依赖 backend.services.stats 的 StatsService，依赖 backend.models.stats 的 StatsResponse
+[OUTPUT]: 对外提供统计汇总查询与重建 REST API 路由
+[POS]: backend/routers 的统计路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Depends
+from datetime import datetime, timezone
+from typing import Optional
+from ..services.stats import StatsService
+from ..models.stats import Granularity, GroupBy, StatsResponse
+from ..core.exceptions import InvalidOperationError
+
+router = APIRouter()
+
+
+def get_stats_service() -> StatsService:
+    """依赖注入：获取 StatsService 实例"""
+    return StatsService()
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)  # 存储使用 naive UTC
+    return value
+
+
+@router.get("", response_model=StatsResponse)
+async def get_stats(
+    start: datetime = Query(..., description="起始时间（含，向下取整到桶）"),
+    end: datetime = Query(..., description="结束时间（不含）"),
+    granularity: Granularity = Query("day"),
+    group_by: GroupBy = Query("none", description="按用户 / Agent / 模型分组"),
+    user_id: Optional[str] = Query(None),
+    agent_id: Optional[str] = Query(None),
+    model: Optional[str] = Query(None),
+    service: StatsService = Depends(get_stats_service),
+):
+    """按小时 / 天查询对话轮次、回复数、平均回复长度、token 用量与活跃用户（只读汇总桶）"""
+    try:
+        return await service.query(
+            granularity, _utc(start), _utc(end), user_id=user_id, agent_id=agent_id, model=model, group_by=group_by
+        )
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/rebuild", response_model=dict, status_code=202)
+async def rebuild_stats(
+    start: datetime = Query(..., description="起始日期（按天取整），不得早于消息保留期边界"),
+    end: Optional[datetime] = Query(None, description="为空时到今天零点（UTC），不晚于今天零点"),
+    service: StatsService = Depends(get_stats_service),
+):
+    """后台从原始消息重建区间内的汇总桶"""
+    try:
+        job = await service.schedule_rebuild(_utc(start), _utc(end))
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "job_id": job.job_id}
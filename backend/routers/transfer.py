@@ -0,0 +1,90 @@
+"""
+[INPUT]: 依赖 fastapi 的 APIRouter/HTTPException/Request/StreamingResponse，依赖 backend.services.transfer 的 TransferService，依赖 backend.services.user/conversation 的存在性校验
+[OUTPUT]: 对外提供 NDJSON 导出（用户/会话）与导入 REST API 路由
+[POS]: backend/routers 的数据迁移路由，被 main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from ..services.transfer import TransferService
+from ..services.user import UserService
+from ..services.conversation import ConversationService
+from ..core.exceptions import InvalidOperationError
+
+router = APIRouter()
+
+
+def get_transfer_service() -> TransferService:
+    """依赖注入：获取 TransferService 实例"""
+    return TransferService()
+
+
+def get_user_service() -> UserService:
+    """依赖注入：获取 UserService 实例"""
+    return UserService()
+
+
+def get_conversation_service() -> ConversationService:
+    """依赖注入：获取 ConversationService 实例"""
+    return ConversationService()
+
+
+def _export_response(stream, filename: str, compression: Optional[str]) -> StreamingResponse:
+    """包装导出流：zstd 作为附件下载，不设置 Content-Encoding 以免客户端自动解压"""
+    media_type = "application/zstd" if compression else "application/x-ndjson"
+    suffix = ".ndjson.zst" if compression else ".ndjson"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}{suffix}"'},
+    )
+
+
+@router.get("/users/{user_id}/export")
+async def export_user(
+    user_id: str,
+    compression: Optional[Literal["zstd"]] = Query(None),
+    service: TransferService = Depends(get_transfer_service),
+    user_service: UserService = Depends(get_user_service),
+):
+    """流式导出用户全部数据（NDJSON）"""
+    if not await user_service.get_user(user_id):
+        raise HTTPException(status_code=404, detail=f"用户不存在: {user_id}")
+    try:
+        stream = await service.export_user(user_id, compression)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _export_response(stream, f"user-{user_id}", compression)
+
+
+@router.get("/conversations/{conv_id}/export")
+async def export_conversation(
+    conv_id: str,
+    compression: Optional[Literal["zstd"]] = Query(None),
+    service: TransferService = Depends(get_transfer_service),
+    conv_service: ConversationService = Depends(get_conversation_service),
+):
+    """流式导出单个会话（NDJSON）"""
+    if not await conv_service.get_conversation(conv_id):
+        raise HTTPException(status_code=404, detail=f"会话不存在: {conv_id}")
+    try:
+        stream = await service.export_conversation(conv_id, compression)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _export_response(stream, f"conversation-{conv_id}", compression)
+
+
+@router.post("/import", response_model=dict)
+async def import_data(
+    request: Request,
+    compression: Optional[Literal["zstd"]] = Query(None),
+    service: TransferService = Depends(get_transfer_service),
+):
+    """分块导入 NDJSON（请求体流式读取，重复 ID 自动跳过）"""
+    try:
+        stats = await service.import_stream(request.stream(), compression)
+    except InvalidOperationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **stats}
@@ -49,9 +49,9 @@ async def get_user(user_id: str, service: UserService = Depends(get_user_service
 
 @router.delete("/{user_id}", response_model=dict)
 async def delete_user(user_id: str, service: UserService = Depends(get_user_service)):
-    """删除用户"""
+    """删除用户（会话与消息由后台任务级联删除）"""
     try:
-        await service.delete_user(user_id)
-        return {"success": True}
+        job = await service.delete_user(user_id)
+        return {"success": True, "job_id": job.job_id}
     except ResourceNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -9,6 +9,16 @@ from .agent import AgentService
 from .conversation import ConversationService
 from .message import MessageService
 from .llm import LLMService
+from .chat import ChatService
+from .job import JobService, JobRunner, job_runner
+from .cascade_delete import CascadeDeleteService
+from .retention import RetentionService
+from .transfer import TransferService
+from .search import SearchService
+from .lineage import LineageResolver
+from .retokenize import RetokenizeService
+from .warmup import Warmup, warmup
+from .stats import StatsService
 
 __all__ = [
     "UserService",
@@ -16,4 +26,17 @@ __all__ = [
     "ConversationService",
     "MessageService",
     "LLMService",
+    "ChatService",
+    "JobService",
+    "JobRunner",
+    "job_runner",
+    "CascadeDeleteService",
+    "RetentionService",
+    "TransferService",
+    "SearchService",
+    "LineageResolver",
+    "RetokenizeService",
+    "Warmup",
+    "warmup",
+    "StatsService",
 ]
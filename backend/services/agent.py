@@ -1,5 +1,5 @@
 """
-[INPUT]: 依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.models.agent 的 AgentCreate/AgentResponse
+[INPUT]: 依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.models.agent 的 AgentCreate/AgentResponse，依赖 backend.services.retokenize 的 RetokenizeService
 [OUTPUT]: 对外提供 AgentService 类，封装 Agent 业务逻辑
 [POS]: backend/services 的 Agent 业务逻辑层，被 Router 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
@@ -11,6 +11,8 @@ import uuid
 from ..repositories.agent import AgentRepository
 from ..models.agent import AgentCreate, AgentResponse
 from ..core.exceptions import ResourceNotFoundError
+from ..core.tokenizer import get_tokenizer
+from .retokenize import RetokenizeService
 
 
 class AgentService:
@@ -18,7 +20,7 @@ class AgentService:
 
     职责：
     - 创建 Agent，设置 system_prompt 和 model
-    - 更新 Agent 配置
+    - 更新 Agent 配置（模型计数规则变化时后台重新计算历史消息 token 数）
     - 查询 Agent
     - 删除 Agent
     """
@@ -33,6 +35,7 @@ class AgentService:
             "name": data.name,
             "system_prompt": data.system_prompt,
             "model": data.model,
+            "retention_days": data.retention_days,
             "created_at": datetime.utcnow(),
         }
 
@@ -43,32 +46,42 @@ class AgentService:
             name=agent_in_db.name,
             system_prompt=agent_in_db.system_prompt,
             model=agent_in_db.model,
+            retention_days=agent_in_db.retention_days,
             created_at=agent_in_db.created_at,
         )
 
     async def update_agent(self, agent_id: str, data: AgentCreate) -> AgentResponse:
         """更新 Agent 配置"""
+        existing = await self.repo.find_one({"agent_id": agent_id})
+        if not existing:
+            raise ResourceNotFoundError(f"Agent 不存在: {agent_id}")
+
         update_doc = {
             "name": data.name,
             "system_prompt": data.system_prompt,
             "model": data.model,
+            "retention_days": data.retention_days,
         }
 
         agent = await self.repo.update({"agent_id": agent_id}, update_doc)
         if not agent:
             raise ResourceNotFoundError(f"Agent 不存在: {agent_id}")
 
+        if get_tokenizer(existing.model).rule != get_tokenizer(agent.model).rule:
+            await RetokenizeService().schedule(agent_id)
+
         return AgentResponse(
             agent_id=agent.agent_id,
             name=agent.name,
             system_prompt=agent.system_prompt,
             model=agent.model,
+            retention_days=agent.retention_days,
             created_at=agent.created_at,
         )
 
     async def get_agent(self, agent_id: str) -> Optional[AgentResponse]:
         """获取 Agent，返回 None 表示不存在"""
-        agent = await self.repo.find_one({"agent_id": agent_id})
+        agent = await self.repo.load("agent_id", agent_id)
         if not agent:
             return None
 
@@ -77,6 +90,7 @@ class AgentService:
             name=agent.name,
             system_prompt=agent.system_prompt,
             model=agent.model,
+            retention_days=agent.retention_days,
             created_at=agent.created_at,
         )
 
@@ -92,6 +106,7 @@ class AgentService:
                 name=a.name,
                 system_prompt=a.system_prompt,
                 model=a.model,
+                retention_days=a.retention_days,
                 created_at=a.created_at,
             )
             for a in agents
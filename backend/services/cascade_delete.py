@@ -0,0 +1,127 @@
+"""
+[INPUT]: 依赖 backend.services.job 的 JobService/job_runner，依赖 backend.repositories 的 User/Conversation/Message/SearchPosting/StatsRollup Repository，依赖 backend.core.throttle 的 Throttle，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 CascadeDeleteService 类，注册 delete_user/delete_conversation 两类后台任务
+[POS]: backend/services 的级联删除服务，被 UserService 和 ConversationService 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict
+import logging
+from .job import JobService, job_runner
+from ..repositories.base import BaseRepository
+from ..repositories.user import UserRepository
+from ..repositories.conversation import ConversationRepository
+from ..repositories.message import MessageRepository
+from ..repositories.search import SearchPostingRepository
+from ..repositories.stats import StatsRollupRepository
+from ..models.job import JobInDB
+from ..core.config import settings
+from ..core.throttle import Throttle
+
+logger = logging.getLogger(__name__)
+
+
+class CascadeDeleteService:
+    """级联删除（后台、分批、限速、可恢复）
+
+    职责：
+    - 创建删除任务并提交到后台执行
+    - 先删除主文档（接口立即不可见），再分批清理从属数据
+    - 用户任务按会话推进：先清消息、后删会话文档，中断时会话仍可被重新找到；最后清理该用户的统计汇总桶
+    - 会话任务不改动统计汇总（汇总桶跨会话累加，不按会话拆分）
+    - 每批 delete_many 之前经过 Throttle，控制写入与复制压力
+
+    幂等性：
+    - 每一批都重新查询剩余数据，中断后重跑即从断点继续
+    """
+
+    def __init__(self):
+        self.job_service = JobService()
+        self.user_repo = UserRepository()
+        self.conv_repo = ConversationRepository()
+        self.msg_repo = MessageRepository()
+        self.posting_repo = SearchPostingRepository()
+        self.rollup_repo = StatsRollupRepository()
+        self.batch_size = settings.CASCADE_DELETE_BATCH_SIZE
+        self.throttle = Throttle(settings.CASCADE_DELETE_RATE)
+
+    async def schedule_user_deletion(self, user_id: str) -> JobInDB:
+        """提交用户级联删除任务"""
+        job = await self.job_service.create_job("delete_user", user_id)
+        job_runner.submit(job)
+        return job
+
+    async def schedule_conversation_deletion(self, conv_id: str) -> JobInDB:
+        """提交会话级联删除任务"""
+        job = await self.job_service.create_job("delete_conversation", conv_id)
+        job_runner.submit(job)
+        return job
+
+    async def delete_user(self, job: JobInDB) -> None:
+        """删除用户 → 逐个会话级联删除"""
+        progress = dict(job.progress)
+        user_id = job.target_id
+
+        if await self.user_repo.delete({"user_id": user_id}):
+            progress["users"] = progress.get("users", 0) + 1
+
+        while True:
+            convs = await self.conv_repo.find_many({"user_id": user_id}, limit=100)
+            if not convs:
+                break
+            for conv in convs:
+                await self._delete_conversation_data(job, conv.conversation_id, progress)
+
+        await self._drain(job, self.rollup_repo, {"user_id": user_id}, "stats_rollups", progress)
+        await self.job_service.update_progress(job.job_id, progress)
+
+    async def delete_conversation(self, job: JobInDB) -> None:
+        """删除单个会话及其从属数据"""
+        progress = dict(job.progress)
+        if await self.conv_repo.delete({"conversation_id": job.target_id}):
+            progress["conversations"] = progress.get("conversations", 0) + 1
+
+        await self._delete_conversation_data(job, job.target_id, progress)
+        await self.job_service.update_progress(job.job_id, progress)
+
+    async def _delete_conversation_data(
+        self, job: JobInDB, conv_id: str, progress: Dict[str, int]
+    ) -> None:
+        """分批删除会话的从属数据（倒排索引、消息），最后删除会话文档"""
+        await self._drain(
+            job, self.posting_repo, {"conversation_id": conv_id}, "search_postings", progress
+        )
+        await self._drain(
+            job, self.msg_repo, {"conversation_id": conv_id}, "messages", progress
+        )
+
+        if await self.conv_repo.delete({"conversation_id": conv_id}):
+            progress["conversations"] = progress.get("conversations", 0) + 1
+
+    async def _drain(
+        self,
+        job: JobInDB,
+        repo: BaseRepository,
+        query: Dict,
+        name: str,
+        progress: Dict[str, int],
+    ) -> None:
+        """按批删除直到查询结果为空，每批后写入进度"""
+        while True:
+            await self.throttle.wait()
+            deleted = await repo.delete_batch(query, self.batch_size)
+            if not deleted:
+                return
+            progress[name] = progress.get(name, 0) + deleted
+            await self.job_service.update_progress(job.job_id, progress)
+
+
+# ==================== 任务处理器注册 ====================
+@job_runner.handler("delete_user")
+async def _run_delete_user(job: JobInDB, job_service: JobService) -> None:
+    await CascadeDeleteService().delete_user(job)
+
+
+@job_runner.handler("delete_conversation")
+async def _run_delete_conversation(job: JobInDB, job_service: JobService) -> None:
+    await CascadeDeleteService().delete_conversation(job)
@@ -0,0 +1,120 @@
+"""
+[INPUT]: 依赖 backend.services.message 的 MessageService，依赖 backend.services.llm 的 LLMService，依赖 backend.services.stats 的 StatsService（写消息时累加汇总），依赖 backend.repositories 的 Conversation/Agent Repository，依赖 backend.core.pubsub 的 pubsub/user_channel，依赖 backend.core.metrics 的 chat_turn
+[OUTPUT]: 对外提供 ChatService 类，封装一轮对话（整段 / 流式）与服务端主动推送消息
+[POS]: backend/services 的对话编排层，被 messages 路由（HTTP）与 realtime 路由（WebSocket）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, AsyncIterator, Optional, Tuple
+import logging
+from .message import MessageService
+from .llm import LLMService
+from .stats import StatsService
+from ..repositories.conversation import ConversationRepository
+from ..repositories.agent import AgentRepository
+from ..models.conversation import ConversationInDB
+from ..models.message import MessageResponse
+from ..core.pubsub import pubsub, user_channel
+from ..core.metrics import chat_turn
+from ..core.exceptions import ResourceNotFoundError
+
+logger = logging.getLogger(__name__)
+
+# 流式对话产出的事件：("message", 用户消息) / ("delta", 增量文本) / ("completed", 助手消息)
+TurnEvent = Tuple[str, Any]
+
+
+class ChatService:
+    """一轮对话的编排
+
+    数据流：
+    1. 校验会话存在，保存 user message
+    2. 调用 LLMService 生成回复（整段或流式）
+    3. 保存 assistant message（保存消息时同步刷新会话 updated_at 与消息数）
+    4. 每条消息入库后累加统计汇总桶（小时 / 天）
+    5. 把两条消息作为 message.created 事件发布到用户频道（同一用户的其他连接实时同步）
+
+    发布时传入发起连接的订阅 ID，发起方已通过本轮事件拿到结果，不再收到回声。
+    """
+
+    def __init__(self):
+        self.message_service = MessageService()
+        self.llm_service = LLMService()
+        self.stats_service = StatsService()
+        self.conv_repo = ConversationRepository()
+        self.agent_repo = AgentRepository()
+
+    async def chat(self, conv_id: str, content: str, origin: Optional[str] = None) -> MessageResponse:
+        """整段对话：返回 assistant 消息"""
+        with chat_turn("http"):
+            conversation, model = await self._load(conv_id)
+            await self._save(conversation, "user", content, model, origin)
+            assistant_content = await self.llm_service.generate_response(conv_id, content)
+            return await self._save(conversation, "assistant", assistant_content, model, origin)
+
+    async def stream_chat(
+        self,
+        conv_id: str,
+        content: str,
+        origin: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[TurnEvent]:
+        """流式对话：依次产出用户消息、增量文本、助手消息
+
+        user_id 不为空时只允许该用户的会话（WebSocket 连接按用户建立）。
+        消费方停止迭代（连接断开、取消）时生成中止，助手消息不入库，用户消息保留。
+        生成器跨越多次 yield，轮次指标（chat_turn）由消费方在迭代外层开启。
+        """
+        conversation, model = await self._load(conv_id)
+        if user_id is not None and conversation.user_id != user_id:
+            raise ResourceNotFoundError(f"会话不存在: {conv_id}")
+        yield "message", await self._save(conversation, "user", content, model, origin)
+
+        parts = []
+        async for delta in self.llm_service.stream_response(conv_id, content):
+            parts.append(delta)
+            yield "delta", delta
+
+        yield "completed", await self._save(conversation, "assistant", "".join(parts), model, origin)
+
+    async def push_message(self, conv_id: str, content: str) -> MessageResponse:
+        """服务端主动触达：以 assistant 身份写入会话并推送给该用户的所有在线连接
+
+        供兑现调度等服务端发起的场景使用，用户离线时消息照常入库，上线后从历史读取。
+        """
+        conversation, model = await self._load(conv_id)
+        message = await self._save(conversation, "assistant", content, model, origin=None)
+        logger.info("主动推送消息: conv_id=%s, message_id=%s", conv_id, message.message_id)
+        return message
+
+    async def _load(self, conv_id: str) -> Tuple[ConversationInDB, Optional[str]]:
+        conversation = await self.conv_repo.load("conversation_id", conv_id)
+        if not conversation:
+            raise ResourceNotFoundError(f"会话不存在: {conv_id}")
+        agent = await self.agent_repo.load("agent_id", conversation.agent_id)
+        return conversation, agent.model if agent else None
+
+    async def _save(
+        self,
+        conversation: ConversationInDB,
+        role: str,
+        content: str,
+        model: Optional[str],
+        origin: Optional[str],
+    ) -> MessageResponse:
+        message = await self.message_service.create_message(
+            conversation.conversation_id,
+            role,
+            content,
+            retention_days=conversation.retention_days,
+            user_id=conversation.user_id,
+            model=model,
+        )
+        await self.stats_service.record_message(conversation.user_id, conversation.agent_id, model, message)
+        await pubsub.publish(
+            user_channel(conversation.user_id),
+            {"type": "message.created", "message": message.model_dump(mode="json")},
+            origin=origin,
+        )
+        return message
+
@@ -1,15 +1,16 @@
 """
-[INPUT]: 依赖 openai 的 AsyncOpenAI，依赖 backend.core.config 的 settings
+[INPUT]: 依赖 backend.core.llm_client 的 get_openai_client，依赖 backend.core.config 的 settings，依赖 backend.core.tracing 的 span（摘要调用区间）
 [OUTPUT]: 对外提供 ContextCompressionService 类，封装上下文压缩逻辑
-[POS]: backend/services 的上下文压缩服务，被 LLMService 消费
+[POS]: backend/services 的上下文压缩服务，被 LLMService 和 RetentionService 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
 from typing import List, Dict, Any
 import logging
-from openai import AsyncOpenAI
 from ..core.config import settings
+from ..core.llm_client import get_openai_client
 from ..core.exceptions import LLMError
+from ..core.tracing import KIND_CLIENT, span
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +30,7 @@ class ContextCompressionService:
     """
 
     def __init__(self):
-        # 初始化 OpenAI 客户端
-        openai_params = {"api_key": settings.OPENAI_API_KEY}
-        if settings.OPENAI_BASE_URL:
-            openai_params["base_url"] = settings.OPENAI_BASE_URL
-
-        self.openai_client = AsyncOpenAI(**openai_params)
+        self.openai_client = get_openai_client()
         self.compression_model = "gpt-4o-mini"  # 使用快速模型进行压缩
 
     async def compress_messages(
@@ -52,6 +48,19 @@ class ContextCompressionService:
         if not messages:
             return ""
 
+        try:
+            return await self.summarize(messages)
+        except LLMError as e:
+            logger.error("上下文压缩失败: %s", e)
+            # 压缩失败时返回简单的消息计数摘要
+            return f"[对话摘要: 共 {len(messages)} 条消息，包含用户和助手的多轮对话]"
+
+    async def summarize(self, messages: List[Dict[str, Any]]) -> str:
+        """调用 LLM 生成摘要，失败时抛出 LLMError
+
+        与 compress_messages 不同，不做降级：
+        保留策略折叠过期消息时，摘要失败必须放弃本轮而不是写入占位文本。
+        """
         # 构建压缩提示词
         conversation_text = self._format_messages_for_compression(messages)
 
@@ -70,27 +79,26 @@ class ContextCompressionService:
 请输出压缩摘要："""
 
         try:
-            logger.info(f"开始压缩上下文: 原始消息数={len(messages)}")
-
-            response = await self.openai_client.chat.completions.create(
-                model=self.compression_model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的对话摘要助手，擅长提取关键信息。"},
-                    {"role": "user", "content": compression_prompt}
-                ],
-                temperature=0.3,  # 较低温度，保证摘要稳定
-                max_tokens=500,
-            )
+            logger.info("开始压缩上下文: 原始消息数=%s", len(messages))
+
+            with span("openai.chat.completions", KIND_CLIENT, {"gen_ai.request.model": self.compression_model}):
+                response = await self.openai_client.chat.completions.create(
+                    model=self.compression_model,
+                    messages=[
+                        {"role": "system", "content": "你是一个专业的对话摘要助手，擅长提取关键信息。"},
+                        {"role": "user", "content": compression_prompt}
+                    ],
+                    temperature=0.3,  # 较低温度，保证摘要稳定
+                    max_tokens=500,
+                )
 
             summary = response.choices[0].message.content.strip()
-            logger.info(f"上下文压缩完成: 摘要长度={len(summary)}")
+            logger.info("上下文压缩完成: 摘要长度=%s", len(summary))
 
             return summary
 
         except Exception as e:
-            logger.error(f"上下文压缩失败: {e}")
-            # 压缩失败时返回简单的消息计数摘要
-            return f"[对话摘要: 共 {len(messages)} 条消息，包含用户和助手的多轮对话]"
+            raise LLMError(f"摘要生成失败: {e}")
 
     def _format_messages_for_compression(self, messages: List[Dict[str, Any]]) -> str:
         """格式化消息列表为文本，用于压缩"""
@@ -1,45 +1,57 @@
 """
-[INPUT]: 依赖 backend.repositories.conversation 的 ConversationRepository，依赖 backend.repositories.user 的 UserRepository，依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.models.conversation 的 ConversationCreate/ConversationResponse
+[INPUT]: 依赖 backend.repositories.conversation 的 ConversationRepository，依赖 backend.services.cascade_delete 的 CascadeDeleteService，依赖 backend.repositories.user 的 UserRepository，依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.services.lineage 的 LineageResolver，依赖 backend.models.conversation 的 ConversationCreate/ConversationFork/ConversationResponse/ConversationInDB，依赖 backend.core.responses 的 make_etag，依赖 backend.storage.routing 的 reads_from（历史读路由到从节点）
 [OUTPUT]: 对外提供 ConversationService 类，封装会话业务逻辑
 [POS]: backend/services 的会话业务逻辑层，被 Router 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from typing import Optional, List
+from typing import Any, Optional, List, Tuple
+import asyncio
 from datetime import datetime
 import uuid
 from ..repositories.conversation import ConversationRepository
 from ..repositories.user import UserRepository
 from ..repositories.agent import AgentRepository
-from ..models.conversation import ConversationCreate, ConversationResponse
-from ..core.exceptions import ResourceNotFoundError
+from ..repositories.message import MessageRepository
+from ..models.conversation import ConversationCreate, ConversationFork, ConversationResponse, ConversationInDB
+from ..models.job import JobInDB
+from .cascade_delete import CascadeDeleteService
+from .lineage import LineageResolver, Segment, forget
+from ..core.config import settings
+from ..core.responses import make_etag
+from ..core.exceptions import ResourceNotFoundError, InvalidOperationError
+from ..storage.routing import reads_from
 
 
 class ConversationService:
     """会话生命周期管理
 
     职责：
-    - 创建会话，校验 user 和 agent 存在性
-    - 查询会话
-    - 删除会话（未来可扩展为级联删除消息）
+    - 创建会话，校验 user 和 agent 存在性，快照消息保留策略
+    - 查询会话，计算对话历史的 ETag（条件请求）与代次（增量同步）
+    - 分支会话（写时复制：只记录父会话与分叉点，不复制消息）
+    - 删除会话（后台级联删除消息）
     """
 
     def __init__(self):
         self.conv_repo = ConversationRepository()
         self.user_repo = UserRepository()
         self.agent_repo = AgentRepository()
+        self.msg_repo = MessageRepository()
+        self.lineage = LineageResolver()
+        self.cascade = CascadeDeleteService()
 
     async def create_conversation(
         self, data: ConversationCreate
     ) -> ConversationResponse:
         """创建会话"""
-        # 校验用户存在
-        user = await self.user_repo.find_one({"user_id": data.user_id})
+        # 校验用户与 Agent 存在（并发发起，与同一时刻其他请求的同类查询合并）
+        user, agent = await asyncio.gather(
+            self.user_repo.load("user_id", data.user_id),
+            self.agent_repo.load("agent_id", data.agent_id),
+        )
         if not user:
             raise ResourceNotFoundError(f"用户不存在: {data.user_id}")
-
-        # 校验 Agent 存在
-        agent = await self.agent_repo.find_one({"agent_id": data.agent_id})
         if not agent:
             raise ResourceNotFoundError(f"Agent 不存在: {data.agent_id}")
 
@@ -50,9 +62,71 @@ class ConversationService:
             "user_id": data.user_id,
             "agent_id": data.agent_id,
             "title": data.title,
+            "retention_days": self._resolve_retention(
+                user.retention_days, agent.retention_days
+            ),
+            "message_count": 0,
+            "revision": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+        conv_in_db = await self.conv_repo.create(conv_doc)
+
+        return ConversationResponse(
+            conversation_id=conv_in_db.conversation_id,
+            user_id=conv_in_db.user_id,
+            agent_id=conv_in_db.agent_id,
+            title=conv_in_db.title,
+            retention_days=conv_in_db.retention_days,
+            parent_conversation_id=conv_in_db.parent_conversation_id,
+            fork_point=conv_in_db.fork_point,
+            created_at=conv_in_db.created_at,
+            updated_at=conv_in_db.updated_at,
+        )
+
+    async def fork_conversation(
+        self, conv_id: str, data: ConversationFork
+    ) -> ConversationResponse:
+        """从父会话分支出新会话
+
+        - message_id 为空：从父会话当前末尾分叉
+        - message_id 不为空：分叉点为该消息（含），之后的消息不进入新分支
+        新会话只写入一条文档，代价与父会话长度无关；历史由 LineageResolver 按需拼接。
+        """
+        parent = await self.conv_repo.find_one({"conversation_id": conv_id})
+        if not parent:
+            raise ResourceNotFoundError(f"会话不存在: {conv_id}")
+
+        now = datetime.utcnow()
+        fork_point = now
+        if data.message_id:
+            message = await self.msg_repo.find_one({"message_id": data.message_id})
+            bounds = dict(await self.lineage.resolve(conv_id))
+            if not message or message.conversation_id not in bounds:
+                raise ResourceNotFoundError(f"消息不在该会话历史中: {data.message_id}")
+            bound = bounds[message.conversation_id]
+            if bound is not None and message.created_at > bound:
+                raise ResourceNotFoundError(f"消息不在该会话历史中: {data.message_id}")
+            fork_point = message.created_at
+
+        conv_doc = {
+            "conversation_id": str(uuid.uuid4()),
+            "user_id": parent.user_id,
+            "agent_id": parent.agent_id,
+            "title": data.title or parent.title,
+            "retention_days": parent.retention_days,
+            "parent_conversation_id": parent.conversation_id,
+            "fork_point": fork_point,
+            "message_count": 0,
+            "revision": 0,
             "created_at": now,
             "updated_at": now,
         }
+        # 父会话的折叠摘要只覆盖分叉点之前的消息时才能继承
+        if parent.summary and parent.summary_until and parent.summary_until <= fork_point:
+            conv_doc["summary"] = parent.summary
+            conv_doc["summary_until"] = parent.summary_until
 
         conv_in_db = await self.conv_repo.create(conv_doc)
 
@@ -61,13 +135,24 @@ class ConversationService:
             user_id=conv_in_db.user_id,
             agent_id=conv_in_db.agent_id,
             title=conv_in_db.title,
+            retention_days=conv_in_db.retention_days,
+            parent_conversation_id=conv_in_db.parent_conversation_id,
+            fork_point=conv_in_db.fork_point,
             created_at=conv_in_db.created_at,
             updated_at=conv_in_db.updated_at,
         )
 
+    @staticmethod
+    def _resolve_retention(
+        user_days: Optional[int], agent_days: Optional[int]
+    ) -> Optional[int]:
+        """决定会话的消息保留天数：用户与 Agent 取更严格者，均未配置时用全局默认"""
+        configured = [d for d in (user_days, agent_days) if d]
+        return min(configured) if configured else settings.MESSAGE_RETENTION_DAYS
+
     async def get_conversation(self, conv_id: str) -> Optional[ConversationResponse]:
         """获取会话，返回 None 表示不存在"""
-        conv = await self.conv_repo.find_one({"conversation_id": conv_id})
+        conv = await self.conv_repo.load("conversation_id", conv_id)
         if not conv:
             return None
 
@@ -76,10 +161,14 @@ class ConversationService:
             user_id=conv.user_id,
             agent_id=conv.agent_id,
             title=conv.title,
+            retention_days=conv.retention_days,
+            parent_conversation_id=conv.parent_conversation_id,
+            fork_point=conv.fork_point,
             created_at=conv.created_at,
             updated_at=conv.updated_at,
         )
 
+    @reads_from("history")
     async def list_user_conversations(
         self, user_id: str, limit: int = 100, skip: int = 0
     ) -> List[ConversationResponse]:
@@ -94,21 +183,71 @@ class ConversationService:
                 user_id=c.user_id,
                 agent_id=c.agent_id,
                 title=c.title,
+                retention_days=c.retention_days,
+                parent_conversation_id=c.parent_conversation_id,
+                fork_point=c.fork_point,
                 created_at=c.created_at,
                 updated_at=c.updated_at,
             )
             for c in convs
         ]
 
-    async def update_conversation_timestamp(self, conv_id: str) -> None:
-        """更新会话的最后更新时间（在新消息时调用）"""
-        await self.conv_repo.update(
-            {"conversation_id": conv_id}, {"updated_at": datetime.utcnow()}
+    async def history_etag(self, conv_id: str, *variant: Any) -> Optional[str]:
+        """对话历史的 ETag，返回 None 表示会话不存在
+
+        由祖先链上每个会话的 (updated_at, message_count, revision, summary_until) 派生，
+        只读会话文档（请求内合并、祖先链进程内缓存），不查询消息：
+        - 新消息：updated_at 与 message_count 变化
+        - 过期折叠：summary_until 与 message_count 变化
+        - 重新计算 token：revision 变化
+        variant 为同一会话的不同表示（分页参数等）。TTL 索引兜底删除的消息不更新计数，
+        仅在折叠任务长期未运行时出现，宽限期见 RETENTION_TTL_GRACE_DAYS。
+        """
+        lineage = await self._load_lineage(conv_id)
+        if lineage is None:
+            return None
+        parts: List[Any] = list(variant)
+        for (cid, until), conv in lineage:
+            if conv:
+                parts += [cid, until, conv.updated_at, conv.message_count, conv.revision, conv.summary_until]
+        return make_etag(*parts)
+
+    async def history_generation(self, conv_id: str) -> Optional[str]:
+        """对话历史的代次，返回 None 表示会话不存在
+
+        只在已有历史被改写时变化（过期折叠 summary_until、重新计算 token revision），
+        追加新消息不变：客户端按 since 游标增量同步时，代次变化说明本地副本需要整体重建。
+        """
+        lineage = await self._load_lineage(conv_id)
+        if lineage is None:
+            return None
+        parts: List[Any] = []
+        for (cid, until), conv in lineage:
+            if conv:
+                parts += [cid, until, conv.revision, conv.summary_until]
+        return make_etag(*parts)
+
+    async def _load_lineage(
+        self, conv_id: str
+    ) -> Optional[List[Tuple[Segment, Optional[ConversationInDB]]]]:
+        """祖先链各片段与对应的会话文档（请求内合并），会话不存在时返回 None"""
+        segments = await self.lineage.resolve(conv_id)
+        convs = await asyncio.gather(
+            *(self.conv_repo.load("conversation_id", cid) for cid, _ in segments)
         )
+        if not convs[0]:
+            return None
+        return list(zip(segments, convs))
+
+    async def delete_conversation(self, conv_id: str) -> JobInDB:
+        """删除会话，返回后台级联删除任务
 
-    async def delete_conversation(self, conv_id: str) -> bool:
-        """删除会话"""
-        result = await self.conv_repo.delete({"conversation_id": conv_id})
-        if not result:
+        仍有分支引用的会话不能单独删除（分支的历史依赖其消息）。
+        """
+        conv = await self.conv_repo.find_one({"conversation_id": conv_id})
+        if not conv:
             raise ResourceNotFoundError(f"会话不存在: {conv_id}")
-        return True
+        if await self.conv_repo.count({"parent_conversation_id": conv_id}, limit=1):
+            raise InvalidOperationError(f"会话存在分支，请先删除分支: {conv_id}")
+        forget(conv_id)
+        return await self.cascade.schedule_conversation_deletion(conv_id)
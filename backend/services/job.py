@@ -0,0 +1,293 @@
+"""
+[INPUT]: 依赖 backend.repositories.job 的 JobRepository，依赖 backend.models.job 的 JobInDB/JobResponse，依赖 asyncio 的任务调度，依赖 contextvars（任务在空上下文中运行），依赖 backend.core.config 的 settings（租约时长）
+[OUTPUT]: 对外提供 JobService 类（任务状态持久化与租约接管）与 JobRunner 类及全局 job_runner 实例（后台执行、恢复与周期调度）
+[POS]: backend/services 的后台任务框架，被级联删除等长耗时业务消费，被 main.py 的 lifespan 启停
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import uuid
+from ..core.config import settings
+from ..core.exceptions import DuplicateKeyError
+from ..repositories.job import JobRepository
+from ..models.job import JobInDB, JobResponse
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[JobInDB, "JobService"], Awaitable[None]]
+
+
+class JobService:
+    """后台任务状态管理
+
+    职责：
+    - 创建任务记录
+    - 记录进度、完成、失败
+    - 查询任务状态
+    """
+
+    def __init__(self):
+        self.repo = JobRepository()
+
+    async def create_job(
+        self,
+        job_type: str,
+        target_id: str,
+        params: Optional[Dict[str, Any]] = None,
+        singleton: bool = False,
+    ) -> JobInDB:
+        """创建任务记录（状态为 pending）
+
+        singleton 为 True 时同类型至多一个未结束任务（jobs.singleton 唯一索引），
+        已有未结束任务时抛出 DuplicateKeyError。
+        """
+        now = datetime.utcnow()
+        job_doc = {
+            "job_id": str(uuid.uuid4()),
+            "job_type": job_type,
+            "target_id": target_id,
+            "status": "pending",
+            "params": params or {},
+            "progress": {},
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "owner": None,
+            "lease_until": None,
+        }
+        if singleton:
+            job_doc["singleton"] = job_type
+        return await self.repo.create(job_doc)
+
+    async def get_job(self, job_id: str) -> Optional[JobResponse]:
+        """获取任务，返回 None 表示不存在"""
+        job = await self.repo.find_one({"job_id": job_id})
+        if not job:
+            return None
+
+        return JobResponse(
+            job_id=job.job_id,
+            job_type=job.job_type,
+            target_id=job.target_id,
+            status=job.status,
+            progress=job.progress,
+            error=job.error,
+            created_at=job.created_at,
+            updated_at=job.updated_at,
+            finished_at=job.finished_at,
+        )
+
+    async def list_claimable_jobs(self) -> List[JobInDB]:
+        """列出可接管的任务：pending，或 running 但租约已过期（执行进程已退出）"""
+        now = datetime.utcnow()
+        jobs = await self.repo.find_many(
+            {"status": {"$in": ["pending", "running"]}},
+            limit=1000,
+            sort=[("created_at", 1)],
+        )
+        return [
+            job
+            for job in jobs
+            if job.status == "pending" or job.lease_until is None or job.lease_until < now
+        ]
+
+    async def claim(self, job_id: str, owner: str) -> Optional[JobInDB]:
+        """原子接管任务：pending 或租约过期的 running → running(owner, lease_until)
+
+        每个条件都是一次条件更新，多个进程同时接管同一任务时只有一个成功；
+        返回 None 表示任务已被其他进程持有或已结束。
+        """
+        now = datetime.utcnow()
+        fields = {
+            "status": "running",
+            "owner": owner,
+            "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }
+        for condition in (
+            {"status": "pending"},
+            {"status": "running", "lease_until": {"$lt": now}},
+            {"status": "running", "lease_until": None},  # 早于租约机制创建的任务
+        ):
+            job = await self.repo.update({"job_id": job_id, **condition}, fields)
+            if job:
+                return job
+        return None
+
+    async def renew_lease(self, job_id: str, owner: str) -> bool:
+        """续约，返回 False 表示租约已被其他进程接管"""
+        now = datetime.utcnow()
+        job = await self.repo.update(
+            {"job_id": job_id, "status": "running", "owner": owner},
+            {"lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS), "updated_at": now},
+        )
+        return job is not None
+
+    async def release(self, job_id: str, owner: str) -> None:
+        """进程关闭时让出租约（状态保持 running），下次启动或其他进程可立即接管"""
+        await self.repo.update(
+            {"job_id": job_id, "status": "running", "owner": owner},
+            {"lease_until": datetime.utcnow()},
+        )
+
+    async def update_progress(self, job_id: str, progress: Dict[str, int]) -> None:
+        """写入当前进度（整体覆盖）"""
+        await self.repo.update(
+            {"job_id": job_id},
+            {"progress": progress, "updated_at": datetime.utcnow()},
+        )
+
+    async def mark_completed(self, job_id: str, owner: Optional[str] = None) -> None:
+        """标记任务完成（给出 owner 时只在仍持有租约时写入）"""
+        await self._finish(job_id, owner, {"status": "completed"})
+
+    async def mark_failed(self, job_id: str, error: str, owner: Optional[str] = None) -> None:
+        """标记任务失败（给出 owner 时只在仍持有租约时写入）"""
+        await self._finish(job_id, owner, {"status": "failed", "error": error})
+
+    async def _finish(self, job_id: str, owner: Optional[str], fields: Dict[str, Any]) -> None:
+        # singleton 改为 job_id 以释放同类型的唯一键，下一轮周期任务才能创建
+        now = datetime.utcnow()
+        query: Dict[str, Any] = {"job_id": job_id}
+        if owner is not None:
+            query["owner"] = owner
+        await self.repo.update(
+            query,
+            {**fields, "updated_at": now, "finished_at": now, "lease_until": None, "singleton": job_id},
+        )
+
+
+class JobRunner:
+    """进程内后台任务执行器
+
+    设计哲学：
+    - 任务状态持久化在 jobs 集合，进程只负责执行
+    - 处理器必须幂等：中断后从头重跑即可继续（已删除的数据不会再被查到）
+    - 执行前以条件更新原子接管（owner + lease_until），执行中定期续约；多进程部署下同一任务只有一个执行者
+    - resume() 只接管 pending 与租约过期的任务，之后定期巡检，接管已退出进程遗留的任务
+    - schedule_periodic() 提供周期调度，同类型未结束任务由 jobs.singleton 唯一索引去重
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def handler(self, job_type: str) -> Callable[[JobHandler], JobHandler]:
+        """注册任务处理器（装饰器）"""
+
+        def decorator(func: JobHandler) -> JobHandler:
+            self._handlers[job_type] = func
+            return func
+
+        return decorator
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        # 在空的 contextvars 上下文中创建任务：请求中提交的任务不继承请求的日志上下文
+        # （路由、采样）、trace/span、请求作用域备忘表与读路由，任务日志与 span 不归属到该请求
+        task = contextvars.Context().run(asyncio.create_task, coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def submit(self, job: JobInDB) -> None:
+        """提交任务到后台执行（不等待结果）"""
+        self._spawn(self._run(job))
+
+    def schedule_periodic(self, job_type: str, target_id: str, interval: float) -> None:
+        """周期性创建并提交任务；同类型任务未结束时跳过本轮"""
+        self._spawn(self._periodic(job_type, target_id, interval))
+
+    async def _periodic(self, job_type: str, target_id: str, interval: float) -> None:
+        """周期调度循环（随 shutdown 取消）"""
+        service = JobService()
+        while True:
+            try:
+                self.submit(await service.create_job(job_type, target_id, singleton=True))
+            except DuplicateKeyError:
+                pass  # 本进程或其他进程的同类型任务尚未结束
+            except Exception as e:
+                logger.error("周期任务调度失败: type=%s, error=%s", job_type, e)
+            await asyncio.sleep(interval)
+
+    async def resume(self) -> None:
+        """接管 pending 与租约过期的任务，并启动定期巡检"""
+        await self._reclaim()
+        self._spawn(self._watch())
+
+    async def _reclaim(self) -> None:
+        jobs = await JobService().list_claimable_jobs()
+        for job in jobs:
+            self.submit(job)
+        if jobs:
+            logger.info("已恢复后台任务: count=%s", len(jobs))
+
+    async def _watch(self) -> None:
+        """巡检循环：其他进程退出后遗留的 running 任务在租约过期后被接管"""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS)
+            try:
+                await self._reclaim()
+            except Exception as e:
+                logger.error("后台任务巡检失败: error=%s", e)
+
+    async def shutdown(self) -> None:
+        """取消执行中的任务（状态保持 running 并让出租约，下次启动时恢复）"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _renew(self, job_id: str, service: JobService, task: asyncio.Task) -> None:
+        """续约循环；租约被接管时取消本进程的执行"""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                renewed = await service.renew_lease(job_id, self.owner)
+            except Exception as e:
+                logger.warning("后台任务续约失败: job_id=%s, error=%s", job_id, e)
+                continue
+            if not renewed:
+                logger.warning("后台任务租约已被接管，停止执行: job_id=%s", job_id)
+                task.cancel()
+                return
+
+    async def _run(self, job: JobInDB) -> None:
+        """接管并执行单个任务，记录结果"""
+        service = JobService()
+        claimed = await service.claim(job.job_id, self.owner)
+        if not claimed:
+            return  # 已被其他进程接管或已结束
+        job = claimed
+        handler = self._handlers.get(job.job_type)
+        if not handler:
+            await service.mark_failed(job.job_id, f"未知任务类型: {job.job_type}", owner=self.owner)
+            return
+
+        logger.info("后台任务开始: job_id=%s, type=%s", job.job_id, job.job_type)
+        renewal = asyncio.create_task(self._renew(job.job_id, service, asyncio.current_task()))
+        try:
+            await handler(job, service)
+        except asyncio.CancelledError:
+            if not renewal.done():
+                logger.info("后台任务中断，将在下次启动时恢复: job_id=%s", job.job_id)
+                await asyncio.shield(service.release(job.job_id, self.owner))
+            raise
+        except Exception as e:
+            logger.exception("后台任务失败: job_id=%s", job.job_id, exc_info=e)
+            await service.mark_failed(job.job_id, str(e), owner=self.owner)
+            return
+        finally:
+            renewal.cancel()
+
+        await service.mark_completed(job.job_id, owner=self.owner)
+        logger.info("后台任务完成: job_id=%s, type=%s", job.job_id, job.job_type)
+
+
+# 全局任务执行器
+job_runner = JobRunner()
@@ -0,0 +1,76 @@
+"""
+[INPUT]: 依赖 backend.repositories.conversation 的 ConversationRepository，依赖 backend.core.config 的 settings，依赖 backend.core.metrics 的 cache_counters（祖先链缓存命中率）
+[OUTPUT]: 对外提供 Segment 类型、LineageResolver 类（解析并缓存会话祖先链）、forget 函数（删除会话时清理缓存）
+[POS]: backend/services 的会话分支解析器，被 MessageService（历史读取）和 ConversationService（分支校验）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+from ..repositories.conversation import ConversationRepository
+from ..core.config import settings
+from ..core.metrics import cache_counters
+
+# (conversation_id, 截止时间)：该会话中 created_at <= 截止时间的消息属于历史，None 表示不截止
+Segment = Tuple[str, Optional[datetime]]
+
+# 祖先链一旦创建就不会变化（parent/fork_point 只在创建时写入），可以进程内永久缓存
+_cache: "OrderedDict[str, Tuple[Segment, ...]]" = OrderedDict()
+_CACHE_HIT, _CACHE_MISS = cache_counters("lineage")
+
+
+class LineageResolver:
+    """会话祖先链解析
+
+    分支会话只记录 (parent_conversation_id, fork_point)，不复制消息。
+    历史 = 自身消息 + 父会话 fork_point 之前的消息 + 祖父会话……
+
+    祖先链按需解析：未命中缓存时只查询本会话，父会话的链递归复用缓存，
+    新分支的解析代价与父会话长度、深度无关。
+    """
+
+    def __init__(self):
+        self.conv_repo = ConversationRepository()
+
+    async def resolve(self, conv_id: str) -> Tuple[Segment, ...]:
+        """返回由近及远的历史片段：[(自身, None), (父, fork_point), ...]"""
+        cached = _cache.get(conv_id)
+        if cached is not None:
+            _CACHE_HIT.inc()
+            _cache.move_to_end(conv_id)
+            return cached
+        _CACHE_MISS.inc()
+
+        conv = await self.conv_repo.load("conversation_id", conv_id)
+        if not conv:
+            return ((conv_id, None),)
+
+        segments: Tuple[Segment, ...] = ((conv_id, None),)
+        if conv.parent_conversation_id:
+            parent_chain = await self.resolve(conv.parent_conversation_id)
+            segments += tuple(
+                (cid, _earliest(bound, conv.fork_point)) for cid, bound in parent_chain
+            )
+
+        _remember(conv_id, segments)
+        return segments
+
+
+def _earliest(a: Optional[datetime], b: Optional[datetime]) -> Optional[datetime]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _remember(conv_id: str, segments: Tuple[Segment, ...]) -> None:
+    _cache[conv_id] = segments
+    while len(_cache) > settings.LINEAGE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def forget(conv_id: str) -> None:
+    """会话被删除时移除缓存（conversation_id 不会复用，仅为及时释放内存）"""
+    _cache.pop(conv_id, None)
@@ -1,23 +1,52 @@
 """
-[INPUT]: 依赖 backend.services.message 的 MessageService，依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.repositories.conversation 的 ConversationRepository，依赖 openai 的 AsyncOpenAI，依赖 backend.core.config 的 settings
-[OUTPUT]: 对外提供 LLMService 类，封装 LLM 调用与上下文管理逻辑
-[POS]: backend/services 的 LLM 核心逻辑层，被 Router 的 /chat 接口消费
+[INPUT]: 依赖 backend.services.message 的 MessageService，依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.repositories.conversation 的 ConversationRepository，依赖 backend.core.llm_client 的 get_openai_client，依赖 backend.core.tokenizer 的 get_tokenizer/trim_to_budget，依赖 backend.core.executor 的 offload，依赖 backend.core.stages 的 stage（history_load/compression/trim/llm_wait 分阶段计时），依赖 backend.core.metrics 的 LLM/压缩指标，依赖 backend.core.tracing 的 span/open_span（OpenAI、压缩、裁剪区间），依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 LLMService 类，封装 LLM 调用（整段 / 流式）与上下文管理逻辑
+[POS]: backend/services 的 LLM 核心逻辑层，被 ChatService 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import logging
-from openai import AsyncOpenAI
+import time
 from .message import MessageService
 from .context_compression import ContextCompressionService
 from ..repositories.agent import AgentRepository
 from ..repositories.conversation import ConversationRepository
+from ..models.agent import AgentInDB
 from ..core.config import settings
+from ..core.llm_client import get_openai_client
+from ..core.tokenizer import Tokenizer, get_tokenizer, trim_to_budget
+from ..core.executor import offload
+from ..core.stages import stage
+from ..core.metrics import COMPRESSION_SECONDS, llm_duration, llm_ttft, token_counters
+from ..core.tracing import KIND_CLIENT, Span, open_span, span
 from ..core.exceptions import ResourceNotFoundError, LLMError, OpenAIAPIError
 
 logger = logging.getLogger(__name__)
 
 
+def _count_usage(agent_id: str, usage: Any) -> None:
+    """供应商返回 usage 时计入该 Agent 的 token 计数（部分兼容接口不返回）"""
+    if usage is None:
+        return
+    prompt, completion = token_counters(agent_id)
+    prompt.inc(usage.prompt_tokens or 0)
+    completion.inc(usage.completion_tokens or 0)
+
+
+def _annotate_usage(llm_span: Optional[Span], usage: Any) -> None:
+    if llm_span is not None and usage is not None:
+        llm_span.attributes["gen_ai.usage.input_tokens"] = usage.prompt_tokens
+        llm_span.attributes["gen_ai.usage.output_tokens"] = usage.completion_tokens
+
+
+def _end_span(llm_span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    if llm_span is not None:
+        if error is not None:
+            llm_span.error = repr(error)
+        llm_span.end()
+
+
 class LLMService:
     """LLM 调用与上下文编排
 
@@ -28,7 +57,7 @@ class LLMService:
     2. 构建上下文：[system_prompt] + history + [user_message]
     3. 裁剪上下文（滑动窗口策略，保留 system + 最新 user）
     4. 调用 OpenAI API
-    5. 返回 assistant 回复
+    5. 返回 assistant 回复（整段或逐段增量）
 
     设计哲学：
     - 上下文是计算结果，而非存储状态
@@ -41,17 +70,95 @@ class LLMService:
         self.compression_service = ContextCompressionService()
         self.agent_repo = AgentRepository()
         self.conv_repo = ConversationRepository()
-
-        # 初始化 OpenAI 客户端
-        openai_params = {"api_key": settings.OPENAI_API_KEY}
-        if settings.OPENAI_BASE_URL:
-            openai_params["base_url"] = settings.OPENAI_BASE_URL
-
-        self.openai_client = AsyncOpenAI(**openai_params)
+        self.openai_client = get_openai_client()
         self.max_context_tokens = settings.MAX_CONTEXT_TOKENS
 
     async def generate_response(self, conv_id: str, user_message: str) -> str:
-        """核心方法：生成 LLM 回复
+        """核心方法：生成 LLM 回复（整段返回）"""
+        agent, messages = await self._prepare(conv_id, user_message)
+        model = agent.model
+        try:
+            logger.info("调用 OpenAI: model=%s, messages_count=%d", model, len(messages))
+            start = time.perf_counter()
+            with stage("llm_wait"), span("openai.chat.completions", KIND_CLIENT, {"gen_ai.request.model": model}) as llm_span:
+                response = await self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1024,
+                )
+                _annotate_usage(llm_span, response.usage)
+            llm_duration(model).observe(time.perf_counter() - start)
+            _count_usage(agent.agent_id, response.usage)
+            assistant_content = response.choices[0].message.content
+            logger.info("OpenAI 响应成功: length=%d", len(assistant_content))
+            return assistant_content
+
+        except Exception as e:
+            logger.error("OpenAI 调用失败: %s", e)
+            raise OpenAIAPIError(f"OpenAI 调用失败: {e}")
+
+    async def stream_response(self, conv_id: str, user_message: str) -> AsyncIterator[str]:
+        """生成 LLM 回复（流式），逐段产出增量文本
+
+        消费方处理慢时不再读取上游流，由 TCP 流控反压到 OpenAI 连接。
+        请求末尾的 usage 块（stream_options.include_usage）计入 token 指标。
+        """
+        agent, messages = await self._prepare(conv_id, user_message)
+        model = agent.model
+        logger.info("调用 OpenAI（流式）: model=%s, messages_count=%d", model, len(messages))
+        start = time.perf_counter()
+        # 流式区间跨越 yield，不设为当前 span
+        llm_span = open_span("openai.chat.completions", KIND_CLIENT, {"gen_ai.request.model": model, "stream": True})
+        try:
+            with stage("llm_wait"):
+                stream = await self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1024,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+        except Exception as e:
+            logger.error("OpenAI 调用失败: %s", e)
+            _end_span(llm_span, e)
+            raise OpenAIAPIError(f"OpenAI 调用失败: {e}")
+
+        length = 0
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                # 只计等待上游的时间，消费方处理增量的时间不计入
+                with stage("llm_wait"):
+                    try:
+                        chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        break
+                if chunk.usage is not None:
+                    _count_usage(agent.agent_id, chunk.usage)
+                    _annotate_usage(llm_span, chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not length:
+                        ttft = time.perf_counter() - start
+                        llm_ttft(model).observe(ttft)
+                        if llm_span is not None:
+                            llm_span.attributes["time_to_first_token_ms"] = round(ttft * 1000, 3)
+                    length += len(delta)
+                    yield delta
+        except Exception as e:
+            logger.error("OpenAI 流式响应中断: %s", e)
+            _end_span(llm_span, e)
+            raise OpenAIAPIError(f"OpenAI 流式响应中断: {e}")
+        finally:
+            _end_span(llm_span)
+            await stream.close()
+        llm_duration(model).observe(time.perf_counter() - start)
+        logger.info("OpenAI 流式响应完成: length=%d", length)
+
+    async def _prepare(self, conv_id: str, user_message: str) -> Tuple[AgentInDB, List[Dict[str, str]]]:
+        """构建本轮调用的 Agent 与上下文
 
         流程：
         1. 获取 conversation → agent_id
@@ -60,30 +167,51 @@ class LLMService:
         4. 检查是否需要压缩上下文
         5. 构建上下文 = [system] + (compressed_summary or history) + [user]
         6. 裁剪上下文（保留 system + 最新 user，删除中间历史）
-        7. 调用 OpenAI API
-        8. 返回 assistant 内容
         """
-        # 1. 获取会话信息
-        conversation = await self.conv_repo.find_one({"conversation_id": conv_id})
+        # 1. 获取会话信息（路由已查询过，同一请求内命中备忘）
+        conversation = await self.conv_repo.load("conversation_id", conv_id)
         if not conversation:
             raise ResourceNotFoundError(f"会话不存在: {conv_id}")
 
         # 2. 获取 Agent 配置
-        agent = await self.agent_repo.find_one({"agent_id": conversation.agent_id})
+        agent = await self.agent_repo.load("agent_id", conversation.agent_id)
         if not agent:
             raise ResourceNotFoundError(f"Agent 不存在: {conversation.agent_id}")
 
-        # 3. 加载历史消息（不包括当前 user_message）
-        history = await self.message_service.get_conversation_messages(
-            conv_id, limit=50
-        )
-
-        # 4. 检查是否需要压缩上下文
-        history_messages = [{"role": msg.role, "content": msg.content} for msg in history]
+        # 3. 加载最近的历史消息（分支会话沿祖先链读取；路由已先写入当前 user_message，这里剔除）
+        with stage("history_load"):
+            history = await self.message_service.get_context_messages(conv_id, limit=50)
+
+        # 入库时已按同一规则（编码 + 每条消息开销）计数的消息，裁剪时直接复用 token_count（按正文对应，同正文计数必然相同）；
+        # 在剔除当前 user_message 之前收集：它刚由 create_message 计过数，通常也是最长的一条
+        tokenizer = get_tokenizer(agent.model)
+        stored_counts = {
+            msg["content"]: msg["token_count"]
+            for msg in history
+            if msg.get("token_rule") == tokenizer.rule and msg.get("token_count") is not None
+        }
+        if history and history[-1]["role"] == "user" and history[-1]["content"] == user_message:
+            history = history[:-1]
+
+        # 4. 检查是否需要压缩上下文（保留策略折叠出的摘要置于历史最前）
+        history_messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
+        if conversation.summary:
+            history_messages.insert(
+                0,
+                {
+                    "role": "system",
+                    "content": f"[历史对话摘要]\n{conversation.summary}\n[以下是最近的对话]",
+                },
+            )
 
         if self.compression_service.should_compress(len(history_messages)):
-            logger.info(f"触发上下文压缩: 当前消息数={len(history_messages)}, 阈值={settings.COMPRESSION_THRESHOLD}")
-            history_messages = await self._compress_context(history_messages)
+            logger.info(
+                "触发上下文压缩: 当前消息数=%d, 阈值=%d", len(history_messages), settings.COMPRESSION_THRESHOLD
+            )
+            start = time.perf_counter()
+            with stage("compression"), span("context.compress", attributes={"messages": len(history_messages)}):
+                history_messages = await self._compress_context(history_messages)
+            COMPRESSION_SECONDS.observe(time.perf_counter() - start)
 
         # 5. 构建上下文
         messages = self._build_context(
@@ -92,27 +220,12 @@ class LLMService:
             user_message,
         )
 
-        # 6. 裁剪上下文
-        messages = self._trim_context(messages, self.max_context_tokens)
-
-        # 7. 调用 OpenAI
-        try:
-            logger.info(
-                f"调用 OpenAI: model={agent.model}, messages_count={len(messages)}"
-            )
-            response = await self.openai_client.chat.completions.create(
-                model=agent.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024,
+        # 6. 裁剪上下文（按 Agent 模型的编码与消息开销计数）
+        with stage("trim"):
+            messages = await self._trim_context(
+                messages, self.max_context_tokens, tokenizer, stored_counts
             )
-            assistant_content = response.choices[0].message.content
-            logger.info(f"OpenAI 响应成功: length={len(assistant_content)}")
-            return assistant_content
-
-        except Exception as e:
-            logger.error(f"OpenAI 调用失败: {e}")
-            raise OpenAIAPIError(f"OpenAI 调用失败: {e}")
+        return agent, messages
 
     async def _compress_context(
         self, history_messages: List[Dict[str, Any]]
@@ -153,9 +266,7 @@ class LLMService:
         ]
         compressed_context.extend(messages_to_keep)
 
-        logger.info(
-            f"上下文压缩完成: {len(history_messages)} 条 → 摘要 + {len(messages_to_keep)} 条"
-        )
+        logger.info("上下文压缩完成: %d 条 → 摘要 + %d 条", len(history_messages), len(messages_to_keep))
 
         return compressed_context
 
@@ -173,45 +284,40 @@ class LLMService:
         messages.append({"role": "user", "content": user_msg})
         return messages
 
-    def _trim_context(
-        self, messages: List[Dict[str, str]], max_tokens: int
+    async def _trim_context(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        tokenizer: Tokenizer,
+        stored_counts: Optional[Dict[str, int]] = None,
     ) -> List[Dict[str, str]]:
         """裁剪上下文（滑动窗口策略）
 
         策略：
-        1. 计算总 token 数
-        2. 如果超出限制：
-           - 保留 messages[0]（system prompt，固定前置）
-           - 保留 messages[-1]（最新 user 消息，必须响应）
-           - 从 messages[1:-1]（历史对话）中间开始删除最早的消息
-        3. 循环删除直到满足 token 限制
+        1. 保留 messages[0]（system prompt，固定前置）
+        2. 保留 messages[-1]（最新 user 消息，必须响应）
+        3. 从 messages[1:-1]（历史对话）最早的消息开始删除，直到满足 token 限制
+
+        计数优先复用入库时的 token_count（stored_counts），其余消息（system、摘要、
+        最新 user）用字符类别估算区间，只有靠近裁剪点、估算无法判定时才做精确 BPE，
+        长文本粘贴不会在每轮对话中被完整编码；上下文体积超过阈值时整体在线程池中执行。
 
         Good Taste 体现：
         - 统一处理各种情况，无需特殊分支
         - 保留 agent 人格（system prompt）
         - 保留用户意图（最新消息）
         """
-        total_tokens = self.message_service._count_tokens(messages)
-
-        if total_tokens <= max_tokens:
-            return messages
-
-        # 只有 system + user 的情况，直接返回
-        if len(messages) <= 2:
-            return messages
-
-        # 保留首尾，删除中间历史
-        system_msg = messages[0]
-        user_msg = messages[-1]
-        history = messages[1:-1]
-
-        # 从历史消息开头开始删除（保留最近对话）
-        while history and total_tokens > max_tokens:
-            removed = history.pop(0)
-            total_tokens -= self.message_service._count_tokens([removed])
-
-        final_messages = [system_msg] + history + [user_msg]
-        logger.info(
-            f"上下文裁剪: 原始 {len(messages)} 条 → 裁剪后 {len(final_messages)} 条"
-        )
+        stored_counts = stored_counts or {}
+        known = [stored_counts.get(m["content"]) for m in messages]
+        size = sum(len(m["content"]) for m in messages)
+        with span("tiktoken.trim_to_budget", attributes={"messages": len(messages), "chars": size}) as trim_span:
+            final_messages, exact_counts = await offload(
+                trim_to_budget, messages, max_tokens, tokenizer, known, size=size
+            )
+            if trim_span is not None:
+                trim_span.attributes.update(kept=len(final_messages), exact_counts=exact_counts)
+        if len(final_messages) < len(messages):
+            logger.info(
+                "上下文裁剪: 原始 %d 条 → 裁剪后 %d 条, 精确计数 %d 条", len(messages), len(final_messages), exact_counts
+            )
         return final_messages
@@ -1,95 +1,191 @@
 """
-[INPUT]: 依赖 backend.repositories.message 的 MessageRepository，依赖 backend.models.message 的 MessageResponse，依赖 tiktoken 的编码器
+[INPUT]: 依赖 backend.repositories.message 的 MessageRepository，依赖 backend.repositories.conversation 的 ConversationRepository，依赖 backend.services.search 的 SearchService，依赖 backend.services.lineage 的 LineageResolver，依赖 backend.models.message 的 MessageResponse，依赖 backend.core.tokenizer 的 get_tokenizer，依赖 backend.core.executor 的 offload，依赖 backend.core.stages 的 stage，依赖 backend.core.tracing 的 span，依赖 backend.storage.routing 的 reads_from（历史读路由到从节点）
 [OUTPUT]: 对外提供 MessageService 类，封装消息业务逻辑
 [POS]: backend/services 的消息业务逻辑层，被 LLMService 和 Router 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from typing import List, Dict, Any, Literal
-from datetime import datetime
+from typing import List, Dict, Any, Literal, Optional
+from datetime import datetime, timedelta
 import uuid
-import tiktoken
 from ..repositories.message import MessageRepository
+from ..repositories.conversation import ConversationRepository
 from ..models.message import MessageResponse
+from ..core.config import settings
+from ..core.tokenizer import get_tokenizer
+from ..core.executor import offload
+from ..core.stages import stage
+from ..core.tracing import span
+from ..storage.routing import reads_from
+from .search import SearchService
+from .lineage import LineageResolver, Segment
+
+
+# 历史接口的投影字段（与 MessageResponse 一致）与 LLM 上下文所需字段
+_RESPONSE_FIELDS = list(MessageResponse.model_fields)
+_CONTEXT_FIELDS = ["role", "content", "token_count", "token_rule"]
+
+
+def _fill_optional(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """补齐旧文档缺失的可选字段，输出与模型序列化结果一致"""
+    for doc in docs:
+        doc.setdefault("token_count", None)
+        doc.setdefault("token_encoding", None)
+    return docs
 
 
 class MessageService:
     """消息持久化与查询
 
     职责：
-    - 保存消息到数据库
-    - 查询对话历史
-    - 计算 token 数量（使用 tiktoken）
+    - 保存消息到数据库，同时累加会话的消息数并刷新 updated_at
+    - 查询对话历史（分支会话沿祖先链拼接，不复制父会话消息；读路径投影原始字典，不构造模型）
+    - 按会话所用模型的编码计算 token 数量
+    - 写入时增量更新全文检索索引
     """
 
     def __init__(self):
         self.repo = MessageRepository()
-        # GPT-4 和 GPT-3.5 使用的编码器
-        self.encoder = tiktoken.get_encoding("cl100k_base")
+        self.conv_repo = ConversationRepository()
+        self.search_service = SearchService()
+        self.lineage = LineageResolver()
 
     async def create_message(
         self,
         conv_id: str,
         role: Literal["user", "assistant", "system"],
         content: str,
+        retention_days: Optional[int] = None,
+        user_id: Optional[str] = None,
+        model: Optional[str] = None,
     ) -> MessageResponse:
-        """保存消息到数据库"""
-        # 计算 token 数
-        token_count = self._count_tokens([{"role": role, "content": content}])
+        """保存消息到数据库
 
+        retention_days 不为空时写入 expire_at（保留期 + 宽限期），
+        由 TTL 索引兜底删除压缩任务未处理的过期消息。
+        user_id 不为空且开启检索时，同步写入该用户的倒排索引。
+        model 为会话 Agent 的模型，决定 token_count 使用的计数规则（为空时用默认编码）。
+        """
+        # 计算 token 数（含单条消息开销）
+        tokenizer = get_tokenizer(model)
+        with stage("token_count"), span("tiktoken.count_message", attributes={"chars": len(content)}):
+            token_count = await offload(tokenizer.count_message, content, size=len(content))
+
+        now = datetime.utcnow()
         msg_doc = {
             "message_id": str(uuid.uuid4()),
             "conversation_id": conv_id,
             "role": role,
             "content": content,
             "token_count": token_count,
-            "created_at": datetime.utcnow(),
+            "token_encoding": tokenizer.encoding,
+            "token_rule": tokenizer.rule,
+            "created_at": now,
         }
+        if retention_days:
+            msg_doc["expire_at"] = now + timedelta(
+                days=retention_days + settings.RETENTION_TTL_GRACE_DAYS
+            )
 
         msg_in_db = await self.repo.create(msg_doc)
+        # 原子累加（并发写入同一会话不丢计数），message_count/updated_at 共同决定历史 ETag
+        await self.conv_repo.increment(
+            {"conversation_id": conv_id}, {"message_count": 1}, {"updated_at": now}
+        )
 
-        return MessageResponse(
+        message = MessageResponse(
             message_id=msg_in_db.message_id,
             conversation_id=msg_in_db.conversation_id,
             role=msg_in_db.role,
             content=msg_in_db.content,
             token_count=msg_in_db.token_count,
+            token_encoding=msg_in_db.token_encoding,
             created_at=msg_in_db.created_at,
         )
 
+        if user_id and settings.ENABLE_SEARCH_INDEX:
+            await self.search_service.index_message(message, user_id)
+
+        return message
+
+    @reads_from("history")
     async def get_conversation_messages(
-        self, conv_id: str, limit: int = 50, skip: int = 0
-    ) -> List[MessageResponse]:
-        """获取对话历史（按时间顺序）"""
-        messages = await self.repo.find_many(
-            {"conversation_id": conv_id},
-            limit=limit,
-            skip=skip,
-            sort=[("created_at", 1)],  # 升序，最早的在前面
-        )
+        self,
+        conv_id: str,
+        limit: int = 50,
+        skip: int = 0,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """获取对话历史（按时间顺序），返回字段与 MessageResponse 一致的原始字典
 
-        return [
-            MessageResponse(
-                message_id=m.message_id,
-                conversation_id=m.conversation_id,
-                role=m.role,
-                content=m.content,
-                token_count=m.token_count,
-                created_at=m.created_at,
+        分支会话的历史 = 祖先片段（由远及近）+ 自身消息，skip/limit 作用于拼接后的整体。
+        since 不为空时只返回 created_at >= since 的消息（增量同步游标，含边界，
+        同一时刻写入的消息不会漏掉，由客户端按 message_id 去重）。
+        数据来自本服务写入的文档，直接投影返回，不再逐条构造模型。
+        """
+        segments = await self.lineage.resolve(conv_id)
+        if len(segments) == 1:
+            messages = await self.repo.find_raw(
+                self._segment_query((conv_id, None), since),
+                fields=_RESPONSE_FIELDS,
+                limit=limit,
+                skip=skip,
+                sort=[("created_at", 1)],  # 升序，最早的在前面
             )
-            for m in messages
-        ]
+            return _fill_optional(messages)
 
-    def _count_tokens(self, messages: List[Dict[str, Any]]) -> int:
-        """计算消息列表的 token 数
+        result: List[Dict[str, Any]] = []
+        for segment in reversed(segments):
+            if len(result) >= limit:
+                break
+            query = self._segment_query(segment, since)
+            if skip:
+                # 整段都在 skip 范围内时只计数，不取文档
+                total = await self.repo.count(query)
+                if total <= skip:
+                    skip -= total
+                    continue
+            messages = await self.repo.find_raw(
+                query,
+                fields=_RESPONSE_FIELDS,
+                limit=limit - len(result),
+                skip=skip,
+                sort=[("created_at", 1)],
+            )
+            skip = 0
+            result.extend(_fill_optional(messages))
+        return result
+
+    async def get_context_messages(self, conv_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """获取最近 limit 条历史（按时间顺序），用于构建 LLM 上下文
 
-        参考 OpenAI 官方计算方法：
-        - 每条消息固定开销：4 tokens（role + content 分隔符）
-        - 每次对话固定开销：2 tokens
+        只投影 role/content/token_count/token_rule，返回原始字典。
+        由近及远逐段倒序读取，取够即停，长父会话中 fork_point 之前的旧消息不会被读取。
         """
-        num_tokens = 0
-        for msg in messages:
-            num_tokens += 4  # 每条消息的固定开销
-            num_tokens += len(self.encoder.encode(msg["content"]))
-        num_tokens += 2  # 每次对话的固定开销
-        return num_tokens
+        collected: List[Dict[str, Any]] = []
+        for segment in await self.lineage.resolve(conv_id):
+            if len(collected) >= limit:
+                break
+            collected.extend(
+                await self.repo.find_raw(
+                    self._segment_query(segment),
+                    fields=_CONTEXT_FIELDS,
+                    limit=limit - len(collected),
+                    sort=[("created_at", -1)],
+                )
+            )
+        collected.reverse()
+        return collected
+
+    @staticmethod
+    def _segment_query(segment: Segment, since: Optional[datetime] = None) -> Dict[str, Any]:
+        conv_id, until = segment
+        query: Dict[str, Any] = {"conversation_id": conv_id}
+        bounds: Dict[str, Any] = {}
+        if since is not None:
+            bounds["$gte"] = since
+        if until is not None:
+            bounds["$lte"] = until
+        if bounds:
+            query["created_at"] = bounds
+        return query
@@ -0,0 +1,149 @@
+"""
+[INPUT]: 依赖 backend.services.job 的 JobService/job_runner，依赖 backend.services.context_compression 的 ContextCompressionService，依赖 backend.repositories 的 Conversation/Message/SearchPosting Repository，依赖 backend.core.throttle 的 Throttle
+[OUTPUT]: 对外提供 RetentionService 类，注册 retention_compaction 后台任务
+[POS]: backend/services 的消息保留策略执行器，被 main.py 周期调度、被 jobs 路由手动触发
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+import logging
+from .job import JobService, job_runner
+from .context_compression import ContextCompressionService
+from ..repositories.conversation import ConversationRepository
+from ..repositories.message import MessageRepository
+from ..repositories.search import SearchPostingRepository
+from ..models.conversation import ConversationInDB
+from ..models.job import JobInDB
+from ..core.config import settings
+from ..core.exceptions import LLMError
+from ..core.throttle import Throttle
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "retention_compaction"
+
+
+class RetentionService:
+    """过期消息在线压缩
+
+    职责：
+    - 遍历配置了 retention_days 的会话
+    - 将超出保留期的消息按批折叠进会话摘要，再删除这些消息
+    - TTL 索引（expire_at = 保留期 + 宽限期）只兜底本任务没处理到的消息
+
+    在线安全：
+    - 只处理 created_at 早于截止时间的消息，与实时写入互不重叠
+    - 摘要以 summary_until 做比较更新，并发折叠时后到者放弃本轮
+    - 删除只针对已折叠批次的 message_id，不会误删新消息
+    - 分支会话按 fork_point 引用父会话消息：折叠只能从最早的消息连续推进，
+      最早的未折叠消息仍被分支引用（created_at <= 某个分支的 fork_point）时整个会话暂不折叠，
+      等引用它的分支被删除后再处理（TTL 兜底不区分引用，宽限期需覆盖分支的使用期）
+    - 每批之前经过 Throttle，摘要失败时跳过会话而不是写入占位摘要
+    """
+
+    def __init__(self):
+        self.job_service = JobService()
+        self.compression_service = ContextCompressionService()
+        self.conv_repo = ConversationRepository()
+        self.msg_repo = MessageRepository()
+        self.posting_repo = SearchPostingRepository()
+        self.batch_size = settings.RETENTION_COMPACTION_BATCH_SIZE
+        self.throttle = Throttle(settings.RETENTION_COMPACTION_RATE)
+
+    async def schedule_compaction(self) -> JobInDB:
+        """手动提交一次压缩任务"""
+        job = await self.job_service.create_job(JOB_TYPE, "all")
+        job_runner.submit(job)
+        return job
+
+    async def compact_all(self, job: JobInDB) -> None:
+        """按 conversation_id 顺序遍历所有带保留策略的会话"""
+        progress = dict(job.progress)
+        now = datetime.utcnow()
+        last_id = ""
+
+        while True:
+            convs = await self.conv_repo.find_many(
+                {"retention_days": {"$gt": 0}, "conversation_id": {"$gt": last_id}},
+                limit=100,
+                sort=[("conversation_id", 1)],
+            )
+            if not convs:
+                break
+
+            for conv in convs:
+                await self.compact_conversation(conv, now, progress)
+            last_id = convs[-1].conversation_id
+            await self.job_service.update_progress(job.job_id, progress)
+
+    async def compact_conversation(
+        self, conv: ConversationInDB, now: datetime, progress: Dict[str, int]
+    ) -> None:
+        """折叠单个会话的过期消息"""
+        cutoff = now - timedelta(days=conv.retention_days)
+        pinned_until = await self._pinned_until(conv.conversation_id)
+
+        while True:
+            await self.throttle.wait()
+            expired = await self.msg_repo.find_many(
+                {"conversation_id": conv.conversation_id, "created_at": {"$lt": cutoff}},
+                limit=self.batch_size,
+                sort=[("created_at", 1)],
+            )
+            if not expired:
+                return
+            if pinned_until is not None and expired[0].created_at <= pinned_until:
+                progress["pinned_by_forks"] = progress.get("pinned_by_forks", 0) + 1
+                return
+
+            span = [{"role": m.role, "content": m.content} for m in expired]
+            if conv.summary:
+                span.insert(0, {"role": "system", "content": f"[已有摘要]\n{conv.summary}"})
+
+            try:
+                summary = await self.compression_service.summarize(span)
+            except LLMError as e:
+                logger.warning("过期消息折叠失败，跳过会话: conv_id=%s, error=%s", conv.conversation_id, e)
+                return
+
+            updated = await self.conv_repo.update(
+                {
+                    "conversation_id": conv.conversation_id,
+                    "summary_until": conv.summary_until,
+                },
+                {"summary": summary, "summary_until": expired[-1].created_at},
+            )
+            if not updated:
+                # 会话已删除或被其他实例抢先折叠
+                return
+
+            folded_ids = [m.message_id for m in expired]
+            await self.posting_repo.delete_many({"message_id": {"$in": folded_ids}})
+            deleted = await self.msg_repo.delete_many({"message_id": {"$in": folded_ids}})
+            progress["messages"] = progress.get("messages", 0) + deleted
+            progress["batches"] = progress.get("batches", 0) + 1
+            if deleted:
+                updated = await self.conv_repo.increment(
+                    {"conversation_id": conv.conversation_id}, {"message_count": -deleted}
+                ) or updated
+            conv = updated
+
+    async def _pinned_until(self, conv_id: str) -> Optional[datetime]:
+        """直接分支中最晚的 fork_point：父会话中不晚于它的消息仍属于某个分支的历史
+
+        孙分支的截止时间不会晚于其父分支的 fork_point，只看直接分支即可。
+        """
+        forks = await self.conv_repo.find_raw(
+            {"parent_conversation_id": conv_id},
+            fields=["fork_point"],
+            limit=1,
+            sort=[("fork_point", -1)],
+        )
+        return forks[0].get("fork_point") if forks else None
+
+
+# ==================== 任务处理器注册 ====================
+@job_runner.handler(JOB_TYPE)
+async def _run_retention_compaction(job: JobInDB, job_service: JobService) -> None:
+    await RetentionService().compact_all(job)
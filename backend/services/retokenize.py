@@ -0,0 +1,134 @@
+"""
+[INPUT]: 依赖 backend.services.job 的 JobService/job_runner，依赖 backend.repositories 的 Agent/Conversation/Message Repository，依赖 backend.core.tokenizer 的 get_tokenizer/count_texts，依赖 backend.core.executor 的 run_in_process
+[OUTPUT]: 对外提供 RetokenizeService 类，注册 retokenize 后台任务
+[POS]: backend/services 的 token 计数回填器，被 AgentService（模型变更）和 jobs 路由（手动触发）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Dict, List, Optional
+import asyncio
+from .job import JobService, job_runner
+from ..repositories.agent import AgentRepository
+from ..repositories.conversation import ConversationRepository
+from ..repositories.message import MessageRepository
+from ..models.agent import AgentInDB
+from ..models.job import JobInDB
+from ..core.config import settings
+from ..core.tokenizer import Tokenizer, get_tokenizer, count_texts
+from ..core.executor import run_in_process
+
+JOB_TYPE = "retokenize"
+
+
+class RetokenizeService:
+    """按 Agent 模型重新计算已存消息的 token_count
+
+    - 任务目标为 agent_id，或 "all" 表示所有 Agent
+    - 只处理 token_rule 与模型计数规则（编码 + 每条消息开销）不一致的消息，
+      同编码换模型也会重新计数；中断后重跑自然跳过已完成部分
+    - BPE 编码是纯 CPU 计算，按批切片后分发到共享进程池，不占用事件循环
+    - 每批结果以一次 bulk_write 写回
+    """
+
+    def __init__(self):
+        self.job_service = JobService()
+        self.agent_repo = AgentRepository()
+        self.conv_repo = ConversationRepository()
+        self.msg_repo = MessageRepository()
+        self.batch_size = settings.RETOKENIZE_BATCH_SIZE
+        self.slices = max(settings.CPU_PROCESS_WORKERS, 1)
+
+    async def schedule(self, agent_id: Optional[str] = None) -> JobInDB:
+        """提交重新计数任务"""
+        job = await self.job_service.create_job(JOB_TYPE, agent_id or "all")
+        job_runner.submit(job)
+        return job
+
+    async def run(self, job: JobInDB) -> None:
+        """遍历目标 Agent 的全部会话"""
+        progress = dict(job.progress)
+        async for agent in self._agents(job.target_id):
+            await self._retokenize_agent(job, agent, progress)
+
+    async def _agents(self, target_id: str):
+        if target_id != "all":
+            agent = await self.agent_repo.find_one({"agent_id": target_id})
+            if agent:
+                yield agent
+            return
+
+        last_id = ""
+        while True:
+            agents = await self.agent_repo.find_many(
+                {"agent_id": {"$gt": last_id}}, limit=100, sort=[("agent_id", 1)]
+            )
+            if not agents:
+                return
+            for agent in agents:
+                yield agent
+            last_id = agents[-1].agent_id
+
+    async def _retokenize_agent(
+        self, job: JobInDB, agent: AgentInDB, progress: Dict[str, int]
+    ) -> None:
+        tokenizer = get_tokenizer(agent.model)
+        last_id = ""
+        while True:
+            convs = await self.conv_repo.find_many(
+                {"agent_id": agent.agent_id, "conversation_id": {"$gt": last_id}},
+                limit=100,
+                sort=[("conversation_id", 1)],
+            )
+            if not convs:
+                break
+
+            for conv in convs:
+                progress["messages"] = progress.get("messages", 0) + await self._retokenize_conversation(
+                    conv.conversation_id, tokenizer
+                )
+            progress["conversations"] = progress.get("conversations", 0) + len(convs)
+            last_id = convs[-1].conversation_id
+            await self.job_service.update_progress(job.job_id, progress)
+
+    async def _retokenize_conversation(self, conv_id: str, tokenizer: Tokenizer) -> int:
+        """处理单个会话中计数规则过期的消息（含未记录规则的旧消息），返回更新数量"""
+        updated = 0
+        while True:
+            stale = await self.msg_repo.find_many(
+                {"conversation_id": conv_id, "token_rule": {"$ne": tokenizer.rule}},
+                limit=self.batch_size,
+            )
+            if not stale:
+                if updated:
+                    # token_count 属于历史接口的返回内容，改写后使历史 ETag 失效
+                    await self.conv_repo.increment({"conversation_id": conv_id}, {"revision": 1})
+                return updated
+
+            counts = await self._count(tokenizer, [m.content for m in stale])
+            updated += await self.msg_repo.update_each(
+                [
+                    (
+                        {"message_id": m.message_id},
+                        {"token_count": count, "token_encoding": tokenizer.encoding, "token_rule": tokenizer.rule},
+                    )
+                    for m, count in zip(stale, counts)
+                ]
+            )
+
+    async def _count(self, tokenizer: Tokenizer, texts: List[str]) -> List[int]:
+        """按进程数切片并行计数，结果保持输入顺序"""
+        size = -(-len(texts) // self.slices)
+        chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(
+            *(
+                run_in_process(count_texts, tokenizer.encoding, tokenizer.tokens_per_message, chunk)
+                for chunk in chunks
+            )
+        )
+        return [count for chunk_counts in results for count in chunk_counts]
+
+
+# ==================== 任务处理器注册 ====================
+@job_runner.handler(JOB_TYPE)
+async def _run_retokenize(job: JobInDB, job_service: JobService) -> None:
+    await RetokenizeService().run(job)
@@ -0,0 +1,267 @@
+"""
+[INPUT]: 依赖 backend.repositories.search 的 SearchPostingRepository，依赖 backend.repositories.message/conversation 的 Repository，依赖 backend.services.job 的 job_runner，依赖 backend.core.executor 的 offload，依赖 backend.core.config 的 settings，依赖 backend.storage.routing 的 reads_from（检索读路由到从节点）
+[OUTPUT]: 对外提供 tokenize/index_terms 函数、SearchService 类，注册 search_reindex 后台任务
+[POS]: backend/services 的全文检索服务，被 MessageService（增量索引）和 search 路由（查询）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+import asyncio
+import base64
+import heapq
+import json
+import math
+import re
+from .job import JobService, job_runner
+from ..repositories.search import SearchPostingRepository
+from ..repositories.message import MessageRepository
+from ..repositories.conversation import ConversationRepository
+from ..models.job import JobInDB
+from ..models.message import MessageResponse
+from ..models.search import SearchHit, SearchResponse
+from ..core.config import settings
+from ..core.executor import offload
+from ..core.exceptions import InvalidOperationError
+from ..storage.routing import reads_from
+
+# CJK 连续片段（汉字、假名、谚文）或 ASCII 字母数字串
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+_SNIPPET_RADIUS = 60
+
+
+def tokenize(text: str) -> Counter:
+    """文本 → 词项频次
+
+    - CJK 片段切成相邻字符二元组（「今天天气」→ 今天/天天/天气），无需分词器
+    - 单个孤立的 CJK 字符保留为一元词项
+    - ASCII 片段按小写单词切分
+    """
+    terms: Counter = Counter()
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if _CJK_RE.match(token) and len(token) > 1:
+            terms.update(token[i : i + 2] for i in range(len(token) - 1))
+        else:
+            terms[token] += 1
+    return terms
+
+
+def index_terms(text: str, max_terms: int) -> List[Tuple[str, int]]:
+    """文本 → 建索引的词项与频次
+
+    在 tokenize 的基础上为每个 CJK 字符补一元词项，使单字查询可以命中；
+    二元组 / 单词与单字分别按频次取前 max_terms 个，避免高频单字挤掉二元组
+    """
+    words = Counter({t: tf for t, tf in tokenize(text).items() if not (len(t) == 1 and _CJK_RE.match(t))})
+    chars = Counter(ch for ch in text.lower() if _CJK_RE.match(ch))
+    return words.most_common(max_terms) + chars.most_common(max_terms)
+
+
+class SearchService:
+    """消息全文检索（二元组倒排索引）
+
+    索引：
+    - search_postings 每条记录 = (term, user_id, message_id, tf, created_at)
+    - 词项为 CJK 二元组、ASCII 单词与 CJK 单字（单字只服务于单字查询，见 index_terms）
+    - 写入消息时增量建索引；会话删除、保留策略折叠时同步清理
+
+    查询（AND 语义）：
+    1. 统计每个词项在该用户下的文档频率（计数有上限）
+    2. 以最稀有词项驱动，取最新的 SEARCH_MAX_CANDIDATES 条候选；
+       达到上限时更早的消息不可达（翻页也取不到），响应标记 truncated=True
+    3. 其余词项只在候选集内用 message_id 过滤
+    4. 打分 Σ (1 + ln tf) · idf，同分按时间倒序，游标分页；
+       每页都重新评估整个候选集（受上限约束），只用堆取游标之后的 limit 条，不做全量排序
+    """
+
+    def __init__(self):
+        self.repo = SearchPostingRepository()
+        self.msg_repo = MessageRepository()
+        self.conv_repo = ConversationRepository()
+        self.max_candidates = settings.SEARCH_MAX_CANDIDATES
+
+    # ==================== 索引 ====================
+    async def index_message(self, message: MessageResponse, user_id: str) -> int:
+        """为单条消息建立倒排记录，返回写入的词项数"""
+        # 纯 Python 正则切分持有 GIL，超大消息交给进程池
+        terms = await offload(
+            index_terms,
+            message.content,
+            settings.SEARCH_MAX_TERMS_PER_MESSAGE,
+            size=len(message.content),
+            kind="process",
+        )
+        postings = [
+            {
+                "term": term,
+                "user_id": user_id,
+                "conversation_id": message.conversation_id,
+                "message_id": message.message_id,
+                "tf": tf,
+                "created_at": message.created_at,
+            }
+            for term, tf in terms
+        ]
+        return await self.repo.create_many(postings)
+
+    async def schedule_reindex(self, user_id: str) -> JobInDB:
+        """提交用户消息重建索引任务"""
+        job = await JobService().create_job("search_reindex", user_id)
+        job_runner.submit(job)
+        return job
+
+    async def reindex_user(self, job: JobInDB, job_service: JobService) -> None:
+        """按会话重建索引：先清该会话的旧记录，再逐条建索引"""
+        progress = dict(job.progress)
+        user_id = job.target_id
+        last_id = ""
+
+        while True:
+            convs = await self.conv_repo.find_many(
+                {"user_id": user_id, "conversation_id": {"$gt": last_id}},
+                limit=100,
+                sort=[("conversation_id", 1)],
+            )
+            if not convs:
+                break
+
+            for conv in convs:
+                await self.repo.delete_many({"conversation_id": conv.conversation_id})
+                async for doc in self.msg_repo.iter_raw(
+                    {"conversation_id": conv.conversation_id},
+                    batch_size=settings.EXPORT_BATCH_SIZE,
+                ):
+                    await self.index_message(MessageResponse(**doc), user_id)
+                    progress["messages"] = progress.get("messages", 0) + 1
+                progress["conversations"] = progress.get("conversations", 0) + 1
+
+            last_id = convs[-1].conversation_id
+            await job_service.update_progress(job.job_id, progress)
+
+    # ==================== 查询 ====================
+    @reads_from("search")
+    async def search(
+        self, user_id: str, query: str, limit: int = 20, cursor: Optional[str] = None
+    ) -> SearchResponse:
+        """在用户的全部消息中检索"""
+        terms = list(tokenize(query))
+        if not terms:
+            raise InvalidOperationError("查询中没有可检索的词项")
+
+        dfs = await asyncio.gather(
+            *(
+                self.repo.count({"term": t, "user_id": user_id}, limit=self.max_candidates)
+                for t in terms
+            )
+        )
+        if min(dfs) == 0:
+            return SearchResponse()
+
+        idf = {t: math.log(1 + self.max_candidates / df) for t, df in zip(terms, dfs)}
+        ordered = sorted(terms, key=lambda t: idf[t], reverse=True)
+
+        # 最稀有词项驱动候选集
+        postings = await self.repo.find_many(
+            {"term": ordered[0], "user_id": user_id},
+            limit=self.max_candidates,
+            sort=[("created_at", -1)],
+        )
+        candidates: Dict[str, Dict[str, Any]] = {
+            p.message_id: {"score": self._weight(p.tf, idf[p.term]), "created_at": p.created_at}
+            for p in postings
+        }
+
+        truncated = len(postings) >= self.max_candidates
+
+        for term in ordered[1:]:
+            if not candidates:
+                return SearchResponse(truncated=truncated)
+            matched = await self.repo.find_many(
+                {"term": term, "user_id": user_id, "message_id": {"$in": list(candidates)}},
+                limit=len(candidates),
+            )
+            next_candidates = {}
+            for p in matched:
+                entry = candidates[p.message_id]
+                entry["score"] += self._weight(p.tf, idf[term])
+                next_candidates[p.message_id] = entry
+            candidates = next_candidates
+
+        ranked: Iterable[Tuple[str, Dict[str, Any]]] = candidates.items()
+        if cursor:
+            after = self._decode_cursor(cursor)
+            ranked = [item for item in ranked if self._sort_key(item) > after]
+
+        window = heapq.nsmallest(limit + 1, ranked, key=self._sort_key)
+        page = window[:limit]
+        hits = await self._load_hits(page, terms)
+        next_cursor = self._encode_cursor(page[-1]) if len(window) > limit else None
+        return SearchResponse(hits=hits, next_cursor=next_cursor, truncated=truncated)
+
+    async def _load_hits(
+        self, page: List[Tuple[str, Dict[str, Any]]], terms: List[str]
+    ) -> List[SearchHit]:
+        """按排序结果回表取消息并生成片段"""
+        if not page:
+            return []
+        messages = await self.msg_repo.find_many(
+            {"message_id": {"$in": [message_id for message_id, _ in page]}}, limit=len(page)
+        )
+        by_id = {m.message_id: m for m in messages}
+
+        hits = []
+        for message_id, entry in page:
+            msg = by_id.get(message_id)
+            if not msg:
+                continue  # 消息已删除、倒排记录尚未清理
+            hits.append(
+                SearchHit(
+                    message_id=msg.message_id,
+                    conversation_id=msg.conversation_id,
+                    role=msg.role,
+                    snippet=self._snippet(msg.content, terms),
+                    score=round(entry["score"], 4),
+                    created_at=msg.created_at,
+                )
+            )
+        return hits
+
+    @staticmethod
+    def _weight(tf: int, idf: float) -> float:
+        return (1 + math.log(tf)) * idf
+
+    @staticmethod
+    def _sort_key(item: Tuple[str, Dict[str, Any]]) -> Tuple[float, float, str]:
+        message_id, entry = item
+        return (-round(entry["score"], 6), -entry["created_at"].timestamp(), message_id)
+
+    def _encode_cursor(self, item: Tuple[str, Dict[str, Any]]) -> str:
+        raw = json.dumps(list(self._sort_key(item)))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, float, str]:
+        try:
+            score, ts, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return (float(score), float(ts), str(message_id))
+        except (ValueError, TypeError) as e:
+            raise InvalidOperationError(f"无效的分页游标: {e}")
+
+    @staticmethod
+    def _snippet(content: str, terms: List[str]) -> str:
+        """截取第一个命中词项附近的片段"""
+        lowered = content.lower()
+        positions = [pos for pos in (lowered.find(t) for t in terms) if pos >= 0]
+        start = max(min(positions) - _SNIPPET_RADIUS, 0) if positions else 0
+        snippet = content[start : start + _SNIPPET_RADIUS * 2]
+        return ("…" if start else "") + snippet + ("…" if start + len(snippet) < len(content) else "")
+
+
+# ==================== 任务处理器注册 ====================
+@job_runner.handler("search_reindex")
+async def _run_search_reindex(job: JobInDB, job_service: JobService) -> None:
+    await SearchService().reindex_user(job, job_service)
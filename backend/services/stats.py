@@ -0,0 +1,328 @@
+"""
+[INPUT]: 依赖 backend.services.job 的 JobService/job_runner，依赖 backend.repositories 的 StatsRollup/Conversation/Agent/Message Repository，依赖 backend.models.stats 的汇总与响应模型，依赖 backend.storage.routing 的 reads_from（统计读路由到从节点），依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 bucket_start 函数、StatsService 类，注册 stats_rebuild 后台任务
+[POS]: backend/services 的统计汇总层，被 ChatService（写消息时累加）、TransferService（导入消息时累加）、stats 路由（查询与手动重建）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+from .job import JobService, job_runner
+from ..repositories.stats import StatsRollupRepository
+from ..repositories.conversation import ConversationRepository
+from ..repositories.agent import AgentRepository
+from ..repositories.message import MessageRepository
+from ..models.job import JobInDB
+from ..models.message import MessageResponse
+from ..models.stats import Granularity, GroupBy, StatsMetrics, StatsPoint, StatsResponse
+from ..core.config import settings
+from ..core.exceptions import InvalidOperationError
+from ..storage.routing import reads_from
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "stats_rebuild"
+
+_STEPS: Dict[str, timedelta] = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+_GROUP_FIELDS = {"user": "user_id", "agent": "agent_id", "model": "model"}
+_COUNTERS = ("user_messages", "assistant_messages", "user_tokens", "assistant_tokens", "assistant_chars")
+_UNKNOWN_MODEL = "unknown"
+
+# 汇总桶键：(粒度, 桶起点, user_id, agent_id, model)
+RollupKey = Tuple[str, datetime, str, str, str]
+
+
+def bucket_start(at: datetime, granularity: Granularity) -> datetime:
+    """时间所在桶的起点（UTC 整点 / 零点）"""
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def _amounts(role: str, chars: int, token_count: Optional[int]) -> Dict[str, int]:
+    """一条消息对汇总桶的增量"""
+    if role == "user":
+        return {"user_messages": 1, "user_tokens": token_count or 0}
+    return {"assistant_messages": 1, "assistant_tokens": token_count or 0, "assistant_chars": chars}
+
+
+def _metrics(counters: Dict[str, int], users: Set[str]) -> Dict[str, Any]:
+    replies = counters.get("assistant_messages", 0)
+    user_tokens = counters.get("user_tokens", 0)
+    assistant_tokens = counters.get("assistant_tokens", 0)
+    return {
+        "turns": counters.get("user_messages", 0),
+        "replies": replies,
+        "avg_reply_chars": round(counters.get("assistant_chars", 0) / replies, 1) if replies else 0.0,
+        "user_tokens": user_tokens,
+        "assistant_tokens": assistant_tokens,
+        "total_tokens": user_tokens + assistant_tokens,
+        "active_users": len(users),
+    }
+
+
+class StatsService:
+    """按用户 / Agent / 模型物化的小时、天汇总
+
+    写入：
+    - 每条用户 / 助手消息入库后，对所在小时桶与天桶各做一次 $inc upsert（键唯一索引保证并发累加不丢、不重复建桶）
+    - 累加失败只记录告警，不影响对话；汇总可由重建任务从原始消息修复
+
+    查询：只读取区间内的汇总桶，代价与桶数成正比，与消息量无关
+
+    重建（stats_rebuild 任务）：
+    - 按整天重建，且只重建今天零点（UTC）之前的天：实时累加只落在今天的桶，重建区间与之不重叠
+    - 会话按 conversation_id 分块，各块并发扫描消息并在内存中聚合，最后删除区间内的旧桶再批量写入
+    - 模型取 Agent 当前的模型；已被保留策略删除的消息无法重建，不要重建早于保留期的区间
+    """
+
+    def __init__(self):
+        self.job_service = JobService()
+        self.rollup_repo = StatsRollupRepository()
+        self.conv_repo = ConversationRepository()
+        self.agent_repo = AgentRepository()
+        self.msg_repo = MessageRepository()
+
+    # ==================== 写入 ====================
+    async def record_message(
+        self, user_id: str, agent_id: str, model: Optional[str], message: MessageResponse
+    ) -> None:
+        """把一条消息累加到它所在的小时桶与天桶"""
+        await self.record_messages([(user_id, agent_id, model, message)])
+
+    async def record_messages(
+        self, rows: List[Tuple[str, str, Optional[str], MessageResponse]]
+    ) -> None:
+        """批量累加 (user_id, agent_id, model, 消息)：同一汇总桶先在内存合并，每个桶一次 $inc"""
+        if not settings.ENABLE_STATS_ROLLUPS:
+            return
+        merged: Dict[RollupKey, Dict[str, int]] = {}
+        for user_id, agent_id, model, message in rows:
+            if message.role not in ("user", "assistant"):
+                continue
+            amounts = _amounts(message.role, len(message.content), message.token_count)
+            for granularity in _STEPS:
+                bucket = bucket_start(message.created_at, granularity)
+                key = (granularity, bucket, user_id, agent_id, model or _UNKNOWN_MODEL)
+                counters = merged.setdefault(key, dict.fromkeys(amounts, 0))
+                for name, value in amounts.items():
+                    counters[name] = counters.get(name, 0) + value
+        try:
+            await asyncio.gather(
+                *(
+                    self.rollup_repo.increment(
+                        {"granularity": g, "bucket": b, "user_id": u, "agent_id": a, "model": m},
+                        counters,
+                        upsert=True,
+                    )
+                    for (g, b, u, a, m), counters in merged.items()
+                )
+            )
+        except Exception as e:
+            logger.warning("统计汇总累加失败（可由重建任务修复）: buckets=%s, error=%s", len(merged), e)
+
+    # ==================== 查询 ====================
+    @reads_from("stats")
+    async def query(
+        self,
+        granularity: Granularity,
+        start: datetime,
+        end: datetime,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        model: Optional[str] = None,
+        group_by: GroupBy = "none",
+    ) -> StatsResponse:
+        """区间 [start, end) 内的汇总，按时间桶（及分组值）输出，另给出区间合计"""
+        start = bucket_start(start, granularity)
+        if end <= start:
+            raise InvalidOperationError("end 必须晚于 start")
+        if (end - start) / _STEPS[granularity] > settings.STATS_MAX_POINTS:
+            raise InvalidOperationError(f"时间桶过多（上限 {settings.STATS_MAX_POINTS}），请缩小区间或改用 day 粒度")
+
+        query: Dict[str, Any] = {"granularity": granularity, "bucket": {"$gte": start, "$lt": end}}
+        for field, value in (("user_id", user_id), ("agent_id", agent_id), ("model", model)):
+            if value is not None:
+                query[field] = value
+        group_field = _GROUP_FIELDS.get(group_by)
+
+        points: Dict[Tuple[datetime, Optional[str]], Tuple[Dict[str, int], Set[str]]] = {}
+        totals: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+        all_users: Set[str] = set()
+        async for doc in self.rollup_repo.iter_raw(query, batch_size=1000):
+            counters, users = points.setdefault(
+                (doc["bucket"], doc[group_field] if group_field else None), (dict.fromkeys(_COUNTERS, 0), set())
+            )
+            for name in _COUNTERS:
+                value = doc.get(name, 0)
+                counters[name] += value
+                totals[name] += value
+            users.add(doc["user_id"])
+            all_users.add(doc["user_id"])
+
+        return StatsResponse(
+            granularity=granularity,
+            group_by=group_by,
+            start=start,
+            end=end,
+            points=[
+                StatsPoint(bucket=bucket, key=key, **_metrics(*points[(bucket, key)]))
+                for bucket, key in sorted(points, key=lambda point: (point[0], point[1] or ""))
+            ],
+            totals=StatsMetrics(**_metrics(totals, all_users)),
+        )
+
+    # ==================== 重建 ====================
+    async def schedule_rebuild(self, start: datetime, end: Optional[datetime] = None) -> JobInDB:
+        """提交重建任务（区间按整天取整，end 为空表示到今天零点）
+
+        start 必须显式给出且不早于保留期边界：更早的原始消息已被折叠删除，重建会把历史汇总清零。
+        """
+        await self._check_range(start, end)
+        params = {"start": start.isoformat(), "end": end.isoformat() if end else None}
+        job = await self.job_service.create_job(JOB_TYPE, "all", params)
+        job_runner.submit(job)
+        return job
+
+    async def _check_range(
+        self, start: datetime, end: Optional[datetime]
+    ) -> Tuple[datetime, datetime]:
+        """区间取整并校验，返回 (start, end)；越过保留期边界时抛出 InvalidOperationError"""
+        today = bucket_start(datetime.utcnow(), "day")
+        start = bucket_start(start, "day")
+        end = min(bucket_start(end, "day"), today) if end else today
+        horizon = await self._retention_horizon(today)
+        if horizon is not None and start < horizon:
+            raise InvalidOperationError(
+                f"重建起点早于消息保留期边界 {horizon.date()}，之前的原始消息已被折叠删除"
+            )
+        return start, end
+
+    async def _retention_horizon(self, today: datetime) -> Optional[datetime]:
+        """最严格的会话保留期对应的最早可重建日期，没有会话配置保留期时为 None"""
+        strictest = await self.conv_repo.find_raw(
+            {"retention_days": {"$gt": 0}},
+            fields=["retention_days"],
+            limit=1,
+            sort=[("retention_days", 1)],
+        )
+        if not strictest:
+            return None
+        return today - timedelta(days=strictest[0]["retention_days"])
+
+    async def rebuild(self, job: JobInDB) -> None:
+        """从原始消息重新计算区间内的全部汇总桶（幂等：中断后重跑得到同样结果）
+
+        任务恢复时保留期边界可能已经后移，届时重新校验并以失败结束。
+        """
+        end = job.params.get("end")
+        start, end = await self._check_range(
+            datetime.fromisoformat(job.params["start"]), datetime.fromisoformat(end) if end else None
+        )
+        if start >= end:
+            logger.info("统计重建区间为空: start=%s, end=%s", start, end)
+            return
+
+        created_at: Dict[str, datetime] = {"$gte": start, "$lt": end}
+        rollups: Dict[RollupKey, Dict[str, int]] = {}
+        progress = {"conversations": 0, "messages": 0}
+        semaphore = asyncio.Semaphore(max(1, settings.STATS_REBUILD_CONCURRENCY))
+        chunks: List[asyncio.Task] = []
+
+        async def run_chunk(convs: List[Dict[str, Any]]) -> None:
+            try:
+                partial, count = await self._rebuild_chunk(convs, created_at)
+            finally:
+                semaphore.release()
+            for key, counters in partial.items():
+                merged = rollups.setdefault(key, dict.fromkeys(_COUNTERS, 0))
+                for name, value in counters.items():
+                    merged[name] += value
+            progress["conversations"] += len(convs)
+            progress["messages"] += count
+            await self.job_service.update_progress(job.job_id, dict(progress))
+
+        last_id = ""
+        try:
+            while True:
+                convs = await self.conv_repo.find_raw(
+                    {"conversation_id": {"$gt": last_id}},
+                    fields=["conversation_id", "user_id", "agent_id"],
+                    limit=settings.STATS_REBUILD_CHUNK_SIZE,
+                    sort=[("conversation_id", 1)],
+                )
+                if not convs:
+                    break
+                # 至多 STATS_REBUILD_CONCURRENCY 块同时扫描，翻页与扫描重叠
+                await semaphore.acquire()
+                chunks.append(asyncio.create_task(run_chunk(convs)))
+                last_id = convs[-1]["conversation_id"]
+            await asyncio.gather(*chunks)
+        except BaseException:
+            for chunk in chunks:
+                chunk.cancel()
+            raise
+
+        written, removed = await self._replace(job.job_id, start, end, rollups)
+        progress["rollups"] = written
+        progress["stale_rollups"] = removed
+        await self.job_service.update_progress(job.job_id, progress)
+        logger.info("统计重建完成: start=%s, end=%s, %s", start, end, progress)
+
+    async def _rebuild_chunk(
+        self, convs: List[Dict[str, Any]], created_at: Dict[str, datetime]
+    ) -> Tuple[Dict[RollupKey, Dict[str, int]], int]:
+        """聚合一块会话在区间内的消息，返回 (汇总桶, 消息数)"""
+        agent_ids = sorted({conv["agent_id"] for conv in convs})
+        # load 在同一轮事件循环内合并为一条 $in 查询
+        agents = await asyncio.gather(*(self.agent_repo.load("agent_id", agent_id) for agent_id in agent_ids))
+        models = {agent_id: agent.model if agent else _UNKNOWN_MODEL for agent_id, agent in zip(agent_ids, agents)}
+        owners = {conv["conversation_id"]: (conv["user_id"], conv["agent_id"]) for conv in convs}
+
+        partial: Dict[RollupKey, Dict[str, int]] = {}
+        count = 0
+        async for msg in self.msg_repo.iter_raw(
+            {"conversation_id": {"$in": list(owners)}, "created_at": created_at},
+            fields=["conversation_id", "role", "content", "token_count", "created_at"],
+        ):
+            if msg["role"] not in ("user", "assistant"):
+                continue
+            count += 1
+            user_id, agent_id = owners[msg["conversation_id"]]
+            amounts = _amounts(msg["role"], len(msg["content"]), msg.get("token_count"))
+            for granularity in _STEPS:
+                key = (granularity, bucket_start(msg["created_at"], granularity), user_id, agent_id, models[agent_id])
+                counters = partial.setdefault(key, dict.fromkeys(_COUNTERS, 0))
+                for name, value in amounts.items():
+                    counters[name] += value
+        return partial, count
+
+    async def _replace(
+        self, generation: str, start: datetime, end: datetime, rollups: Dict[RollupKey, Dict[str, int]]
+    ) -> Tuple[int, int]:
+        """按键整体覆盖区间内的汇总桶，再删除本次重建没有产出的旧桶，返回 (写入数, 删除数)
+
+        覆盖期间查询看到的每个桶要么是旧值要么是新值，不会出现先删后写的空窗；
+        generation（任务 ID）标记本次写入的桶，区间内未被标记的即为过期桶。
+        """
+        updates = [
+            (
+                {"granularity": g, "bucket": b, "user_id": u, "agent_id": a, "model": m},
+                {**counters, "generation": generation},
+            )
+            for (g, b, u, a, m), counters in rollups.items()
+        ]
+        for i in range(0, len(updates), 1000):
+            await self.rollup_repo.update_each(updates[i : i + 1000], upsert=True)
+        removed = await self.rollup_repo.delete_many(
+            {"bucket": {"$gte": start, "$lt": end}, "generation": {"$ne": generation}}
+        )
+        return len(updates), removed
+
+
+# ==================== 任务处理器注册 ====================
+@job_runner.handler(JOB_TYPE)
+async def _run_stats_rebuild(job: JobInDB, job_service: JobService) -> None:
+    await StatsService().rebuild(job)
@@ -0,0 +1,336 @@
+"""
+[INPUT]: 依赖 backend.repositories 的 User/Agent/Conversation/Message Repository，依赖 backend.models 的 InDB 模型（导入校验与字段白名单），依赖 backend.services 的 SearchService（导入后重建索引）/StatsService（导入消息计入汇总），依赖 backend.core.config 的 settings，依赖 backend.core.executor 的 run_in_thread，可选依赖 zstandard，依赖 backend.storage.routing 的 reads_from（导出读路由到从节点）
+[OUTPUT]: 对外提供 TransferService 类，封装 NDJSON 流式导出与分块导入
+[POS]: backend/services 的数据迁移与备份服务，被 transfer 路由消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Type
+from datetime import datetime
+import asyncio
+import json
+import logging
+from pydantic import BaseModel, ValidationError
+from ..repositories.base import BaseRepository
+from ..repositories.user import UserRepository
+from ..repositories.agent import AgentRepository
+from ..repositories.conversation import ConversationRepository
+from ..repositories.message import MessageRepository
+from ..models.user import UserInDB
+from ..models.agent import AgentInDB
+from ..models.conversation import ConversationInDB
+from ..models.message import MessageInDB, MessageResponse
+from .search import SearchService
+from .stats import StatsService
+from ..core.config import settings
+from ..core.executor import run_in_thread
+from ..core.exceptions import InvalidOperationError
+from ..storage.routing import reads_from
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖：uv sync --extra zstd
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT_VERSION = 1
+
+# 导入记录类型 → 校验与字段白名单使用的模型
+_IMPORT_MODELS: Dict[str, Type[BaseModel]] = {
+    "user": UserInDB,
+    "agent": AgentInDB,
+    "conversation": ConversationInDB,
+    "message": MessageInDB,
+}
+
+# 输出缓冲：攒够约 64KB 再交给响应流，减少小块写入
+_FLUSH_BYTES = 64 * 1024
+
+
+class TransferService:
+    """NDJSON 流式导出 / 导入
+
+    行格式：{"type": "user|agent|conversation|message", "data": {...}}
+    首行为 {"type": "meta", ...}，业务 ID 原样保留，_id 不导出。
+
+    设计哲学：
+    - 导出直接从游标流出，任何时刻只持有一批文档
+    - 会话按 conversation_id 键集分页，不长时间占用单个游标
+    - 导入按 IMPORT_CHUNK_SIZE 分块 insert_many(ordered=False)，重复数据自动跳过
+    """
+
+    def __init__(self):
+        self.user_repo = UserRepository()
+        self.agent_repo = AgentRepository()
+        self.conv_repo = ConversationRepository()
+        self.msg_repo = MessageRepository()
+        self.search_service = SearchService()
+        self.stats_service = StatsService()
+        self.batch_size = settings.EXPORT_BATCH_SIZE
+        self.chunk_size = settings.IMPORT_CHUNK_SIZE
+
+    # ==================== 导出 ====================
+    async def export_user(
+        self, user_id: str, compression: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """导出用户及其全部会话、消息、引用到的 Agent"""
+        self._check_compression(compression)
+        return self._encode(self._user_records(user_id), compression)
+
+    async def export_conversation(
+        self, conv_id: str, compression: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """导出单个会话及其消息、Agent"""
+        self._check_compression(compression)
+        return self._encode(self._conversation_records(conv_id), compression)
+
+    @reads_from("export")
+    async def _user_records(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        yield self._meta("user", user_id)
+        async for doc in self.user_repo.iter_raw({"user_id": user_id}):
+            yield {"type": "user", "data": doc}
+
+        agent_ids: Set[str] = set()
+        last_id = ""
+        while True:
+            convs = [
+                doc
+                async for doc in self.conv_repo.iter_raw(
+                    {"user_id": user_id, "conversation_id": {"$gt": last_id}},
+                    sort=[("conversation_id", 1)],
+                    batch_size=100,
+                    limit=100,
+                )
+            ]
+            if not convs:
+                break
+            for conv in convs:
+                agent_ids.add(conv["agent_id"])
+                async for record in self._conversation_body(conv):
+                    yield record
+            last_id = convs[-1]["conversation_id"]
+
+        async for record in self._agents(agent_ids):
+            yield record
+
+    @reads_from("export")
+    async def _conversation_records(self, conv_id: str) -> AsyncIterator[Dict[str, Any]]:
+        yield self._meta("conversation", conv_id)
+        async for conv in self.conv_repo.iter_raw({"conversation_id": conv_id}):
+            async for record in self._conversation_body(conv):
+                yield record
+            async for record in self._agents({conv["agent_id"]}):
+                yield record
+
+    async def _conversation_body(self, conv: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """会话行 + 按时间顺序的消息行"""
+        yield {"type": "conversation", "data": conv}
+        async for doc in self.msg_repo.iter_raw(
+            {"conversation_id": conv["conversation_id"]},
+            sort=[("created_at", 1)],
+            batch_size=self.batch_size,
+        ):
+            yield {"type": "message", "data": doc}
+
+    async def _agents(self, agent_ids: Set[str]) -> AsyncIterator[Dict[str, Any]]:
+        if not agent_ids:
+            return
+        async for doc in self.agent_repo.iter_raw({"agent_id": {"$in": list(agent_ids)}}):
+            yield {"type": "agent", "data": doc}
+
+    @staticmethod
+    def _meta(scope: str, target_id: str) -> Dict[str, Any]:
+        return {
+            "type": "meta",
+            "data": {
+                "version": EXPORT_FORMAT_VERSION,
+                "scope": scope,
+                "target_id": target_id,
+                "exported_at": datetime.utcnow(),
+            },
+        }
+
+    async def _encode(
+        self, records: AsyncIterator[Dict[str, Any]], compression: Optional[str]
+    ) -> AsyncIterator[bytes]:
+        """记录 → NDJSON 字节流（可选 zstd 压缩）"""
+        compressor = zstandard.ZstdCompressor().compressobj() if compression else None
+        buffer: List[bytes] = []
+        size = 0
+
+        async for record in records:
+            line = json.dumps(record, ensure_ascii=False, default=_json_default)
+            data = line.encode("utf-8") + b"\n"
+            buffer.append(data)
+            size += len(data)
+            if size >= _FLUSH_BYTES:
+                chunk = b"".join(buffer)
+                buffer, size = [], 0
+                # zstd 压缩释放 GIL，在线程池中执行
+                chunk = await run_in_thread(compressor.compress, chunk) if compressor else chunk
+                if chunk:
+                    yield chunk
+
+        chunk = b"".join(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+
+    # ==================== 导入 ====================
+    async def import_stream(
+        self, chunks: AsyncIterator[bytes], compression: Optional[str] = None
+    ) -> Dict[str, int]:
+        """分块导入 NDJSON 字节流，返回各类型插入数量与跳过数量
+
+        每条记录按对应模型校验，只保留模型字段（_id 等多余字段丢弃），格式错误时抛出 InvalidOperationError。
+        导入的消息不经过 ChatService：按块累加统计汇总，结束后重算受影响会话的计数，
+        并为受影响的用户提交检索索引重建任务。
+        """
+        self._check_compression(compression)
+        repos: Dict[str, BaseRepository] = {
+            "user": self.user_repo,
+            "agent": self.agent_repo,
+            "conversation": self.conv_repo,
+            "message": self.msg_repo,
+        }
+        pending: Dict[str, List[Dict[str, Any]]] = {name: [] for name in repos}
+        stats: Dict[str, int] = {f"{name}s": 0 for name in repos}
+        stats["skipped"] = 0
+        touched: Set[str] = set()
+
+        async def flush(name: str) -> None:
+            docs = pending[name]
+            if not docs:
+                return
+            pending[name] = []
+            if name == "message":
+                # 消息的统计与计数依赖所属会话，先写入同批之前读到的上级记录
+                for parent in ("user", "agent", "conversation"):
+                    await flush(parent)
+                existing = {
+                    doc["message_id"]
+                    for doc in await self.msg_repo.find_raw(
+                        {"message_id": {"$in": [doc["message_id"] for doc in docs]}},
+                        fields=["message_id"],
+                        limit=len(docs),
+                    )
+                }
+            inserted = await repos[name].create_many(docs)
+            stats[f"{name}s"] += inserted
+            stats["skipped"] += len(docs) - inserted
+            if name == "message":
+                added = [doc for doc in docs if doc["message_id"] not in existing]
+                touched.update(doc["conversation_id"] for doc in added)
+                await self._record_imported(added)
+
+        async for line in self._lines(chunks, compression):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise InvalidOperationError(f"NDJSON 格式错误: {e}")
+            if not isinstance(record, dict):
+                raise InvalidOperationError("NDJSON 记录必须是 JSON 对象")
+
+            name = record.get("type")
+            if name == "meta":
+                continue
+            if name not in repos:
+                raise InvalidOperationError(f"未知记录类型: {name}")
+
+            pending[name].append(_validated(name, record.get("data")))
+            if len(pending[name]) >= self.chunk_size:
+                await flush(name)
+
+        for name in repos:
+            await flush(name)
+
+        stats["reindex_jobs"] = await self._refresh_conversations(touched)
+        logger.info("导入完成: %s", stats)
+        return stats
+
+    async def _record_imported(self, messages: List[Dict[str, Any]]) -> None:
+        """把新插入的消息累加进统计汇总（所属会话不存在的消息跳过）"""
+        conv_ids = sorted({doc["conversation_id"] for doc in messages})
+        convs = await asyncio.gather(*(self.conv_repo.load("conversation_id", cid) for cid in conv_ids))
+        owners = {conv.conversation_id: conv for conv in convs if conv}
+        agent_ids = sorted({conv.agent_id for conv in owners.values()})
+        agents = await asyncio.gather(*(self.agent_repo.load("agent_id", aid) for aid in agent_ids))
+        models = {aid: agent.model for aid, agent in zip(agent_ids, agents) if agent}
+        rows = []
+        for doc in messages:
+            conv = owners.get(doc["conversation_id"])
+            if conv is not None:
+                rows.append((conv.user_id, conv.agent_id, models.get(conv.agent_id), MessageResponse(**doc)))
+        await self.stats_service.record_messages(rows)
+
+    async def _refresh_conversations(self, conv_ids: Set[str]) -> int:
+        """按实际消息重算 message_count / updated_at，并为涉及的用户提交索引重建，返回提交的任务数"""
+        user_ids: Set[str] = set()
+        for conv_id in sorted(conv_ids):
+            conv = await self.conv_repo.find_one({"conversation_id": conv_id})
+            if not conv:
+                continue
+            latest = await self.msg_repo.find_raw(
+                {"conversation_id": conv_id}, fields=["created_at"], limit=1, sort=[("created_at", -1)]
+            )
+            updated_at = max([conv.updated_at] + [doc["created_at"] for doc in latest])
+            await self.conv_repo.update(
+                {"conversation_id": conv_id},
+                {
+                    "message_count": await self.msg_repo.count({"conversation_id": conv_id}),
+                    "updated_at": updated_at,
+                },
+            )
+            user_ids.add(conv.user_id)
+        for user_id in sorted(user_ids):
+            await self.search_service.schedule_reindex(user_id)
+        return len(user_ids)
+
+    async def _lines(
+        self, chunks: AsyncIterator[bytes], compression: Optional[str]
+    ) -> AsyncIterator[bytes]:
+        """字节块 → 完整行（跨块拼接，不缓存整个请求体）"""
+        decompressor = zstandard.ZstdDecompressor().decompressobj() if compression else None
+        tail = b""
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+    @staticmethod
+    def _check_compression(compression: Optional[str]) -> None:
+        if compression is None:
+            return
+        if compression != "zstd":
+            raise InvalidOperationError(f"不支持的压缩格式: {compression}")
+        if zstandard is None:
+            raise InvalidOperationError("服务端未安装 zstandard，无法使用 zstd 压缩")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _validated(name: str, data: Any) -> Dict[str, Any]:
+    """按记录类型的模型校验 data，只保留模型字段（ISO 时间字符串还原为 datetime）"""
+    if not isinstance(data, dict):
+        raise InvalidOperationError(f"{name} 记录缺少 data 对象")
+    model = _IMPORT_MODELS[name]
+    doc = {field: value for field, value in data.items() if field in model.model_fields}
+    try:
+        validated = model.model_validate(doc)
+    except ValidationError as e:
+        raise InvalidOperationError(f"{name} 记录字段无效: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+    return {field: getattr(validated, field) for field in doc}
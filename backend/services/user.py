@@ -1,5 +1,5 @@
 """
-[INPUT]: 依赖 backend.repositories.user 的 UserRepository，依赖 backend.models.user 的 UserCreate/UserResponse
+[INPUT]: 依赖 backend.repositories.user 的 UserRepository，依赖 backend.services.cascade_delete 的 CascadeDeleteService，依赖 backend.models.user 的 UserCreate/UserResponse
 [OUTPUT]: 对外提供 UserService 类，封装用户业务逻辑
 [POS]: backend/services 的用户业务逻辑层，被 Router 消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
@@ -10,6 +10,8 @@ from datetime import datetime
 import uuid
 from ..repositories.user import UserRepository
 from ..models.user import UserCreate, UserResponse
+from ..models.job import JobInDB
+from .cascade_delete import CascadeDeleteService
 from ..core.exceptions import ResourceNotFoundError, DuplicateKeyError
 
 
@@ -19,11 +21,12 @@ class UserService:
     职责：
     - 创建用户，校验用户名唯一性
     - 查询用户
-    - 删除用户（未来可扩展为级联删除）
+    - 删除用户（后台级联删除会话与消息）
     """
 
     def __init__(self):
         self.repo = UserRepository()
+        self.cascade = CascadeDeleteService()
 
     async def create_user(self, data: UserCreate) -> UserResponse:
         """创建用户"""
@@ -36,6 +39,7 @@ class UserService:
         user_doc = {
             "user_id": str(uuid.uuid4()),
             "username": data.username,
+            "retention_days": data.retention_days,
             "created_at": datetime.utcnow(),
         }
 
@@ -44,6 +48,7 @@ class UserService:
         return UserResponse(
             user_id=user_in_db.user_id,
             username=user_in_db.username,
+            retention_days=user_in_db.retention_days,
             created_at=user_in_db.created_at,
         )
 
@@ -56,6 +61,7 @@ class UserService:
         return UserResponse(
             user_id=user.user_id,
             username=user.username,
+            retention_days=user.retention_days,
             created_at=user.created_at,
         )
 
@@ -69,14 +75,15 @@ class UserService:
             UserResponse(
                 user_id=u.user_id,
                 username=u.username,
+                retention_days=u.retention_days,
                 created_at=u.created_at,
             )
             for u in users
         ]
 
-    async def delete_user(self, user_id: str) -> bool:
-        """删除用户"""
-        result = await self.repo.delete({"user_id": user_id})
-        if not result:
+    async def delete_user(self, user_id: str) -> JobInDB:
+        """删除用户，返回后台级联删除任务"""
+        user = await self.repo.find_one({"user_id": user_id})
+        if not user:
             raise ResourceNotFoundError(f"用户不存在: {user_id}")
-        return True
+        return await self.cascade.schedule_user_deletion(user_id)
@@ -0,0 +1,104 @@
+"""
+[INPUT]: 依赖 backend.repositories.agent 的 AgentRepository，依赖 backend.core.tokenizer 的 get_tokenizer，依赖 backend.core.executor 的 run_in_thread，依赖 backend.core.llm_client 的 get_openai_client，依赖 backend.core.config 的 settings
+[OUTPUT]: 对外提供 Warmup 类与全局 warmup 实例（后台预热 + 就绪状态）
+[POS]: backend/services 的启动预热，被 main.py 的 lifespan 启停，被 /ready 就绪探针读取
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+from ..core.config import settings
+from ..core.executor import run_in_thread
+from ..core.llm_client import get_openai_client
+from ..core.tokenizer import get_tokenizer
+from ..repositories.agent import AgentRepository
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """启动预热与就绪状态
+
+    应用启动（连接存储、补齐索引）后在后台并发执行，完成前 /ready 返回 503：
+    - encoders：按默认模型与已有 Agent 的模型加载 tiktoken 编码器（首次加载需读取 BPE 表）
+    - storage_pool：并发发起轻量查询，预先建立存储连接池中的连接
+    - llm_client：创建共享的 OpenAI 客户端；WARMUP_LLM_CONNECTION 开启时请求一次 models 接口建立连接
+    单步失败只记录错误，不阻止就绪（预热只影响首批请求的延迟）；超时后同样标记为就绪。
+    应用关闭开始时立即退出就绪，滚动发布期间不再接收新流量。
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.ready = False
+        self.steps = {}
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"status": "ready" if self.ready else "starting", "steps": self.steps}
+
+    async def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self._step("encoders", self._encoders),
+                    self._step("storage_pool", self._storage_pool),
+                    self._step("llm_client", self._llm_client),
+                ),
+                timeout=settings.WARMUP_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("预热超时（%ss），按就绪处理: %s", settings.WARMUP_TIMEOUT, self.steps)
+        self.ready = True
+        logger.info("预热完成: 耗时 %.0fms", (time.perf_counter() - start) * 1000)
+
+    async def _step(self, name: str, func: Callable[[], Awaitable[Any]]) -> None:
+        self.steps[name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            detail = await func()
+        except Exception as e:
+            logger.warning("预热步骤失败: %s: %s", name, e)
+            self.steps[name] = {"status": "failed", "error": str(e)}
+            return
+        self.steps[name] = {"status": "done", "ms": round((time.perf_counter() - start) * 1000, 1), **(detail or {})}
+
+    async def _encoders(self) -> Dict[str, Any]:
+        agents = await AgentRepository().find_raw({}, fields=["model"], limit=settings.WARMUP_AGENT_LIMIT)
+        models = {None} | {agent.get("model") for agent in agents}
+        tokenizers = {}
+        for model in models:
+            tokenizer = get_tokenizer(model)
+            tokenizers.setdefault(tokenizer.encoding, tokenizer)
+        # 计数空串即触发编码器加载；在线程池中执行，不阻塞事件循环
+        await asyncio.gather(*(run_in_thread(tokenizer.count, "") for tokenizer in tokenizers.values()))
+        return {"encodings": sorted(tokenizers)}
+
+    async def _storage_pool(self) -> Dict[str, Any]:
+        repo = AgentRepository()
+        count = max(1, settings.WARMUP_STORAGE_CONNECTIONS)
+        await asyncio.gather(*(repo.find_raw({}, fields=["agent_id"], limit=1) for _ in range(count)))
+        return {"queries": count}
+
+    async def _llm_client(self) -> Dict[str, Any]:
+        client = get_openai_client()
+        if settings.WARMUP_LLM_CONNECTION:
+            await client.models.list()
+        return {"connected": settings.WARMUP_LLM_CONNECTION}
+
+
+# 全局预热实例
+warmup = Warmup()
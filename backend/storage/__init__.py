@@ -0,0 +1,59 @@
+"""
+backend.storage - 存储后端模块
+
+Mongo（生产默认）、内存、SQLite 三种实现共享同一接口，由 Settings.STORAGE_BACKEND 选择；
+Mongo 后端按读意图（routing.read_intent / reads_from）把历史、检索、导出的读路由到从节点，
+并在因果一致范围（routing.causal_scope）内保证读到自己的写；其余后端忽略这两者。
+各实现的行为一致性由 `python -m backend.storage.conformance --backend <name>` 校验。
+
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from .base import StorageBackend, StorageCollection
+from .memory import MemoryBackend
+from .routing import CausalClock, causal_scope, current_clock, read_intent, reads_from
+from .sqlite import SQLiteBackend
+
+
+def create_backend(name: str) -> StorageBackend:
+    """按名称创建存储后端（mongo 后端惰性导入 motor）"""
+    from ..core.config import settings
+
+    if name == "mongo":
+        from .mongo import MongoBackend
+
+        options = {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+            "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        }
+        return MongoBackend(
+            settings.MONGODB_URL,
+            settings.MONGODB_DB_NAME,
+            options={key: value for key, value in options.items() if value is not None},
+            read_preferences=settings.MONGODB_READ_PREFERENCES,
+            max_staleness=settings.MONGODB_MAX_STALENESS_SECONDS,
+        )
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(settings.SQLITE_PATH)
+    raise ValueError(f"未知的存储后端: {name}")
+
+
+__all__ = [
+    "StorageBackend",
+    "StorageCollection",
+    "MemoryBackend",
+    "SQLiteBackend",
+    "create_backend",
+    "CausalClock",
+    "causal_scope",
+    "current_clock",
+    "read_intent",
+    "reads_from",
+]
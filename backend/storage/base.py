@@ -0,0 +1,149 @@
+"""
+[INPUT]: 依赖 abc 的抽象基类，依赖 typing 的类型注解
+[OUTPUT]: 对外提供 StorageCollection/StorageBackend 抽象类与 IndexKeys/IndexOptions 类型、normalize_keys 工具函数
+[POS]: backend/storage 的存储接口定义，被 Mongo/内存/SQLite 三种实现继承，被 BaseRepository 消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from abc import ABC, abstractmethod
+
+Query = Dict[str, Any]
+Projection = Optional[Dict[str, int]]
+Sort = Optional[Sequence[Tuple[str, int]]]
+IndexKeys = Union[str, Sequence[Tuple[str, int]]]
+IndexOptions = Dict[str, Any]
+
+
+def normalize_keys(keys: IndexKeys) -> List[Tuple[str, int]]:
+    """"field" → [("field", 1)]，与 pymongo create_index 的写法一致"""
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(field, direction) for field, direction in keys]
+
+
+class StorageCollection(ABC):
+    """单个集合的存储操作
+
+    查询语言为 MongoDB 查询的子集（各实现必须一致，由 conformance 模块校验）：
+    - 字段相等（None 匹配缺失字段），点号路径
+    - $in / $ne / $gt / $gte / $lt / $lte / $exists
+    - 排序为 [(field, 1|-1)]，投影为 {"_id": 0, field: 1, ...}
+    写操作遇到唯一索引冲突时抛出 DuplicateKeyError。
+    """
+
+    name: str  # 全局唯一的命名空间（用于请求内备忘等按集合区分的场景）
+    supports_ttl: bool = False  # 是否真正执行 TTL 过期（仅 Mongo），否则 ttl_seconds 只作声明
+
+    @abstractmethod
+    async def insert_one(self, document: Dict[str, Any]) -> Any:
+        """插入单个文档，返回 _id"""
+
+    @abstractmethod
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        """批量插入（不保证顺序），唯一冲突的文档被跳过，返回成功插入数量"""
+
+    @abstractmethod
+    async def find_one(self, query: Query) -> Optional[Dict[str, Any]]:
+        """查询单个文档"""
+
+    @abstractmethod
+    async def find(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """查询多个文档，limit 为 0 表示不限"""
+
+    @abstractmethod
+    def iterate(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        batch_size: int = 1000,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """按批流式遍历"""
+
+    @abstractmethod
+    async def find_one_and_set(self, query: Query, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """$set 第一个匹配文档，返回更新后的文档"""
+
+    @abstractmethod
+    async def increment(
+        self,
+        query: Query,
+        amounts: Dict[str, float],
+        fields: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """$inc 第一个匹配文档（缺失字段按 0 计，可同时 $set fields），返回更新后的文档
+
+        upsert 为 True 且没有匹配文档时插入新文档（query 的相等条件 + fields + amounts）并返回。
+        """
+
+    @abstractmethod
+    async def update_each(self, updates: List[Tuple[Query, Dict[str, Any]]], upsert: bool = False) -> int:
+        """逐项 $set（每项只更新第一个匹配文档），返回实际修改数量
+
+        upsert 为 True 时没有匹配文档的项插入新文档（query 的相等条件 + fields），计入返回数量。
+        """
+
+    @abstractmethod
+    async def delete_one(self, query: Query) -> int:
+        """删除第一个匹配文档，返回删除数量"""
+
+    @abstractmethod
+    async def delete_many(self, query: Query, limit: int = 0) -> int:
+        """删除匹配文档，limit > 0 时至多删除 limit 条"""
+
+    @abstractmethod
+    async def count(self, query: Query, limit: int = 0) -> int:
+        """统计匹配文档数量，limit > 0 时数到 limit 即停止"""
+
+    @abstractmethod
+    async def create_index(
+        self,
+        keys: IndexKeys,
+        unique: bool = False,
+        sparse: bool = False,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        """创建索引（幂等）；ttl_seconds 仅 Mongo 后端生效，其余后端依赖保留策略任务清理"""
+
+    @abstractmethod
+    async def index_info(self) -> List[Tuple[List[Tuple[str, int]], IndexOptions]]:
+        """已有索引（不含主键）的键与选项，选项为 {"unique", "sparse", "ttl_seconds"}
+
+        不支持 TTL 的后端 ttl_seconds 恒为 None。
+        """
+
+    @abstractmethod
+    async def drop_index(self, keys: IndexKeys) -> None:
+        """删除键完全一致的索引（不存在时忽略）"""
+
+    async def list_indexes(self) -> List[List[Tuple[str, int]]]:
+        """已有索引的键（不含主键），每个索引为 [(字段, 方向), ...]"""
+        return [keys for keys, _ in await self.index_info()]
+
+
+class StorageBackend(ABC):
+    """存储后端：管理连接并提供集合"""
+
+    name: str
+
+    @abstractmethod
+    async def connect(self) -> None:
+        """建立连接（应用启动时调用）"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """释放连接（应用关闭时调用）"""
+
+    @abstractmethod
+    def collection(self, name: str) -> StorageCollection:
+        """获取集合（不存在时按需创建）"""
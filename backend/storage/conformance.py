@@ -0,0 +1,383 @@
+"""
+[INPUT]: 依赖 backend.storage 的 StorageBackend 与各实现，依赖 backend.storage.routing 的 causal_scope/read_intent，依赖 backend.core.exceptions 的 DuplicateKeyError
+[OUTPUT]: 对外提供 run_conformance 协程函数与命令行入口（逐项校验存储后端的行为约定）
+[POS]: backend/storage 的一致性校验，新增或修改后端实现后运行
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m backend.storage.conformance --backend memory
+    python -m backend.storage.conformance --backend sqlite --sqlite-path /tmp/conformance.db
+    python -m backend.storage.conformance --backend mongo --mongo-url mongodb://localhost:27017
+    python -m backend.storage.conformance --backend mongo \
+        --mongo-url "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0"
+
+每项检查使用独立的新集合；mongo 后端写入 --db 指定的库（结束后删除）。
+mongo 后端的 "history" 读意图按 --read-preference 路由，连接副本集时 causal_read_your_writes 校验从节点读到自己的写。
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import uuid
+from .base import StorageBackend, StorageCollection
+from .routing import causal_scope, read_intent
+from ..core.exceptions import DuplicateKeyError
+
+Check = Callable[[StorageCollection], Awaitable[None]]
+_CHECKS: List[Check] = []
+
+# Mongo 日期精度为毫秒，样例数据统一使用毫秒精度
+_T0 = datetime(2026, 1, 1, 8, 0, 0, 123000)
+
+
+def check(func: Check) -> Check:
+    _CHECKS.append(func)
+    return func
+
+
+def _strip(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in doc.items() if k != "_id"} for doc in docs]
+
+
+async def _seed(coll: StorageCollection, count: int = 10) -> None:
+    await coll.insert_many(
+        [
+            {
+                "key": f"k{i:02d}",
+                "group": "odd" if i % 2 else "even",
+                "n": i,
+                "at": _T0 + timedelta(minutes=i),
+                **({"tag": "t"} if i % 3 == 0 else {}),
+            }
+            for i in range(count)
+        ]
+    )
+
+
+async def _keys(coll: StorageCollection, query: Dict[str, Any], **kwargs: Any) -> List[str]:
+    return [doc["key"] for doc in await coll.find(query, {"_id": 0, "key": 1}, **kwargs)]
+
+
+# ==================== 检查项 ====================
+@check
+async def roundtrip(coll: StorageCollection) -> None:
+    doc = {
+        "s": "初醒 hello",
+        "i": 42,
+        "f": 1.5,
+        "b": True,
+        "none": None,
+        "at": _T0,
+        "nested": {"a": 1, "list": [1, "x"]},
+    }
+    doc_id = await coll.insert_one(dict(doc))
+    assert doc_id is not None
+    found = await coll.find_one({"s": "初醒 hello"})
+    assert found is not None and found["_id"] == doc_id
+    assert _strip([found]) == [doc], found
+
+
+@check
+async def returned_documents_are_copies(coll: StorageCollection) -> None:
+    await coll.insert_one({"key": "a", "nested": {"x": 1}})
+    found = await coll.find_one({"key": "a"})
+    found["nested"]["x"] = 2
+    found["key"] = "b"
+    assert (await coll.find_one({"key": "a"}))["nested"] == {"x": 1}
+
+
+@check
+async def unique_index(coll: StorageCollection) -> None:
+    await coll.create_index("key", unique=True)
+    await coll.create_index("key", unique=True)  # 幂等
+    await coll.insert_one({"key": "a"})
+    try:
+        await coll.insert_one({"key": "a"})
+    except DuplicateKeyError:
+        pass
+    else:
+        raise AssertionError("重复键未抛出 DuplicateKeyError")
+    inserted = await coll.insert_many([{"key": "a"}, {"key": "b"}, {"key": "c"}])
+    assert inserted == 2, inserted
+    assert await coll.count({}) == 3
+
+
+@check
+async def unique_sparse_index(coll: StorageCollection) -> None:
+    await coll.create_index("email", unique=True, sparse=True)
+    await coll.insert_one({"name": "a"})
+    await coll.insert_one({"name": "b"})
+    await coll.insert_one({"name": "c", "email": "c@x"})
+    assert await coll.count({}) == 3
+
+
+@check
+async def list_indexes(coll: StorageCollection) -> None:
+    assert await coll.list_indexes() == []
+    await coll.create_index("key", unique=True)
+    await coll.create_index([("owner.id", 1), ("created_at", -1)], sparse=True)
+    indexes = sorted(await coll.list_indexes())
+    assert indexes == [[("key", 1)], [("owner.id", 1), ("created_at", -1)]], indexes
+
+
+@check
+async def index_options(coll: StorageCollection) -> None:
+    await coll.create_index("key", unique=True)
+    await coll.create_index([("owner.id", 1), ("created_at", -1)], sparse=True)
+    info = {tuple(keys): options for keys, options in await coll.index_info()}
+    assert info[("key", 1),] == {"unique": True, "sparse": False, "ttl_seconds": None}, info
+    assert info[("owner.id", 1), ("created_at", -1)] == {"unique": False, "sparse": True, "ttl_seconds": None}, info
+    # 删除后按新选项重建（ensure_indexes 处理选项变化的方式）
+    await coll.insert_one({"key": "a"})
+    await coll.drop_index("key")
+    await coll.drop_index("missing")
+    await coll.create_index("key")
+    await coll.insert_one({"key": "a"})
+    info = {tuple(keys): options for keys, options in await coll.index_info()}
+    assert info[("key", 1),]["unique"] is False, info
+
+
+@check
+async def unique_index_on_update(coll: StorageCollection) -> None:
+    await coll.create_index("key", unique=True)
+    await coll.insert_many([{"key": "a"}, {"key": "b"}])
+    try:
+        await coll.find_one_and_set({"key": "b"}, {"key": "a"})
+    except DuplicateKeyError:
+        pass
+    else:
+        raise AssertionError("更新导致重复键未抛出 DuplicateKeyError")
+    assert await coll.count({"key": "b"}) == 1
+
+
+@check
+async def equality_and_missing(coll: StorageCollection) -> None:
+    await _seed(coll)
+    assert await _keys(coll, {"group": "odd", "n": 3}) == ["k03"]
+    assert await coll.count({"tag": None}) == 6  # None 匹配缺失字段
+    assert await coll.count({"tag": "t"}) == 4
+    assert await coll.count({"tag": {"$exists": True}}) == 4
+    assert await coll.count({"tag": {"$exists": False}}) == 6
+
+
+@check
+async def operators(coll: StorageCollection) -> None:
+    await _seed(coll)
+    assert await _keys(coll, {"n": {"$in": [1, 5, 99]}}, sort=[("n", 1)]) == ["k01", "k05"]
+    assert await coll.count({"n": {"$in": []}}) == 0
+    assert await coll.count({"tag": {"$in": ["t", None]}}) == 10
+    assert await coll.count({"tag": {"$ne": "t"}}) == 6  # $ne 匹配缺失字段
+    assert await coll.count({"n": {"$gt": 7}}) == 2
+    assert await coll.count({"n": {"$gte": 7}}) == 3
+    assert await coll.count({"n": {"$lt": 2}}) == 2
+    assert await coll.count({"n": {"$lte": 2}}) == 3
+    assert await coll.count({"n": {"$gt": 2, "$lt": 5}}) == 2
+    assert await coll.count({"key": {"$gt": "k07"}}) == 2
+    cutoff = _T0 + timedelta(minutes=4)
+    assert await coll.count({"at": {"$lt": cutoff}}) == 4
+    assert await coll.count({"at": {"$lte": cutoff}}) == 5
+    # 范围比较不跨类型：字符串条件不匹配数字字段
+    assert await coll.count({"n": {"$gt": "a"}}) == 0
+
+
+@check
+async def sort_skip_limit(coll: StorageCollection) -> None:
+    await _seed(coll)
+    assert await _keys(coll, {}, sort=[("n", -1)], limit=3) == ["k09", "k08", "k07"]
+    assert await _keys(coll, {}, sort=[("n", 1)], skip=8) == ["k08", "k09"]
+    assert await _keys(coll, {}, sort=[("group", 1), ("n", -1)], limit=2) == ["k08", "k06"]
+    assert await _keys(coll, {}, sort=[("at", -1)], skip=1, limit=1) == ["k08"]
+
+
+@check
+async def sort_uses_compound_index(coll: StorageCollection) -> None:
+    await coll.create_index([("group", 1), ("at", -1)])
+    await _seed(coll)
+    assert await _keys(coll, {"group": "even"}, sort=[("at", -1)], limit=2) == ["k08", "k06"]
+    assert await _keys(coll, {"group": {"$in": ["odd"]}}, sort=[("at", 1)], limit=2) == ["k01", "k03"]
+
+
+@check
+async def projection(coll: StorageCollection) -> None:
+    await coll.insert_one({"a": 1, "b": 2, "nested": {"x": 1, "y": 2}})
+    assert await coll.find({}, {"_id": 0, "a": 1}) == [{"a": 1}]
+    assert await coll.find({}, {"_id": 0, "nested.x": 1}) == [{"nested": {"x": 1}}]
+    assert await coll.find({}, {"_id": 0, "missing": 1}) == [{}]
+    only_id = await coll.find({}, {"_id": 1})
+    assert list(only_id[0]) == ["_id"], only_id
+    without_id = await coll.find({}, {"_id": 0})
+    assert without_id == [{"a": 1, "b": 2, "nested": {"x": 1, "y": 2}}]
+
+
+@check
+async def find_one_and_set(coll: StorageCollection) -> None:
+    await coll.insert_one({"key": "a", "n": 1, "progress": {"done": 0}})
+    updated = await coll.find_one_and_set({"key": "a"}, {"n": 2, "progress.done": 5, "new": _T0})
+    assert updated["n"] == 2 and updated["progress"] == {"done": 5} and updated["new"] == _T0
+    assert (await coll.find_one({"key": "a"}))["n"] == 2
+    assert await coll.find_one_and_set({"key": "missing"}, {"n": 3}) is None
+
+
+@check
+async def increment(coll: StorageCollection) -> None:
+    await coll.insert_many([{"key": "a", "n": 1}, {"key": "b"}])
+    updated = await coll.increment({"key": "a"}, {"n": 2, "stats.hits": 1}, {"at": _T0})
+    assert updated["n"] == 3 and updated["stats"] == {"hits": 1} and updated["at"] == _T0, updated
+    assert (await coll.increment({"key": "b"}, {"n": -1}))["n"] == -1  # 缺失字段按 0 计
+    assert (await coll.find_one({"key": "a"}))["n"] == 3
+    assert await coll.increment({"key": "missing"}, {"n": 1}) is None
+
+
+@check
+async def increment_upsert(coll: StorageCollection) -> None:
+    await coll.create_index([("key", 1), ("day", 1)], unique=True)
+    query = {"key": "a", "day": _T0, "n": {"$gte": 0}}
+    created = await coll.increment(query, {"n": 2, "stats.hits": 1}, {"at": _T0}, upsert=True)
+    assert {k: v for k, v in created.items() if k != "_id"} == {
+        "key": "a", "day": _T0, "n": 2, "stats": {"hits": 1}, "at": _T0
+    }, created
+    await asyncio.gather(*(coll.increment({"key": "a", "day": _T0}, {"n": 1}, upsert=True) for _ in range(5)))
+    assert [doc["n"] for doc in await coll.find({"key": "a"})] == [7]
+    await asyncio.gather(*(coll.increment({"key": "b", "day": _T0}, {"n": 1}, upsert=True) for _ in range(5)))
+    assert await coll.count({}) == 2 and (await coll.find_one({"key": "b"}))["n"] == 5
+
+
+@check
+async def update_each(coll: StorageCollection) -> None:
+    await _seed(coll, 4)
+    modified = await coll.update_each(
+        [
+            ({"key": "k00"}, {"n": 100}),
+            ({"key": "k01"}, {"n": 1}),  # 值未变化，不计入修改数
+            ({"key": "missing"}, {"n": 5}),
+            ({"group": "even"}, {"flag": True}),  # 每项只更新第一个匹配文档
+        ]
+    )
+    assert modified == 2, modified
+    assert (await coll.find_one({"key": "k00"}))["n"] == 100
+    assert await coll.count({"flag": True}) == 1
+    assert await coll.update_each([]) == 0
+
+
+@check
+async def update_each_upsert(coll: StorageCollection) -> None:
+    await coll.create_index([("key", 1), ("day", 1)], unique=True)
+    await coll.insert_one({"key": "a", "day": _T0, "n": 1, "gen": "old"})
+    modified = await coll.update_each(
+        [
+            ({"key": "a", "day": _T0}, {"n": 5, "gen": "new"}),
+            ({"key": "b", "day": _T0}, {"n": 2, "gen": "new"}),
+        ],
+        upsert=True,
+    )
+    assert modified == 2, modified
+    docs = await coll.find({}, {"_id": 0}, sort=[("key", 1)])
+    assert docs == [
+        {"key": "a", "day": _T0, "n": 5, "gen": "new"},
+        {"key": "b", "day": _T0, "n": 2, "gen": "new"},
+    ], docs
+
+
+@check
+async def deletes(coll: StorageCollection) -> None:
+    await _seed(coll)
+    assert await coll.delete_one({"group": "odd"}) == 1
+    assert await coll.delete_one({"key": "missing"}) == 0
+    assert await coll.count({"group": "odd"}) == 4
+    assert await coll.delete_many({"group": "even"}, limit=3) == 3
+    assert await coll.count({"group": "even"}) == 2
+    assert await coll.delete_many({"group": {"$in": ["odd", "even"]}}) == 6
+    assert await coll.count({}) == 0
+
+
+@check
+async def count_limit(coll: StorageCollection) -> None:
+    await _seed(coll)
+    assert await coll.count({}) == 10
+    assert await coll.count({}, limit=3) == 3
+    assert await coll.count({"group": "odd"}, limit=100) == 5
+
+
+@check
+async def iterate(coll: StorageCollection) -> None:
+    await _seed(coll, 25)
+    keys = [doc["key"] async for doc in coll.iterate({}, {"_id": 0}, sort=[("n", -1)], batch_size=4)]
+    assert keys == [f"k{i:02d}" for i in range(24, -1, -1)]
+    limited = [doc async for doc in coll.iterate({"group": "odd"}, {"_id": 0}, sort=[("n", 1)], batch_size=2, limit=3)]
+    assert [doc["n"] for doc in limited] == [1, 3, 5] and "_id" not in limited[0]
+
+
+@check
+async def causal_read_your_writes(coll: StorageCollection) -> None:
+    # 因果一致范围内路由到从节点的读能读到范围内此前的写；令牌带到新范围后同样成立
+    with causal_scope() as clock:
+        await coll.insert_one({"key": "a", "n": 1})
+        with read_intent("history"):
+            assert (await coll.find_one({"key": "a"}))["n"] == 1
+        await coll.find_one_and_set({"key": "a"}, {"n": 2})
+        with read_intent("history"):
+            assert [doc["n"] for doc in await coll.find({"key": "a"})] == [2]
+        token = clock.token()
+    with causal_scope(token), read_intent("history"):
+        assert await coll.count({"key": "a", "n": 2}) == 1
+
+
+# ==================== 运行 ====================
+async def run_conformance(backend: StorageBackend) -> Dict[str, Any]:
+    """逐项运行检查（每项使用新集合），返回通过数与失败详情"""
+    failed: List[Dict[str, str]] = []
+    for func in _CHECKS:
+        coll = backend.collection(f"conformance_{func.__name__}_{uuid.uuid4().hex[:8]}")
+        try:
+            await func(coll)
+        except Exception as e:
+            failed.append({"check": func.__name__, "error": f"{type(e).__name__}: {e}"})
+    return {"backend": backend.name, "passed": len(_CHECKS) - len(failed), "failed": failed}
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.backend == "mongo":
+        from .mongo import MongoBackend
+
+        backend: StorageBackend = MongoBackend(
+            args.mongo_url, args.db, read_preferences={"history": args.read_preference}
+        )
+    elif args.backend == "sqlite":
+        from .sqlite import SQLiteBackend
+
+        backend = SQLiteBackend(args.sqlite_path or os.path.join(tempfile.mkdtemp(), "conformance.db"))
+    else:
+        from .memory import MemoryBackend
+
+        backend = MemoryBackend()
+
+    await backend.connect()
+    try:
+        return await run_conformance(backend)
+    finally:
+        if args.backend == "mongo":
+            await backend.client.drop_database(args.db)
+        await backend.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="存储后端一致性校验")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "mongo"], default="memory")
+    parser.add_argument("--sqlite-path", default=None, help="默认使用临时目录")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="storage_conformance")
+    parser.add_argument("--read-preference", default="secondaryPreferred", help="mongo 后端 history 读意图的读偏好")
+    args = parser.parse_args()
+
+    result = asyncio.run(_main(args))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+[INPUT]: 依赖 backend.storage.base 的 StorageCollection/StorageBackend，依赖 backend.storage.query 的查询求值工具，依赖 bisect 的有序插入
+[OUTPUT]: 对外提供 MemoryBackend/MemoryCollection 类（进程内字典 + 有序索引）
+[POS]: backend/storage 的内存实现，用于无 MongoDB 时运行 API、基准与 conformance 校验
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import bisect
+import itertools
+from .base import StorageBackend, StorageCollection, Query, Projection, Sort, IndexKeys, IndexOptions, normalize_keys
+from .query import MAX_KEY, apply_projection, get_path, matches, set_path, sort_key, upsert_document
+from ..core.exceptions import DuplicateKeyError
+
+_NO_CONDITION = object()
+
+
+def _clone(value: Any) -> Any:
+    """复制文档（嵌套 dict/list 逐层复制，标量共享），调用方修改返回值不影响存储"""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+class _SortedIndex:
+    """有序索引：(键元组, _id) 的有序列表，按首字段前缀二分定位"""
+
+    def __init__(self, keys: List[Tuple[str, int]], unique: bool, sparse: bool):
+        self.fields = [field for field, _ in keys]
+        self.unique = unique
+        self.sparse = sparse
+        self.entries: List[Tuple[Tuple, int]] = []
+
+    def key(self, doc: Dict[str, Any]) -> Optional[Tuple]:
+        values = [get_path(doc, field) for field in self.fields]
+        if self.sparse and all(v is None for v in values):
+            return None
+        return tuple(sort_key(v) for v in values)
+
+    def check(self, doc: Dict[str, Any], doc_id: int) -> None:
+        """唯一索引冲突检查（同一文档更新自身不算冲突）"""
+        key = self.key(doc)
+        if not self.unique or key is None:
+            return
+        pos = bisect.bisect_left(self.entries, (key,))
+        if pos < len(self.entries) and self.entries[pos][0] == key and self.entries[pos][1] != doc_id:
+            raise DuplicateKeyError(f"唯一索引冲突: {self.fields}={key}")
+
+    def add(self, doc: Dict[str, Any], doc_id: int) -> None:
+        key = self.key(doc)
+        if key is not None:
+            bisect.insort(self.entries, (key, doc_id))
+
+    def remove(self, doc: Dict[str, Any], doc_id: int) -> None:
+        key = self.key(doc)
+        if key is None:
+            return
+        pos = bisect.bisect_left(self.entries, (key, doc_id))
+        if pos < len(self.entries) and self.entries[pos] == (key, doc_id):
+            del self.entries[pos]
+
+    def lookup(self, values: Iterable[Any]) -> List[int]:
+        """首字段取值为 values 之一的文档 _id（按索引顺序）"""
+        ids: List[int] = []
+        for value in values:
+            prefix = sort_key(value)
+            lo = bisect.bisect_left(self.entries, ((prefix,),))
+            hi = bisect.bisect_left(self.entries, ((prefix, MAX_KEY),))
+            ids.extend(doc_id for _, doc_id in self.entries[lo:hi])
+        return ids
+
+
+class MemoryCollection(StorageCollection):
+    """字典存储 + 有序索引
+
+    查询时若某个索引的首字段在条件中为相等或 $in，先用该索引二分取候选，
+    再对候选逐条求值；否则全表扫描。唯一索引在写入前检查。
+    """
+
+    def __init__(self, name: str):
+        self.name = f"memory.{name}"
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._indexes: Dict[Tuple, _SortedIndex] = {}
+
+    # ==================== 内部工具 ====================
+    def _candidates(self, query: Query) -> Iterable[Tuple[int, Dict[str, Any]]]:
+        best: Optional[List[int]] = None
+        for index in self._indexes.values():
+            condition = query.get(index.fields[0], _NO_CONDITION)
+            if condition is _NO_CONDITION:
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif isinstance(condition, dict) and any(str(k).startswith("$") for k in condition):
+                continue
+            else:
+                values = [condition]
+            ids = index.lookup(values)
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return list(self._docs.items())
+        return [(doc_id, self._docs[doc_id]) for doc_id in sorted(set(best))]
+
+    def _select(self, query: Query, sort: Sort = None, skip: int = 0, limit: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        selected = [(doc_id, doc) for doc_id, doc in self._candidates(query) if matches(doc, query)]
+        if sort:
+            for field, direction in reversed(list(sort)):
+                selected.sort(key=lambda item: sort_key(get_path(item[1], field)), reverse=direction < 0)
+        if skip:
+            selected = selected[skip:]
+        if limit:
+            selected = selected[:limit]
+        return selected
+
+    def _insert(self, document: Dict[str, Any]) -> int:
+        doc_id = document.get("_id") or next(self._ids)
+        if doc_id in self._docs:
+            raise DuplicateKeyError(f"_id 重复: {doc_id}")
+        stored = _clone(document)
+        stored["_id"] = doc_id
+        for index in self._indexes.values():
+            index.check(stored, doc_id)
+        for index in self._indexes.values():
+            index.add(stored, doc_id)
+        self._docs[doc_id] = stored
+        return doc_id
+
+    def _set(self, doc_id: int, fields: Dict[str, Any]) -> bool:
+        old = self._docs[doc_id]
+        new = _clone(old)
+        for field, value in fields.items():
+            set_path(new, field, _clone(value))
+        if new == old:
+            return False
+        for index in self._indexes.values():
+            index.check(new, doc_id)
+        for index in self._indexes.values():
+            index.remove(old, doc_id)
+            index.add(new, doc_id)
+        self._docs[doc_id] = new
+        return True
+
+    def _remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id)
+        for index in self._indexes.values():
+            index.remove(doc, doc_id)
+
+    # ==================== StorageCollection ====================
+    async def insert_one(self, document: Dict[str, Any]) -> Any:
+        return self._insert(document)
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        inserted = 0
+        for document in documents:
+            try:
+                self._insert(document)
+                inserted += 1
+            except DuplicateKeyError:
+                continue
+        return inserted
+
+    async def find_one(self, query: Query) -> Optional[Dict[str, Any]]:
+        selected = self._select(query, limit=1)
+        return _clone(selected[0][1]) if selected else None
+
+    async def find(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        return [
+            apply_projection(_clone(doc), projection)
+            for _, doc in self._select(query, sort, skip, limit)
+        ]
+
+    async def iterate(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        batch_size: int = 1000,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        for _, doc in self._select(query, sort, 0, limit):
+            yield apply_projection(_clone(doc), projection)
+
+    async def find_one_and_set(self, query: Query, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        selected = self._select(query, limit=1)
+        if not selected:
+            return None
+        doc_id = selected[0][0]
+        self._set(doc_id, fields)
+        return _clone(self._docs[doc_id])
+
+    async def increment(
+        self,
+        query: Query,
+        amounts: Dict[str, float],
+        fields: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        selected = self._select(query, limit=1)
+        if not selected:
+            if not upsert:
+                return None
+            doc_id = self._insert(upsert_document(query, fields or {}, amounts))
+            return _clone(self._docs[doc_id])
+        doc_id, doc = selected[0]
+        changes = dict(fields or {})
+        for field, amount in amounts.items():
+            changes[field] = (get_path(doc, field) or 0) + amount
+        self._set(doc_id, changes)
+        return _clone(self._docs[doc_id])
+
+    async def update_each(self, updates: List[Tuple[Query, Dict[str, Any]]], upsert: bool = False) -> int:
+        modified = 0
+        for query, fields in updates:
+            selected = self._select(query, limit=1)
+            if selected:
+                modified += self._set(selected[0][0], fields)
+            elif upsert:
+                self._insert(upsert_document(query, fields, {}))
+                modified += 1
+        return modified
+
+    async def delete_one(self, query: Query) -> int:
+        return await self.delete_many(query, limit=1)
+
+    async def delete_many(self, query: Query, limit: int = 0) -> int:
+        selected = self._select(query, limit=limit)
+        for doc_id, _ in selected:
+            self._remove(doc_id)
+        return len(selected)
+
+    async def count(self, query: Query, limit: int = 0) -> int:
+        return len(self._select(query, limit=limit))
+
+    async def create_index(
+        self,
+        keys: IndexKeys,
+        unique: bool = False,
+        sparse: bool = False,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        spec = tuple(normalize_keys(keys))
+        if spec in self._indexes:
+            return
+        index = _SortedIndex(list(spec), unique, sparse)
+        for doc_id, doc in self._docs.items():
+            index.check(doc, doc_id)
+            index.add(doc, doc_id)
+        self._indexes[spec] = index
+
+    async def index_info(self) -> List[Tuple[List[Tuple[str, int]], IndexOptions]]:
+        return [
+            (list(spec), {"unique": index.unique, "sparse": index.sparse, "ttl_seconds": None})
+            for spec, index in self._indexes.items()
+        ]
+
+    async def drop_index(self, keys: IndexKeys) -> None:
+        self._indexes.pop(tuple(normalize_keys(keys)), None)
+
+
+class MemoryBackend(StorageBackend):
+    """进程内存储：数据随进程退出丢失，适合测试、基准与单机演示"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    async def connect(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    def collection(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
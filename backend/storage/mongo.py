@@ -0,0 +1,306 @@
+"""
+[INPUT]: 依赖 motor.motor_asyncio 的 AsyncIOMotorClient/AsyncIOMotorCollection/会话，依赖 pymongo 的 UpdateOne/读偏好/错误类型，依赖 backend.storage.base 的 StorageCollection/StorageBackend，依赖 backend.storage.routing 的读意图与因果时钟
+[OUTPUT]: 对外提供 MongoBackend/MongoCollection 类（按读意图路由到从节点、因果一致会话）
+[POS]: backend/storage 的 MongoDB 实现（生产默认后端）
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import logging
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorClientSession,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ReturnDocument, UpdateOne
+from pymongo import errors as mongo_errors
+from pymongo.read_preferences import Nearest, PrimaryPreferred, Secondary, SecondaryPreferred
+from .base import StorageBackend, StorageCollection, Query, Projection, Sort, IndexKeys, IndexOptions, normalize_keys
+from .routing import current_clock, current_read_intent
+from ..core.exceptions import DuplicateKeyError, RepositoryError
+
+logger = logging.getLogger(__name__)
+
+_READ_PREFERENCES = {
+    "primary": None,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+class MongoCollection(StorageCollection):
+    """motor 集合的薄封装
+
+    - 读：按当前读意图（read_intent）选择读偏好，未标注时走主节点
+    - 因果一致范围内：每次操作使用独立的因果一致会话（pymongo 会话不能并发使用），
+      开始前推进到范围的 CausalClock，结束后把会话观察到的时间并回
+    """
+
+    supports_ttl = True
+
+    def __init__(self, collection: AsyncIOMotorCollection, backend: "MongoBackend"):
+        self.collection = collection
+        self.backend = backend
+        self.name = collection.full_name
+        self._readers: Dict[str, AsyncIOMotorCollection] = {}
+
+    def _reader(self) -> AsyncIOMotorCollection:
+        intent = current_read_intent()
+        if intent is None:
+            return self.collection
+        reader = self._readers.get(intent)
+        if reader is None:
+            preference = self.backend.read_preference(intent)
+            reader = self.collection.with_options(read_preference=preference) if preference else self.collection
+            self._readers[intent] = reader
+        return reader
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+        clock = current_clock()
+        if clock is None:
+            yield None
+            return
+        async with await self.backend.client.start_session(causal_consistency=True) as session:
+            if clock.cluster_time is not None:
+                session.advance_cluster_time(clock.cluster_time)
+            if clock.operation_time is not None:
+                session.advance_operation_time(clock.operation_time)
+            try:
+                yield session
+            finally:
+                clock.advance(session.cluster_time, session.operation_time)
+
+    def _cursor(self, query: Query, projection: Projection, sort: Sort, skip: int, limit: int, session: Any):
+        cursor = self._reader().find(query, projection, session=session)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        return cursor
+
+    async def insert_one(self, document: Dict[str, Any]) -> Any:
+        async with self._session() as session:
+            try:
+                result = await self.collection.insert_one(document, session=session)
+            except mongo_errors.DuplicateKeyError as e:
+                raise DuplicateKeyError(f"唯一索引冲突: {self.name}: {e}")
+        return result.inserted_id
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        async with self._session() as session:
+            try:
+                result = await self.collection.insert_many(documents, ordered=False, session=session)
+                return len(result.inserted_ids)
+            except mongo_errors.BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != 11000 for err in errors):
+                    raise RepositoryError(f"批量写入失败: {errors[:3]}")
+                return e.details.get("nInserted", 0)
+
+    async def find_one(self, query: Query) -> Optional[Dict[str, Any]]:
+        async with self._session() as session:
+            return await self._reader().find_one(query, session=session)
+
+    async def find(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        async with self._session() as session:
+            cursor = self._cursor(query, projection, sort, skip, limit, session)
+            return await cursor.to_list(length=limit or None)
+
+    async def iterate(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        batch_size: int = 1000,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with self._session() as session:
+            cursor = self._cursor(query, projection, sort, 0, limit, session).batch_size(batch_size)
+            async for doc in cursor:
+                yield doc
+
+    async def find_one_and_set(self, query: Query, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with self._session() as session:
+            try:
+                return await self.collection.find_one_and_update(
+                    query, {"$set": fields}, return_document=ReturnDocument.AFTER, session=session
+                )
+            except mongo_errors.DuplicateKeyError as e:
+                raise DuplicateKeyError(f"唯一索引冲突: {self.name}: {e}")
+
+    async def increment(
+        self,
+        query: Query,
+        amounts: Dict[str, float],
+        fields: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        update: Dict[str, Any] = {"$inc": amounts}
+        if fields:
+            update["$set"] = fields
+        async with self._session() as session:
+            try:
+                return await self.collection.find_one_and_update(
+                    query, update, upsert=upsert, return_document=ReturnDocument.AFTER, session=session
+                )
+            except mongo_errors.DuplicateKeyError as e:
+                if not upsert:
+                    raise DuplicateKeyError(f"唯一索引冲突: {self.name}: {e}")
+                # 并发 upsert 同时插入：唯一索引只放行一个，落败方重试即命中已插入的文档
+                return await self.collection.find_one_and_update(
+                    query, update, return_document=ReturnDocument.AFTER, session=session
+                )
+
+    async def update_each(self, updates: List[Tuple[Query, Dict[str, Any]]], upsert: bool = False) -> int:
+        async with self._session() as session:
+            result = await self.collection.bulk_write(
+                [UpdateOne(query, {"$set": fields}, upsert=upsert) for query, fields in updates],
+                ordered=False,
+                session=session,
+            )
+        return result.modified_count + result.upserted_count
+
+    async def delete_one(self, query: Query) -> int:
+        async with self._session() as session:
+            result = await self.collection.delete_one(query, session=session)
+        return result.deleted_count
+
+    async def delete_many(self, query: Query, limit: int = 0) -> int:
+        async with self._session() as session:
+            if limit:
+                # delete_many 不支持 limit：先按 _id 取出至多 limit 条再删除
+                cursor = self.collection.find(query, {"_id": 1}, session=session).limit(limit)
+                ids = [doc["_id"] async for doc in cursor]
+                if not ids:
+                    return 0
+                query = {"_id": {"$in": ids}}
+            result = await self.collection.delete_many(query, session=session)
+        return result.deleted_count
+
+    async def count(self, query: Query, limit: int = 0) -> int:
+        options = {"limit": limit} if limit else {}
+        async with self._session() as session:
+            return await self._reader().count_documents(query, session=session, **options)
+
+    async def create_index(
+        self,
+        keys: IndexKeys,
+        unique: bool = False,
+        sparse: bool = False,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        options: Dict[str, Any] = {}
+        if unique:
+            options["unique"] = True
+        if sparse:
+            options["sparse"] = True
+        if ttl_seconds is not None:
+            options["expireAfterSeconds"] = ttl_seconds
+        await self.collection.create_index(normalize_keys(keys), **options)
+
+    async def index_info(self) -> List[Tuple[List[Tuple[str, int]], IndexOptions]]:
+        info = await self.collection.index_information()
+        return [
+            (
+                [(field, int(direction)) for field, direction in spec["key"]],
+                {
+                    "unique": bool(spec.get("unique", False)),
+                    "sparse": bool(spec.get("sparse", False)),
+                    "ttl_seconds": spec.get("expireAfterSeconds"),
+                },
+            )
+            for name, spec in info.items()
+            if name != "_id_"
+        ]
+
+    async def drop_index(self, keys: IndexKeys) -> None:
+        wanted = normalize_keys(keys)
+        info = await self.collection.index_information()
+        for name, spec in info.items():
+            if name != "_id_" and [(field, int(direction)) for field, direction in spec["key"]] == wanted:
+                try:
+                    await self.collection.drop_index(name)
+                except mongo_errors.OperationFailure as e:
+                    if e.code != 27:  # IndexNotFound：其他 worker 已删除
+                        raise
+
+
+class MongoBackend(StorageBackend):
+    """MongoDB 连接池
+
+    options 为 AsyncIOMotorClient 的连接池 / 超时参数；read_preferences 为读意图 → 读偏好模式
+    （primary / primaryPreferred / secondary / secondaryPreferred / nearest），未列出的意图走主节点。
+    """
+
+    name = "mongo"
+
+    def __init__(
+        self,
+        url: str,
+        db_name: str,
+        options: Optional[Dict[str, Any]] = None,
+        read_preferences: Optional[Dict[str, str]] = None,
+        max_staleness: int = -1,
+    ):
+        self.url = url
+        self.db_name = db_name
+        self.options = options or {}
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.database: Optional[AsyncIOMotorDatabase] = None
+        self._collections: Dict[str, MongoCollection] = {}
+        self._preferences: Dict[str, Any] = {}
+        for intent, mode in (read_preferences or {}).items():
+            if mode not in _READ_PREFERENCES:
+                raise ValueError(f"未知的读偏好: {intent}={mode}")
+            preference = _READ_PREFERENCES[mode]
+            if preference is not None:
+                self._preferences[intent] = preference(max_staleness=max_staleness)
+
+    def _ensure_client(self) -> None:
+        # motor 客户端惰性连接，创建时不发起网络请求
+        if self.client is None:
+            self.client = AsyncIOMotorClient(self.url, **self.options)
+            self.database = self.client[self.db_name]
+
+    def read_preference(self, intent: str) -> Optional[Any]:
+        """读意图对应的读偏好，None 表示走主节点（集合默认）"""
+        return self._preferences.get(intent)
+
+    async def connect(self) -> None:
+        logger.info("正在连接 MongoDB: %s", self.url)
+        self._ensure_client()
+        try:
+            await self.client.admin.command("ping")
+            logger.info("MongoDB 连接成功")
+        except Exception as e:
+            logger.error("MongoDB 连接失败: %s", e)
+            raise
+
+    async def close(self) -> None:
+        if self.client:
+            self.client.close()
+            self.client = None
+            self.database = None
+            self._collections.clear()
+            logger.info("MongoDB 连接已关闭")
+
+    def collection(self, name: str) -> MongoCollection:
+        self._ensure_client()
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = MongoCollection(self.database[name], self)
+        return coll
@@ -0,0 +1,141 @@
+"""
+[INPUT]: 依赖 datetime 标准库
+[OUTPUT]: 对外提供 get_path/set_path/matches/sort_key/apply_projection/check_field/upsert_document 工具函数
+[POS]: backend/storage 的查询求值工具，被内存后端（全部求值）与 SQLite 后端（投影与字段校验）消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+import re
+from ..core.exceptions import RepositoryError
+
+_FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+_MISSING = object()
+
+
+def check_field(field: str) -> str:
+    """字段名白名单（SQLite 后端会把字段名拼进 SQL 表达式）"""
+    if not _FIELD.match(field):
+        raise RepositoryError(f"非法字段名: {field!r}")
+    return field
+
+
+def get_path(doc: Dict[str, Any], field: str, default: Any = None) -> Any:
+    """按点号路径取值，缺失时返回 default"""
+    value: Any = doc
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def set_path(doc: Dict[str, Any], field: str, value: Any) -> None:
+    """按点号路径赋值，中间层不存在时创建"""
+    parts = field.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def sort_key(value: Any) -> Tuple:
+    """跨类型全序（与 MongoDB 的类型排序一致）：null < 数字 < 字符串 < 对象 < 布尔 < 日期"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (4, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (5, value)
+    return (3, repr(value))
+
+
+# 大于任何 sort_key 的哨兵，用于有序索引的前缀区间上界
+MAX_KEY = (99,)
+
+
+def _compare(op: str, value: Any, target: Any) -> bool:
+    # MongoDB 的比较只在同类型之间成立（缺失/None 不参与范围比较）
+    if value is None or sort_key(value)[0] != sort_key(target)[0]:
+        return False
+    if op == "$gt":
+        return value > target
+    if op == "$gte":
+        return value >= target
+    if op == "$lt":
+        return value < target
+    return value <= target
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if not (isinstance(condition, dict) and condition and next(iter(condition)).startswith("$")):
+        return value == condition
+    for op, target in condition.items():
+        if op == "$in":
+            if value not in target:
+                return False
+        elif op == "$ne":
+            if value == target:
+                return False
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not _compare(op, value, target):
+                return False
+        elif op == "$exists":
+            if (value is not _MISSING) != bool(target):
+                return False
+        else:
+            raise RepositoryError(f"不支持的查询操作符: {op}")
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """文档是否满足查询（MongoDB 查询子集）"""
+    for field, condition in query.items():
+        value = get_path(doc, field, _MISSING)
+        if isinstance(condition, dict) and "$exists" in condition:
+            if not _match_condition(value, condition):
+                return False
+            continue
+        if not _match_condition(None if value is _MISSING else value, condition):
+            return False
+    return True
+
+
+def apply_projection(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """包含式投影：{"_id": 0, "a": 1} 只保留 a；{"_id": 1} 只保留 _id；None 保留全部"""
+    if not projection:
+        return doc
+    include = [field for field, flag in projection.items() if flag and field != "_id"]
+    if not include:
+        if projection.get("_id", 1):
+            return {"_id": doc["_id"]} if len(projection) == 1 else dict(doc)
+        return {k: v for k, v in doc.items() if k != "_id"}
+    result: Dict[str, Any] = {}
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for field in include:
+        value = get_path(doc, field, _MISSING)
+        if value is not _MISSING:
+            set_path(result, field, value)
+    return result
+
+
+def upsert_document(
+    query: Dict[str, Any], fields: Dict[str, Any], amounts: Dict[str, float]
+) -> Dict[str, Any]:
+    """upsert 未命中时插入的文档：query 中的相等条件（操作符条件忽略）+ $set 字段 + $inc 初值"""
+    doc: Dict[str, Any] = {}
+    for field, condition in query.items():
+        if not (isinstance(condition, dict) and condition and next(iter(condition)).startswith("$")):
+            set_path(doc, field, condition)
+        elif "$eq" in condition:
+            set_path(doc, field, condition["$eq"])
+    for field, value in fields.items():
+        set_path(doc, field, value)
+    for field, amount in amounts.items():
+        set_path(doc, field, amount)
+    return doc
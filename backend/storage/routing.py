@@ -0,0 +1,132 @@
+"""
+[INPUT]: 依赖 contextvars 的 ContextVar，依赖 bson（随 pymongo 安装）的 encode/decode（因果令牌编码）
+[OUTPUT]: 对外提供 read_intent 上下文管理器、reads_from 装饰器、current_read_intent、CausalClock 类、causal_scope 上下文管理器与 current_clock
+[POS]: backend/storage 的读路由上下文，被服务层标注读意图，被 MongoCollection 选择读偏好与因果会话，被 HTTP 中间件与 realtime 路由开启因果范围
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+import base64
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+_intent: ContextVar[Optional[str]] = ContextVar("read_intent", default=None)
+
+
+# ==================== 读意图 ====================
+def current_read_intent() -> Optional[str]:
+    return _intent.get()
+
+
+@contextmanager
+def read_intent(name: str) -> Iterator[None]:
+    """范围内的读带上意图（history / search / export），后端据此选择读偏好；未标注的读走主节点"""
+    token = _intent.set(name)
+    try:
+        yield
+    finally:
+        _intent.reset(token)
+
+
+def reads_from(intent: str) -> Callable:
+    """方法装饰器：方法内的读带上意图
+
+    支持协程与异步生成器；异步生成器只在每次取值期间设置意图，不泄漏到消费方。
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.isasyncgenfunction(func):
+
+            @wraps(func)
+            async def generator(*args: Any, **kwargs: Any) -> Any:
+                inner = func(*args, **kwargs)
+                try:
+                    while True:
+                        with read_intent(intent):
+                            try:
+                                item = await inner.__anext__()
+                            except StopAsyncIteration:
+                                return
+                        yield item
+                finally:
+                    await inner.aclose()
+
+            return generator
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with read_intent(intent):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ==================== 因果一致 ====================
+class CausalClock:
+    """一个因果一致范围内观察到的最新逻辑时间（Mongo 的 $clusterTime 与 operationTime）
+
+    范围内每次存储操作开始前把会话推进到该时间，结束后取两者较新的值：
+    之后的读（包括从节点读）会等到节点追上这个时间，保证读到范围内此前的写。
+    token() 把时间编码为不透明字符串交给客户端，下一个请求带回即可延续。
+    """
+
+    __slots__ = ("cluster_time", "operation_time")
+
+    def __init__(self, cluster_time: Any = None, operation_time: Any = None):
+        self.cluster_time = cluster_time
+        self.operation_time = operation_time
+
+    def advance(self, cluster_time: Any, operation_time: Any) -> None:
+        if cluster_time is not None and (
+            self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]
+        ):
+            self.cluster_time = cluster_time
+        if operation_time is not None and (self.operation_time is None or operation_time > self.operation_time):
+            self.operation_time = operation_time
+
+    def token(self) -> Optional[str]:
+        if self.operation_time is None:
+            return None
+        import bson
+
+        raw = bson.encode({"c": self.cluster_time, "o": self.operation_time})
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def from_token(cls, token: Optional[str]) -> "CausalClock":
+        """解析客户端带回的令牌，无效时从空时间开始（退化为范围内的因果一致）"""
+        if not token:
+            return cls()
+        import bson
+
+        try:
+            doc = bson.decode(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(doc.get("c"), doc.get("o"))
+        except Exception as e:
+            logger.debug("忽略无效的因果令牌: %s", e)
+            return cls()
+
+
+_clock: ContextVar[Optional[CausalClock]] = ContextVar("causal_clock", default=None)
+
+
+def current_clock() -> Optional[CausalClock]:
+    return _clock.get()
+
+
+@contextmanager
+def causal_scope(token: Optional[str] = None) -> Iterator[CausalClock]:
+    """开启因果一致范围（一个 HTTP 请求 / 一轮对话），产出范围的 CausalClock；不区分主从的后端忽略"""
+    clock = CausalClock.from_token(token)
+    reset = _clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _clock.reset(reset)
@@ -0,0 +1,419 @@
+"""
+[INPUT]: 依赖 sqlite3 标准库（WAL + 语句缓存），依赖 backend.storage.base 的 StorageCollection/StorageBackend，依赖 backend.storage.query 的投影与字段校验
+[OUTPUT]: 对外提供 SQLiteBackend/SQLiteCollection 类（单文件存储，文档以 JSON 保存）
+[POS]: backend/storage 的 SQLite 实现，用于小规模边缘部署
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import functools
+import json
+import logging
+import re
+import sqlite3
+from .base import StorageBackend, StorageCollection, Query, Projection, Sort, IndexKeys, IndexOptions, normalize_keys
+from .query import apply_projection, check_field, get_path, set_path, upsert_document
+from ..core.exceptions import DuplicateKeyError, RepositoryError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# JSON 没有日期类型：日期编码为「私有区字符 + ISO 时间」，同类值之间按字符串比较即按时间比较
+_DATE_MARK = "\ue000"
+_INDEX_COLUMN = re.compile(r"(?:\b(id)\b|json_extract\(doc, '\$\.([^']+)'\))( DESC)?")
+
+
+# ==================== 编码 ====================
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return _DATE_MARK + value.isoformat(timespec="microseconds")
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(_DATE_MARK):
+        return datetime.fromisoformat(value[1:])
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    return value
+
+
+def _object_hook(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: _decode_value(v) for k, v in obj.items()}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(text: str) -> Any:
+    return json.loads(text, object_hook=_object_hook)
+
+
+def _param(value: Any) -> Any:
+    """查询参数编码：与 json_extract 的返回值可比"""
+    if isinstance(value, datetime):
+        return _default(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        raise RepositoryError("SQLite 后端不支持按对象或数组取值查询")
+    return value
+
+
+def _expr(field: str) -> str:
+    # 与表达式索引的文本完全一致，查询规划器才会使用索引
+    if field == "_id":
+        return "id"
+    return f"json_extract(doc, '$.{check_field(field)}')"
+
+
+# ==================== 查询翻译 ====================
+def _where(query: Query) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    for field, condition in query.items():
+        expr = _expr(field)
+        if not (isinstance(condition, dict) and condition and next(iter(condition)).startswith("$")):
+            condition = {"$eq": condition}
+        for op, target in condition.items():
+            if op == "$eq":
+                if target is None:
+                    clauses.append(f"{expr} IS NULL")
+                else:
+                    clauses.append(f"{expr} = ?")
+                    params.append(_param(target))
+            elif op == "$ne":
+                if target is None:
+                    clauses.append(f"{expr} IS NOT NULL")
+                else:
+                    clauses.append(f"({expr} IS NULL OR {expr} != ?)")
+                    params.append(_param(target))
+            elif op == "$in":
+                # 整个列表作为一个 JSON 参数：无论列表多长都是同一条预编译语句
+                values = [v for v in target if v is not None]
+                clause = f"{expr} IN (SELECT value FROM json_each(?))"
+                if len(values) != len(target):
+                    clause = f"({clause} OR {expr} IS NULL)"
+                clauses.append(clause)
+                params.append(_dumps([_param(v) for v in values]))
+            elif op in _COMPARISONS:
+                clauses.append(f"{expr} {_COMPARISONS[op]} ?")
+                params.append(_param(target))
+            elif op == "$exists":
+                clauses.append(f"{expr} IS {'NOT ' if target else ''}NULL")
+            else:
+                raise RepositoryError(f"不支持的查询操作符: {op}")
+    return (" AND ".join(clauses) or "1"), params
+
+
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _order_by(sort: Sort) -> str:
+    terms = [f"{_expr(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in sort or ()]
+    return " ORDER BY " + ", ".join(terms + ["id"])
+
+
+class SQLiteCollection(StorageCollection):
+    """一张表对应一个集合：(id INTEGER PRIMARY KEY, doc TEXT)
+
+    - 查询条件翻译为 json_extract 表达式，参数全部绑定，语句由连接缓存复用
+    - 索引为同样的 json_extract 表达式索引，sparse 索引为 IS NOT NULL 部分索引
+    - 所有语句在后端的单个工作线程上执行，不阻塞事件循环
+    """
+
+    def __init__(self, backend: "SQLiteBackend", name: str):
+        self.backend = backend
+        self.table = check_field(name)
+        self.name = f"sqlite.{name}"
+
+    # ==================== 内部工具 ====================
+    def _ensure(self) -> sqlite3.Connection:
+        conn = self.backend.conn
+        if self.table not in self.backend.tables:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" (id INTEGER PRIMARY KEY, doc TEXT NOT NULL)')
+            self.backend.tables.add(self.table)
+        return conn
+
+    def _select_sql(self, query: Query, sort: Sort, skip: int, limit: int, columns: str = "id, doc") -> Tuple[str, List[Any]]:
+        where, params = _where(query)
+        sql = f'SELECT {columns} FROM "{self.table}" WHERE {where}{_order_by(sort)} LIMIT ? OFFSET ?'
+        return sql, params + [limit or -1, skip]
+
+    @staticmethod
+    def _row(row: Tuple[int, str]) -> Dict[str, Any]:
+        doc = _loads(row[1])
+        doc["_id"] = row[0]
+        return doc
+
+    def _insert(self, conn: sqlite3.Connection, document: Dict[str, Any]) -> int:
+        body = {k: v for k, v in document.items() if k != "_id"}
+        doc_id = document.get("_id") if isinstance(document.get("_id"), int) else None
+        try:
+            cursor = conn.execute(
+                f'INSERT INTO "{self.table}" (id, doc) VALUES (?, ?)', (doc_id, _dumps(body))
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"唯一索引冲突: {self.table}: {e}")
+        return cursor.lastrowid
+
+    def _set(
+        self,
+        conn: sqlite3.Connection,
+        query: Query,
+        fields: Dict[str, Any],
+        amounts: Optional[Dict[str, float]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        sql, params = self._select_sql(query, None, 0, 1)
+        row = conn.execute(sql, params).fetchone()
+        if row is None:
+            return None, False
+        doc, updated = self._row(row), self._row(row)
+        for field, value in fields.items():
+            set_path(updated, field, value)
+        for field, amount in (amounts or {}).items():
+            set_path(updated, field, (get_path(updated, field) or 0) + amount)
+        if updated == doc:
+            return doc, False
+        body = {k: v for k, v in updated.items() if k != "_id"}
+        try:
+            conn.execute(f'UPDATE "{self.table}" SET doc = ? WHERE id = ?', (_dumps(body), row[0]))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"唯一索引冲突: {self.table}: {e}")
+        return updated, True
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await self.backend.run(func, *args)
+
+    # ==================== StorageCollection ====================
+    async def insert_one(self, document: Dict[str, Any]) -> Any:
+        return await self._run(lambda: self._insert(self._ensure(), document))
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        def run() -> int:
+            conn = self._ensure()
+            inserted = 0
+            with self.backend.transaction():
+                for document in documents:
+                    try:
+                        self._insert(conn, document)
+                        inserted += 1
+                    except DuplicateKeyError:
+                        continue
+            return inserted
+
+        return await self._run(run)
+
+    async def find_one(self, query: Query) -> Optional[Dict[str, Any]]:
+        sql, params = self._select_sql(query, None, 0, 1)
+        row = await self._run(lambda: self._ensure().execute(sql, params).fetchone())
+        return self._row(row) if row else None
+
+    async def find(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        sql, params = self._select_sql(query, sort, skip, limit)
+        rows = await self._run(lambda: self._ensure().execute(sql, params).fetchall())
+        return [apply_projection(self._row(row), projection) for row in rows]
+
+    async def iterate(
+        self,
+        query: Query,
+        projection: Projection = None,
+        sort: Sort = None,
+        batch_size: int = 1000,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        sql, params = self._select_sql(query, sort, 0, limit)
+        cursor = await self._run(lambda: self._ensure().execute(sql, params))
+        try:
+            while True:
+                rows = await self._run(cursor.fetchmany, batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield apply_projection(self._row(row), projection)
+        finally:
+            await self._run(cursor.close)
+
+    async def find_one_and_set(self, query: Query, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        def run() -> Optional[Dict[str, Any]]:
+            conn = self._ensure()
+            with self.backend.transaction():
+                return self._set(conn, query, fields)[0]
+
+        return await self._run(run)
+
+    async def increment(
+        self,
+        query: Query,
+        amounts: Dict[str, float],
+        fields: Optional[Dict[str, Any]] = None,
+        upsert: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        def run() -> Optional[Dict[str, Any]]:
+            conn = self._ensure()
+            with self.backend.transaction():
+                doc = self._set(conn, query, fields or {}, amounts)[0]
+                if doc is None and upsert:
+                    # 查询与插入在同一事务内（单写连接），不会与并发 upsert 交错
+                    doc = upsert_document(query, fields or {}, amounts)
+                    doc["_id"] = self._insert(conn, doc)
+                return doc
+
+        return await self._run(run)
+
+    async def update_each(self, updates: List[Tuple[Query, Dict[str, Any]]], upsert: bool = False) -> int:
+        def run() -> int:
+            conn = self._ensure()
+            modified = 0
+            with self.backend.transaction():
+                for query, fields in updates:
+                    doc, changed = self._set(conn, query, fields)
+                    if doc is None and upsert:
+                        self._insert(conn, upsert_document(query, fields, {}))
+                        changed = True
+                    modified += changed
+            return modified
+
+        return await self._run(run)
+
+    async def delete_one(self, query: Query) -> int:
+        return await self.delete_many(query, limit=1)
+
+    async def delete_many(self, query: Query, limit: int = 0) -> int:
+        select, params = self._select_sql(query, None, 0, limit, columns="id")
+        sql = f'DELETE FROM "{self.table}" WHERE id IN ({select})'
+        return await self._run(lambda: self._ensure().execute(sql, params).rowcount)
+
+    async def count(self, query: Query, limit: int = 0) -> int:
+        select, params = self._select_sql(query, None, 0, limit, columns="1")
+        sql = f"SELECT COUNT(*) FROM ({select})"
+        return await self._run(lambda: self._ensure().execute(sql, params).fetchone()[0])
+
+    async def create_index(
+        self,
+        keys: IndexKeys,
+        unique: bool = False,
+        sparse: bool = False,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        fields = normalize_keys(keys)
+        name = self._index_name(fields)
+        columns = ", ".join(f"{_expr(field)}{' DESC' if direction < 0 else ''}" for field, direction in fields)
+        sql = f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{self.table}" ({columns})'
+        if sparse:
+            sql += " WHERE " + " OR ".join(f"{_expr(field)} IS NOT NULL" for field, _ in fields)
+        if ttl_seconds is not None:
+            logger.debug("SQLite 后端不支持 TTL 索引，按普通索引创建: %s", name)
+        await self._run(lambda: self._ensure().execute(sql))
+
+    def _index_name(self, fields: List[Tuple[str, int]]) -> str:
+        return "ix_" + self.table + "_" + "_".join(
+            f"{field.replace('.', '_')}{'_desc' if direction < 0 else ''}" for field, direction in fields
+        )
+
+    async def index_info(self) -> List[Tuple[List[Tuple[str, int]], IndexOptions]]:
+        def run() -> List[str]:
+            rows = self._ensure().execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (self.table,),
+            )
+            return [row[0] for row in rows]
+
+        # 从建索引语句还原键与选项：列均为 _expr 生成的表达式，sparse 为 WHERE 部分索引（与 create_index 对称）
+        indexes = []
+        for sql in await self._run(run):
+            columns = sql.split(" WHERE ")[0].split(" ON ", 1)[1]
+            keys = [
+                ("_id" if match.group(1) == "id" else match.group(2), -1 if match.group(3) else 1)
+                for match in _INDEX_COLUMN.finditer(columns)
+            ]
+            options = {"unique": sql.startswith("CREATE UNIQUE "), "sparse": " WHERE " in sql, "ttl_seconds": None}
+            indexes.append((keys, options))
+        return indexes
+
+    async def drop_index(self, keys: IndexKeys) -> None:
+        sql = f'DROP INDEX IF EXISTS "{self._index_name(normalize_keys(keys))}"'
+        await self._run(lambda: self._ensure().execute(sql))
+
+
+class SQLiteBackend(StorageBackend):
+    """单文件 SQLite 存储
+
+    - WAL 日志模式 + synchronous=NORMAL：读写互不阻塞，提交不逐次 fsync
+    - 单连接 + 单工作线程：语句天然串行，多语句操作用显式事务保证原子性
+    - 连接级语句缓存（cached_statements）复用预编译语句
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.tables: Set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._collections: Dict[str, SQLiteCollection] = {}
+
+    async def connect(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        await self.run(self._open)
+        logger.info("SQLite 已打开: %s", self.path)
+
+    def _open(self) -> None:
+        # 在工作线程内赋值，排在其后的语句一定能看到连接
+        conn = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, cached_statements=512
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn = conn
+
+    async def close(self) -> None:
+        if self._executor is None:
+            return
+        await self.run(self.conn.close)
+        self._executor.shutdown(wait=True)
+        self.conn = None
+        self._executor = None
+        self.tables.clear()
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """在后端工作线程执行（未连接时先连接）"""
+        if self._executor is None:
+            await self.connect()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def transaction(self) -> "_Transaction":
+        return _Transaction(self.conn)
+
+    def collection(self, name: str) -> SQLiteCollection:
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+
+class _Transaction:
+    """显式事务（连接为 autocommit 模式，多语句操作需要手动 BEGIN/COMMIT）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,7 @@
+"""
+benchmarks - 性能基准脚本模块
+
+以 python -m benchmarks.<name> 运行，结果输出 JSON 便于对比
+
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
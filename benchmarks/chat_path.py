@@ -0,0 +1,267 @@
+"""
+[INPUT]: 依赖 backend.main 的 app，依赖 backend.core 的 db/connect_storage/ensure_indexes/settings/use_openai_client/record_stages，依赖 backend.storage 的 MemoryBackend/SQLiteBackend，依赖 backend.repositories 的 Message/Conversation Repository，依赖 benchmarks.fake_openai 的假服务，依赖 benchmarks.corpus 的语料与统计工具
+[OUTPUT]: 命令行基准：/chat 端到端吞吐与延迟（冷/热会话 × 短/长历史 × 压缩开关），按阶段拆分耗时，与基线对比超阈值时退出码为 1
+[POS]: benchmarks 的对话主路径基准，衡量 LLMService 及其上下游的性能改动
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.chat_path --requests 30 --output baseline.json
+    python -m benchmarks.chat_path --requests 30 --baseline baseline.json --threshold 0.2
+
+应用、存储（内存或 SQLite 文件）与假 LLM 全部在进程内运行，请求经 ASGI 直接调用，不含网络。
+阶段（backend.core.stages 埋点，取扣除子阶段后的自身耗时）：
+    db_read       仓储读取（会话、Agent、消息、祖先链）
+    history_load  加载上下文历史中数据库读取以外的部分
+    token_count   新消息入库前的 token 计数
+    trim          上下文裁剪（估算 + 必要的精确 BPE）
+    compression   上下文压缩（含摘要的 LLM 调用）
+    llm_wait      等待 LLM 回复
+    persist       仓储写入（消息、会话计数、检索索引）
+    other         路由、序列化、中间件等未埋点部分
+冷会话：每个请求使用一个新会话（祖先链缓存未命中）；热会话：同一会话预热一轮后连续请求。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from itertools import product
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import uuid
+import httpx
+from openai import AsyncOpenAI
+from backend.core.config import settings
+from backend.core.database import db, connect_storage, close_storage, ensure_indexes
+from backend.core.llm_client import use_openai_client
+from backend.core.stages import record_stages
+from backend.core.tokenizer import get_tokenizer
+from backend.repositories.message import MessageRepository
+from backend.repositories.conversation import ConversationRepository
+from backend.storage import MemoryBackend, SQLiteBackend
+from .corpus import percentile, synthetic_messages
+from .fake_openai import LatencyProfile, create_app
+
+STAGES = ["db_read", "history_load", "token_count", "trim", "compression", "llm_wait", "persist", "other"]
+SEED_BATCH = 1000
+
+
+# ==================== 环境 ====================
+async def _setup(store: str, llm_ttft: float, llm_tps: float) -> Tuple[httpx.AsyncClient, Optional[Path]]:
+    """连接存储、接入进程内假 LLM，返回直连应用的 HTTP 客户端"""
+    from backend.main import app
+
+    path = None
+    if store == "sqlite":
+        path = Path(tempfile.mkdtemp()) / "bench.sqlite3"
+        db.backend = SQLiteBackend(str(path))
+    else:
+        db.backend = MemoryBackend()
+    await connect_storage()
+    await ensure_indexes()
+
+    profile = LatencyProfile(ttft=llm_ttft, ttft_jitter=0.0, tps=llm_tps, output_tokens=48)
+    fake = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(profile)), base_url="http://fake-openai")
+    use_openai_client(AsyncOpenAI(api_key="bench", base_url="http://fake-openai/v1", http_client=fake, max_retries=0))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+    return client, path
+
+
+async def _seed_conversation(client: httpx.AsyncClient, user_id: str, agent_id: str, history: int) -> str:
+    """创建会话并直接写入 history 条历史消息（带入库时的 token_count，与正常写入一致）"""
+    response = await client.post("/api/conversations", json={"user_id": user_id, "agent_id": agent_id})
+    conv_id = response.json()["conversation_id"]
+    tokenizer = get_tokenizer(None)
+    repo = MessageRepository()
+    base = datetime.utcnow() - timedelta(days=1)
+    texts = list(synthetic_messages(history, seed=history))
+    for offset in range(0, history, SEED_BATCH):
+        docs = [
+            {
+                "message_id": str(uuid.uuid4()),
+                "conversation_id": conv_id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": texts[i],
+                "token_count": tokenizer.count_message(texts[i]),
+                "token_encoding": tokenizer.encoding,
+                "token_rule": tokenizer.rule,
+                "created_at": base + timedelta(milliseconds=i),
+            }
+            for i in range(offset, min(offset + SEED_BATCH, history))
+        ]
+        await repo.create_many(docs)
+    await ConversationRepository().increment({"conversation_id": conv_id}, {"message_count": history})
+    return conv_id
+
+
+# ==================== 测量 ====================
+async def _timed_chat(client: httpx.AsyncClient, conv_id: str, content: str) -> Dict[str, Any]:
+    with record_stages() as recorder:
+        start = time.perf_counter()
+        response = await client.post(f"/api/conversations/{conv_id}/chat", json={"content": content})
+        elapsed = time.perf_counter() - start
+    stages = recorder.self_times()
+    stages["other"] = max(0.0, elapsed - sum(stages.values()))
+    return {"elapsed": elapsed, "stages": stages, "ok": response.status_code == 200}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    user_id: str,
+    agent_id: str,
+    warm: bool,
+    history: int,
+    compression: bool,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    settings.ENABLE_CONTEXT_COMPRESSION = compression
+
+    # 会话准备不计时：热会话每个工作协程一个并预热一轮，冷会话每个请求一个
+    if warm:
+        convs = [await _seed_conversation(client, user_id, agent_id, history) for _ in range(concurrency)]
+        await asyncio.gather(*(_timed_chat(client, c, "预热") for c in convs))
+    else:
+        convs = [await _seed_conversation(client, user_id, agent_id, history) for _ in range(requests)]
+
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    results: List[Dict[str, Any]] = []
+
+    async def worker(index: int) -> None:
+        while not queue.empty():
+            i = queue.get_nowait()
+            conv_id = convs[index] if warm else convs[i]
+            results.append(await _timed_chat(client, conv_id, f"第 {i} 轮：帮我回顾一下今天的计划"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies = [r["elapsed"] for r in results]
+    stages = {}
+    for name in STAGES:
+        values = [r["stages"].get(name, 0.0) for r in results]
+        stages[name] = {
+            "mean": round(sum(values) / len(values) * 1000, 3),
+            "p50": round(percentile(values, 50) * 1000, 3),
+            "p95": round(percentile(values, 95) * 1000, 3),
+        }
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r["ok"]),
+        "throughput_rps": round(len(results) / wall, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+        "stages_ms": stages,
+    }
+
+
+# ==================== 基线对比 ====================
+def find_regressions(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_ms: float
+) -> List[Dict[str, Any]]:
+    """逐场景逐阶段比较 p50 自身耗时（及整体延迟 p50）：超过基线 (1 + threshold) 倍且绝对差超过 min_delta_ms 视为退化"""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        pairs = [("latency", result["latency_ms"]["p50"], base["latency_ms"]["p50"])]
+        pairs += [
+            (stage, result["stages_ms"][stage]["p50"], base["stages_ms"].get(stage, {}).get("p50", 0.0))
+            for stage in STAGES
+        ]
+        for metric, now, before in pairs:
+            if now - before > min_delta_ms and now > before * (1 + threshold):
+                regressions.append(
+                    {"scenario": name, "metric": metric, "baseline_ms": before, "current_ms": now,
+                     "change": f"+{(now / before - 1) * 100:.0f}%" if before else "new"}
+                )
+    return regressions
+
+
+async def bench(args: argparse.Namespace) -> Dict[str, Any]:
+    client, path = await _setup(args.store, args.llm_ttft, args.llm_tps)
+    user = (await client.post("/api/users", json={"username": "bench"})).json()
+    agent = (
+        await client.post("/api/agents", json={"name": "bench", "system_prompt": "你是一个简洁的助手。"})
+    ).json()
+
+    original_compression = settings.ENABLE_CONTEXT_COMPRESSION
+    scenarios: Dict[str, Any] = {}
+    try:
+        for warm, (label, history), compression in product(
+            (False, True), (("short", args.short_history), ("long", args.long_history)), (False, True)
+        ):
+            name = f"{'warm' if warm else 'cold'}/{label}/{'compress' if compression else 'plain'}"
+            scenarios[name] = await run_scenario(
+                client, user["user_id"], agent["agent_id"], warm, history, compression,
+                args.requests, args.concurrency,
+            )
+            print(f"{name}: p50 {scenarios[name]['latency_ms']['p50']} ms", file=sys.stderr)
+    finally:
+        settings.ENABLE_CONTEXT_COMPRESSION = original_compression
+        use_openai_client(None)
+        await client.aclose()
+        await close_storage()
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    return {
+        "config": {
+            "store": args.store,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "short_history": args.short_history,
+            "long_history": args.long_history,
+            "llm_ttft": args.llm_ttft,
+            "llm_tps": args.llm_tps,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对话主路径端到端基准（分阶段）")
+    parser.add_argument("--store", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--requests", type=int, default=30, help="每个场景的测量请求数")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--short-history", type=int, default=10)
+    parser.add_argument("--long-history", type=int, default=10_000)
+    parser.add_argument("--llm-ttft", type=float, default=0.0, help="假 LLM 首 token 时间（秒）")
+    parser.add_argument("--llm-tps", type=float, default=0.0, help="假 LLM 输出速率（token/秒，0 不限速）")
+    parser.add_argument("--output", type=Path, help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", type=Path, help="对比的基线结果（JSON）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的相对退化比例")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="忽略小于该绝对差的变化（毫秒）")
+    args = parser.parse_args()
+
+    result = asyncio.run(bench(args))
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("config") != result["config"]:
+            print(f"警告: 基线配置不同 {baseline.get('config')}，对比结果仅供参考", file=sys.stderr)
+        regressions = find_regressions(result, baseline, args.threshold, args.min_delta_ms)
+        for r in regressions:
+            print(
+                f"退化: {r['scenario']} {r['metric']} {r['baseline_ms']} → {r['current_ms']} ms ({r['change']})",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
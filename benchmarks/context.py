@@ -0,0 +1,188 @@
+"""
+[INPUT]: 依赖 backend.services 的 LLMService/ContextCompressionService，依赖 backend.core.tokenizer 的 get_tokenizer，依赖 backend.core.config 的 settings，依赖 tracemalloc 标准库，依赖 benchmarks.corpus 的语料与统计工具
+[OUTPUT]: 命令行基准：上下文热路径各函数（token 计数、拼接、裁剪、压缩格式化）的耗时与内存分配（峰值 / 残留），--baseline 输出前后对比
+[POS]: benchmarks 的上下文构建微基准，热路径改动附带前后数据
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.context --output before.json
+    python -m benchmarks.context --baseline before.json
+
+被测函数（与线上调用方式一致）：
+    count_tokens    Tokenizer.count_message，对会话内每条消息计数（MessageService.create_message 入库时的计数）
+    build_context   LLMService._build_context
+    trim            LLMService._trim_context，历史复用入库时的 token_count（线上路径）
+    trim_unstored   LLMService._trim_context，不提供入库计数（全部估算 / 精确计数）
+    format          ContextCompressionService._format_messages_for_compression
+会话：中文 / 英文 × 10 / 100 / 1k / 1 万条消息，另有含单条超长消息（--huge-chars）的 10 条会话：
+中文为连续汉字，英文为无空白的长串（BPE 最慢的情况）。
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from backend.core.config import settings
+from backend.core.tokenizer import Tokenizer, get_tokenizer
+from backend.services.context_compression import ContextCompressionService
+from backend.services.llm import LLMService
+from .corpus import synthetic_messages
+
+SYSTEM_PROMPT = "你是一个贴心的生活助手，回答简洁、具体。"
+USER_MESSAGE = "帮我把刚才聊到的安排整理成清单。"
+_DENSE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+# ==================== 语料 ====================
+def make_history(count: int, lang: str, huge_chars: int = 0) -> List[Dict[str, Any]]:
+    """生成 count 条交替角色的历史消息；huge_chars > 0 时把中间一条替换为超长消息"""
+    texts = list(synthetic_messages(count, seed=count, lang=lang))
+    if huge_chars:
+        rng = random.Random(huge_chars)
+        if lang == "zh":
+            huge = "".join(rng.choice(texts[0]) for _ in range(huge_chars))
+        else:
+            huge = "".join(rng.choice(_DENSE_ALPHABET) for _ in range(huge_chars))
+        texts[count // 2] = huge
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": text}
+        for i, text in enumerate(texts)
+    ]
+
+
+def make_cases(sizes: List[int], huge_chars: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    cases = []
+    for lang in ("zh", "en"):
+        cases += [(f"{lang}/{size}", make_history(size, lang)) for size in sizes]
+        if huge_chars:
+            cases.append((f"{lang}/huge", make_history(10, lang, huge_chars)))
+    return cases
+
+
+# ==================== 测量 ====================
+def measure(func: Callable[[], Any], min_time: float, max_rounds: int) -> Dict[str, Any]:
+    """耗时：重复执行至累计 min_time 秒（至多 max_rounds 次）；分配：tracemalloc 下单独执行一次"""
+    timings: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_rounds and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return {
+        "rounds": len(timings),
+        "best_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "peak_kb": round((peak - before) / 1024, 1),
+        "retained_kb": round((current - before) / 1024, 1),
+    }
+
+
+def bench_case(
+    history: List[Dict[str, Any]],
+    tokenizer: Tokenizer,
+    llm: LLMService,
+    compression: ContextCompressionService,
+    loop: asyncio.AbstractEventLoop,
+    min_time: float,
+    max_rounds: int,
+) -> Dict[str, Any]:
+    messages = llm._build_context(SYSTEM_PROMPT, history, USER_MESSAGE)
+    stored = {m["content"]: tokenizer.count_message(m["content"]) for m in history}
+    budget = llm.max_context_tokens
+
+    def count_tokens() -> List[int]:
+        return [tokenizer.count_message(m["content"]) for m in history]
+
+    def trim(stored_counts: Optional[Dict[str, int]]) -> Callable[[], Any]:
+        return lambda: loop.run_until_complete(llm._trim_context(messages, budget, tokenizer, stored_counts))
+
+    return {
+        "messages": len(history),
+        "chars": sum(len(m["content"]) for m in history),
+        "count_tokens": measure(count_tokens, min_time, max_rounds),
+        "build_context": measure(
+            lambda: llm._build_context(SYSTEM_PROMPT, history, USER_MESSAGE), min_time, max_rounds
+        ),
+        "trim": measure(trim(stored), min_time, max_rounds),
+        "trim_unstored": measure(trim(None), min_time, max_rounds),
+        "format": measure(
+            lambda: compression._format_messages_for_compression(history), min_time, max_rounds
+        ),
+    }
+
+
+# ==================== 前后对比 ====================
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """按用例与函数给出 best_ms / peak_kb 的变化（当前 / 基线）"""
+    diff: Dict[str, Dict[str, str]] = {}
+    for case, funcs in current["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if base is None:
+            continue
+        for name, now in funcs.items():
+            before = base.get(name)
+            if not isinstance(now, dict) or not isinstance(before, dict):
+                continue
+            diff.setdefault(case, {})[name] = " ".join(
+                f"{metric} {before[metric]} → {now[metric]} ({now[metric] / before[metric]:.2f}x)"
+                if before[metric] else f"{metric} {before[metric]} → {now[metric]}"
+                for metric in ("best_ms", "peak_kb")
+            )
+    return diff
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="上下文构建 / 裁剪 / 压缩格式化微基准")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="会话消息数，逗号分隔")
+    parser.add_argument("--huge-chars", type=int, default=500_000, help="超长消息字符数（0 不测）")
+    parser.add_argument("--model", default=None, help="按该模型选择 tokenizer（默认与 Agent 默认模型一致）")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每项至少累计执行的秒数")
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", type=Path, help="对比的基线结果（JSON）")
+    args = parser.parse_args()
+
+    tokenizer = get_tokenizer(args.model)
+    llm = LLMService()
+    compression = ContextCompressionService()
+    loop = asyncio.new_event_loop()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    result: Dict[str, Any] = {
+        "encoding": tokenizer.encoding,
+        "max_context_tokens": settings.MAX_CONTEXT_TOKENS,
+        "cases": {},
+    }
+    try:
+        for name, history in make_cases(sizes, args.huge_chars):
+            result["cases"][name] = bench_case(
+                history, tokenizer, llm, compression, loop, args.min_time, args.max_rounds
+            )
+    finally:
+        loop.close()
+
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        result["compare"] = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+[INPUT]: 依赖 random/json 标准库，依赖 cli.commands.bench 的 percentile，可选依赖 zstandard（读取压缩的导出文件）
+[OUTPUT]: 对外提供 synthetic_messages/synthetic_pastes 生成器、exported_messages（读取 data export 导出的真实语料）与 percentile 工具函数（转出 cli 压测命令的实现）
+[POS]: benchmarks 的公共语料与统计工具，被各基准脚本消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Iterator
+import json
+import random
+from cli.commands.bench import percentile  # noqa: F401  与压测命令共用同一最近秩（ceil）实现
+
+_ZH_WORDS = [
+    "今天", "明天", "天气", "会议", "紧张", "开心", "工作", "项目", "周末", "朋友",
+    "电影", "加班", "考试", "面试", "生日", "旅行", "睡觉", "早上", "晚上", "提醒",
+    "医院", "家人", "咖啡", "跑步", "下雨", "压力", "计划", "老板", "同事", "休息",
+]
+_EN_WORDS = [
+    "meeting", "deadline", "python", "weather", "coffee", "project", "review",
+    "weekend", "travel", "release", "deploy", "bug", "design", "interview", "gym",
+]
+
+
+def synthetic_messages(count: int, seed: int = 42, lang: str = "mixed") -> Iterator[str]:
+    """生成可复现的合成消息（中文、英文或混合）"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        length = rng.choice((4, 8, 16, 32, 64))
+        use_zh = lang == "zh" or (lang == "mixed" and rng.random() < 0.7)
+        if use_zh:
+            yield "".join(rng.choice(_ZH_WORDS) for _ in range(length)) + "。"
+        else:
+            yield " ".join(rng.choice(_EN_WORDS) for _ in range(length)) + "."
+
+
+def synthetic_pastes(count: int, seed: int = 7) -> Iterator[str]:
+    """生成可复现的长文本粘贴（日志、代码、长段中文），用于覆盖长消息场景"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        kind = rng.choice(("log", "code", "zh"))
+        lines = rng.randint(20, 200)
+        if kind == "log":
+            yield "\n".join(
+                f"2024-05-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z "
+                f"{rng.choice(('INFO', 'WARN', 'ERROR'))} {rng.choice(_EN_WORDS)} "
+                f"id={rng.getrandbits(64):016x} took={rng.random() * 100:.2f}ms"
+                for _ in range(lines)
+            )
+        elif kind == "code":
+            yield "\n".join(
+                f"    {rng.choice(_EN_WORDS)}_{i} = {{\"{rng.choice(_EN_WORDS)}\": [{i}, {i * 7}]}}"
+                for i in range(lines)
+            )
+        else:
+            yield "".join(rng.choice(_ZH_WORDS) for _ in range(lines * 8)) + "。"
+
+
+def exported_messages(path: str, limit: int = 0) -> Iterator[str]:
+    """读取 `data export` 导出的 NDJSON（.zst 按 zstd 解压），逐条产出消息正文"""
+    if path.endswith(".zst"):
+        import io
+        import zstandard
+
+        raw = open(path, "rb")
+        stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+    else:
+        stream = open(path, encoding="utf-8")
+
+    produced = 0
+    with stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") != "message":
+                continue
+            yield record["data"]["content"]
+            produced += 1
+            if limit and produced >= limit:
+                return
@@ -0,0 +1,377 @@
+"""
+[INPUT]: 依赖 fastapi 的 FastAPI/Request/Response，依赖 starlette 的 StreamingResponse，依赖 httpx 的 AsyncClient（录制模式转发上游），依赖 uvicorn（命令行启动）
+[OUTPUT]: 对外提供 OpenAI 兼容的假服务：create_app 工厂、LatencyProfile 延迟配置、PROFILES 预设与 Cassette 录制/回放存储
+[POS]: benchmarks 的离线 LLM 替身，经 OPENAI_BASE_URL 接入 LLMService / ContextCompressionService，供压测与回归复现供应商行为
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    # 合成回复：首 token 400ms、每秒 80 token，2% 的请求返回 429
+    python -m benchmarks.fake_openai --port 9100 --profile gpt-4o-mini --rate-limit-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uv run uvicorn backend.main:app
+
+    # 录制真实交互到磁带，再离线回放（按原始节奏，--replay-speed 0 为立即返回）
+    python -m benchmarks.fake_openai --record cassettes/chat.jsonl --upstream https://api.openai.com/v1
+    python -m benchmarks.fake_openai --replay cassettes/chat.jsonl
+
+合成模式下回复文本、延迟与注入的错误由 (--seed, 请求内容, 该请求第几次出现) 决定，
+同样的请求序列在每次运行中得到同样的结果。
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 合成回复的词表（每个词计为一个 token）
+_VOCABULARY = (
+    "the plan looks reasonable and we can start with a small step today "
+    "记得 每天 留出 时间 复盘 目标 进度 然后 调整 下一步 计划 "
+    "focus on one habit at a time keep notes and review them weekly"
+).split()
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """供应商行为配置"""
+
+    ttft: float = 0.4  # 首 token 时间（秒）
+    ttft_jitter: float = 0.2  # 首 token 时间的相对抖动（正态分布标准差 / 均值）
+    tps: float = 80.0  # 输出速率（token/秒），0 表示不限速
+    output_tokens: int = 64  # 默认输出 token 数（请求的 max_tokens 更小时以请求为准）
+    error_rate: float = 0.0  # 返回 500 的概率
+    rate_limit_rate: float = 0.0  # 返回 429 的概率
+    retry_after: float = 0.5  # 429 响应建议的重试间隔（秒）
+
+
+# 预设配置，命令行参数在此基础上覆盖
+PROFILES: Dict[str, LatencyProfile] = {
+    "instant": LatencyProfile(ttft=0.0, ttft_jitter=0.0, tps=0.0),
+    "gpt-4o-mini": LatencyProfile(ttft=0.4, tps=80.0),
+    "gpt-4o": LatencyProfile(ttft=0.7, tps=45.0, output_tokens=128),
+    "slow": LatencyProfile(ttft=2.0, ttft_jitter=0.5, tps=15.0),
+    "flaky": LatencyProfile(ttft=0.5, tps=60.0, error_rate=0.05, rate_limit_rate=0.1),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略 token 估算（约 4 字符一个 token），用于 usage 统计，不依赖 tiktoken"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """请求指纹：决定合成结果与磁带匹配，只取影响输出的字段"""
+    material = {
+        k: body.get(k)
+        for k in ("model", "messages", "temperature", "top_p", "max_tokens", "max_completion_tokens", "stream")
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _error(status: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        {"error": {"message": message, "type": kind, "param": None, "code": None}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def _sse(payload: Any) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+# ==================== 磁带 ====================
+class Cassette:
+    """录制的请求/响应（JSONL，一行一次交互）
+
+    同一请求指纹录有多次时按顺序轮流回放；流式响应按块保存，附带相对请求开始的时间偏移，
+    回放时按原始节奏（乘以 speed）输出。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._exchanges: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self._exchanges.setdefault(exchange["key"], []).append(exchange)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._exchanges.values())
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        exchanges = self._exchanges.get(key)
+        if not exchanges:
+            return None
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = index + 1
+        return exchanges[index % len(exchanges)]
+
+    def append(self, exchange: Dict[str, Any]) -> None:
+        self._exchanges.setdefault(exchange["key"], []).append(exchange)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(exchange, ensure_ascii=False) + "\n")
+
+
+# ==================== 合成回复 ====================
+class _Synthesizer:
+    """按延迟配置合成回复，随机性由 (seed, 请求指纹, 出现次数) 决定"""
+
+    def __init__(self, profile: LatencyProfile, seed: int):
+        self.profile = profile
+        self.seed = seed
+        self._seen: Dict[str, int] = {}
+
+    async def respond(self, body: Dict[str, Any]) -> Response:
+        key = request_key(body)
+        occurrence = self._seen.get(key, 0)
+        self._seen[key] = occurrence + 1
+        rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+        profile = self.profile
+
+        draw = rng.random()
+        if draw < profile.rate_limit_rate:
+            return _error(
+                429,
+                "Rate limit reached (injected by fake server)",
+                "rate_limit_exceeded",
+                headers={
+                    "retry-after": str(max(1, math.ceil(profile.retry_after))),
+                    "retry-after-ms": str(int(profile.retry_after * 1000)),
+                },
+            )
+        if draw < profile.rate_limit_rate + profile.error_rate:
+            return _error(500, "Internal server error (injected by fake server)", "server_error")
+
+        limit = body.get("max_completion_tokens") or body.get("max_tokens") or profile.output_tokens
+        tokens = [rng.choice(_VOCABULARY) + " " for _ in range(min(limit, profile.output_tokens))]
+        ttft = max(0.0, rng.gauss(profile.ttft, profile.ttft * profile.ttft_jitter)) if profile.ttft else 0.0
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) + 4 for m in body.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        completion = _Completion(body.get("model", "fake"))
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                self._stream(completion, tokens, ttft, usage if include_usage else None),
+                media_type="text/event-stream",
+            )
+        # 非流式：整段生成完才返回
+        await asyncio.sleep(ttft + (len(tokens) / profile.tps if profile.tps else 0.0))
+        return JSONResponse(completion.message("".join(tokens).strip(), usage))
+
+    async def _stream(
+        self, completion: "_Completion", tokens: List[str], ttft: float, usage: Optional[Dict[str, int]]
+    ) -> AsyncIterator[bytes]:
+        start = time.perf_counter()
+        yield _sse(completion.chunk({"role": "assistant", "content": ""}))
+        for i, token in enumerate(tokens):
+            # 按绝对时间表输出，避免 sleep 误差累积
+            due = ttft + (i / self.profile.tps if self.profile.tps else 0.0)
+            delay = due - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield _sse(completion.chunk({"content": token}))
+        yield _sse(completion.chunk({}, "stop"))
+        if usage is not None:
+            yield _sse(completion.usage_chunk(usage))
+        yield b"data: [DONE]\n\n"
+
+
+class _Completion:
+    """一次补全的响应体构造（chat.completion / chat.completion.chunk）"""
+
+    def __init__(self, model: str):
+        self.id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self.model = model
+        self.created = int(time.time())
+
+    def _envelope(self, kind: str, choices: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"id": self.id, "object": kind, "created": self.created, "model": self.model, "choices": choices}
+
+    def message(self, content: str, usage: Dict[str, int]) -> Dict[str, Any]:
+        body = self._envelope(
+            "chat.completion",
+            [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        )
+        body["usage"] = usage
+        return body
+
+    def chunk(self, delta: Dict[str, Any], finish: Optional[str] = None) -> Dict[str, Any]:
+        return self._envelope("chat.completion.chunk", [{"index": 0, "delta": delta, "finish_reason": finish}])
+
+    def usage_chunk(self, usage: Dict[str, int]) -> Dict[str, Any]:
+        body = self._envelope("chat.completion.chunk", [])
+        body["usage"] = usage
+        return body
+
+
+# ==================== 录制与回放 ====================
+class _Recorder:
+    """把请求转发到真实上游，原样返回并写入磁带（认证头透传，服务端不保存密钥）"""
+
+    def __init__(self, cassette: Cassette, upstream: str):
+        self.cassette = cassette
+        self.upstream = upstream.rstrip("/")
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0))
+
+    async def respond(self, body: Dict[str, Any], headers: Dict[str, str]) -> Response:
+        key = request_key(body)
+        forward = {k: v for k, v in headers.items() if k.lower() in ("authorization", "openai-organization", "openai-project")}
+        request = self.client.build_request("POST", f"{self.upstream}/chat/completions", json=body, headers=forward)
+        start = time.perf_counter()
+        upstream = await self.client.send(request, stream=True)
+
+        if not body.get("stream") or upstream.status_code != 200:
+            content = await upstream.aread()
+            await upstream.aclose()
+            exchange = {"key": key, "request": body, "status": upstream.status_code, "stream": False,
+                        "elapsed": round(time.perf_counter() - start, 4), "body": json.loads(content or b"null")}
+            self.cassette.append(exchange)
+            return Response(content, status_code=upstream.status_code, media_type="application/json")
+
+        async def relay() -> AsyncIterator[bytes]:
+            chunks: List[Dict[str, Any]] = []
+            try:
+                async for line in upstream.aiter_lines():
+                    if line.startswith("data: "):
+                        chunks.append({"t": round(time.perf_counter() - start, 4), "data": line[len("data: "):]})
+                        yield f"{line}\n\n".encode()
+            finally:
+                await upstream.aclose()
+            self.cassette.append({"key": key, "request": body, "status": 200, "stream": True, "chunks": chunks})
+
+        return StreamingResponse(relay(), media_type="text/event-stream")
+
+
+class _Player:
+    """按请求指纹从磁带回放，speed 为节奏倍率（0 为立即返回）；未命中时按 fallback 合成或返回 404"""
+
+    def __init__(self, cassette: Cassette, speed: float, fallback: Optional[_Synthesizer]):
+        self.cassette = cassette
+        self.speed = speed
+        self.fallback = fallback
+
+    async def respond(self, body: Dict[str, Any]) -> Response:
+        exchange = self.cassette.next(request_key(body))
+        if exchange is None:
+            if self.fallback is not None:
+                return await self.fallback.respond(body)
+            return _error(404, "No recorded exchange for this request (cassette miss)", "cassette_miss")
+
+        if not exchange["stream"]:
+            await asyncio.sleep(exchange.get("elapsed", 0.0) * self.speed)
+            return JSONResponse(exchange["body"], status_code=exchange["status"])
+
+        async def play() -> AsyncIterator[bytes]:
+            start = time.perf_counter()
+            for chunk in exchange["chunks"]:
+                delay = chunk["t"] * self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield f"data: {chunk['data']}\n\n".encode()
+
+        return StreamingResponse(play(), media_type="text/event-stream")
+
+
+# ==================== 应用 ====================
+def create_app(
+    profile: LatencyProfile = PROFILES["gpt-4o-mini"],
+    seed: int = 0,
+    record: Optional[Path] = None,
+    upstream: Optional[str] = None,
+    replay: Optional[Path] = None,
+    replay_speed: float = 1.0,
+    replay_fallback: bool = False,
+) -> FastAPI:
+    """构造假服务应用：默认合成回复；record + upstream 为录制模式；replay 为回放模式"""
+    app = FastAPI(title="fake-openai")
+    synthesizer = _Synthesizer(profile, seed)
+    recorder = _Recorder(Cassette(record), upstream) if record and upstream else None
+    player = _Player(Cassette(replay), replay_speed, synthesizer if replay_fallback else None) if replay else None
+    stats = {"requests": 0, "streamed": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error(400, "Invalid JSON body", "invalid_request_error")
+        if not isinstance(body, dict) or not body.get("messages"):
+            return _error(400, "'messages' is required", "invalid_request_error")
+        stats["requests"] += 1
+        stats["streamed"] += bool(body.get("stream"))
+        if recorder is not None:
+            return await recorder.respond(body, dict(request.headers))
+        if player is not None:
+            return await player.respond(body)
+        return await synthesizer.respond(body)
+
+    @app.get("/v1/models")
+    async def list_models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": name, "object": "model", "owned_by": "fake"} for name in PROFILES]}
+
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, int]:
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI 兼容的假服务（离线压测与回归）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gpt-4o-mini", help="预设延迟配置")
+    parser.add_argument("--ttft", type=float, help="首 token 时间（秒）")
+    parser.add_argument("--ttft-jitter", type=float, help="首 token 时间的相对抖动")
+    parser.add_argument("--tps", type=float, help="输出速率（token/秒，0 为不限速）")
+    parser.add_argument("--output-tokens", type=int, help="默认输出 token 数")
+    parser.add_argument("--error-rate", type=float, help="返回 500 的概率")
+    parser.add_argument("--rate-limit-rate", type=float, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, help="429 建议的重试间隔（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="合成结果的随机种子")
+    parser.add_argument("--record", type=Path, help="录制模式：磁带文件（JSONL，追加写入）")
+    parser.add_argument("--upstream", help="录制模式的真实上游，如 https://api.openai.com/v1")
+    parser.add_argument("--replay", type=Path, help="回放模式：磁带文件")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="回放节奏倍率，0 为立即返回")
+    parser.add_argument("--replay-fallback", action="store_true", help="磁带未命中时合成回复（默认返回 404）")
+    args = parser.parse_args()
+
+    if bool(args.record) != bool(args.upstream):
+        parser.error("--record 与 --upstream 需同时指定")
+    if args.record and args.replay:
+        parser.error("--record 与 --replay 不能同时使用")
+
+    overrides = {
+        field: getattr(args, field)
+        for field in ("ttft", "ttft_jitter", "tps", "output_tokens", "error_rate", "rate_limit_rate", "retry_after")
+        if getattr(args, field) is not None
+    }
+    profile = replace(PROFILES[args.profile], **overrides)
+    app = create_app(profile, args.seed, args.record, args.upstream, args.replay, args.replay_speed, args.replay_fallback)
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+[INPUT]: 依赖 backend.repositories.message 的 MessageRepository._to_model，依赖 backend.models.message 的 MessageResponse，依赖 orjson，依赖 benchmarks.corpus 的语料与统计工具
+[OUTPUT]: 命令行基准：对话历史读取的每条消息 CPU 开销（旧路径：模型构造 + Pydantic 序列化；新路径：原始投影 + orjson）
+[POS]: benchmarks 的历史读取基准，验证 find_raw 投影与 ORJSONResponse 的收益
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.history --sizes 50,200,1000
+
+只测数据库返回之后的 CPU 部分（文档 → 响应字节 / LLM 上下文），不含网络与查询耗时。
+"""
+
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+import orjson
+from pydantic import TypeAdapter
+from backend.models.message import MessageResponse
+from backend.repositories.message import MessageRepository
+from .corpus import percentile, synthetic_messages
+
+_message_list = TypeAdapter(List[MessageResponse])
+_RESPONSE_FIELDS = list(MessageResponse.model_fields)
+
+
+def make_documents(count: int) -> List[Dict[str, Any]]:
+    """构造与 messages 集合一致的完整文档（含 _id 与 expire_at）"""
+    base = datetime(2026, 1, 1)
+    conv_id = str(uuid.uuid4())
+    return [
+        {
+            "_id": uuid.uuid4().hex[:24],
+            "message_id": str(uuid.uuid4()),
+            "conversation_id": conv_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": text,
+            "token_count": len(text),
+            "token_encoding": "o200k_base",
+            "token_rule": "o200k_base:3",
+            "created_at": base + timedelta(seconds=i),
+            "expire_at": base + timedelta(days=30, seconds=i),
+        }
+        for i, text in enumerate(synthetic_messages(count))
+    ]
+
+
+def project(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """模拟数据库端投影：只返回 fields（find_raw 的结果）"""
+    return {field: doc[field] for field in fields if field in doc}
+
+
+# ==================== 旧路径 ====================
+def endpoint_before(docs: List[Dict[str, Any]]) -> bytes:
+    repo = object.__new__(MessageRepository)
+    messages = [repo._to_model(doc) for doc in docs]
+    responses = [
+        MessageResponse(
+            message_id=m.message_id,
+            conversation_id=m.conversation_id,
+            role=m.role,
+            content=m.content,
+            token_count=m.token_count,
+            token_encoding=m.token_encoding,
+            created_at=m.created_at,
+        )
+        for m in messages
+    ]
+    return _message_list.dump_json(responses)
+
+
+def context_before(docs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    repo = object.__new__(MessageRepository)
+    messages = [repo._to_model(doc) for doc in docs]
+    return [{"role": m.role, "content": m.content} for m in messages]
+
+
+# ==================== 新路径 ====================
+def endpoint_after(docs: List[Dict[str, Any]]) -> bytes:
+    return orjson.dumps(docs, option=orjson.OPT_NON_STR_KEYS)
+
+
+def context_after(docs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [{"role": d["role"], "content": d["content"]} for d in docs]
+
+
+def measure(func: Callable[[Any], Any], docs: Any, rounds: int) -> Dict[str, float]:
+    """每条消息耗时（微秒）的 p50/p95"""
+    samples: List[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(docs)
+        samples.append((time.perf_counter() - start) / len(docs) * 1e6)
+    return {f"p{p}": round(percentile(samples, p), 3) for p in (50, 95)}
+
+
+def bench_size(count: int, rounds: int) -> Dict[str, Any]:
+    docs = make_documents(count)
+    response_docs = [project(d, _RESPONSE_FIELDS) for d in docs]
+    context_docs = [project(d, ["role", "content", "token_count", "token_rule"]) for d in docs]
+    # 两条路径输出必须一致，否则对比无意义
+    assert json.loads(endpoint_before(docs)) == json.loads(endpoint_after(response_docs))
+    assert context_before(docs) == context_after(context_docs)
+
+    result: Dict[str, Any] = {}
+    for name, before, after, raw in (
+        ("endpoint", endpoint_before, endpoint_after, response_docs),
+        ("context", context_before, context_after, context_docs),
+    ):
+        b = measure(before, docs, rounds)
+        a = measure(after, raw, rounds)
+        result[name] = {
+            "before_us_per_message": b,
+            "after_us_per_message": a,
+            "speedup_p50": round(b["p50"] / max(a["p50"], 1e-9), 1),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对话历史读取的每条消息开销基准")
+    parser.add_argument("--sizes", default="50,200,1000")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    result = {
+        str(count): bench_size(count, args.rounds)
+        for count in (int(size) for size in args.sizes.split(","))
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
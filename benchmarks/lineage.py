@@ -0,0 +1,182 @@
+"""
+[INPUT]: 依赖 backend.core 的 db/connect_storage/ensure_indexes/use_openai_client，依赖 backend.storage 的 MemoryBackend/SQLiteBackend，依赖 backend.services 的 ConversationService/MessageService/RetentionService，依赖 backend.repositories 的 Conversation/Message Repository，依赖 benchmarks.fake_openai 的假服务（折叠摘要）
+[OUTPUT]: 命令行校验：分支会话的历史拼接、嵌套分支截止点、过期折叠不删除被分支引用的父会话消息，任一用例失败时退出码为 1
+[POS]: benchmarks 的会话分支校验，覆盖 LineageResolver 与 RetentionService 的交互
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.lineage
+    python -m benchmarks.lineage --store sqlite
+
+存储与假 LLM 全部在进程内运行；每个用例使用独立的会话，互不影响。
+"""
+
+from typing import Awaitable, Callable, Dict, List, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import uuid
+import httpx
+from openai import AsyncOpenAI
+from backend.core.database import db, connect_storage, close_storage, ensure_indexes
+from backend.core.llm_client import use_openai_client
+from backend.models.conversation import ConversationFork
+from backend.repositories.conversation import ConversationRepository
+from backend.repositories.message import MessageRepository
+from backend.services.conversation import ConversationService
+from backend.services.message import MessageService
+from backend.services.retention import RetentionService
+from backend.storage import MemoryBackend, SQLiteBackend
+from .fake_openai import LatencyProfile, create_app
+
+# 父会话 p0..p7 每天一条，从 9.5 天前到 2.5 天前；保留 5 天时 p0..p4 过期
+_PARENT_MESSAGES = 8
+_RETENTION_DAYS = 5
+_EXPIRED = 5
+
+
+async def _conversation(retention_days: int = _RETENTION_DAYS) -> str:
+    now = datetime.utcnow()
+    conv = await ConversationRepository().create(
+        {
+            "conversation_id": str(uuid.uuid4()),
+            "user_id": "lineage-check",
+            "agent_id": "lineage-check",
+            "retention_days": retention_days,
+            "message_count": 0,
+            "revision": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+    )
+    return conv.conversation_id
+
+
+async def _messages(conv_id: str, contents: List[str], start: datetime, step: timedelta) -> List[str]:
+    docs = [
+        {
+            "message_id": str(uuid.uuid4()),
+            "conversation_id": conv_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": content,
+            "token_count": len(content),
+            "token_encoding": "o200k_base",
+            "token_rule": "o200k_base:3",
+            "created_at": start + step * i,
+        }
+        for i, content in enumerate(contents)
+    ]
+    await MessageRepository().create_many(docs)
+    await ConversationRepository().increment({"conversation_id": conv_id}, {"message_count": len(docs)})
+    return [doc["message_id"] for doc in docs]
+
+
+async def _parent() -> Tuple[str, List[str]]:
+    """父会话与按时间顺序的消息 ID"""
+    conv_id = await _conversation()
+    start = datetime.utcnow() - timedelta(days=9, hours=12)
+    ids = await _messages(conv_id, [f"p{i}" for i in range(_PARENT_MESSAGES)], start, timedelta(days=1))
+    return conv_id, ids
+
+
+async def _history(conv_id: str) -> List[str]:
+    return [m["content"] for m in await MessageService().get_context_messages(conv_id, limit=100)]
+
+
+def _expect(actual: List[str], expected: List[str]) -> None:
+    if actual != expected:
+        raise AssertionError(f"历史不一致: {actual} != {expected}")
+
+
+# ==================== 用例 ====================
+async def check_fork_history() -> None:
+    """分支历史 = 父会话分支点（含）之前的消息 + 自身消息"""
+    parent, ids = await _parent()
+    fork = await ConversationService().fork_conversation(parent, ConversationFork(message_id=ids[2]))
+    await _messages(fork.conversation_id, ["f0", "f1"], datetime.utcnow(), timedelta(seconds=1))
+    _expect(await _history(fork.conversation_id), ["p0", "p1", "p2", "f0", "f1"])
+
+
+async def check_nested_fork() -> None:
+    """孙分支的父会话截止点取两级分支点中较早者"""
+    parent, ids = await _parent()
+    service = ConversationService()
+    fork = await service.fork_conversation(parent, ConversationFork(message_id=ids[4]))
+    child = await service.fork_conversation(fork.conversation_id, ConversationFork())
+    _expect(await _history(child.conversation_id), ["p0", "p1", "p2", "p3", "p4"])
+
+
+async def check_retention_keeps_forked_history() -> None:
+    """父会话过期折叠不删除被分支引用的消息，分支历史保持完整"""
+    parent, ids = await _parent()
+    fork = await ConversationService().fork_conversation(parent, ConversationFork(message_id=ids[1]))
+    conv = await ConversationRepository().find_one({"conversation_id": parent})
+    progress: Dict[str, int] = {}
+    await RetentionService().compact_conversation(conv, datetime.utcnow(), progress)
+    if progress.get("messages"):
+        raise AssertionError(f"被分支引用的消息被折叠: {progress}")
+    _expect(await _history(fork.conversation_id), ["p0", "p1"])
+
+
+async def check_retention_after_fork_deleted() -> None:
+    """引用父会话消息的分支删除后，父会话照常折叠过期消息"""
+    parent, ids = await _parent()
+    fork = await ConversationService().fork_conversation(parent, ConversationFork(message_id=ids[1]))
+    await ConversationRepository().delete({"conversation_id": fork.conversation_id})
+    conv = await ConversationRepository().find_one({"conversation_id": parent})
+    progress: Dict[str, int] = {}
+    await RetentionService().compact_conversation(conv, datetime.utcnow(), progress)
+    if progress.get("messages") != _EXPIRED:
+        raise AssertionError(f"过期消息未折叠: {progress}")
+    _expect(await _history(parent), [f"p{i}" for i in range(_EXPIRED, _PARENT_MESSAGES)])
+
+
+CHECKS: List[Tuple[str, Callable[[], Awaitable[None]]]] = [
+    ("fork_history", check_fork_history),
+    ("nested_fork", check_nested_fork),
+    ("retention_keeps_forked_history", check_retention_keeps_forked_history),
+    ("retention_after_fork_deleted", check_retention_after_fork_deleted),
+]
+
+
+async def run(store: str) -> Dict[str, List[str]]:
+    if store == "sqlite":
+        db.backend = SQLiteBackend(str(Path(tempfile.mkdtemp()) / "lineage.sqlite3"))
+    else:
+        db.backend = MemoryBackend()
+    await connect_storage()
+    await ensure_indexes()
+    profile = LatencyProfile(ttft=0.0, ttft_jitter=0.0, tps=0.0, output_tokens=16)
+    fake = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(profile)), base_url="http://fake-openai")
+    use_openai_client(AsyncOpenAI(api_key="check", base_url="http://fake-openai/v1", http_client=fake, max_retries=0))
+
+    result: Dict[str, List[str]] = {"passed": [], "failed": []}
+    try:
+        for name, check in CHECKS:
+            try:
+                await check()
+                result["passed"].append(name)
+            except AssertionError as e:
+                result["failed"].append(f"{name}: {e}")
+    finally:
+        await fake.aclose()
+        await close_storage()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="会话分支历史与过期折叠校验")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.store))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+[INPUT]: 依赖 backend.main 的 app，依赖 backend.core.database 的 db，依赖 backend.storage 的 MemoryBackend，依赖 backend.core.pubsub 的 pubsub/user_channel，依赖 resource 标准库（峰值 RSS）
+[OUTPUT]: 命令行基准：空闲 WebSocket 连接的单连接内存、建连速率，以及向全部连接推送一个事件的扇出耗时
+[POS]: benchmarks 的实时通道基准，验证单节点 5 万空闲连接的应用层开销
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.realtime --connections 50000
+
+连接在进程内直接驱动 ASGI 应用（不经过网络与 ASGI 服务器），只测应用层：
+路由、订阅、每连接的协程与队列（含基准自身模拟连接的少量对象）。ASGI 服务器自身的每连接缓冲（uvicorn + websockets
+约数十 KB，取决于 --ws-max-queue）需另行叠加，见 README 的部署说明。
+"""
+
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import time
+import resource
+from backend.core.database import db
+from backend.core.pubsub import pubsub, user_channel
+from backend.storage import MemoryBackend
+from .corpus import percentile
+
+
+class _FakeSocket:
+    """一条进程内 WebSocket：receive 从队列取客户端事件，send 记录服务端帧"""
+
+    def __init__(self):
+        self.inbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.ready = asyncio.Event()
+        self.received_at: List[float] = []
+
+    async def receive(self) -> Dict[str, Any]:
+        return await self.inbox.get()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if message["type"] != "websocket.send":
+            return
+        if not self.ready.is_set():
+            self.ready.set()
+        else:
+            self.received_at.append(time.perf_counter())
+
+
+def _peak_rss() -> int:
+    """进程峰值 RSS（字节，Linux 下 ru_maxrss 单位为 KB）；连接只增不减，峰值差即连接占用"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _scope(user_id: str) -> Dict[str, Any]:
+    return {
+        "type": "websocket",
+        "path": "/api/ws",
+        "raw_path": b"/api/ws",
+        "query_string": f"user_id={user_id}".encode(),
+        "headers": [],
+        "scheme": "ws",
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+        "root_path": "",
+        "subprotocols": [],
+        "asgi": {"version": "3.0"},
+    }
+
+
+async def bench(connections: int, users: int) -> Dict[str, Any]:
+    from backend.main import app
+    from backend.services.user import UserService
+    from backend.models.user import UserCreate
+
+    db.backend = MemoryBackend()
+    service = UserService()
+    user_ids = [(await service.create_user(UserCreate(username=f"bench{i}"))).user_id for i in range(users)]
+
+    baseline = _peak_rss()
+
+    sockets: List[_FakeSocket] = []
+    tasks: List[asyncio.Task] = []
+    start = time.perf_counter()
+    for i in range(connections):
+        sock = _FakeSocket()
+        sockets.append(sock)
+        tasks.append(asyncio.create_task(app(_scope(user_ids[i % users]), sock.receive, sock.send)))
+        if len(tasks) % 1000 == 0:
+            await asyncio.gather(*(s.ready.wait() for s in sockets[-1000:]))
+    await asyncio.gather(*(s.ready.wait() for s in sockets))
+    connect_seconds = time.perf_counter() - start
+
+    per_connection = (_peak_rss() - baseline) / connections
+
+    # 扇出：向每个用户频道推送一个事件，直到所有连接收到
+    start = time.perf_counter()
+    for user_id in user_ids:
+        await pubsub.publish(user_channel(user_id), {"type": "message.created", "message": {"content": "ping"}})
+    publish_seconds = time.perf_counter() - start
+    while any(not s.received_at for s in sockets):
+        await asyncio.sleep(0.001)
+    latencies = sorted(s.received_at[0] - start for s in sockets)
+
+    for sock in sockets:
+        sock.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await asyncio.gather(*tasks)
+
+    return {
+        "connections": connections,
+        "users": users,
+        "connect_per_second": round(connections / connect_seconds),
+        "rss_bytes_per_idle_connection": round(per_connection),
+        "app_mb_total": round(per_connection * connections / 2**20, 1),
+        "fanout_publish_ms": round(publish_seconds * 1000, 2),
+        "fanout_delivery_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+        "subscriptions_after_close": pubsub.stats()["subscriptions"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="实时通道基准")
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100, help="连接均分到这些用户频道")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(bench(args.connections, args.users)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
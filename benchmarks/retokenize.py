@@ -0,0 +1,173 @@
+"""
+[INPUT]: 依赖 backend.core 的 db/connect_storage/ensure_indexes/get_tokenizer，依赖 backend.storage 的 MemoryBackend/SQLiteBackend，依赖 backend.services 的 AgentService/MessageService/RetokenizeService/job_runner，依赖 backend.repositories 的 Conversation/Message/Job Repository
+[OUTPUT]: 命令行校验：同编码、不同每条消息开销的模型切换后重新计数，规则相同的切换不触发任务，未记录规则的旧消息被补齐，任一用例失败时退出码为 1
+[POS]: benchmarks 的 token 计数规则校验，覆盖 AgentService 的切换判断与 RetokenizeService 的过期过滤
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    python -m benchmarks.retokenize
+    python -m benchmarks.retokenize --store sqlite
+
+用例只用 cl100k 的模型（gpt-3.5-turbo-0301 每条消息开销 4，gpt-4 为 3），需要能加载 cl100k_base 编码。
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import uuid
+from backend.core.database import db, connect_storage, close_storage, ensure_indexes
+from backend.core.tokenizer import get_tokenizer
+from backend.models.agent import AgentCreate
+from backend.repositories.conversation import ConversationRepository
+from backend.repositories.job import JobRepository
+from backend.repositories.message import MessageRepository
+from backend.services.agent import AgentService
+from backend.services.job import job_runner
+from backend.services.message import MessageService
+from backend.services.retokenize import JOB_TYPE, RetokenizeService
+from backend.storage import MemoryBackend, SQLiteBackend
+
+# 同为 cl100k_base，每条消息开销分别为 4 与 3
+_OLD_MODEL = "gpt-3.5-turbo-0301"
+_NEW_MODEL = "gpt-4"
+_SAME_RULE_MODEL = "gpt-4-turbo"
+_CONTENTS = ["你好，帮我看看这段代码", "def f(x):\n    return x ** 2", "好的，结果是 42。"]
+_JOB_TIMEOUT = 10.0
+
+
+async def _agent(model: str) -> str:
+    agent = await AgentService().create_agent(AgentCreate(name="retokenize-check", system_prompt="check", model=model))
+    return agent.agent_id
+
+
+async def _conversation(agent_id: str, model: str) -> str:
+    now = datetime.utcnow()
+    conv = await ConversationRepository().create(
+        {
+            "conversation_id": str(uuid.uuid4()),
+            "user_id": "retokenize-check",
+            "agent_id": agent_id,
+            "message_count": 0,
+            "revision": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+    )
+    service = MessageService()
+    for i, content in enumerate(_CONTENTS):
+        await service.create_message(conv.conversation_id, "user" if i % 2 == 0 else "assistant", content, model=model)
+    return conv.conversation_id
+
+
+async def _switch(agent_id: str, model: str) -> None:
+    await AgentService().update_agent(agent_id, AgentCreate(name="retokenize-check", system_prompt="check", model=model))
+
+
+async def _wait(agent_id: str) -> Optional[str]:
+    """等待该 Agent 的重新计数任务结束，返回最终状态；没有任务时返回 None"""
+    repo = JobRepository()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _JOB_TIMEOUT
+    while True:
+        jobs = await repo.find_many({"job_type": JOB_TYPE, "target_id": agent_id}, limit=10)
+        if not jobs:
+            return None
+        if all(job.status in ("completed", "failed") for job in jobs):
+            return jobs[-1].status
+        if loop.time() > deadline:
+            raise AssertionError(f"重新计数任务超时: {[job.status for job in jobs]}")
+        await asyncio.sleep(0.05)
+
+
+async def _expect_counts(conv_id: str, model: str) -> None:
+    tokenizer = get_tokenizer(model)
+    messages = await MessageRepository().find_many({"conversation_id": conv_id}, limit=100)
+    actual = sorted((m.content, m.token_count, m.token_rule) for m in messages)
+    expected = sorted((c, tokenizer.count_message(c), tokenizer.rule) for c in _CONTENTS)
+    if actual != expected:
+        raise AssertionError(f"token_count 与 {model} 的计数规则不一致: {actual} != {expected}")
+
+
+# ==================== 用例 ====================
+async def check_same_encoding_switch() -> None:
+    """同编码、不同每条消息开销的模型切换后，历史消息按新模型重新计数"""
+    agent_id = await _agent(_OLD_MODEL)
+    conv_id = await _conversation(agent_id, _OLD_MODEL)
+    await _expect_counts(conv_id, _OLD_MODEL)
+    await _switch(agent_id, _NEW_MODEL)
+    status = await _wait(agent_id)
+    if status != "completed":
+        raise AssertionError(f"切换模型后重新计数任务状态: {status}")
+    await _expect_counts(conv_id, _NEW_MODEL)
+
+
+async def check_same_rule_switch() -> None:
+    """计数规则相同的模型切换不触发重新计数"""
+    agent_id = await _agent(_NEW_MODEL)
+    await _conversation(agent_id, _NEW_MODEL)
+    await _switch(agent_id, _SAME_RULE_MODEL)
+    status = await _wait(agent_id)
+    if status is not None:
+        raise AssertionError(f"规则相同的切换触发了重新计数: {status}")
+
+
+async def check_legacy_messages() -> None:
+    """只记录了编码、未记录规则的旧消息视为过期，手动任务按当前模型补齐"""
+    agent_id = await _agent(_OLD_MODEL)
+    conv_id = await _conversation(agent_id, _OLD_MODEL)
+    repo = MessageRepository()
+    messages = await repo.find_many({"conversation_id": conv_id}, limit=100)
+    await repo.update_each([({"message_id": m.message_id}, {"token_count": 0, "token_rule": None}) for m in messages])
+    await RetokenizeService().schedule(agent_id)
+    status = await _wait(agent_id)
+    if status != "completed":
+        raise AssertionError(f"手动重新计数任务状态: {status}")
+    await _expect_counts(conv_id, _OLD_MODEL)
+
+
+CHECKS: List[Tuple[str, Callable[[], Awaitable[None]]]] = [
+    ("same_encoding_switch", check_same_encoding_switch),
+    ("same_rule_switch", check_same_rule_switch),
+    ("legacy_messages", check_legacy_messages),
+]
+
+
+async def run(store: str) -> Dict[str, List[str]]:
+    if store == "sqlite":
+        db.backend = SQLiteBackend(str(Path(tempfile.mkdtemp()) / "retokenize.sqlite3"))
+    else:
+        db.backend = MemoryBackend()
+    await connect_storage()
+    await ensure_indexes()
+
+    result: Dict[str, List[str]] = {"passed": [], "failed": []}
+    try:
+        for name, check in CHECKS:
+            try:
+                await check()
+                result["passed"].append(name)
+            except AssertionError as e:
+                result["failed"].append(f"{name}: {e}")
+    finally:
+        await job_runner.shutdown()
+        await close_storage()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同编码换模型的 token 重新计数校验")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.store))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+[INPUT]: 依赖 backend.services.search 的 tokenize/SearchService，依赖 backend.core.database 的 db/ensure_indexes，依赖 backend.storage.mongo 的 MongoBackend，依赖 benchmarks.corpus 的合成语料
+[OUTPUT]: 命令行基准：分词吞吐、索引体积估算，以及（连接 MongoDB 时）批量建索引与查询延迟
+[POS]: benchmarks 的全文检索基准，验证二元组倒排索引在千万级消息下的表现
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    # 仅分词与体积估算（无需数据库）
+    python -m benchmarks.search --messages 100000
+
+    # 千万级：写入独立的基准库并测查询延迟（会清空 --db 指定的库）
+    python -m benchmarks.search --messages 10000000 --mongo-url mongodb://localhost:27017 --db bench_search
+"""
+
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from backend.services.search import tokenize
+from .corpus import synthetic_messages, percentile
+
+INSERT_BATCH = 5000
+
+
+def bench_tokenize(count: int) -> Dict[str, Any]:
+    """纯 CPU：分词吞吐与每条消息的词项数"""
+    terms = 0
+    chars = 0
+    start = time.perf_counter()
+    for text in synthetic_messages(count):
+        terms += len(tokenize(text))
+        chars += len(text)
+    elapsed = time.perf_counter() - start
+    return {
+        "messages": count,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(count / elapsed),
+        "avg_chars": round(chars / count, 1),
+        "avg_postings_per_message": round(terms / count, 2),
+        "estimated_postings_10m": round(terms / count * 10_000_000),
+    }
+
+
+async def bench_mongo(args: argparse.Namespace) -> Dict[str, Any]:
+    """写入合成消息与倒排记录，再测查询延迟"""
+    from backend.core.database import db, ensure_indexes
+    from backend.services.search import SearchService
+    from backend.storage.mongo import MongoBackend
+
+    backend = MongoBackend(args.mongo_url, args.db)
+    await backend.connect()
+    await backend.client.drop_database(args.db)
+    db.backend = backend
+    await ensure_indexes()
+
+    user_ids = [f"bench-user-{i}" for i in range(args.users)]
+    base_time = datetime.utcnow() - timedelta(days=365)
+    messages: List[Dict[str, Any]] = []
+    postings: List[Dict[str, Any]] = []
+
+    start = time.perf_counter()
+    for i, text in enumerate(synthetic_messages(args.messages)):
+        user_id = user_ids[i % args.users]
+        created_at = base_time + timedelta(seconds=i)
+        message_id = f"m{i}"
+        conv_id = f"{user_id}-c{i % 50}"
+        messages.append(
+            {
+                "message_id": message_id,
+                "conversation_id": conv_id,
+                "role": "user",
+                "content": text,
+                "created_at": created_at,
+            }
+        )
+        postings.extend(
+            {
+                "term": term,
+                "user_id": user_id,
+                "conversation_id": conv_id,
+                "message_id": message_id,
+                "tf": tf,
+                "created_at": created_at,
+            }
+            for term, tf in tokenize(text).items()
+        )
+        if len(messages) >= INSERT_BATCH:
+            await backend.database.messages.insert_many(messages, ordered=False)
+            await backend.database.search_postings.insert_many(postings, ordered=False)
+            messages, postings = [], []
+    if messages:
+        await backend.database.messages.insert_many(messages, ordered=False)
+        await backend.database.search_postings.insert_many(postings, ordered=False)
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(7)
+    queries = [
+        " ".join(rng.sample(list(tokenize(text)), k=min(2, len(tokenize(text)))))
+        for text in synthetic_messages(args.queries, seed=99)
+    ]
+    service = SearchService()
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        await service.search(rng.choice(user_ids), q, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    stats = await backend.database.command("collstats", "search_postings")
+    return {
+        "load_seconds": round(load_seconds, 1),
+        "postings": stats.get("count"),
+        "postings_index_mb": round(stats.get("totalIndexSize", 0) / 1024 / 1024, 1),
+        "query_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="全文检索基准")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--mongo-url", default=None, help="提供后执行写入与查询基准")
+    parser.add_argument("--db", default="bench_search")
+    args = parser.parse_args()
+
+    result: Dict[str, Any] = {"tokenize": bench_tokenize(min(args.messages, 200_000))}
+    if args.mongo_url:
+        result["mongo"] = asyncio.run(bench_mongo(args))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
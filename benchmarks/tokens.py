@@ -0,0 +1,245 @@
+"""
+[INPUT]: 依赖 backend.core.tokenizer 的 get_tokenizer/trim_to_budget，依赖 benchmarks.corpus 的语料与统计工具
+[OUTPUT]: 命令行基准：估算与精确计数的单条耗时、估算误差分布与区间越界率、每轮上下文裁剪的 CPU 耗时，以及 --check 的区间校验（对抗文本与语料，含区间相对实际的分布）
+[POS]: benchmarks 的 token 计数基准，验证字符类别区间估算可以替代大部分 BPE，并校验其系数
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+
+用法：
+    # 合成语料（短消息 + 长文本粘贴）
+    python -m benchmarks.tokens --messages 20000
+
+    # 真实语料：先用 `python -m cli.main data export -u <user_id> -o corpus.ndjson` 导出
+    python -m benchmarks.tokens --corpus corpus.ndjson
+
+    # 对抗文本（数字、标点、生僻汉字、Markdown、长空白、长串）与语料上校验所有已注册编码的区间，
+    # 输出上界 / 下界相对实际的分布；越界或编码无法加载时退出码为 1
+    python -m benchmarks.tokens --check
+    python -m benchmarks.tokens --check --encodings cl100k_base --corpus corpus.ndjson
+"""
+
+from typing import Any, Dict, List
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from backend.core.config import settings
+from backend.core.tokenizer import _MODEL_RULES, Tokenizer, get_tokenizer, trim_to_budget
+from .corpus import exported_messages, percentile, synthetic_messages, synthetic_pastes
+
+# 估算最容易失手的文本：BPE 合并很少（数字、标点、生僻字）或很多（长空白、分隔线）
+ADVERSARIAL_TEXTS: Dict[str, str] = {
+    "digits": " ".join(str(i) for i in range(1, 200)),
+    "arithmetic": "1+2=3; 4*5=20; " * 10,
+    "punctuation": "1 , 2 , 3 , " * 10 + "!?.,;:'\"()[]{}<>|\\/@#$%^&*~`" * 10,
+    "markdown_tasks": "- [ ] x\n" * 20,
+    "markdown_table": "| a | b |\n|---|---|\n" + "| 1 | 2 |\n" * 30,
+    "rare_cjk": "鑫龘" * 20 + "𠀀𠀁𪚥" * 10,
+    "emoji": "👨‍👩‍👧‍👦🏳️‍🌈" * 10,
+    "mixed_scripts": "abcАБВαβγ你好こんにちは안녕" * 10,
+    "whitespace": " " * 500 + "\n" * 200 + "\t" * 100,
+    "rule_lines": "-" * 400 + "=" * 400,
+    "base64": "QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVo0123456789+/" * 20,
+    "long_words": "internationalization electroencephalography antidisestablishmentarianism pneumonoultramicroscopic " * 10,
+    "hex_ids": " ".join(f"{i * 2654435761 % 2**32:08x}" for i in range(100)),
+    "spaced_letters": " ".join("abcdefghijklmnopqrstuvwxyz") * 10,
+    "indented_code": "    def f(x):\n        return x\n" * 20,
+    "urls": " ".join(f"https://example.com/a/{i}?q=x&id={i * 7}" for i in range(40)),
+    "camel_case": "getUserByIdAndTimestamp setHTTPRequestHeaderValue XMLHttpRequestFactory " * 10,
+    "repeated_letter": "a" * 500 + " " + "z" * 500,
+    "cjk_punct": "，。！？、；：“”（）【】" * 30,
+    "cjk_digits": "第1章第2节共3页" * 30,
+}
+
+
+def load_corpus(args: argparse.Namespace) -> List[str]:
+    if args.corpus:
+        return list(exported_messages(args.corpus, limit=args.messages))
+    pastes = max(1, args.messages // 50)
+    return list(synthetic_messages(args.messages - pastes)) + list(synthetic_pastes(pastes))
+
+
+def bench_counting(tokenizer: Tokenizer, texts: List[str]) -> Dict[str, Any]:
+    """单条消息：精确计数 vs 估算的耗时，以及估算区间的误差"""
+    exact: List[int] = []
+    start = time.perf_counter()
+    for text in texts:
+        exact.append(tokenizer.count(text))
+    exact_seconds = time.perf_counter() - start
+
+    bounds = []
+    start = time.perf_counter()
+    for text in texts:
+        bounds.append(tokenizer.estimate(text))
+    estimate_seconds = time.perf_counter() - start
+
+    ratios, widths = [], []
+    below = above = 0
+    for count, (low, high) in zip(exact, bounds):
+        if not count:
+            continue
+        below += count < low
+        above += count > high
+        ratios.append((low + high) / 2 / count)
+        widths.append((high - low) / count)
+
+    total_chars = sum(len(t) for t in texts)
+    return {
+        "exact_us_per_message": round(exact_seconds / len(texts) * 1e6, 2),
+        "estimate_us_per_message": round(estimate_seconds / len(texts) * 1e6, 2),
+        "exact_us_per_kchar": round(exact_seconds / total_chars * 1e9, 2),
+        "estimate_us_per_kchar": round(estimate_seconds / total_chars * 1e9, 2),
+        "speedup": round(exact_seconds / max(estimate_seconds, 1e-9), 1),
+        "midpoint_over_exact": {
+            f"p{p}": round(percentile(ratios, p), 3) for p in (1, 5, 50, 95, 99)
+        },
+        "relative_width_p50": round(percentile(widths, 50), 3),
+        "below_lower_bound": below,
+        "above_upper_bound": above,
+        "violation_rate": round((below + above) / max(len(ratios), 1), 5),
+    }
+
+
+def check_bounds(encodings: List[str], texts: List[str]) -> Dict[str, Any]:
+    """逐编码校验 low <= count <= high：对抗文本与语料全部参与，语料另给出区间相对实际的分布
+
+    加载不了的编码（离线环境没有 BPE 表）记入 unavailable，同样视为未通过。
+    """
+    samples = list(ADVERSARIAL_TEXTS.items()) + [(f"corpus[{i}]", text) for i, text in enumerate(texts)]
+    violations: List[Dict[str, Any]] = []
+    envelope: Dict[str, Any] = {}
+    unavailable: Dict[str, str] = {}
+    for encoding in encodings:
+        tokenizer = Tokenizer(encoding, 0, 0)
+        try:
+            tokenizer.count("")
+        except Exception as e:
+            unavailable[encoding] = f"{type(e).__name__}: {e}"
+            continue
+        high_ratios, low_ratios = [], []
+        for name, text in samples:
+            low, high = tokenizer.estimate(text)
+            count = tokenizer.count(text)
+            if not low <= count <= high:
+                violations.append({"encoding": encoding, "text": name, "low": low, "count": count, "high": high})
+            if count and name not in ADVERSARIAL_TEXTS:
+                high_ratios.append(high / count)
+                low_ratios.append(low / count)
+        envelope[encoding] = {
+            "calibrated": tokenizer.rates is not None,
+            "high_over_exact": {f"p{p}": round(percentile(high_ratios, p), 3) for p in (50, 90, 100)},
+            "low_over_exact": {f"p{p}": round(percentile(low_ratios, p), 3) for p in (0, 10, 50)},
+        }
+    return {
+        "encodings": encodings,
+        "texts": len(samples),
+        "envelope": envelope,
+        "unavailable": unavailable,
+        "violations": violations,
+    }
+
+
+def _trim_exact(messages: List[Dict[str, str]], max_tokens: int, tokenizer: Tokenizer) -> int:
+    """旧实现：整体精确计数，再逐条删除最早的历史，返回保留的消息数"""
+    total = tokenizer.count_messages(messages)
+    if total <= max_tokens or len(messages) <= 2:
+        return len(messages)
+    history = messages[1:-1]
+    while history and total > max_tokens:
+        total -= tokenizer.count_message(history.pop(0)["content"])
+    return len(history) + 2
+
+
+def bench_turns(
+    tokenizer: Tokenizer, texts: List[str], turns: int, history: int, budget: int
+) -> Dict[str, Any]:
+    """模拟每轮对话的上下文裁剪：[system] + 最近 history 条 + [user]
+
+    estimate_only：全部消息先估算；stored_history：历史消息复用入库时的 token_count（线上路径）
+    """
+    rng = random.Random(11)
+    exact_ms: List[float] = []
+    modes = ("estimate_only", "stored_history")
+    mode_ms: Dict[str, List[float]] = {mode: [] for mode in modes}
+    mode_counts: Dict[str, List[int]] = {mode: [] for mode in modes}
+    mismatches = 0
+    for _ in range(turns):
+        sample = rng.sample(texts, min(history + 1, len(texts)))
+        messages = [{"role": "system", "content": "你是一个贴心的生活助手。"}] + [
+            {"role": "user" if i % 2 else "assistant", "content": t}
+            for i, t in enumerate(sample)
+        ]
+
+        start = time.perf_counter()
+        expected = _trim_exact(messages, budget, tokenizer)
+        exact_ms.append((time.perf_counter() - start) * 1000)
+
+        stored = [None] + [tokenizer.count_message(m["content"]) for m in messages[1:-1]] + [None]
+        for mode, known in zip(modes, (None, stored)):
+            start = time.perf_counter()
+            kept, counted = trim_to_budget(messages, budget, tokenizer, known)
+            mode_ms[mode].append((time.perf_counter() - start) * 1000)
+            mode_counts[mode].append(counted)
+            mismatches += len(kept) != expected
+
+    def summary(values: List[float]) -> Dict[str, float]:
+        return {f"p{p}": round(percentile(values, p), 3) for p in (50, 95, 99)}
+
+    return {
+        "turns": turns,
+        "budget": budget,
+        "exact_ms_per_turn": summary(exact_ms),
+        **{
+            mode: {
+                "ms_per_turn": summary(mode_ms[mode]),
+                "exact_counts_per_turn_mean": round(sum(mode_counts[mode]) / max(turns, 1), 2),
+            }
+            for mode in modes
+        },
+        "kept_count_mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="token 估算与上下文裁剪基准")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--corpus", default=None, help="data export 导出的 NDJSON 文件（可为 .zst）")
+    parser.add_argument("--models", default="deepseek-chat,gpt-4o-mini,gpt-4")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=4096)
+    parser.add_argument("--check", action="store_true", help="在对抗文本与语料上校验估算区间并输出区间相对实际的分布")
+    parser.add_argument("--encodings", default=None, help="--check 校验的编码（逗号分隔），默认所有已注册编码")
+    args = parser.parse_args()
+
+    if args.check:
+        encodings = args.encodings.split(",") if args.encodings else sorted(
+            {rule[1] for rule in _MODEL_RULES}
+            | set(settings.TOKENIZER_MODEL_OVERRIDES.values())
+            | {settings.DEFAULT_TOKEN_ENCODING}
+        )
+        report = check_bounds(encodings, load_corpus(args))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(1 if report["violations"] or report["unavailable"] else 0)
+
+    texts = load_corpus(args)
+    result: Dict[str, Any] = {"messages": len(texts)}
+    tokenizers = {model: get_tokenizer(model) for model in args.models.split(",")}
+    # 同编码的模型只测一次
+    for encoding, group in itertools.groupby(
+        sorted(tokenizers.items(), key=lambda item: item[1].encoding), key=lambda item: item[1].encoding
+    ):
+        models = [model for model, _ in group]
+        tokenizer = tokenizers[models[0]]
+        entry: Dict[str, Any] = {
+            "models": models,
+            "counting": bench_counting(tokenizer, texts),
+            "context": bench_turns(tokenizer, texts, args.turns, args.history, args.budget),
+        }
+        result[encoding] = entry
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
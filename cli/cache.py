@@ -0,0 +1,121 @@
+"""
+[INPUT]: 依赖 sqlite3 标准库，依赖 os/pathlib 的缓存路径
+[OUTPUT]: 对外提供 TranscriptCache 类（本地对话记录缓存：消息、增量同步游标与历史代次）
+[POS]: cli 的本地持久化层，被 cli.client 的 APIClient.sync_transcript 与 chat 命令消费
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import os
+import sqlite3
+
+
+def default_cache_path() -> Path:
+    """缓存文件位置：$CHUXING_CLI_CACHE，否则 $XDG_CACHE_HOME（默认 ~/.cache）/chuxing/transcripts.sqlite3"""
+    explicit = os.environ.get("CHUXING_CLI_CACHE")
+    if explicit:
+        return Path(explicit).expanduser()
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "chuxing" / "transcripts.sqlite3"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    server TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    generation TEXT,
+    cursor TEXT,
+    PRIMARY KEY (server, conversation_id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    server TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (server, conversation_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_time ON messages (server, conversation_id, created_at);
+"""
+
+
+class TranscriptCache:
+    """本地对话记录缓存（SQLite）
+
+    按 (服务地址, 会话) 保存对话历史的本地副本：
+    - cursor：最近一次增量同步拿到的最后一条消息时间，下次同步从这里开始（since 游标）
+    - generation：服务端的历史代次，变化（过期折叠、重新计算 token）时丢弃副本重建
+    分支会话的副本包含继承自祖先的消息，与历史接口返回的内容一致。
+    实时通道收到的消息也写入副本，但不推进游标：断线期间漏掉的消息由下次同步补齐，
+    重复的 message_id 自动忽略。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def state(self, server: str, conv_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """(generation, cursor)，未缓存过时均为 None"""
+        row = self.conn.execute(
+            "SELECT generation, cursor FROM transcripts WHERE server = ? AND conversation_id = ?",
+            (server, conv_id),
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def set_state(self, server: str, conv_id: str, generation: Optional[str], cursor: Optional[str]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO transcripts (server, conversation_id, generation, cursor) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (server, conversation_id) DO UPDATE SET generation = excluded.generation, cursor = excluded.cursor",
+                (server, conv_id, generation, cursor),
+            )
+
+    def reset(self, server: str, conv_id: str) -> None:
+        """丢弃该会话的本地副本"""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM messages WHERE server = ? AND conversation_id = ?", (server, conv_id)
+            )
+            self.conn.execute(
+                "DELETE FROM transcripts WHERE server = ? AND conversation_id = ?", (server, conv_id)
+            )
+
+    def append(self, server: str, conv_id: str, messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """写入消息，返回此前未缓存的那部分（按 message_id 去重）"""
+        added: List[Dict[str, Any]] = []
+        with self.conn:
+            for message in messages:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO messages (server, conversation_id, message_id, role, content, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        server,
+                        conv_id,
+                        message["message_id"],
+                        message["role"],
+                        message["content"],
+                        message["created_at"],
+                    ),
+                )
+                if cursor.rowcount:
+                    added.append(message)
+        return added
+
+    def tail(self, server: str, conv_id: str, limit: int) -> List[Dict[str, Any]]:
+        """最近 limit 条消息（按时间顺序）"""
+        rows = self.conn.execute(
+            "SELECT message_id, role, content, created_at FROM messages "
+            "WHERE server = ? AND conversation_id = ? ORDER BY created_at DESC LIMIT ?",
+            (server, conv_id, limit),
+        ).fetchall()
+        return [
+            {"message_id": row[0], "conversation_id": conv_id, "role": row[1], "content": row[2], "created_at": row[3]}
+            for row in reversed(rows)
+        ]
@@ -1,90 +1,289 @@
 """
-[INPUT]: 依赖 httpx 的 Client，依赖 typing 的类型注解
-[OUTPUT]: 对外提供 APIClient 类，封装与后端 API 的 HTTP 交互
+[INPUT]: 依赖 httpx 的 AsyncClient，依赖 websockets 的 asyncio 客户端，依赖 cli.cache 的 TranscriptCache，可选依赖 h2（HTTP/2）
+[OUTPUT]: 对外提供 APIClient 类（封装与后端 API 的异步 HTTP 交互，历史与会话列表按 ETag 条件请求复用本地副本，对话记录按 since 游标增量同步到本地缓存）与 RealtimeSession 类（WebSocket 实时通道）
 [POS]: cli 的 HTTP 客户端，被所有 commands 模块消费
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
+import asyncio
 import httpx
-from typing import Dict, Any, List, Optional
+import json
+import uuid
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from websockets.asyncio.client import ClientConnection, connect
+from .cache import TranscriptCache
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:  # 可选依赖：uv sync --extra http2
+    HTTP2_AVAILABLE = False
+
+# 增量同步每页条数（历史接口 limit 上限）
+_SYNC_PAGE_SIZE = 200
 
 
 class APIClient:
-    """HTTP 客户端封装
+    """异步 HTTP 客户端封装
 
-    提供与后端 API 交互的所有方法
+    提供与后端 API 交互的所有方法，用法：
+        async with APIClient(api_url) as client:
+            await client.list_users()
+
+    - 安装 h2 时启用 HTTP/2（经 TLS 反向代理时多个请求复用同一连接；明文直连 uvicorn 时仍为 HTTP/1.1）
+    - 历史与会话列表带 If-None-Match 请求，服务端返回 304 时复用上次结果
+    - 对话记录按 since 游标增量同步到本地 TranscriptCache
+    - 导入导出流式收发，响应压缩（gzip/br）由 httpx 自动协商与解压
     """
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        http2: Optional[bool] = None,
+        timeout: float = 30.0,
+        limits: Optional[httpx.Limits] = None,
+    ):
         self.base_url = base_url.rstrip("/")
-        self.client = httpx.Client(base_url=self.base_url, timeout=30.0)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            http2=HTTP2_AVAILABLE if http2 is None else http2,
+            limits=limits or httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        self._validated: Dict[Tuple[str, Tuple], Tuple[str, Any]] = {}  # (url, params) → (ETag, 数据)
 
-    def close(self):
+    async def __aenter__(self) -> "APIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self):
         """关闭客户端"""
-        self.client.close()
+        await self.client.aclose()
+
+    async def _get_validated(self, url: str, params: Dict[str, Any]) -> Any:
+        """条件 GET：携带上次的 ETag，304 时返回缓存数据"""
+        key = (url, tuple(sorted(params.items())))
+        cached = self._validated.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = await self.client.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._validated[key] = (etag, data)
+        else:
+            self._validated.pop(key, None)
+        return data
 
     # ==================== 用户管理 ====================
-    def create_user(self, username: str) -> Dict[str, Any]:
+    async def create_user(self, username: str) -> Dict[str, Any]:
         """创建用户"""
-        response = self.client.post("/api/users", json={"username": username})
+        response = await self.client.post("/api/users", json={"username": username})
         response.raise_for_status()
         return response.json()
 
-    def list_users(self) -> List[Dict[str, Any]]:
+    async def list_users(self) -> List[Dict[str, Any]]:
         """列出所有用户"""
-        response = self.client.get("/api/users")
+        response = await self.client.get("/api/users")
+        response.raise_for_status()
+        return response.json()
+
+    async def delete_user(self, user_id: str) -> Dict[str, Any]:
+        """删除用户（会话与消息由服务端后台任务级联删除）"""
+        response = await self.client.delete(f"/api/users/{user_id}")
         response.raise_for_status()
         return response.json()
 
     # ==================== Agent 管理 ====================
-    def create_agent(
+    async def create_agent(
         self, name: str, system_prompt: str, model: str = "gpt-4o-mini"
     ) -> Dict[str, Any]:
         """创建 Agent"""
-        response = self.client.post(
+        response = await self.client.post(
             "/api/agents",
             json={"name": name, "system_prompt": system_prompt, "model": model},
         )
         response.raise_for_status()
         return response.json()
 
-    def list_agents(self) -> List[Dict[str, Any]]:
+    async def list_agents(self) -> List[Dict[str, Any]]:
         """列出所有 Agent"""
-        response = self.client.get("/api/agents")
+        response = await self.client.get("/api/agents")
         response.raise_for_status()
         return response.json()
 
     # ==================== 会话管理 ====================
-    def create_conversation(
+    async def create_conversation(
         self, user_id: str, agent_id: str, title: Optional[str] = None
     ) -> Dict[str, Any]:
         """创建会话"""
         data = {"user_id": user_id, "agent_id": agent_id}
         if title:
             data["title"] = title
-        response = self.client.post("/api/conversations", json=data)
+        response = await self.client.post("/api/conversations", json=data)
         response.raise_for_status()
         return response.json()
 
-    def list_conversations(self, user_id: str) -> List[Dict[str, Any]]:
-        """列出用户的所有会话"""
-        response = self.client.get("/api/conversations", params={"user_id": user_id})
+    async def get_conversation(self, conv_id: str) -> Dict[str, Any]:
+        """获取会话详情"""
+        response = await self.client.get(f"/api/conversations/{conv_id}")
         response.raise_for_status()
         return response.json()
 
+    async def list_conversations(self, user_id: str) -> List[Dict[str, Any]]:
+        """列出用户的所有会话"""
+        return await self._get_validated("/api/conversations", {"user_id": user_id})
+
     # ==================== 消息与对话 ====================
-    def send_message(self, conv_id: str, content: str) -> Dict[str, Any]:
+    async def send_message(self, conv_id: str, content: str) -> Dict[str, Any]:
         """发送消息并获取回复"""
-        response = self.client.post(
+        response = await self.client.post(
             f"/api/conversations/{conv_id}/chat", json={"content": content}
         )
         response.raise_for_status()
         return response.json()
 
-    def get_messages(self, conv_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    async def get_messages(self, conv_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """获取对话历史"""
-        response = self.client.get(
-            f"/api/conversations/{conv_id}/messages", params={"limit": limit}
+        return await self._get_validated(f"/api/conversations/{conv_id}/messages", {"limit": limit})
+
+    async def sync_transcript(self, conv_id: str, cache: TranscriptCache) -> List[Dict[str, Any]]:
+        """把会话历史增量同步到本地缓存，返回本次新增的消息（按时间顺序）
+
+        从缓存记录的游标（上次同步到的最后一条 created_at）起分页拉取，只下载新消息；
+        服务端历史代次与缓存记录不一致（过期折叠、重新计算 token）时丢弃副本全量重拉。
+        游标含边界，边界上已缓存的消息按 message_id 去重。
+        """
+        generation, cursor = cache.state(self.base_url, conv_id)
+        added: List[Dict[str, Any]] = []
+        while True:
+            params: Dict[str, Any] = {"limit": _SYNC_PAGE_SIZE}
+            if cursor:
+                params["since"] = cursor
+            response = await self.client.get(f"/api/conversations/{conv_id}/messages", params=params)
+            response.raise_for_status()
+            current = response.headers.get("X-History-Generation")
+            if generation is not None and current != generation:
+                # 已有历史被改写，本地副本作废，从头同步
+                cache.reset(self.base_url, conv_id)
+                generation, cursor, added = None, None, []
+                continue
+            generation = current
+
+            page = response.json()
+            added += cache.append(self.base_url, conv_id, page)
+            last = page[-1]["created_at"] if page else cursor
+            if len(page) < _SYNC_PAGE_SIZE or last == cursor:
+                cursor = last
+                break
+            cursor = last
+        cache.set_state(self.base_url, conv_id, generation, cursor)
+        return added
+
+    async def open_realtime(self, user_id: str) -> "RealtimeSession":
+        """建立该用户的 WebSocket 实时通道（流式对话 + 服务端推送）"""
+        ws_url = "ws" + self.base_url[len("http"):] if self.base_url.startswith("http") else self.base_url
+        return await RealtimeSession.open(f"{ws_url}/api/ws?user_id={user_id}")
+
+    # ==================== 导入导出 ====================
+    async def export_to_file(
+        self,
+        path: str,
+        user_id: Optional[str] = None,
+        conv_id: Optional[str] = None,
+        compression: Optional[str] = None,
+    ) -> int:
+        """流式导出到文件（边下载边写盘），返回写入字节数"""
+        url = f"/api/users/{user_id}/export" if user_id else f"/api/conversations/{conv_id}/export"
+        params = {"compression": compression} if compression else {}
+        written = 0
+        async with self.client.stream("GET", url, params=params, timeout=None) as response:
+            response.raise_for_status()
+            with open(path, "wb") as f:
+                async for chunk in response.aiter_raw():
+                    f.write(chunk)
+                    written += len(chunk)
+        return written
+
+    async def import_from_file(self, path: str, compression: Optional[str] = None) -> Dict[str, Any]:
+        """流式上传 NDJSON 文件导入"""
+        params = {"compression": compression} if compression else {}
+        response = await self.client.post(
+            "/api/import", params=params, content=_iter_file(path), timeout=None
         )
         response.raise_for_status()
         return response.json()
+
+
+class RealtimeSession:
+    """WebSocket 实时通道
+
+    同一连接上多路复用对话轮次（按 request_id 区分）与服务端推送：
+    后台读取协程把属于进行中轮次的事件分发到该轮的队列，其余事件（推送）暂存，由 poll_pushed 取出。
+    """
+
+    def __init__(self, ws: ClientConnection, ready: Dict[str, Any]):
+        self.ws = ws
+        self.connection_id = ready.get("connection_id")
+        self._turns: Dict[str, "asyncio.Queue[Optional[Dict[str, Any]]]"] = {}
+        self._pushed: List[Dict[str, Any]] = []
+        self._reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def open(cls, url: str) -> "RealtimeSession":
+        ws = await connect(url)
+        return cls(ws, json.loads(await ws.recv()))
+
+    async def chat(self, conv_id: str, content: str) -> AsyncIterator[Dict[str, Any]]:
+        """发送一轮对话，依次产出 turn.started / turn.delta / turn.completed（或 turn.failed）事件"""
+        request_id = str(uuid.uuid4())
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self._turns[request_id] = queue
+        try:
+            await self.ws.send(
+                json.dumps(
+                    {"type": "chat", "conversation_id": conv_id, "content": content, "request_id": request_id}
+                )
+            )
+            while True:
+                event = await queue.get()
+                if event is None:
+                    raise ConnectionError("实时通道已断开")
+                yield event
+                if event["type"] in ("turn.completed", "turn.failed"):
+                    return
+        finally:
+            self._turns.pop(request_id, None)
+
+    def poll_pushed(self) -> List[Dict[str, Any]]:
+        """取出已到达的推送事件（不阻塞）"""
+        events, self._pushed = self._pushed, []
+        return events
+
+    async def close(self) -> None:
+        await self.ws.close()
+        await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self) -> None:
+        try:
+            async for raw in self.ws:
+                event = json.loads(raw)
+                queue = self._turns.get(event.get("request_id"))
+                if queue is not None:
+                    queue.put_nowait(event)
+                else:
+                    self._pushed.append(event)
+        finally:
+            for queue in self._turns.values():
+                queue.put_nowait(None)
+
+
+async def _iter_file(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """按块读取文件，上传时不整体载入内存"""
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
@@ -4,6 +4,6 @@ cli.commands - CLI 子命令模块
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
-from . import user, agent, chat
+from . import user, agent, chat, data, bench
 
-__all__ = ["user", "agent", "chat"]
+__all__ = ["user", "agent", "chat", "data", "bench"]
@@ -5,6 +5,7 @@
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
+import asyncio
 import typer
 from rich.console import Console
 from rich.table import Table
@@ -22,18 +23,20 @@ def create_agent(
     api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
 ):
     """创建 Agent"""
-    client = APIClient(api_url)
-    try:
-        agent = client.create_agent(name, system_prompt, model)
-        console.print(f"[green]✓[/green] Agent 创建成功")
-        console.print(f"  agent_id: {agent['agent_id']}")
-        console.print(f"  name: {agent['name']}")
-        console.print(f"  model: {agent['model']}")
-    except Exception as e:
-        console.print(f"[red]✗[/red] 创建失败: {e}")
-        raise typer.Exit(1)
-    finally:
-        client.close()
+    asyncio.run(_create_agent(name, system_prompt, model, api_url))
+
+
+async def _create_agent(name: str, system_prompt: str, model: str, api_url: str):
+    async with APIClient(api_url) as client:
+        try:
+            agent = await client.create_agent(name, system_prompt, model)
+            console.print(f"[green]✓[/green] Agent 创建成功")
+            console.print(f"  agent_id: {agent['agent_id']}")
+            console.print(f"  name: {agent['name']}")
+            console.print(f"  model: {agent['model']}")
+        except Exception as e:
+            console.print(f"[red]✗[/red] 创建失败: {e}")
+            raise typer.Exit(1)
 
 
 @app.command("list")
@@ -41,33 +44,34 @@ def list_agents(
     api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
 ):
     """列出所有 Agent"""
-    client = APIClient(api_url)
-    try:
-        agents = client.list_agents()
+    asyncio.run(_list_agents(api_url))
+
 
-        if not agents:
-            console.print("[yellow]暂无 Agent[/yellow]")
-            return
+async def _list_agents(api_url: str):
+    async with APIClient(api_url) as client:
+        try:
+            agents = await client.list_agents()
+        except Exception as e:
+            console.print(f"[red]✗[/red] 查询失败: {e}")
+            raise typer.Exit(1)
 
-        table = Table(title="Agent 列表")
-        table.add_column("Agent ID", style="cyan")
-        table.add_column("Name", style="green")
-        table.add_column("Model", style="yellow")
-        table.add_column("System Prompt", style="magenta", no_wrap=False)
+    if not agents:
+        console.print("[yellow]暂无 Agent[/yellow]")
+        return
 
-        for agent in agents:
-            prompt_preview = agent["system_prompt"][:50] + "..." if len(agent["system_prompt"]) > 50 else agent["system_prompt"]
-            table.add_row(
-                agent["agent_id"],
-                agent["name"],
-                agent["model"],
-                prompt_preview,
-            )
+    table = Table(title="Agent 列表")
+    table.add_column("Agent ID", style="cyan")
+    table.add_column("Name", style="green")
+    table.add_column("Model", style="yellow")
+    table.add_column("System Prompt", style="magenta", no_wrap=False)
 
-        console.print(table)
+    for agent in agents:
+        prompt_preview = agent["system_prompt"][:50] + "..." if len(agent["system_prompt"]) > 50 else agent["system_prompt"]
+        table.add_row(
+            agent["agent_id"],
+            agent["name"],
+            agent["model"],
+            prompt_preview,
+        )
 
-    except Exception as e:
-        console.print(f"[red]✗[/red] 查询失败: {e}")
-        raise typer.Exit(1)
-    finally:
-        client.close()
+    console.print(table)
@@ -0,0 +1,326 @@
+"""
+[INPUT]: 依赖 typer 的 Typer/Option，依赖 rich 的 Console/Table，依赖 httpx 的 Limits/异常类型，依赖 cli.client 的 APIClient/RealtimeSession
+[OUTPUT]: 对外提供压测命令（chat）：批量准备用户/Agent/会话，按并发数（闭环）或目标 RPS（开环）驱动对话接口，输出吞吐、延迟分位、首 token 时间与错误分类；percentile 最近秩百分位工具函数（benchmarks 共用）
+[POS]: cli/commands 的容量测试命令，被 cli/main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+import asyncio
+import json
+import math
+import time
+import httpx
+import typer
+from rich.console import Console
+from rich.table import Table
+from ..client import APIClient, RealtimeSession
+
+app = typer.Typer()
+console = Console()
+
+# 准备阶段批量创建资源的并发上限
+_SETUP_CONCURRENCY = 32
+
+
+@dataclass
+class Sample:
+    """一次对话请求的结果（时间均为相对压测开始的秒数）"""
+
+    start: float
+    end: float
+    ttft: Optional[float] = None  # 首 token 时间（仅 ws 传输）
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位：升序第 ceil(pct% · n) 个（values 为空时返回 0），benchmarks 共用此实现"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _classify(e: BaseException) -> str:
+    """错误分类：HTTP 状态码 / 超时 / 连接错误 / 异常类型"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP {e.response.status_code}"
+    if isinstance(e, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(e, (httpx.ConnectError, ConnectionError, OSError)):
+        return "connect error"
+    return type(e).__name__
+
+
+# ==================== 数据准备 ====================
+async def _prepare(
+    client: APIClient, users: int, conversations: int, agent_id: Optional[str], model: str
+) -> Tuple[List[str], str, List[Tuple[str, str]]]:
+    """批量创建用户、Agent 与会话，返回 (用户 ID 列表, Agent ID, [(会话 ID, 用户 ID)])"""
+    semaphore = asyncio.Semaphore(_SETUP_CONCURRENCY)
+
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    stamp = int(time.time())
+    user_ids = [
+        u["user_id"]
+        for u in await asyncio.gather(
+            *(limited(client.create_user(f"bench-{stamp}-{i}")) for i in range(users))
+        )
+    ]
+    if agent_id is None:
+        agent = await client.create_agent(
+            f"bench-{stamp}", "你是一个简洁的助手，回答控制在两三句话以内。", model
+        )
+        agent_id = agent["agent_id"]
+    convs = await asyncio.gather(
+        *(
+            limited(client.create_conversation(user_ids[i % users], agent_id, title=f"bench {i}"))
+            for i in range(conversations)
+        )
+    )
+    return user_ids, agent_id, [(c["conversation_id"], c["user_id"]) for c in convs]
+
+
+# ==================== 单次请求 ====================
+class _Driver:
+    """按传输方式发起一轮对话并记录结果"""
+
+    def __init__(self, client: APIClient, transport: str, message: str, timeout: float):
+        self.client = client
+        self.transport = transport
+        self.message = message
+        self.timeout = timeout
+        self.sessions: Dict[str, RealtimeSession] = {}  # 会话 ID → 实时通道（ws 传输每会话一条连接）
+        self.samples: List[Sample] = []
+        self.origin = time.perf_counter()
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    async def open(self, convs: List[Tuple[str, str]]) -> None:
+        if self.transport != "ws":
+            return
+        sessions = await asyncio.gather(*(self.client.open_realtime(user_id) for _, user_id in convs))
+        self.sessions = {conv_id: s for (conv_id, _), s in zip(convs, sessions)}
+
+    async def close(self) -> None:
+        await asyncio.gather(*(s.close() for s in self.sessions.values()), return_exceptions=True)
+
+    async def run(self, conv_id: str) -> None:
+        sample = Sample(start=self.now(), end=0.0)
+        try:
+            if self.transport == "ws":
+                await asyncio.wait_for(self._stream(conv_id, sample), self.timeout)
+            else:
+                await self.client.send_message(conv_id, self.message)
+        except Exception as e:
+            sample.error = _classify(e)
+        sample.end = self.now()
+        self.samples.append(sample)
+
+    async def _stream(self, conv_id: str, sample: Sample) -> None:
+        async for event in self.sessions[conv_id].chat(conv_id, self.message):
+            if event["type"] == "turn.delta" and sample.ttft is None:
+                sample.ttft = self.now() - sample.start
+            elif event["type"] == "turn.failed":
+                sample.error = f"WS {event['status']}"
+
+
+# ==================== 负载模型 ====================
+async def _closed_loop(driver: _Driver, convs: List[str], concurrency: int, ramp: float, until: float) -> None:
+    """闭环：concurrency 个工作协程各自循环发送（上一轮结束才发下一轮），在 ramp 秒内依次启动"""
+
+    async def worker(index: int) -> None:
+        await asyncio.sleep(ramp * index / concurrency)
+        conv_id = convs[index % len(convs)]
+        while driver.now() < until:
+            await driver.run(conv_id)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def _open_loop(
+    driver: _Driver, convs: List[str], rps: float, ramp: float, until: float, max_inflight: int
+) -> int:
+    """开环：按到达时间表发送，不等待上一轮结束；速率在 ramp 秒内由 0 线性升至 rps
+
+    到达时间由累计到达数反解：N(t) = rps·t²/(2·ramp)（爬坡期），之后 N(t) 每秒增加 rps。
+    在途请求达到 max_inflight 时跳过该次到达并计为丢弃（客户端侧过载），返回丢弃数。
+    """
+    inflight: set = set()
+    dropped = 0
+    ramp_arrivals = rps * ramp / 2
+    k = 0
+    while True:
+        k += 1
+        if k <= ramp_arrivals:
+            at = math.sqrt(2 * ramp * k / rps)
+        else:
+            at = ramp + (k - ramp_arrivals) / rps
+        if at >= until:
+            break
+        delay = at - driver.now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(driver.run(convs[k % len(convs)]))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    await asyncio.gather(*inflight)
+    return dropped
+
+
+# ==================== 结果汇总 ====================
+def _summarize(samples: List[Sample], window: Tuple[float, float], dropped: int) -> Dict[str, Any]:
+    """统计测量窗口（爬坡结束到停止发送）内发起的请求；吞吐按窗口内完成的成功请求计算"""
+    begin, end = window
+    measured = [s for s in samples if begin <= s.start < end]
+    ok = [s for s in measured if s.error is None]
+    latencies = [s.end - s.start for s in ok]
+    ttfts = [s.ttft for s in ok if s.ttft is not None]
+    completed = sum(1 for s in samples if s.error is None and begin <= s.end < end)
+
+    def dist(values: List[float]) -> Dict[str, float]:
+        return {
+            "p50": round(percentile(values, 50) * 1000, 1),
+            "p95": round(percentile(values, 95) * 1000, 1),
+            "p99": round(percentile(values, 99) * 1000, 1),
+            "max": round(max(values) * 1000, 1) if values else 0.0,
+        }
+
+    return {
+        "requests": len(measured),
+        "ok": len(ok),
+        "errors": len(measured) - len(ok),
+        "dropped": dropped,
+        "throughput_rps": round(completed / (end - begin), 2) if end > begin else 0.0,
+        "latency_ms": dist(latencies),
+        "ttft_ms": dist(ttfts) if ttfts else None,
+        "error_breakdown": dict(Counter(s.error for s in measured if s.error).most_common()),
+    }
+
+
+def _render(config: Dict[str, Any], result: Dict[str, Any]) -> None:
+    mode = f"rps={config['rps']}" if config["rps"] else f"concurrency={config['concurrency']}"
+    console.print(f"[bold]bench chat[/bold]  transport={config['transport']}  {mode}  测量 {config['duration']}s")
+    table = Table()
+    table.add_column("指标", style="cyan")
+    table.add_column("值", style="green", justify="right")
+    table.add_row("请求数", str(result["requests"]))
+    table.add_row("成功 / 失败", f"{result['ok']} / {result['errors']}")
+    if result["dropped"]:
+        table.add_row("丢弃（在途上限）", str(result["dropped"]))
+    table.add_row("吞吐 (req/s)", str(result["throughput_rps"]))
+    for name, key in (("延迟", "latency_ms"), ("首 token", "ttft_ms")):
+        dist = result[key]
+        if dist:
+            for p in ("p50", "p95", "p99", "max"):
+                table.add_row(f"{name} {p} (ms)", str(dist[p]))
+    console.print(table)
+
+    if result["error_breakdown"]:
+        errors = Table(title="错误分类")
+        errors.add_column("错误", style="red")
+        errors.add_column("次数", justify="right")
+        for kind, count in result["error_breakdown"].items():
+            errors.add_row(kind, str(count))
+        console.print(errors)
+
+
+# ==================== 命令 ====================
+@app.command("chat")
+def bench_chat(
+    users: int = typer.Option(10, "--users", help="创建的用户数"),
+    conversations: int = typer.Option(20, "--conversations", help="创建的会话数（轮流分配给用户）"),
+    agent_id: Optional[str] = typer.Option(None, "--agent-id", "-a", help="复用已有 Agent（默认新建）"),
+    model: str = typer.Option("gpt-4o-mini", "--model", "-m", help="新建 Agent 使用的模型"),
+    concurrency: int = typer.Option(10, "--concurrency", "-c", help="闭环并发数（未指定 --rps 时生效）"),
+    rps: Optional[float] = typer.Option(None, "--rps", help="开环目标速率（请求/秒），指定后忽略 --concurrency"),
+    max_inflight: int = typer.Option(1000, "--max-inflight", help="开环模式的在途请求上限"),
+    duration: float = typer.Option(30.0, "--duration", "-d", help="测量时长（秒，不含爬坡）"),
+    ramp: float = typer.Option(0.0, "--ramp", help="爬坡时长（秒），期间的请求不计入统计"),
+    transport: str = typer.Option("http", "--transport", "-t", help="http（POST /chat）或 ws（流式，统计首 token 时间）"),
+    message: str = typer.Option("你好，请用一句话介绍你自己。", "--message", help="每轮发送的内容"),
+    timeout: float = typer.Option(120.0, "--timeout", help="单轮超时（秒）"),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="结果写入 JSON 文件，便于对比多次运行"),
+    cleanup: bool = typer.Option(False, "--cleanup", help="结束后删除创建的用户（会话与消息后台级联删除）"),
+    api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
+):
+    """对话接口压测
+
+    用法示例：
+        uv run cli bench chat --concurrency 50 --duration 60 --ramp 10
+        uv run cli bench chat --rps 20 --transport ws --output run.json
+
+    闭环（--concurrency）测量给定并发下的吞吐上限；开环（--rps）按固定到达率发送，
+    反映服务过载时的排队与错误。测试数据写入目标服务，建议使用独立数据库。
+    """
+    if transport not in ("http", "ws"):
+        console.print("[red]✗[/red] --transport 只能是 http 或 ws")
+        raise typer.Exit(1)
+    if users < 1 or conversations < 1 or duration <= 0 or (rps is not None and rps <= 0):
+        console.print("[red]✗[/red] 用户数、会话数、时长与 RPS 必须为正数")
+        raise typer.Exit(1)
+
+    config = {
+        "api_url": api_url,
+        "transport": transport,
+        "users": users,
+        "conversations": conversations,
+        "concurrency": None if rps else concurrency,
+        "rps": rps,
+        "duration": duration,
+        "ramp": ramp,
+        "message": message,
+        "model": model,
+    }
+    result = asyncio.run(_bench(config, agent_id, max_inflight, timeout, cleanup))
+    _render(config, result)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "result": result}, f, ensure_ascii=False, indent=2)
+        console.print(f"[green]✓[/green] 结果已写入: {output}")
+
+
+async def _bench(
+    config: Dict[str, Any], agent_id: Optional[str], max_inflight: int, timeout: float, cleanup: bool
+) -> Dict[str, Any]:
+    pool = max(config["concurrency"] or 0, max_inflight if config["rps"] else 0) + _SETUP_CONCURRENCY
+    limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+    async with APIClient(config["api_url"], timeout=timeout, limits=limits) as client:
+        console.print("[cyan]正在准备用户、Agent 与会话...[/cyan]")
+        try:
+            user_ids, agent_id, convs = await _prepare(
+                client, config["users"], config["conversations"], agent_id, config["model"]
+            )
+        except Exception as e:
+            console.print(f"[red]✗[/red] 准备数据失败: {e}")
+            raise typer.Exit(1)
+        console.print(f"[green]✓[/green] {len(user_ids)} 个用户，{len(convs)} 个会话，Agent {agent_id}")
+
+        driver = _Driver(client, config["transport"], config["message"], timeout)
+        try:
+            await driver.open(convs)
+            conv_ids = [conv_id for conv_id, _ in convs]
+            driver.origin = time.perf_counter()
+            until = config["ramp"] + config["duration"]
+            console.print(f"[cyan]压测中（爬坡 {config['ramp']}s + 测量 {config['duration']}s）...[/cyan]")
+            dropped = 0
+            if config["rps"]:
+                dropped = await _open_loop(driver, conv_ids, config["rps"], config["ramp"], until, max_inflight)
+            else:
+                await _closed_loop(driver, conv_ids, config["concurrency"], config["ramp"], until)
+        finally:
+            await driver.close()
+            if cleanup:
+                await asyncio.gather(*(client.delete_user(u) for u in user_ids), return_exceptions=True)
+
+    return _summarize(driver.samples, (config["ramp"], until), dropped)
@@ -1,82 +1,192 @@
 """
-[INPUT]: 依赖 typer 的 Typer/Option，依赖 rich.console 的 Console/Markdown，依赖 cli.client 的 APIClient
-[OUTPUT]: 对外提供交互式对话命令（start）
+[INPUT]: 依赖 typer 的 Typer/Option，依赖 rich 的 Console/Live/Markdown/Panel，依赖 cli.client 的 APIClient/RealtimeSession，依赖 cli.cache 的 TranscriptCache
+[OUTPUT]: 对外提供交互式对话命令（start，支持 --resume 续聊已有会话）
 [POS]: cli/commands 的核心对话命令，被 cli/main.py 注册
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
+from typing import Any, Dict, List, Optional
+import asyncio
+import threading
 import typer
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
-from ..client import APIClient
+from rich.text import Text
+from ..client import APIClient, RealtimeSession
+from ..cache import TranscriptCache
 
 app = typer.Typer()
 console = Console()
 
+# 续聊时展示的最近消息条数
+_RESUME_TAIL = 20
+
 
 @app.command("start")
 def start_chat(
-    user_id: str = typer.Option(..., "--user-id", "-u", help="用户 ID"),
-    agent_id: str = typer.Option(..., "--agent-id", "-a", help="Agent ID"),
+    user_id: Optional[str] = typer.Option(None, "--user-id", "-u", help="用户 ID（新建会话时必填）"),
+    agent_id: Optional[str] = typer.Option(None, "--agent-id", "-a", help="Agent ID（新建会话时必填）"),
+    resume: Optional[str] = typer.Option(None, "--resume", "-r", help="续聊已有会话（会话 ID）"),
     api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
 ):
     """启动交互式对话
 
     用法示例：
         uv run cli chat start --user-id <user_id> --agent-id <agent_id>
+        uv run cli chat start --resume <conversation_id>
 
+    对话经 WebSocket 实时通道进行：回复以 Markdown 流式展示，服务端主动推送的消息在下次输入前展示。
+    对话记录缓存在本地（见 cli/cache.py），续聊时先展示本地副本，再按游标只拉取新消息。
     输入 'exit' 或 'quit' 退出对话
     """
-    client = APIClient(api_url)
-
-    try:
-        # 创建会话
-        console.print("[cyan]正在创建会话...[/cyan]")
-        conv = client.create_conversation(user_id, agent_id)
-        conv_id = conv["conversation_id"]
-        console.print(f"[green]✓[/green] 会话已创建: {conv_id}")
-        console.print()
-
-        # 交互循环
-        console.print("[yellow]开始对话（输入 'exit' 或 'quit' 退出）[/yellow]")
-        console.print("─" * 60)
+    if not resume and not (user_id and agent_id):
+        console.print("[red]✗[/red] 新建会话需要 --user-id 与 --agent-id，续聊使用 --resume <会话 ID>")
+        raise typer.Exit(1)
+    asyncio.run(_chat(user_id, agent_id, resume, api_url))
+
+
+async def _chat(user_id: Optional[str], agent_id: Optional[str], resume: Optional[str], api_url: str):
+    cache = TranscriptCache()
+    session: Optional[RealtimeSession] = None
+
+    async with APIClient(api_url) as client:
+        try:
+            if resume:
+                conv_id = resume
+                user_id = await _resume(client, cache, conv_id)
+            else:
+                # 创建会话
+                console.print("[cyan]正在创建会话...[/cyan]")
+                conv = await client.create_conversation(user_id, agent_id)
+                conv_id = conv["conversation_id"]
+                console.print(f"[green]✓[/green] 会话已创建: {conv_id}")
+            session = await client.open_realtime(user_id)
+            console.print()
+        except Exception as e:
+            console.print(f"[red]✗[/red] 会话创建失败: {e}")
+            cache.close()
+            raise typer.Exit(1)
+
+        try:
+            # 交互循环
+            console.print("[yellow]开始对话（输入 'exit' 或 'quit' 退出）[/yellow]")
+            console.print("─" * 60)
+            console.print()
+
+            while True:
+                _show_pushed(session.poll_pushed(), conv_id, cache, client.base_url)
+
+                # 读取用户输入（在独立线程等待键盘，期间实时通道继续接收推送）
+                try:
+                    user_input = await _input("[bold blue]You:[/bold blue] ")
+                except EOFError:
+                    user_input = "exit"
+
+                if user_input.strip().lower() in ["exit", "quit", "q"]:
+                    console.print("[yellow]再见![/yellow]")
+                    break
+
+                if not user_input.strip():
+                    continue
+
+                # 发送消息，流式展示回复（使用 Markdown 渲染）
+                try:
+                    console.print()
+                    await _stream_turn(session, conv_id, user_input, cache, client.base_url)
+                    console.print()
+
+                except Exception as e:
+                    console.print(f"[red]✗[/red] 消息发送失败: {e}")
+                    console.print()
+
+        finally:
+            await session.close()
+            cache.close()
+
+
+async def _resume(client: APIClient, cache: TranscriptCache, conv_id: str) -> str:
+    """续聊：先展示本地副本，再增量同步并补充展示新消息，返回会话所属用户"""
+    shown = cache.tail(client.base_url, conv_id, _RESUME_TAIL)
+    _show_transcript(shown)
+
+    conv = await client.get_conversation(conv_id)
+    await client.sync_transcript(conv_id, cache)
+    shown_ids = {m["message_id"] for m in shown}
+    _show_transcript(
+        [m for m in cache.tail(client.base_url, conv_id, _RESUME_TAIL) if m["message_id"] not in shown_ids]
+    )
+    console.print(f"[green]✓[/green] 已续聊会话: {conv_id}")
+    return conv["user_id"]
+
+
+async def _input(prompt: str) -> str:
+    """在守护线程中读取键盘输入（Ctrl+C 退出时不等待该线程）"""
+    loop = asyncio.get_running_loop()
+    future: "asyncio.Future[str]" = loop.create_future()
+
+    def settle(result: Optional[str], error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def read() -> None:
+        try:
+            result = console.input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, None, e)
+            return
+        loop.call_soon_threadsafe(settle, result, None)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+def _panel(content: str, title: str = "Assistant") -> Panel:
+    return Panel(Markdown(content), title=f"[bold green]{title}[/bold green]", border_style="green")
+
+
+def _show_transcript(messages: List[Dict[str, Any]]) -> None:
+    for message in messages:
+        if message["role"] == "assistant":
+            console.print(_panel(message["content"]))
+        else:
+            console.print(f"[bold blue]{message['role'].capitalize()}:[/bold blue] {message['content']}")
         console.print()
 
-        while True:
-            # 读取用户输入
-            user_input = console.input("[bold blue]You:[/bold blue] ")
 
-            if user_input.strip().lower() in ["exit", "quit", "q"]:
-                console.print("[yellow]再见![/yellow]")
-                break
-
-            if not user_input.strip():
+async def _stream_turn(
+    session: RealtimeSession, conv_id: str, content: str, cache: TranscriptCache, server: str
+) -> None:
+    """发送一轮对话，随增量刷新回复面板，用户消息与回复写入本地缓存"""
+    text = ""
+    with Live(_panel("…"), console=console, refresh_per_second=12) as live:
+        async for event in session.chat(conv_id, content):
+            if event["type"] == "turn.started":
+                cache.append(server, conv_id, [event["message"]])
+            elif event["type"] == "turn.delta":
+                text += event["content"]
+                live.update(_panel(text))
+            elif event["type"] == "turn.completed":
+                cache.append(server, conv_id, [event["message"]])
+                live.update(_panel(event["message"]["content"]))
+            elif event["type"] == "turn.failed":
+                live.update(Text(f"✗ {event['detail']}", style="red"))
+
+
+def _show_pushed(events: List[Dict[str, Any]], conv_id: str, cache: TranscriptCache, server: str) -> None:
+    """展示等待输入期间到达的服务端推送（本会话的新消息），并写入本地缓存"""
+    for event in events:
+        message = event.get("message") or {}
+        if event.get("type") == "message.created" and message.get("conversation_id") == conv_id:
+            if not cache.append(server, conv_id, [message]):
                 continue
-
-            # 发送消息
-            try:
-                console.print("[dim]等待回复...[/dim]")
-                response = client.send_message(conv_id, user_input)
-
-                # 展示回复（使用 Markdown 渲染）
+            if message["role"] == "assistant":
+                console.print(_panel(message["content"], title="Assistant（推送）"))
                 console.print()
-                console.print(
-                    Panel(
-                        Markdown(response["content"]),
-                        title="[bold green]Assistant[/bold green]",
-                        border_style="green",
-                    )
-                )
-                console.print()
-
-            except Exception as e:
-                console.print(f"[red]✗[/red] 消息发送失败: {e}")
-                console.print()
-
-    except Exception as e:
-        console.print(f"[red]✗[/red] 会话创建失败: {e}")
-        raise typer.Exit(1)
-
-    finally:
-        client.close()
+            else:
+                _show_transcript([message])
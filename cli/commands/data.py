@@ -0,0 +1,67 @@
+"""
+[INPUT]: 依赖 typer 的 Typer/Option，依赖 rich.console 的 Console，依赖 cli.client 的 APIClient
+[OUTPUT]: 对外提供数据导入导出命令（export/import）
+[POS]: cli/commands 的数据迁移与备份命令，被 cli/main.py 注册
+[PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
+"""
+
+import asyncio
+import typer
+from typing import Optional
+from rich.console import Console
+from ..client import APIClient
+
+app = typer.Typer()
+console = Console()
+
+
+@app.command("export")
+def export_data(
+    output: str = typer.Option(..., "--output", "-o", help="输出文件路径"),
+    user_id: Optional[str] = typer.Option(None, "--user-id", "-u", help="导出该用户的全部数据"),
+    conv_id: Optional[str] = typer.Option(None, "--conversation-id", "-c", help="仅导出单个会话"),
+    zstd: bool = typer.Option(False, "--zstd", help="使用 zstd 压缩"),
+    api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
+):
+    """导出为 NDJSON 文件（流式写盘）"""
+    if bool(user_id) == bool(conv_id):
+        console.print("[red]✗[/red] 必须且只能指定 --user-id 或 --conversation-id 之一")
+        raise typer.Exit(1)
+
+    asyncio.run(_export(output, user_id, conv_id, "zstd" if zstd else None, api_url))
+
+
+async def _export(
+    output: str, user_id: Optional[str], conv_id: Optional[str], compression: Optional[str], api_url: str
+):
+    async with APIClient(api_url) as client:
+        try:
+            written = await client.export_to_file(
+                output, user_id=user_id, conv_id=conv_id, compression=compression
+            )
+            console.print(f"[green]✓[/green] 导出完成: {output} ({written} bytes)")
+        except Exception as e:
+            console.print(f"[red]✗[/red] 导出失败: {e}")
+            raise typer.Exit(1)
+
+
+@app.command("import")
+def import_data(
+    input_path: str = typer.Option(..., "--input", "-i", help="NDJSON 文件路径（.zst 自动按 zstd 解析）"),
+    api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
+):
+    """从 NDJSON 文件导入（重复 ID 自动跳过）"""
+    compression = "zstd" if input_path.endswith(".zst") else None
+    asyncio.run(_import(input_path, compression, api_url))
+
+
+async def _import(input_path: str, compression: Optional[str], api_url: str):
+    async with APIClient(api_url) as client:
+        try:
+            stats = await client.import_from_file(input_path, compression=compression)
+            console.print("[green]✓[/green] 导入完成")
+            for key in ("users", "agents", "conversations", "messages", "skipped"):
+                console.print(f"  {key}: {stats.get(key, 0)}")
+        except Exception as e:
+            console.print(f"[red]✗[/red] 导入失败: {e}")
+            raise typer.Exit(1)
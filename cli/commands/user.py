@@ -5,6 +5,7 @@
 [PROTOCOL]: 变更时更新此头部，然后检查 CLAUDE.md
 """
 
+import asyncio
 import typer
 from rich.console import Console
 from rich.table import Table
@@ -20,17 +21,19 @@ def create_user(
     api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
 ):
     """创建用户"""
-    client = APIClient(api_url)
-    try:
-        user = client.create_user(username)
-        console.print(f"[green]✓[/green] 用户创建成功")
-        console.print(f"  user_id: {user['user_id']}")
-        console.print(f"  username: {user['username']}")
-    except Exception as e:
-        console.print(f"[red]✗[/red] 创建失败: {e}")
-        raise typer.Exit(1)
-    finally:
-        client.close()
+    asyncio.run(_create_user(username, api_url))
+
+
+async def _create_user(username: str, api_url: str):
+    async with APIClient(api_url) as client:
+        try:
+            user = await client.create_user(username)
+            console.print(f"[green]✓[/green] 用户创建成功")
+            console.print(f"  user_id: {user['user_id']}")
+            console.print(f"  username: {user['username']}")
+        except Exception as e:
+            console.print(f"[red]✗[/red] 创建失败: {e}")
+            raise typer.Exit(1)
 
 
 @app.command("list")
@@ -38,28 +41,29 @@ def list_users(
     api_url: str = typer.Option("http://localhost:8000", "--api-url", help="API 地址"),
 ):
     """列出所有用户"""
-    client = APIClient(api_url)
-    try:
-        users = client.list_users()
+    asyncio.run(_list_users(api_url))
+
 
-        if not users:
-            console.print("[yellow]暂无用户[/yellow]")
-            return
+async def _list_users(api_url: str):
+    async with APIClient(api_url) as client:
+        try:
+            users = await client.list_users()
+        except Exception as e:
+            console.print(f"[red]✗[/red] 查询失败: {e}")
+            raise typer.Exit(1)
 
-        table = Table(title="用户列表")
-        table.add_column("User ID", style="cyan")
-        table.add_column("Username", style="green")
-        table.add_column("Created At", style="magenta")
+    if not users:
+        console.print("[yellow]暂无用户[/yellow]")
+        return
 
-        for user in users:
-            table.add_row(
-                user["user_id"], user["username"], user["created_at"][:19]
-            )
+    table = Table(title="用户列表")
+    table.add_column("User ID", style="cyan")
+    table.add_column("Username", style="green")
+    table.add_column("Created At", style="magenta")
 
-        console.print(table)
+    for user in users:
+        table.add_row(
+            user["user_id"], user["username"], user["created_at"][:19]
+        )
 
-    except Exception as e:
-        console.print(f"[red]✗[/red] 查询失败: {e}")
-        raise typer.Exit(1)
-    finally:
-        client.close()
+    console.print(table)
@@ -6,7 +6,7 @@
 """
 
 import typer
-from .commands import user, agent, chat
+from .commands import user, agent, chat, data, bench
 
 app = typer.Typer(
     name="cli",
@@ -18,6 +18,8 @@ app = typer.Typer(
 app.add_typer(user.app, name="user", help="用户管理")
 app.add_typer(agent.app, name="agent", help="Agent 管理")
 app.add_typer(chat.app, name="chat", help="交互式对话")
+app.add_typer(data.app, name="data", help="数据导入导出")
+app.add_typer(bench.app, name="bench", help="容量压测")
 
 
 if __name__ == "__main__":